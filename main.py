@@ -6,6 +6,9 @@ from src.common.constants import Featured_storage_DB_engines_enum as Storage_DB_
 from src.common.constants import Featured_RAG_DB_engines_enum as RAG_DB_enums
 from src.common.constants import Featured_embedding_models_enum as Embedder_enums
 from src.common.constants import Featured_chatBot_models_enum as Chatbot_enums
+from src.common.constants import Featured_vector_compressions_enum as Compression_enums
+from src.common.constants import Featured_vector_storage_formats_enum as Storage_format_enums
+from src.common.constants import Featured_retrieval_modes_enum as Retrieval_mode_enums
 
 from src.models.config_models import (Chatbot_config,  
                                       Embedder_config, 
@@ -51,7 +54,30 @@ if __name__=="__main__":
     rag_config = RAG_DB_config(db_engine = used_RAG_DB, 
                                api_key = append_config.get("api_key"), 
                                connection_url = append_config.get("db_connection_url"), 
-                               database_name = append_config.get("db_name"))
+                               database_name = append_config.get("db_name"), 
+                               vector_cache_folder_path = append_config.get("vector_cache_folder_path"), 
+                               ivf_nprobe = append_config.get("ivf_nprobe"), 
+                               index_folder_path = append_config.get("index_folder_path"), 
+                               hnsw_M = append_config.get("M", 16), 
+                               hnsw_ef_construction = append_config.get("ef_construction", 200), 
+                               hnsw_ef_search = append_config.get("ef_search", 64), 
+                               vector_compression = (Compression_enums(append_config["vector_compression"]) 
+                                                     if append_config.get("vector_compression") else None), 
+                               scan_threads = append_config.get("scan_threads", 1), 
+                               scoring_processes = append_config.get("scoring_processes"), 
+                               vector_storage_format = (Storage_format_enums(append_config["vector_storage_format"]) 
+                                                        if append_config.get("vector_storage_format") else None), 
+                               result_cache_size = append_config.get("result_cache_size", 0), 
+                               retrieval_mode = (Retrieval_mode_enums(append_config["retrieval_mode"]) 
+                                                 if append_config.get("retrieval_mode") else None), 
+                               retrieval_deadline_ms = append_config.get("retrieval_deadline_ms"), 
+                               embedder_registry_path = append_config.get("embedder_registry_path"), 
+                               server_side_scoring = append_config.get("server_side_scoring", False), 
+                               redundancy_clustering = append_config.get("redundancy_clustering", False), 
+                               duplicate_tolerance = append_config.get("duplicate_tolerance"), 
+                               document_probe = append_config.get("document_probe"), 
+                               planner_latency_target_ms = append_config.get("planner_latency_target_ms"), 
+                               index_generations = append_config.get("index_generations", False))
 
     # initialize embedder configuration object
     append_config = application_config["embedder_api_keys"]
@@ -2,6 +2,9 @@ from enum import Enum
 from llama_index.embeddings.openai import OpenAIEmbeddingModelType
 
 
+REDUNDANCY_TOLERANCE = 0.85 #similarity above which two RAG records are redundant (near-duplicates)
+
+
 class _Checks_enum_values_Mixin(Enum):
     """
     Interface extended by sub-types of Enum to ensure a value checking functionality.
@@ -34,6 +37,42 @@ class Featured_storage_DB_engines_enum(_Checks_enum_values_Mixin):
 class Featured_RAG_DB_engines_enum(_Checks_enum_values_Mixin):
     MONGODB = "MongoDB"
     PINECONE = "Pinecone"
+    HNSW = "HNSW"
+    LOCAL_FILE = "LocalFile"
+
+
+class Featured_vector_compressions_enum(_Checks_enum_values_Mixin):
+    PRODUCT_QUANTIZATION = "pq"
+    SCALAR_QUANTIZATION_INT8 = "int8"
+    BINARY_SIGN = "binary"
+
+
+class Filterable_RAG_metadata_fields_enum(_Checks_enum_values_Mixin):
+    URL = "url"
+    TITLE = "title"
+    AUTHOR = "author"
+    EMBEDDER = "embedder"
+
+
+class Featured_vector_storage_formats_enum(_Checks_enum_values_Mixin):
+    ARRAY = "array" #BSON array of doubles
+    FLOAT32 = "float32" #BSON vector (binary subtype 9) of little-endian float32
+    FLOAT16 = "float16" #user-defined binary subtype of little-endian float16
+
+
+class Featured_retrieval_modes_enum(_Checks_enum_values_Mixin):
+    VECTOR = "vector" #dense similarity only
+    HYBRID = "hybrid" #Reciprocal Rank Fusion of the BM25 and dense similarity rankings
+    LEXICAL_SHORTLIST = "lexical_shortlist" #dense similarity scored only on the BM25 candidates
+
+
+class Featured_access_paths_enum(_Checks_enum_values_Mixin):
+    MEMORY_SCAN = "memory_scan" #exact scoring of a local (in-memory or memory-mapped) copy of the vectors
+    EXACT_SCAN = "exact_scan" #exact scoring of the vectors fetched from the DB
+    SERVER_SCAN = "server_scan" #exact scoring inside the DB server, only the best records are fetched
+    IVF = "ivf" #exact scoring of the vectors of the inverted lists closest to the query
+    COMPRESSED_CODES = "compressed_codes" #compressed codes scan and exact rescoring of a shortlist
+    GRAPH = "graph" #approximate graph search (HNSW)
 
 
 class Featured_embedding_models_enum(_Checks_enum_values_Mixin):
@@ -8,8 +8,6 @@ from src.managers.chatBot_managers import ChatBot_manager
 
 
 
-#TODO(FIX): Implement a check to make sure that new embeddings ain't going to create incongruence
-#               (mixed vector types in the same collection)
 class Manager_coordinator:
     """
     General manager orchestrating other managers in order to permit strict collaboration between managers
@@ -147,9 +145,13 @@ class Manager_coordinator:
             source_vector_index_name = self.default_RAG_DB_index_name
 
         vector_query = self.embedding_manager.generate_vector_query_from_text(question)
-        return self.rag_DB_manager.retrieve_vectors_using_vectorQuery(target_collection_name = source_vector_index_name, 
-                                                                      vector_query = vector_query, 
-                                                                      top_k = top_k)
+        # the question text is also matched lexically, according to the retrieval mode of the RAG DB configuration
+        retrieved_data: list[RAG_DTModel] = self.rag_DB_manager.retrieve_vectors_using_textAndVectorQuery(
+                target_collection_name = source_vector_index_name, text_query = question, vector_query = vector_query, top_k = top_k, 
+                embedder_name = self.embedding_manager.get_embedder_name())
+        if(getattr(retrieved_data, "is_partial", False)):
+            logging.info(f"[WARNING]: The retrieval from '{source_vector_index_name}' hit its deadline: the reply is based on the best records found in time.")
+        return retrieved_data
     
     
     def clear_chat_and_script(self) -> None:
@@ -1,10 +1,16 @@
+import logging
+import numpy
 from typing import override
+from concurrent.futures import Future
 from abc import abstractmethod
 
 from src.managers.interfaces.manager_interface import Manager_I
 
 from src.common.constants import (Featured_storage_DB_engines_enum as storage_DB_engine, 
-                                  Featured_RAG_DB_engines_enum as RAG_DB_engine)
+                                  Featured_RAG_DB_engines_enum as RAG_DB_engine, 
+                                  Filterable_RAG_metadata_fields_enum as filterable_metadata_fields, 
+                                  Featured_retrieval_modes_enum as retrieval_modes, 
+                                  Featured_vector_storage_formats_enum as vector_storage_formats)
 
 from src.models.interfaces.config_interfaces import DB_config_I
 from src.models.interfaces.data_model_interface import DTModel_I
@@ -13,6 +19,10 @@ from src.models.data_models import Storage_DTModel, RAG_DTModel
 
 from src.services.db_services.interfaces.DB_operator_interfaces import DB_operator_I, RAG_DB_operator_I, Storage_DB_operator_I
 from src.services.db_services import storage_DB_operators, rag_DB_operators
+from src.services.other_services import retrieval_cache_services as retrievalCache
+from src.services.other_services import embedder_registry_services as embedderRegistry
+from src.services.other_services import vector_search_services as vectorSearch
+from src.services.other_services import query_planner_services as queryPlanner
 
 
 
@@ -168,48 +178,506 @@ class RAG_DB_manager(Abstract_DB_manager):
             raise ValueError("The DB configuration cannot be None.")
         
         self.DB_operator: RAG_DB_operator_I = _DB_operator_factory.initialize_RAG_db_operator(DB_config)
+        self.result_cache: retrievalCache.Retrieval_result_cache = (
+                retrievalCache.Retrieval_result_cache(DB_config.result_cache_size) if DB_config.result_cache_size else None)
+        self.retrieval_mode: retrieval_modes = DB_config.retrieval_mode or retrieval_modes.VECTOR
+        # with a registry, every collection is split into one physical partition per embedder
+        self.partition_registry: embedderRegistry.Embedder_partition_registry = (
+                embedderRegistry.Embedder_partition_registry(DB_config.embedder_registry_path) if DB_config.embedder_registry_path else None)
+        # with a latency target, every single-query retrieval is planned on the statistics of its collection
+        self.query_planner: queryPlanner.Query_planner = (
+                queryPlanner.Query_planner(DB_config.planner_latency_target_ms) if DB_config.planner_latency_target_ms else None)
 
     def insert_records(self, target_collection_name: str, data_models: list[RAG_DTModel]) -> bool:
         """
         Variation of insert_record to insert multiple records at once.
+        With the embedder partitions enabled, the whole batch is validated at once (see '_route_to_partitions').
         """
         self._parameters_validation(target_collection_name=target_collection_name, data_models=data_models)
         
-        flag = True
-        for data_model in data_models:
-            if(not self.insert_record(target_collection_name, data_model)):
-                flag = False
-        return flag
+        return self._insert_routed_records(target_collection_name, data_models)
 
 
     @override
     def insert_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
         self._parameters_validation(target_collection_name=target_collection_name, data_model=data_model)
         
-        return self.DB_operator.insert_record(target_collection_name, data_model)
+        return self._insert_routed_records(target_collection_name, [data_model])
     
 
     @override
     def update_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
         self._parameters_validation(target_collection_name=target_collection_name, data_model=data_model)
         
-        return self.DB_operator.update_record(target_collection_name, data_model)
+        partitioned_data_models: dict[str, list[RAG_DTModel]] = self._route_to_partitions(target_collection_name, [data_model])
+        if(len(partitioned_data_models) == 0): #the record has been rejected by the validation
+            return False
+        (partition_name, partition_data_models) = next(iter(partitioned_data_models.items()))
+        try:
+            return self.DB_operator.update_record(partition_name, partition_data_models[0])
+        finally:
+            self._invalidate_cached_results(partition_name)
+
+
+    def register_embedder_partition(self, target_collection_name: str, embedder_name: str, dimension: int, 
+                                    partition_name: str = None) -> str:
+        """
+        Registers the partition of an embedder within a collection, es. to keep using an already populated collection 
+        (passed as 'partition_name') as the partition of the embedder it has been filled with.
+        Parameters:
+            target_collection_name (str): The logical collection.
+            embedder_name (str): The embedder of the partition vectors.
+            dimension (int): The dimension of the partition vectors.
+            partition_name (str, optional): The physical collection/index of the partition (derived from the names if None).
+        Returns:
+            str: The registered partition name.
+        """
+        if(self.partition_registry is None):
+            raise ValueError("The embedder partitions are not enabled ('embedder_registry_path' is not configured).")
+        if((target_collection_name is None) or (embedder_name is None) or (dimension is None)):
+            raise ValueError("The method 'register_embedder_partition' has been called with one or more required parameters as 'None'")
+        
+        return self.partition_registry.register_partition(target_collection_name, embedder_name, dimension, partition_name)[0]
 
     
-    def retrieve_vectors_using_vectorQuery(self, target_collection_name: str, 
-                                           vector_query: list[float], top_k: int) -> list[RAG_DTModel]:
+    def retrieve_vectors_using_vectorQuery(self, target_collection_name: str, vector_query: list[float], top_k: int, 
+                                           redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                           metadata_filter: dict[str, str | list[str]] = None, embedder_name: str = None) -> list[RAG_DTModel]:
         """
         Retrieves the top_k most similar vectors to the input query from the given collection/table/index.
         Parameters:
             target_collection_name (str): The name of the collection/table/index to retrieve the vectors from.
             vector_query (list[float]): The vector query to find similar vectors.
             top_k (int): The number of top similar vectors to retrieve.
+            redundancy_tolerance (float, optional): The redundance threshold between retrieved vectors (operator default if None).
+            mmr_lambda (float, optional): The relevance/diversity trade-off of the redundance filtering (pure relevance if None).
+            metadata_filter (dict[str, str | list[str]], optional): The accepted value(s) of some metadata fields 
+                                                                    ('url', 'title', 'author', 'embedder'). 
+                                                                    Only the matching records are searched.
+            embedder_name (str, optional): The embedder of the query vector, selecting the partition to search 
+                                            (needed only if the collection has several embedder partitions).
         Returns:
             list[DTModel]: A list of the top_k most similar vectors as data models.
         """
+        target_collection_name = self._resolve_partition(target_collection_name, embedder_name, 
+                                                         None if (vector_query is None) else len(vector_query))
         self._parameters_validation(target_collection_name=target_collection_name, vector_query=vector_query, top_k=top_k)
+        metadata_filter = self._metadata_filter_normalization(metadata_filter)
+
+        cache_key: tuple = None
+        cache_epoch: int = None
+        if(self.result_cache is not None):
+            cache_key = self.result_cache.build_key(target_collection_name, vector_query, top_k, redundancy_tolerance=redundancy_tolerance, 
+                                                    mmr_lambda=mmr_lambda, metadata_filter=metadata_filter)
+            cache_epoch = self.result_cache.get_epoch(target_collection_name) #read before the retrieval (see 'Retrieval_result_cache')
+            cached_result: list[RAG_DTModel] = self.result_cache.get(cache_key)
+            if(cached_result is not None):
+                return cached_result
+
+        plan: queryPlanner.Retrieval_plan = self._plan_retrieval(target_collection_name, top_k)
+        result: list[RAG_DTModel] = self.DB_operator.retrieve_embeddings_from_vector(
+                target_collection_name, vector_query, top_k, 
+                redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, metadata_filter=metadata_filter, 
+                **({"search_options": plan.options} if (plan is not None) else dict()))
+        if((cache_key is not None) and (not getattr(result, "is_partial", False))): #deadline-truncated results are not reused
+            self.result_cache.put(cache_key, result, cache_epoch)
+        return result
+
+
+    def retrieve_vectors_using_textAndVectorQuery(self, target_collection_name: str, text_query: str, vector_query: list[float], 
+                                                  top_k: int, retrieval_mode: retrieval_modes = None, 
+                                                  redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                  metadata_filter: dict[str, str | list[str]] = None, 
+                                                  embedder_name: str = None) -> list[RAG_DTModel]:
+        """
+        Variation of retrieve_vectors_using_vectorQuery also matching the terms of the query text (BM25), 
+        so that exact titles, acronyms and author names are found even when the dense similarity ranks them poorly.
+        Parameters:
+            target_collection_name (str): The name of the collection/table/index to retrieve the vectors from.
+            text_query (str): The natural language query (the one embedded into 'vector_query').
+            vector_query (list[float]): The vector query to find similar vectors.
+            top_k (int): The number of top records to retrieve.
+            retrieval_mode (Featured_retrieval_modes_enum, optional): The way the query text and vector are combined 
+                                                                    ('hybrid', 'lexical_shortlist' or 'vector'). 
+                                                                    If None, the configured one is used.
+            redundancy_tolerance (float, optional): The redundance threshold between retrieved vectors (operator default if None).
+            mmr_lambda (float, optional): The relevance/diversity trade-off of the redundance filtering (pure relevance if None).
+            metadata_filter (dict[str, str | list[str]], optional): See 'retrieve_vectors_using_vectorQuery'.
+            embedder_name (str, optional): See 'retrieve_vectors_using_vectorQuery'.
+        Returns:
+            list[DTModel]: A list of the top_k best records as data models.
+        """
+        retrieval_mode = retrieval_mode if (retrieval_mode is not None) else self.retrieval_mode
+        if(retrieval_mode == retrieval_modes.VECTOR):
+            return self.retrieve_vectors_using_vectorQuery(target_collection_name, vector_query, top_k, redundancy_tolerance=redundancy_tolerance, 
+                                                           mmr_lambda=mmr_lambda, metadata_filter=metadata_filter, embedder_name=embedder_name)
+        target_collection_name = self._resolve_partition(target_collection_name, embedder_name, 
+                                                         None if (vector_query is None) else len(vector_query))
+        self._parameters_validation(target_collection_name=target_collection_name, text_query=text_query, 
+                                    vector_query=vector_query, top_k=top_k)
+        metadata_filter = self._metadata_filter_normalization(metadata_filter)
+
+        cache_key: tuple = None
+        cache_epoch: int = None
+        if(self.result_cache is not None):
+            cache_key = self.result_cache.build_key(target_collection_name, vector_query, top_k, text_query=text_query, 
+                                                    retrieval_mode=retrieval_mode.value, redundancy_tolerance=redundancy_tolerance, 
+                                                    mmr_lambda=mmr_lambda, metadata_filter=metadata_filter)
+            cache_epoch = self.result_cache.get_epoch(target_collection_name)
+            cached_result: list[RAG_DTModel] = self.result_cache.get(cache_key)
+            if(cached_result is not None):
+                return cached_result
+
+        result: list[RAG_DTModel] = self.DB_operator.retrieve_embeddings_from_text_and_vector(
+                target_collection_name, text_query, vector_query, top_k, retrieval_mode=retrieval_mode, 
+                redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, metadata_filter=metadata_filter)
+        if((cache_key is not None) and (not getattr(result, "is_partial", False))): #deadline-truncated results are not reused
+            self.result_cache.put(cache_key, result, cache_epoch)
+        return result
+
+
+    def retrieve_vectors_using_vectorQueries(self, target_collection_name: str, vector_queries: list[list[float]], top_k: int, 
+                                             redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                             metadata_filter: dict[str, str | list[str]] = None, 
+                                             embedder_name: str = None) -> list[list[RAG_DTModel]]:
+        """
+        Variation of retrieve_vectors_using_vectorQuery serving multiple queries with a single pass over the collection/table/index
+        (or one query at a time, if the query planner chooses an approximate access path).
+        Parameters:
+            target_collection_name (str): The name of the collection/table/index to retrieve the vectors from.
+            vector_queries (list[list[float]]): The vector queries to find similar vectors for.
+            top_k (int): The number of top similar vectors to retrieve for each query.
+            redundancy_tolerance (float, optional): The redundance threshold between retrieved vectors (operator default if None).
+            mmr_lambda (float, optional): The relevance/diversity trade-off of the redundance filtering (pure relevance if None).
+            metadata_filter (dict[str, str | list[str]], optional): See 'retrieve_vectors_using_vectorQuery'.
+            embedder_name (str, optional): See 'retrieve_vectors_using_vectorQuery'.
+        Returns:
+            list[list[DTModel]]: The top_k most similar vectors of each query as data models (same order of the queries).
+        """
+        target_collection_name = self._resolve_partition(target_collection_name, embedder_name, 
+                                                         len(vector_queries[0]) if vector_queries else None)
+        self._parameters_validation(target_collection_name=target_collection_name, vector_queries=vector_queries, top_k=top_k)
+        metadata_filter = self._metadata_filter_normalization(metadata_filter)
+
+        if(self.result_cache is None):
+            return self._retrieve_vectors_batch(target_collection_name, vector_queries, top_k, redundancy_tolerance, mmr_lambda, 
+                                                metadata_filter)
+        
+        # only the queries missing from the result cache are sent to the DB (still as a single batch)
+        cache_keys: list[tuple] = [ self.result_cache.build_key(target_collection_name, vector_query, top_k, 
+                                                                redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                                metadata_filter=metadata_filter) 
+                                        for vector_query in vector_queries ]
+        cache_epoch: int = self.result_cache.get_epoch(target_collection_name)
+        results: list[list[RAG_DTModel]] = [ self.result_cache.get(cache_key) for cache_key in cache_keys ]
+        missing_indexes: list[int] = [ query_index for (query_index, result) in enumerate(results) if result is None ]
+        if(len(missing_indexes) > 0):
+            missing_results: list[list[RAG_DTModel]] = self._retrieve_vectors_batch(
+                    target_collection_name, [ vector_queries[query_index] for query_index in missing_indexes ], top_k, 
+                    redundancy_tolerance, mmr_lambda, metadata_filter)
+            for (query_index, result) in zip(missing_indexes, missing_results):
+                results[query_index] = result
+                if(not getattr(result, "is_partial", False)): #deadline-truncated results are not reused
+                    self.result_cache.put(cache_keys[query_index], result, cache_epoch)
+        return results
+
+
+    def get_result_cache_stats(self) -> dict[str, any]:
+        """
+        Returns the usage statistics of the retrieval result cache (entries, hits, misses, hit rate, evictions, invalidations).
+        None if the result cache is disabled.
+        """
+        if(self.result_cache is None):
+            return None
+        return self.result_cache.get_stats()
+
+
+    def migrate_vector_storage(self, target_collection_name: str, storage_format: vector_storage_formats = None, 
+                               embedder_name: str = None) -> int:
+        """
+        Converts in place the stored vectors of the given collection into the given storage format (see the operator one),
+        dropping its cached retrieval results.
+        Parameters:
+            target_collection_name (str): The collection to migrate.
+            storage_format (Featured_vector_storage_formats_enum, optional): The target format (default: the configured one).
+            embedder_name (str, optional): The embedder of the partition to migrate (see 'retrieve_vectors_using_vectorQuery').
+        Returns:
+            int: The number of converted records.
+        """
+        return self._run_collection_maintenance("migrate_vector_storage", target_collection_name, embedder_name, storage_format)
+
+
+    def start_vector_storage_migration(self, target_collection_name: str, storage_format: vector_storage_formats = None, 
+                                       embedder_name: str = None) -> Future:
+        """
+        Runs 'migrate_vector_storage' in a background thread of the operator.
+        The cached retrieval results of the collection are dropped once the migration ends, before the returned future completes.
+        Returns:
+            Future: The future of the number of converted records.
+        """
+        partition_name: str = self._resolve_maintenance_target("start_vector_storage_migration", target_collection_name, embedder_name)
+        migration: Future = self.DB_operator.start_vector_storage_migration(partition_name, storage_format)
+        # the callbacks run after the waiters of 'migration' are woken up, so its outcome is forwarded once the state is dropped
+        maintained_migration: Future = Future()
+        migration.add_done_callback(lambda _: self._complete_after_invalidation(migration, maintained_migration, partition_name))
+        return maintained_migration
+
+
+    def cluster_redundancy_groups(self, target_collection_name: str, embedder_name: str = None) -> int:
+        """
+        Assigns the near-duplicate group of every record of the given collection (see the operator method),
+        dropping its cached retrieval results.
+        Returns:
+            int: The number of groups (leaders).
+        """
+        return self._run_collection_maintenance("cluster_redundancy_groups", target_collection_name, embedder_name)
+
+
+    def train_IVF_index(self, target_collection_name: str, n_lists: int = None, sample_size: int = None, 
+                        iterations: int = 20, embedder_name: str = None) -> bool:
+        """
+        Trains an IVF index on the given collection (see the operator method), dropping its cached retrieval results.
+        Returns:
+            bool: True if the index has been trained. False if the collection is empty.
+        """
+        return self._run_collection_maintenance("train_IVF_index", target_collection_name, embedder_name, 
+                                                n_lists=n_lists, sample_size=sample_size, iterations=iterations)
+
+
+    def train_PQ_index(self, target_collection_name: str, n_subspaces: int = None, sample_size: int = 25600, 
+                       iterations: int = 20, embedder_name: str = None) -> bool:
+        """
+        Trains the PQ codebooks of the given collection (see the operator method), dropping its cached retrieval results.
+        Returns:
+            bool: True if the codebooks have been trained. False if the collection is empty.
+        """
+        return self._run_collection_maintenance("train_PQ_index", target_collection_name, embedder_name, 
+                                                n_subspaces=n_subspaces, sample_size=sample_size, iterations=iterations)
+
+
+    def train_SQ_index(self, target_collection_name: str, sample_size: int = 25600, embedder_name: str = None) -> bool:
+        """
+        Trains the int8 scalar quantizer of the given collection (see the operator method), dropping its cached retrieval results.
+        Returns:
+            bool: True if the scales have been trained. False if the collection is empty.
+        """
+        return self._run_collection_maintenance("train_SQ_index", target_collection_name, embedder_name, sample_size=sample_size)
 
-        return self.DB_operator.retrieve_embeddings_from_vector(target_collection_name, vector_query, top_k)
+
+    def train_binary_index(self, target_collection_name: str, sample_size: int = 25600, embedder_name: str = None) -> bool:
+        """
+        Stores the binary sign codes of the given collection (see the operator method), dropping its cached retrieval results.
+        Returns:
+            bool: True if the codes have been stored. False if the collection is empty.
+        """
+        return self._run_collection_maintenance("train_binary_index", target_collection_name, embedder_name, sample_size=sample_size)
+
+
+    def build_document_centroids(self, target_collection_name: str, embedder_name: str = None) -> int:
+        """
+        Rebuilds the document centroids of the given collection (see the operator method), dropping its cached retrieval results.
+        Returns:
+            int: The number of documents.
+        """
+        return self._run_collection_maintenance("build_document_centroids", target_collection_name, embedder_name)
+
+
+    def _run_collection_maintenance(self, operation_name: str, target_collection_name: str, embedder_name: str, 
+                                    *args, **kwargs) -> any:
+        """
+        Private method running a maintenance operation of the operator on a collection (or on one of its partitions), 
+        then dropping the cached retrieval results and planner statistics of the collection, which the operation may have changed.
+        Returns:
+            any: The outcome of the operation.
+        """
+        partition_name: str = self._resolve_maintenance_target(operation_name, target_collection_name, embedder_name)
+        try:
+            return getattr(self.DB_operator, operation_name)(partition_name, *args, **kwargs)
+        finally:
+            self._invalidate_collection_state(partition_name)
+
+
+    def _invalidate_collection_state(self, target_collection_name: str) -> None:
+        """
+        Private method dropping the cached retrieval results and the planner statistics of a collection which has been maintained
+        (es. migrated or indexed), so that the next retrievals are planned on the stored formats and the trained indexes.
+        """
+        self._invalidate_cached_results(target_collection_name)
+        if(self.query_planner is not None):
+            self.query_planner.invalidate(target_collection_name)
+
+
+    def _complete_after_invalidation(self, operation: Future, maintained_operation: Future, target_collection_name: str) -> None:
+        """
+        Private method dropping the state of a collection maintained in background,
+        then forwarding the outcome of the finished operation to the future returned to the caller.
+        """
+        try:
+            self._invalidate_collection_state(target_collection_name)
+        finally:
+            if(operation.cancelled()):
+                maintained_operation.cancel()
+            elif(operation.exception() is not None):
+                maintained_operation.set_exception(operation.exception())
+            else:
+                maintained_operation.set_result(operation.result())
+
+
+    def _resolve_maintenance_target(self, operation_name: str, target_collection_name: str, embedder_name: str) -> str:
+        """
+        Private method validating a maintenance operation and returning the physical collection/index it has to run on.
+        In case of operation not supported by the configured operator, raises ValueError.
+        """
+        if(not callable(getattr(self.DB_operator, operation_name, None))):
+            raise ValueError(f"The '{self.DB_operator.get_engine_name()}' operator does not support '{operation_name}'.")
+        target_collection_name = self._resolve_partition(target_collection_name, embedder_name, None)
+        self._parameters_validation(target_collection_name=target_collection_name)
+        return target_collection_name
+
+
+    def _insert_routed_records(self, target_collection_name: str, data_models: list[RAG_DTModel]) -> bool:
+        """
+        Private method inserting the given records into the partitions of their embedders (or into the collection itself 
+        if the partitions are not enabled).
+        Returns:
+            bool: True if all the records have been inserted. False otherwise.
+        """
+        partitioned_data_models: dict[str, list[RAG_DTModel]] = self._route_to_partitions(target_collection_name, data_models)
+        flag = (sum( len(partition_data_models) for partition_data_models in partitioned_data_models.values() ) == len(data_models))
+        for (partition_name, partition_data_models) in partitioned_data_models.items():
+            all_inserted: bool = False
+            try:
+                all_inserted = self.DB_operator.insert_records(partition_name, partition_data_models)
+                if(not all_inserted):
+                    flag = False
+            finally:
+                self._invalidate_cached_results(partition_name)
+                if(self.query_planner is not None):
+                    self.query_planner.record_insertions(partition_name, [ data_model.embedder_name 
+                                                                           for data_model in partition_data_models ], all_inserted)
+        return flag
+
+
+    def _route_to_partitions(self, target_collection_name: str, data_models: list[RAG_DTModel]) -> dict[str, list[RAG_DTModel]]:
+        """
+        Private method grouping the records to write by the partition of their embedder, registering the new partitions.
+        The vectors of each embedder are validated as a single batch: vectors whose dimension differs from the registered one 
+        (or from the first vector of a new partition) and null vectors are rejected, while the others are normalized in place.
+        Returns:
+            dict[str, list[RAG_DTModel]]: The accepted records of each partition name. 
+                                            Without registry, all the records are assigned to the collection itself.
+        """
+        if(self.partition_registry is None):
+            return {target_collection_name: list(data_models)}
+        
+        data_models_by_embedder: dict[str, list[RAG_DTModel]] = dict()
+        for data_model in data_models:
+            data_models_by_embedder.setdefault(data_model.embedder_name, []).append(data_model)
+        
+        partitioned_data_models: dict[str, list[RAG_DTModel]] = dict()
+        partitions: dict[str, tuple[str, int]] = self.partition_registry.get_partitions(target_collection_name)
+        for (embedder_name, embedder_data_models) in data_models_by_embedder.items():
+            dimension: int = partitions[embedder_name][1] if (embedder_name in partitions) else len(embedder_data_models[0].vector)
+            (valid_mask, unnormalized_mask, normalized_matrix) = vectorSearch.validate_vectors_batch(
+                    [ data_model.vector for data_model in embedder_data_models ], dimension)
+            if(not valid_mask.all()):
+                logging.info(f"[ERROR]: {int((~valid_mask).sum())} records embedded with '{embedder_name}' rejected from '{target_collection_name}': "
+                             f"null vectors or dimension different from {dimension}.")
+            if(unnormalized_mask.any()):
+                logging.info(f"[INFO]: {int(unnormalized_mask.sum())} vectors embedded with '{embedder_name}' normalized before the insertion.")
+                for index in numpy.flatnonzero(unnormalized_mask):
+                    embedder_data_models[index].vector = normalized_matrix[index].tolist()
+            if(valid_mask.any()):
+                partition_name: str = self.partition_registry.register_partition(target_collection_name, embedder_name, dimension)[0]
+                partitioned_data_models.setdefault(partition_name, []).extend(
+                        [ data_model for (data_model, is_valid) in zip(embedder_data_models, valid_mask) if is_valid ])
+        return partitioned_data_models
+
+
+    def _resolve_partition(self, target_collection_name: str, embedder_name: str, query_dimension: int) -> str:
+        """
+        Private method returning the physical collection/index to search for queries embedded with the given embedder.
+        Collections without registered partitions (or without registry) are searched as they are. 
+        If 'embedder_name' is None, the only partition of the collection is used.
+        In case of missing or ambiguous partition, or of a query dimension different from the partition one, raises ValueError.
+        """
+        if((self.partition_registry is None) or (target_collection_name is None)):
+            return target_collection_name
+        partitions: dict[str, tuple[str, int]] = self.partition_registry.get_partitions(target_collection_name)
+        if(len(partitions) == 0):
+            return target_collection_name
+        
+        if(embedder_name is None):
+            if(len(partitions) > 1):
+                raise ValueError(f"The collection '{target_collection_name}' stores the vectors of several embedders {sorted(partitions)}: "
+                                 "the query embedder must be specified.")
+            embedder_name = next(iter(partitions))
+        if(embedder_name not in partitions):
+            raise ValueError(f"The collection '{target_collection_name}' stores no vectors embedded with '{embedder_name}'.")
+        (partition_name, dimension) = partitions[embedder_name]
+        if((query_dimension is not None) and (query_dimension != dimension)):
+            raise ValueError(f"The query vector has {query_dimension} dimensions, while the '{embedder_name}' partition "
+                             f"of '{target_collection_name}' stores {dimension}-dimensional vectors.")
+        return partition_name
+
+
+    def _plan_retrieval(self, target_collection_name: str, top_k: int) -> queryPlanner.Retrieval_plan:
+        """
+        Private method choosing (and logging) the access path of a retrieval through the query planner.
+        Returns:
+            Retrieval_plan: The chosen plan. None if the planner is disabled or cannot plan.
+        """
+        if(self.query_planner is None):
+            return None
+        plan: queryPlanner.Retrieval_plan = self.query_planner.plan(target_collection_name, self.DB_operator.get_collection_statistics, top_k)
+        if(plan is None):
+            return None
+        statistics: queryPlanner.Collection_statistics = self.query_planner.get_statistics(target_collection_name, 
+                                                                                           self.DB_operator.get_collection_statistics)
+        logging.info(f"[INFO]: Retrieval plan for '{target_collection_name}' ({statistics}): {plan}")
+        return plan
+
+
+    def _retrieve_vectors_batch(self, target_collection_name: str, vector_queries: list[list[float]], top_k: int, 
+                                redundancy_tolerance: float, mmr_lambda: float, 
+                                metadata_filter: dict[str, list[str]]) -> list[list[RAG_DTModel]]:
+        """
+        Private method retrieving the results of several queries from the operator with a single batched (exact) search, 
+        unless the query planner chooses an approximate access path for them: then each query is served on its own 
+        with the planned options, which the batched search does not accept.
+        """
+        plan: queryPlanner.Retrieval_plan = self._plan_retrieval(target_collection_name, top_k)
+        if((plan is not None) and (not plan.is_exact)):
+            return [ self.DB_operator.retrieve_embeddings_from_vector(target_collection_name, vector_query, top_k, 
+                                                                      redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                                      metadata_filter=metadata_filter, search_options=plan.options) 
+                        for vector_query in vector_queries ]
+        return self.DB_operator.retrieve_embeddings_from_vectors(target_collection_name, vector_queries, top_k, 
+                                                                 redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                                 metadata_filter=metadata_filter)
+
+
+    def _invalidate_cached_results(self, target_collection_name: str) -> None:
+        """
+        Private method dropping the cached retrieval results of a collection which has been written.
+        """
+        if(self.result_cache is not None):
+            self.result_cache.invalidate_collection(target_collection_name)
+
+
+    def _metadata_filter_normalization(self, metadata_filter: dict[str, str | list[str]]) -> dict[str, list[str]]:
+        """
+        Private method validating the metadata filter of a retrieval and converting its single values into lists.
+        In case of unknown metadata fields, raises ValueError.
+        """
+        if(metadata_filter is None):
+            return None
+        normalized_filter: dict[str, list[str]] = dict()
+        for (field, values) in metadata_filter.items():
+            if(not filterable_metadata_fields.has_value(field)):
+                raise ValueError(f"The metadata field '{field}' cannot be used to filter a retrieval.")
+            normalized_filter[field] = [ values ] if isinstance(values, str) else list(values)
+        return normalized_filter
 
 
 
@@ -248,7 +716,27 @@ class _DB_operator_factory:
             return rag_DB_operators.RAG_PineconeDB_operator(api_key=DB_config.api_key, host=DB_config.connection_url)
         elif DB_config.db_engine == RAG_DB_engine.MONGODB:
             return rag_DB_operators.RAG_MongoDB_operator(DB_connection_url=DB_config.connection_url, DB_name=DB_config.database_name, 
-                                                         batch_size= DB_config.batch_size)
+                                                         batch_size= DB_config.batch_size, 
+                                                         vector_cache_folder_path=DB_config.vector_cache_folder_path, 
+                                                         ivf_nprobe=DB_config.ivf_nprobe, 
+                                                         vector_compression=DB_config.vector_compression, 
+                                                         scan_threads=DB_config.scan_threads, 
+                                                         scoring_processes=DB_config.scoring_processes, 
+                                                         vector_storage_format=DB_config.vector_storage_format, 
+                                                         retrieval_deadline_ms=DB_config.retrieval_deadline_ms, 
+                                                         server_side_scoring=DB_config.server_side_scoring, 
+                                                         redundancy_clustering=DB_config.redundancy_clustering, 
+                                                         duplicate_tolerance=DB_config.duplicate_tolerance, 
+                                                         document_probe=DB_config.document_probe, 
+                                                         index_generations=DB_config.index_generations)
+        elif DB_config.db_engine == RAG_DB_engine.HNSW:
+            return rag_DB_operators.RAG_HNSW_operator(index_folder_path=DB_config.index_folder_path, M=DB_config.hnsw_M, 
+                                                      ef_construction=DB_config.hnsw_ef_construction, 
+                                                      ef_search=DB_config.hnsw_ef_search)
+        elif DB_config.db_engine == RAG_DB_engine.LOCAL_FILE:
+            return rag_DB_operators.RAG_LocalFile_operator(index_folder_path=DB_config.index_folder_path, 
+                                                           batch_size=DB_config.batch_size, 
+                                                           document_probe=DB_config.document_probe)
         raise NotImplementedError(
             f"Dead code activation: No factory case for operator named '{DB_config.usage_type}_{DB_config.db_engine}_operator'. "
             "Did you update featured_DB_types but forget to extend the factory method?"
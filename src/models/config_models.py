@@ -2,9 +2,13 @@ from typing import override
 
 from src.common.constants import (Featured_storage_DB_engines_enum as storage_engines, 
                                   Featured_RAG_DB_engines_enum as RAG_engines,
+                                  Featured_vector_compressions_enum as vector_compressions,
+                                  Featured_vector_storage_formats_enum as vector_storage_formats,
+                                  Featured_retrieval_modes_enum as retrieval_modes,
                                   DB_use_types_enum as DB_usage,
                                   Featured_embedding_models_enum as embed_models, 
-                                  Featured_chatBot_models_enum as chatBot_models)
+                                  Featured_chatBot_models_enum as chatBot_models, 
+                                  REDUNDANCY_TOLERANCE)
 
 from src.models.interfaces.config_interfaces import (Configuration_model_I, DB_config_I)
 
@@ -41,11 +45,32 @@ class RAG_DB_config(DB_config_I):
     """
     @override
     def __init__(self, db_engine: RAG_engines, api_key: str=None, connection_url: str=None, database_name: str=None, 
-                 batch_size: int=100000):
+                 batch_size: int=100000, vector_cache_folder_path: str=None, ivf_nprobe: int=None, 
+                 index_folder_path: str=None, hnsw_M: int=16, hnsw_ef_construction: int=200, hnsw_ef_search: int=64, 
+                 vector_compression: vector_compressions=None, scan_threads: int=1, scoring_processes: int=None, 
+                 vector_storage_format: vector_storage_formats=None, result_cache_size: int=0, 
+                 retrieval_mode: retrieval_modes=retrieval_modes.VECTOR, retrieval_deadline_ms: int=None, 
+                 embedder_registry_path: str=None, server_side_scoring: bool=False, 
+                 redundancy_clustering: bool=False, duplicate_tolerance: float=None, document_probe: int=None, 
+                 planner_latency_target_ms: float=None, index_generations: bool=False):
         if(db_engine is None):
             raise ValueError("the parameter 'db_engine' must be provided.")
         if not RAG_engines.has_value(db_engine.value):
             raise ValueError(f"DB engine {db_engine} is not supported as a {DB_usage.RAG} DB")
+        if((vector_compression is not None) and (not vector_compressions.has_value(vector_compression.value))):
+            raise ValueError(f"Vector compression {vector_compression} is not featured")
+        if((vector_storage_format is not None) and (not vector_storage_formats.has_value(vector_storage_format.value))):
+            raise ValueError(f"Vector storage format {vector_storage_format} is not featured")
+        if((retrieval_mode is not None) and (not retrieval_modes.has_value(retrieval_mode.value))):
+            raise ValueError(f"Retrieval mode {retrieval_mode} is not featured")
+        if((retrieval_deadline_ms is not None) and (retrieval_deadline_ms <= 0)):
+            raise ValueError("The retrieval deadline must be a positive number of milliseconds")
+        if((duplicate_tolerance is not None) and not (REDUNDANCY_TOLERANCE <= duplicate_tolerance <= 1)):
+            raise ValueError(f"The duplicate tolerance must be a similarity in [{REDUNDANCY_TOLERANCE}, 1]")
+        if((document_probe is not None) and (document_probe <= 0)):
+            raise ValueError("The number of probed documents must be a positive integer")
+        if((planner_latency_target_ms is not None) and (planner_latency_target_ms <= 0)):
+            raise ValueError("The planner latency target must be a positive number of milliseconds")
         
         self.usage_type = DB_usage.RAG
         self.db_engine = db_engine
@@ -53,6 +78,26 @@ class RAG_DB_config(DB_config_I):
         self.connection_url = connection_url
         self.database_name = database_name
         self.batch_size = batch_size
+        self.vector_cache_folder_path = vector_cache_folder_path
+        self.ivf_nprobe = ivf_nprobe
+        self.index_folder_path = index_folder_path
+        self.hnsw_M = hnsw_M
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.vector_compression = vector_compression
+        self.scan_threads = scan_threads
+        self.scoring_processes = scoring_processes
+        self.vector_storage_format = vector_storage_format
+        self.result_cache_size = result_cache_size #number of retrieval results cached by the manager (disabled if 0)
+        self.retrieval_mode = retrieval_mode or retrieval_modes.VECTOR #how the questions are matched (dense, lexical or both)
+        self.retrieval_deadline_ms = retrieval_deadline_ms #time budget of the MongoDB scans (unbounded if None)
+        self.embedder_registry_path = embedder_registry_path #SQLite file of the embedder partitions (collections not partitioned if None)
+        self.server_side_scoring = server_side_scoring #whether MongoDB scores the records through aggregation pipelines
+        self.redundancy_clustering = redundancy_clustering #whether near-duplicate groups are assigned at ingest time
+        self.duplicate_tolerance = duplicate_tolerance #similarity above which new records are not stored (exact duplicates if None)
+        self.document_probe = document_probe #documents whose chunks are scored after ranking the document centroids (all if None)
+        self.planner_latency_target_ms = planner_latency_target_ms #latency target of the retrieval planner (retrievals not planned if None)
+        self.index_generations = index_generations #whether MongoDB bulk insertions become visible only once completed
 
 
 
@@ -1,6 +1,8 @@
-from typing import override
+from typing import Any, override
 
 from src.common.constants import Featured_embedding_models_enum as embed_models
+from src.common.constants import Featured_access_paths_enum as access_paths_enum
+from src.common.constants import Featured_vector_compressions_enum as compressions_enum
 
 from src.models.interfaces.data_model_interface import DTModel_I
 
@@ -153,6 +155,56 @@ class RAG_DTModel(Storage_DTModel):
         return "<- "+self.text+" ->\n"
       
         
+class RAG_retrieval_result(list):
+    """
+    List of the RAG_DTModel returned by a retrieval, flagged as partial if the search stopped at its deadline 
+    before visiting all the candidate records (the best records found so far are returned anyway).
+    """
+    def __init__(self, data_models: list[RAG_DTModel] = (), is_partial: bool = False):
+        super().__init__(data_models)
+        self.is_partial: bool = is_partial
+
+
+
+class RAG_search_options:
+    """
+    Per-call options steering the dense search of a retrieval (es. the ones chosen by the query planner), 
+    overriding the operator defaults. Options left as None are not set: each operator accepts only the ones of its 
+    own access paths (see 'check_supported_options').
+    """
+    def __init__(self, access_path: access_paths_enum = None, top_m: int = None, nprobe: int = None, 
+                 vector_compression: compressions_enum = None, ef_search: int = None):
+        self.access_path: access_paths_enum = access_path #the search path to use (see 'get_collection_statistics')
+        self.top_m: int = top_m #candidates collected before the redundance filtering (at least 'top_k')
+        self.nprobe: int = nprobe #IVF lists to scan
+        self.vector_compression: compressions_enum = vector_compression #compressed codes of the first scoring stage
+        self.ef_search: int = ef_search #candidates list length of the graph search
+
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RAG_search_options) and (vars(self) == vars(other))
+
+
+    def __str__(self) -> str:
+        return str({ option: getattr(value, "value", value) for (option, value) in self.get_set_options().items() })
+
+
+    def get_set_options(self) -> dict[str, Any]:
+        """
+        Returns the options which have been set, by name.
+        """
+        return { option: value for (option, value) in vars(self).items() if (value is not None) }
+
+
+    def check_supported_options(self, supported_options: list[str], backend_name: str) -> None:
+        """
+        Checks that only the given options have been set, otherwise raises ValueError.
+        """
+        unsupported_options: list[str] = sorted(set(self.get_set_options()) - set(supported_options))
+        if(len(unsupported_options) > 0):
+            raise ValueError(f"The {backend_name} RAG DB operator does not support the search options {unsupported_options}.")
+
+
 
 
 def _init_params_normalization(url: str, title: str = None, pages: str = None, authors: list[str] = None) -> tuple:
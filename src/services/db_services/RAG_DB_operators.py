@@ -1,7 +1,13 @@
-import asyncio
+import hnswlib
+import contextlib
+import itertools
 import logging
 import math
 import numpy
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, override
 from urllib.parse import urlparse
 
@@ -11,36 +17,75 @@ from pinecone.core.openapi.db_data.model.search_records_response import SearchRe
 from pinecone.core.openapi.db_data.model.search_records_response_result import SearchRecordsResponseResult
 from pinecone.core.openapi.db_data.model.hit import Hit
 
-from pymongo import MongoClient
+from bson import Binary, ObjectId
+from bson.binary import BinaryVectorDtype, USER_DEFINED_SUBTYPE, VECTOR_SUBTYPE
+from pymongo import MongoClient, ReturnDocument, UpdateOne
 from pymongo.database import Database
 from pymongo.cursor import Cursor
 
 from src.common.constants import Featured_RAG_DB_engines_enum as RAG_engines_enum
+from src.common.constants import Featured_vector_compressions_enum as compressions_enum
+from src.common.constants import Featured_vector_storage_formats_enum as storage_formats_enum
+from src.common.constants import Featured_retrieval_modes_enum as retrieval_modes_enum
+from src.common.constants import Featured_access_paths_enum as access_paths_enum
+from src.common.constants import REDUNDANCY_TOLERANCE as TOLERANCE
 
 from src.services.db_services.interfaces.DB_operator_interfaces import RAG_DB_operator_I
 
-from src.models.data_models import RAG_DTModel
+from src.models.data_models import RAG_DTModel, RAG_retrieval_result, RAG_search_options
+
+from src.services.other_services import vector_search_services as vectorSearch
+from src.services.other_services import vector_cache_services as vectorCache
+from src.services.other_services import local_record_store_services as localStore
+from src.services.other_services import sharded_scoring_services as shardedScoring
+from src.services.other_services import lexical_search_services as lexicalSearch
 
 
 #region custom types
-TOLERANCE = 0.85
+EXACT_DUPLICATE_SIMILARITY = 0.9999 #similarity above which two vectors are the same (up to float32 rounding)
+INDEX_METADATA_COLLECTION_NAME = "RAG_index_metadata" #stores the trained retrieval structures of every collection
+DOCUMENT_CENTROIDS_COLLECTION_NAME = "RAG_document_centroids" #stores the chunk vectors sum and count of every document
+IVF_LIST_FIELD = "ivf_list"
+PQ_CODES_FIELD = "pq_codes"
+SQ_CODES_FIELD = "sq8_codes"
+SIGN_CODES_FIELD = "sign_codes"
+REDUNDANCY_GROUP_FIELD = "redundancy_group" #ID of the near-duplicate group (the record ID of its leader)
+REDUNDANCY_LEADER_FIELD = "redundancy_leader"
+GENERATION_FIELD = "generation" #number of the ingestion generation which wrote the record (see 'index_generations')
+CODES_FIELD_BY_COMPRESSION = {compressions_enum.PRODUCT_QUANTIZATION: PQ_CODES_FIELD, 
+                              compressions_enum.SCALAR_QUANTIZATION_INT8: SQ_CODES_FIELD, 
+                              compressions_enum.BINARY_SIGN: SIGN_CODES_FIELD}
+INDEX_TYPE_BY_COMPRESSION = {compressions_enum.PRODUCT_QUANTIZATION: "pq", 
+                             compressions_enum.SCALAR_QUANTIZATION_INT8: "sq8", 
+                             compressions_enum.BINARY_SIGN: "sign"}
+#candidates selected through compressed codes, per 'top_m' candidate rescored exactly (coarser codes need longer shortlists)
+SHORTLIST_FACTOR_BY_COMPRESSION = {compressions_enum.PRODUCT_QUANTIZATION: 4, 
+                                   compressions_enum.SCALAR_QUANTIZATION_INT8: 4, 
+                                   compressions_enum.BINARY_SIGN: 16}
+#stored bytes of a vector element (BSON arrays also store the type and index key of every element)
+STORED_FLOAT_BYTES_BY_FORMAT = {storage_formats_enum.ARRAY: 13, storage_formats_enum.FLOAT32: 4, storage_formats_enum.FLOAT16: 2}
+PINECONE_MAX_CONCURRENT_REQUESTS = 8
+PINECONE_MAX_UPSERT_BATCH_SIZE = 1000 #Pinecone limit of records per upsert request
+PINECONE_MAX_UPSERT_REQUEST_BYTES = 2 * 1024 * 1024 #Pinecone limit of the upsert request size
+PINECONE_UPSERT_VALUE_BYTES = 24 #estimated request bytes of a vector value (JSON-encoded float and separator)
+DEADLINE_SCAN_BATCH_SIZE = 4096 #maximum batch size of the deadline-bounded scans, so that the deadline is checked often
+SCAN_RANGE_SAMPLES_PER_THREAD = 32 #sampled IDs per scan thread, used to split the collection into balanced '_id' ranges
+PINECONE_REDUNDANCE_OVERFETCH = 4 #candidates fetched per returned record, leaving room to the redundance filtering
+PINECONE_MAX_TOP_K_WITH_VALUES = 1000 #Pinecone limit of 'top_k' for queries including vector values
+LEXICAL_SHORTLIST_FACTOR = 4 #BM25 candidates per 'top_m' candidate scored by the dense similarity (lexical shortlist mode)
+HNSW_EXACT_SUBSET_LIMIT = 2048 #metadata-filtered subsets scored exactly instead of searching the graph
+GENERATION_VIEW_MAX_AGE_S = 1.0 #age after which the published generations are reloaded (written by other operators too)
+ABANDONED_GENERATION_TIMEOUT_S = 600 #unpublished generations whose ingestion did not signal for longer are abandoned
+FLOAT16_VECTOR_SUBTYPE = USER_DEFINED_SUBTYPE #BSON vectors do not feature float16
+BSON_VECTOR_HEADER_SIZE = 2 #dtype and padding bytes preceding the data of a BSON vector
+STATISTICS_SAMPLE_SIZE = 64 #records sampled to describe the stored vectors of a collection (see 'get_collection_statistics')
 json = dict[str, Any]
 floatVector = list[float]
-class _VectorModel:
-    """
-    Container class for vector nodes used in the retrieval process.
-    More precisely, it is used to assign similarity scores to text chunks 
-    without worsening access to raw data vectors for intra-top_k similarity checks.
-    """
-    def __init__(self, similarity_to_query: float, json_RAGDTModel: json, vectorList: list[floatVector]):
-        self.similarity_to_query: float = similarity_to_query
-        self.json_RAGDTModel: json = json_RAGDTModel
-        self.vectorList: list[floatVector] = vectorList
 #endregion custom types
 
 """
  Service module to manage the connection and operations on a database meant to store embedded data for argument retrieval.
- Selected DBs are Pinecone and MongoDB
+ Selected DBs are Pinecone, MongoDB and a local HNSW graph index
 """
 
 
@@ -91,6 +136,33 @@ class RAG_PineconeDB_operator(RAG_DB_operator_I):
         return self._upsert_record(target_index_name, data_model)
 
 
+    @override
+    def insert_records(self, target_index_name: str, data_models: list[RAG_DTModel]) -> bool:
+        """
+        Implementation note:
+            The index existence is checked once, then the records are split into upsert requests within the Pinecone limits 
+            (records count and estimated request size), which are sent concurrently through a bounded thread pool.
+            The upserted count of every batch is logged, and a failed batch does not stop the other ones.
+        """
+        if((target_index_name is None) or (target_index_name.strip() == "") or 
+           (data_models is None)):
+            raise ValueError("One or more required parameters for 'insert_records' method are missing or invalid.")
+        if(len(data_models) == 0):
+            return True
+        if(self.check_collection_existence(target_index_name) is False):
+            raise ValueError(f"The target index '{target_index_name}' does not exist in Pinecone DB.")
+        
+        batches: list[list[json]] = self._split_into_upsert_batches([ data_model.generate_JSON_data() for data_model in data_models ])
+        with ThreadPoolExecutor(max_workers=min(PINECONE_MAX_CONCURRENT_REQUESTS, len(batches))) as executor:
+            upserted_counts: list[int] = list(executor.map(
+                    lambda indexed_batch: self._upsert_batch(target_index_name, *indexed_batch, len(batches)), 
+                    enumerate(batches, start=1)))
+        
+        logging.info(f"[INFO]: {sum(upserted_counts)}/{len(data_models)} records upserted into '{target_index_name}' "
+                     f"through {len(batches)} requests.")
+        return (sum(upserted_counts) == len(data_models))
+
+
     @override
     def update_record(self, target_index_name: str, data_model: RAG_DTModel) -> bool:
         if((target_index_name is None) or (target_index_name.strip() == "") or 
@@ -106,17 +178,61 @@ class RAG_PineconeDB_operator(RAG_DB_operator_I):
 
 
     @override
-    def retrieve_embeddings_from_vector(self, target_index_name: str, query_vector: list[floatVector], 
-                                              top_k: int) -> list[RAG_DTModel]:
+    def retrieve_embeddings_from_vector(self, target_index_name: str, query_vector: list[floatVector], top_k: int, 
+                                        redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                        metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
+        """
+        Implementation note:
+            Pinecone has no intra-top_k redundance filtering, so it is applied as a post-processing stage 
+            on an over-fetched candidates list (vectors included). The metadata filter is mapped to the Pinecone one.
+        """
         if((target_index_name is None) or (target_index_name.strip() == "") or 
            (query_vector is None) or (top_k is None)):
             raise ValueError("One or more required parameters for 'insert_record' method are missing or invalid.")
         if(self.check_collection_existence(target_index_name) is False):
             raise ValueError(f"The target index '{target_index_name}' does not exist in Pinecone DB.")
         
-        response: SearchRecordsResponse = self.database.query(namespace=target_index_name, 
-                                                                    vector=query_vector, top_k=top_k)
-        return self._from_SearchRecordsResponse_to_RAGDTModelList(response)
+        return self._query_non_redundant_records(target_index_name, query_vector, top_k, redundancy_tolerance, mmr_lambda, 
+                                                 metadata_filter)
+    
+
+    @override
+    def retrieve_embeddings_from_vectors(self, target_index_name: str, query_matrix: list[floatVector], top_k: int, 
+                                         redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                         metadata_filter: dict[str, list[str]] = None) -> list[list[RAG_DTModel]]:
+        """
+        Implementation note:
+            Pinecone does not feature multi-vector queries, so the queries are sent concurrently through a bounded thread pool.
+        """
+        if((target_index_name is None) or (target_index_name.strip() == "") or 
+           (query_matrix is None) or (top_k is None)):
+            raise ValueError("One or more required parameters for 'retrieve_embeddings_from_vectors' method are missing or invalid.")
+        if(self.check_collection_existence(target_index_name) is False):
+            raise ValueError(f"The target index '{target_index_name}' does not exist in Pinecone DB.")
+        if(len(query_matrix) == 0):
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(PINECONE_MAX_CONCURRENT_REQUESTS, len(query_matrix))) as executor:
+            return list(executor.map(
+                    lambda query_vector: self._query_non_redundant_records(target_index_name, query_vector, top_k, 
+                                                                           redundancy_tolerance, mmr_lambda, metadata_filter), 
+                    query_matrix))
+    
+
+    @override
+    def retrieve_embeddings_from_text_and_vector(self, target_index_name: str, query_text: str, query_vector: floatVector, 
+                                                 top_k: int, retrieval_mode: retrieval_modes_enum = retrieval_modes_enum.HYBRID, 
+                                                 redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                 metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
+        """
+        Implementation note:
+            Dense indexes do not feature lexical search (it would require sparse vectors, stored along with the dense ones), 
+            so the query text is ignored and the dense retrieval is performed.
+        """
+        if(retrieval_mode != retrieval_modes_enum.VECTOR):
+            logging.info(f"[WARNING]: Lexical retrieval is not featured by Pinecone indexes: '{retrieval_mode.value}' mode replaced by dense retrieval.")
+        return self.retrieve_embeddings_from_vector(target_index_name, query_vector, top_k, redundancy_tolerance=redundancy_tolerance, 
+                                                    mmr_lambda=mmr_lambda, metadata_filter=metadata_filter)
     
 
     @override
@@ -173,6 +289,93 @@ class RAG_PineconeDB_operator(RAG_DB_operator_I):
         return (insertion_count > 0)
 
 
+    def _upsert_batch(self, target_index_name: str, batch_number: int, records: list[json], batches_count: int) -> int:
+        """
+        Private method upserting a batch of records with a single request and logging its outcome.
+        Parameters:
+            target_index_name (str): The namespace to upsert the records into.
+            batch_number (int): The (1-based) position of the batch, only used by the log.
+            records (list[json]): The Pinecone records of the batch (see 'RAG_DTModel.generate_JSON_data').
+            batches_count (int): The number of batches of the insertion, only used by the log.
+        Returns:
+            int: The number of upserted records (0 if the request failed).
+        """
+        try:
+            response: UpsertResponse = self.database.upsert(namespace=target_index_name, vectors=records)
+            upserted_count: int = getattr(response, "upserted_count", -1)
+            if upserted_count == -1:
+                raise RuntimeError("Attribute 'upserted_count' not found in UpsertResponse wrapper.")
+        except Exception as e:
+            logging.info(f"[ERROR]: Failed to upsert batch {batch_number}/{batches_count} ({len(records)} records) "
+                         f"into '{target_index_name}': {e}")
+            return 0
+        logging.info(f"[INFO]: Batch {batch_number}/{batches_count} upserted into '{target_index_name}': "
+                     f"{upserted_count}/{len(records)} records.")
+        return upserted_count
+
+
+    def _split_into_upsert_batches(self, records: list[json]) -> list[list[json]]:
+        """
+        Private method splitting the records into consecutive batches respecting the Pinecone upsert limits: 
+        at most 'PINECONE_MAX_UPSERT_BATCH_SIZE' records and 'PINECONE_MAX_UPSERT_REQUEST_BYTES' (estimated) bytes per request.
+        A record exceeding the size limit by itself makes up its own batch (and is rejected by Pinecone).
+        """
+        batches: list[list[json]] = []
+        (batch, batch_bytes) = ([], 0)
+        for record in records:
+            record_bytes: int = (len(record["values"]) * PINECONE_UPSERT_VALUE_BYTES 
+                                 + len(str(record["metadata"]).encode("utf-8")) + len(str(record["id"])))
+            if((len(batch) > 0) and ((len(batch) == PINECONE_MAX_UPSERT_BATCH_SIZE) or 
+                                     (batch_bytes + record_bytes > PINECONE_MAX_UPSERT_REQUEST_BYTES))):
+                batches.append(batch)
+                (batch, batch_bytes) = ([], 0)
+            batch.append(record)
+            batch_bytes += record_bytes
+        if(len(batch) > 0):
+            batches.append(batch)
+        return batches
+
+
+    def _query_non_redundant_records(self, target_index_name: str, query_vector: floatVector, top_k: int, 
+                                     redundancy_tolerance: float, mmr_lambda: float, 
+                                     metadata_filter: dict[str, list[str]]) -> list[RAG_DTModel]:
+        """
+        Private method querying an over-fetched candidates list (vectors included) and applying the intra-top_k redundance filtering.
+        Parameters:
+            target_index_name (str): The namespace to query.
+            query_vector (floatVector): The query vector.
+            top_k (int): The number of records to return.
+            redundancy_tolerance (float): The redundance threshold (default 'TOLERANCE' if None).
+            mmr_lambda (float): The relevance/diversity trade-off of the MMR selection (pure relevance if None).
+            metadata_filter (dict[str, list[str]]): The accepted values of the filtered metadata fields (no filter if None).
+        Returns:
+            list[RAG_DTModel]: The selected records, in selection order.
+        """
+        if(top_k <= 0):
+            return []
+        top_m: int = min(top_k * PINECONE_REDUNDANCE_OVERFETCH, PINECONE_MAX_TOP_K_WITH_VALUES)
+        # metadata fields are stored at the top level of the Pinecone metadata ('$in' also matches list fields like 'author')
+        pinecone_filter: json = (None if (not metadata_filter) 
+                                 else { field: {"$in": list(values)} for (field, values) in metadata_filter.items() })
+        response = self.database.query(namespace=target_index_name, vector=numpy.asarray(query_vector, dtype=float).tolist(), 
+                                       top_k=top_m, include_values=True, include_metadata=True, filter=pinecone_filter)
+        matches: list = response.matches
+        if(len(matches) == 0):
+            return []
+        
+        selected_indexes: list[int] = vectorSearch.select_non_redundant_candidates(
+                similarities=numpy.array([ match.score for match in matches ], dtype=numpy.float32), 
+                vectors=numpy.asarray([ match.values for match in matches ], dtype=numpy.float32), 
+                top_k=top_k, 
+                redundancy_tolerance=(redundancy_tolerance if (redundancy_tolerance is not None) else TOLERANCE), 
+                mmr_lambda=mmr_lambda)
+        return [ RAG_DTModel.create_from_JSONData(JSON_data={ "id": matches[index].id, 
+                                                              "text": matches[index].metadata["text"], 
+                                                              "vector": matches[index].values, 
+                                                              "metadata": matches[index].metadata }) 
+                    for index in selected_indexes ]
+
+
     def _is_ID_already_in_use(self, target_index_name: str, id_to_check: str) -> bool:
         """
         Private method doing a search query in order to check if the given string is assigned to an existing record.
@@ -240,109 +443,645 @@ class RAG_MongoDB_operator(RAG_DB_operator_I):
     not indicative of an architectural issue and should not be refactored into
     shared abstractions unless a future, stable pattern emerges.
     """
-    def __init__(self, DB_connection_url: str, DB_name: str, batch_size: int = 100000):
+    def __init__(self, DB_connection_url: str, DB_name: str, batch_size: int = 100000, 
+                 vector_cache_folder_path: str = None, ivf_nprobe: int = None, 
+                 vector_compression: compressions_enum = None, scan_threads: int = 1, scoring_processes: int = None, 
+                 vector_storage_format: storage_formats_enum = storage_formats_enum.ARRAY, retrieval_deadline_ms: int = None, 
+                 server_side_scoring: bool = False, redundancy_clustering: bool = False, duplicate_tolerance: float = None, 
+                 document_probe: int = None, index_generations: bool = False):
+        if((scan_threads is None) or (scan_threads < 1)):
+            raise ValueError("The number of scan threads must be a positive integer.")
+        if((scoring_processes is not None) and (vector_cache_folder_path is None)):
+            raise ValueError("The process-pool scoring requires the vector cache ('vector_cache_folder_path') to be enabled.")
+        if((duplicate_tolerance is not None) and not (TOLERANCE <= duplicate_tolerance <= 1)):
+            raise ValueError(f"The duplicate tolerance must be in [{TOLERANCE}, 1].")
+        if((document_probe is not None) and (document_probe <= 0)):
+            raise ValueError("The number of probed documents must be a positive integer.")
+        if((duplicate_tolerance is not None) and (not redundancy_clustering)):
+            raise ValueError("The duplicate tolerance requires the redundancy clustering ('redundancy_clustering') to be enabled.")
+        # search defaults which would silently override each other (see '_resolve_dense_access_path')
+        if(server_side_scoring and (retrieval_deadline_ms is not None)):
+            raise ValueError("The server-side scoring cannot be combined with a retrieval deadline: an aggregation cannot return partial results.")
+        if(server_side_scoring and (vector_compression is not None)):
+            raise ValueError("The server-side scoring cannot be combined with a vector compression: the compressed codes are scored on the client side.")
+        if(vector_cache_folder_path is not None):
+            conflicting_defaults: list[str] = [ option_name for (option_name, option_value) in [ 
+                    ("ivf_nprobe", ivf_nprobe), ("vector_compression", vector_compression), 
+                    ("retrieval_deadline_ms", retrieval_deadline_ms), ("server_side_scoring", server_side_scoring or None) ] 
+                        if option_value is not None ]
+            if(len(conflicting_defaults) > 0):
+                raise ValueError(f"The vector cache cannot be combined with {conflicting_defaults}: the cached vectors are scored exactly, "
+                                 "in memory and without deadline (pass these options per call to bypass the cache).")
+        
         self.connection: MongoClient
         self.database: Database
         self.batch_size: int = batch_size
+        self.scan_threads: int = scan_threads #number of '_id' ranges scanned in parallel by an exact collection scan
+        self.vector_cache_folder_path: str = vector_cache_folder_path
+        self.ivf_nprobe: int = ivf_nprobe #default number of probed IVF lists (exact search if None)
+        self.vector_compression: compressions_enum = vector_compression #default compressed codes used for the first scoring stage
+        self.vector_storage_format: storage_formats_enum = vector_storage_format or storage_formats_enum.ARRAY #format of the written vectors
+        self.retrieval_deadline_ms: int = retrieval_deadline_ms #default time budget of the retrievals (unbounded if None)
+        self.server_side_scoring: bool = server_side_scoring #whether the collection scans are replaced by aggregation pipelines
+        self.redundancy_clustering: bool = redundancy_clustering #whether near-duplicate groups are assigned at ingest time
+        # similarity to a group leader above which a new record is not stored (exact duplicates only if None)
+        self.duplicate_tolerance: float = duplicate_tolerance
+        # default number of documents whose chunks are scored (single-stage retrieval if None), also enabling the centroids upkeep
+        self.document_probe: int = document_probe
+        # whether every bulk insertion is stamped as a new generation, invisible to the retrievals until it is published
+        self.index_generations: bool = index_generations
+        self._maintenance_executor: ThreadPoolExecutor = None #lazily created, runs the background migrations
+        self._vector_caches: dict[str, vectorCache.Collection_vector_cache] = dict()
+        self._index_structures: dict[tuple[str, str], numpy.ndarray] = dict() #lazily loaded, None if not trained
+        self._metadata_indexes: set[tuple[str, str]] = set() #(collection, metadata field) pairs already indexed
+        self._lexical_indexes: dict[str, lexicalSearch.BM25_index] = dict() #lazily built from the stored texts
+        self._leader_clusterings: dict[str, vectorSearch.Leader_clustering] = dict() #lazily loaded from the leader records
+        self._document_centroids: dict[str, vectorSearch.Document_centroids] = dict() #lazily loaded from their collection
+        # cached vectors are copied into shared memory shards scored by a persistent pool of worker processes
+        self._scoring_pool: shardedScoring.Sharded_scoring_pool = (None if (scoring_processes is None) 
+                                                                   else shardedScoring.Sharded_scoring_pool(scoring_processes))
+        self._shared_segments: dict[str, shardedScoring.Shared_vector_segment] = dict()
+        # lazily loaded, the last published generation and the ones excluded below it, along with their loading time
+        self._generation_views: dict[str, tuple[tuple[int, tuple[int, ...]], float]] = dict()
+        self._stale_vector_caches: set[str] = set() #collections whose cached rows failed the hydration, rebuilt by the next refresh
+        # serialize the writers (ingestions, cache refreshes and rebuilds) of each collection, never taken by the retrievals
+        self._writer_locks: dict[str, threading.RLock] = dict()
 
         self.open_connection(DB_connection_url, DB_name)
 
 
     @override
     def insert_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
-        if self._check_record_existence_using_embedded_text(target_collection_name, data_model.text):
-            logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text}' into '{target_collection_name}': record already exists.")
+        if(self.index_generations): #single-record generation
+            return self.insert_records(target_collection_name, [data_model])
+        if(not self._insert_new_record(target_collection_name, data_model)):
             return False
-        
-        return self._insert_update_record(target_collection_name, data_model)
+        self._record_write(target_collection_name)
+        return True
+
+
+    @override
+    def insert_records(self, target_collection_name: str, data_models: list[RAG_DTModel]) -> bool:
+        """
+        Implementation note:
+            With the index generations enabled, the records of a call make up a new generation of the collection: 
+            they are stamped with its number (allocated atomically, so concurrent ingestions of any process never share it) 
+            and the retrievals do not see them until all of them have been written. Then the generation is published at once, 
+            its BM25 entries are added to the loaded index and the vector cache (if enabled) is refreshed.
+            A generation whose ingestion stops signalling (es. a crashed process) is abandoned by the next ingestion: 
+            its records are deleted and it is never published.
+            Ingestions of the same collection are serialized within the operator, while retrievals never wait for them.
+            Every call increments the write version of the collection once (see 'refresh_vector_cache').
+        """
+        if(not self.index_generations):
+            inserted_flags: list[bool] = [ self._insert_new_record(target_collection_name, data_model) for data_model in data_models ]
+            if(any(inserted_flags)):
+                self._record_write(target_collection_name)
+            return all(inserted_flags)
+
+        with self._get_writer_lock(target_collection_name):
+            generation: int = self._allocate_generation(target_collection_name)
+            lexical_documents: list[tuple[ObjectId, str]] = [] #BM25 entries added once the generation is published
+            flag = True
+            last_signal_time: float = time.monotonic()
+            for data_model in data_models:
+                if(not self._insert_new_record(target_collection_name, data_model, generation, lexical_documents)):
+                    flag = False
+                if(time.monotonic() - last_signal_time > ABANDONED_GENERATION_TIMEOUT_S / 4): #still alive
+                    self._signal_generation(target_collection_name, generation)
+                    last_signal_time = time.monotonic()
+            if(not self._publish_generation(target_collection_name, generation, lexical_documents)):
+                flag = False
+            elif((len(lexical_documents) > 0) and (self.vector_cache_folder_path is not None)):
+                self.refresh_vector_cache(target_collection_name)
+        return flag
 
 
     @override    
     def update_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
-        if not self._check_record_existence_using_embedded_text(target_collection_name, data_model.text):
+        """
+        Implementation note:
+            The record storing the same text is replaced in place (keeping its ID), then the write version of the collection 
+            is incremented as a rewrite, so that the vector caches are rebuilt (see 'refresh_vector_cache').
+        """
+        existing_record: json = self.database[target_collection_name].find_one({"text": data_model.text}, {"_id": 1})
+        if existing_record is None:
             logging.info(f"[ERROR]: Failed to update the record with embedded text '{data_model.text}' in '{target_collection_name}': record not existing.")
             return False
         
-        return self._insert_update_record(target_collection_name, data_model)
+        if(not self._insert_update_record(target_collection_name, data_model, reject_duplicates=False, record_id=existing_record["_id"])):
+            return False
+        self._record_write(target_collection_name, is_rewrite=True)
+        return True
 
 
-    #TODO(UPDATE): Implement normalized vector checking and eventual normalization (using 'raw_data_operator.py')
+    #TODO(UPDATE): Check the normalization of the query vector too (with an embedder registry, the inserted ones are normalized by 'RAG_DB_manager._route_to_partitions')
     @override
     def retrieve_embeddings_from_vector(self, target_collection_name: str, 
-                                        normalized_query_vector: list[floatVector], top_k: int) -> list[RAG_DTModel]:
+                                        normalized_query_vector: list[floatVector], top_k: int, 
+                                        redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                        metadata_filter: dict[str, list[str]] = None, deadline_ms: int = None, 
+                                        server_side_scoring: bool = None, document_probe: int = None, 
+                                        search_options: RAG_search_options = None) -> list[RAG_DTModel]:
+        """
+        Parameters (extension):
+            deadline_ms (int, optional): The time budget of the scan ('anytime' retrieval). Once it is over no more batches 
+                                    are fetched, and the best records found so far are returned as a 'RAG_retrieval_result' 
+                                    flagged as partial. Batches are visited newest first, or by closeness of their IVF list 
+                                    to the query if an IVF index has been trained. At least one batch is always scored.
+                                    A deadline bypasses the vector cache and the default server-side scoring, 
+                                    which cannot be stopped. If not provided, the operator default is used (unbounded if None).
+            server_side_scoring (bool, optional): Whether the similarity is computed by MongoDB through an aggregation pipeline,
+                                    so that only the 'top_m' best records leave the server (see '_find_top_m_candidates_on_server').
+                                    If requested, it cannot be combined with a deadline (an aggregation cannot return partial 
+                                    results) nor with a compression. If not provided, the operator default is used.
+            document_probe (int, optional): The number of documents (by 'metadata.url') whose chunks are scored: the document 
+                                    centroids are scored first, then the chunk search is restricted to the closest documents 
+                                    (see 'build_document_centroids'). If not provided, the operator default is used. 
+                                    The whole collection is searched if neither is provided or no centroids are stored.
+            search_options (RAG_search_options, optional): The dense search options, among:
+                                    - 'nprobe': the number of IVF lists to scan (see 'train_IVF_index'), which must have been 
+                                        trained. If not provided, the operator default is used (if the IVF index has been trained). 
+                                        The search is exact if neither is provided.
+                                    - 'vector_compression': the compressed codes to score the records with, before rescoring 
+                                        the shortlist with the full precision vectors. They must have been trained. 
+                                        If not provided, the operator default is used (if its codes have been trained).
+                                    - 'access_path': the search path to use (see 'get_collection_statistics'), overriding 
+                                        the operator defaults: only the options of the given path are accepted ('nprobe' for IVF, 
+                                        'vector_compression' for compressed codes). If not provided, the path follows from 
+                                        the other options and the operator defaults (see '_resolve_dense_access_path').
+                                    - 'top_m': the number of candidates collected before the redundance filtering (at least 
+                                        'top_k'). If not provided, it grows with the logarithm of the batch size.
+        Unsupported combinations of options (es. a deadline with the server-side scoring, or a compression not trained yet)
+        raise ValueError.
+        """
         if( (target_collection_name is None) or (normalized_query_vector is None) or (top_k is None) ):
             raise ValueError("The method 'retrieve_embeddings_from_vector' has been called with one or more required parameters as 'None'")
         if(not self.check_collection_existence(target_collection_name)):
             logging.info(f"[ERROR]: No collection named '{target_collection_name}' in DB '{self.database.name}'")
+        search_options = search_options or RAG_search_options()
+        search_options.check_supported_options(["access_path", "top_m", "nprobe", "vector_compression"], "MongoDB")
+        if(len(normalized_query_vector) == 0 or top_k <= 0):
+            return []
+
+        #top_m represents the maximum length of the candidates list
+        top_m = (max(top_k, search_options.top_m) if (search_options.top_m is not None) 
+                 else math.ceil(top_k * (1 + math.log(self.batch_size))))
+        query_array = numpy.asarray(normalized_query_vector, dtype=numpy.float32)
+
+        (access_path, nprobe, vector_compression) = self._resolve_dense_access_path(
+                target_collection_name, search_options.nprobe, search_options.vector_compression, deadline_ms, server_side_scoring, 
+                search_options.access_path)
+        deadline: vectorSearch.Search_deadline = self._build_deadline(deadline_ms) #None on the server-side and memory paths
+        metadata_query: json = _combine_filters(self._build_metadata_filter(target_collection_name, metadata_filter), 
+                                                self._build_document_filter(target_collection_name, query_array, document_probe, 
+                                                                            metadata_filter))
+        candidates_heap = self._find_top_m_dense_candidates(target_collection_name, query_array, top_m, metadata_query, 
+                                                            access_path, nprobe, vector_compression, deadline)
+        
+        return RAG_retrieval_result(
+                self._select_and_hydrate_records(target_collection_name, candidates_heap, top_k, redundancy_tolerance, mmr_lambda), 
+                is_partial=((deadline is not None) and deadline.was_hit))
+
+
+    @override
+    def retrieve_embeddings_from_text_and_vector(self, target_collection_name: str, query_text: str, 
+                                                 normalized_query_vector: floatVector, top_k: int, 
+                                                 retrieval_mode: retrieval_modes_enum = retrieval_modes_enum.HYBRID, 
+                                                 redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                 metadata_filter: dict[str, list[str]] = None, 
+                                                 deadline_ms: int = None) -> list[RAG_DTModel]:
+        """
+        Parameters (extension):
+            deadline_ms (int, optional): The time budget of the dense scan (see 'retrieve_embeddings_from_vector').
+        Implementation note:
+            The BM25 index of a collection is built in memory from the stored texts on its first lexical retrieval, 
+            then it is kept up to date by the insertions. The lexical candidates are checked against the metadata filter 
+            while fetching their vectors, and their dense similarity is scored exactly.
+            The LEXICAL_SHORTLIST mode falls back to the dense retrieval if the query terms match less than 'top_k' records.
+        """
+        if(retrieval_mode == retrieval_modes_enum.VECTOR):
+            return self.retrieve_embeddings_from_vector(target_collection_name, normalized_query_vector, top_k, 
+                                                        redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                        metadata_filter=metadata_filter, deadline_ms=deadline_ms)
+        if( (target_collection_name is None) or (query_text is None) or (normalized_query_vector is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_text_and_vector' has been called with one or more required parameters as 'None'")
         if(len(normalized_query_vector) == 0 or top_k <= 0):
             return []
 
-        all_records: Cursor = self.database[target_collection_name].find()
+        top_m = math.ceil(top_k * (1 + math.log(self.batch_size)))
+        query_array = numpy.asarray(normalized_query_vector, dtype=numpy.float32)
+        (access_path, nprobe, vector_compression) = self._resolve_dense_access_path(target_collection_name, deadline_ms=deadline_ms)
+        deadline: vectorSearch.Search_deadline = self._build_deadline(deadline_ms)
+        metadata_query: json = self._build_metadata_filter(target_collection_name, metadata_filter)
+        lexical_ranking: list[ObjectId] = [ record_id for (_, record_id) in self._get_lexical_index(target_collection_name).search(
+                query_text, (top_m * LEXICAL_SHORTLIST_FACTOR) if (retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST) else top_m) ]
+        # the lexical candidates are not restricted to the closest documents, so exact terms are found anywhere
+        dense_query: json = _combine_filters(metadata_query, self._build_document_filter(target_collection_name, query_array, None, 
+                                                                                         metadata_filter))
+        
+        if(retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST):
+            candidates_heap = self._rescore_exactly(target_collection_name, lexical_ranking, query_array, top_m, metadata_query)
+            if(len(candidates_heap) < top_k): #too few records share the query terms
+                candidates_heap = self._find_top_m_dense_candidates(target_collection_name, query_array, top_m, dense_query, 
+                                                                    access_path, nprobe, vector_compression, deadline)
+        else:
+            candidates_heap = _fuse_candidates(
+                    self._find_top_m_dense_candidates(target_collection_name, query_array, top_m, dense_query, 
+                                                      access_path, nprobe, vector_compression, deadline), 
+                    self._rescore_exactly(target_collection_name, lexical_ranking, query_array, top_m, metadata_query), 
+                    lexical_ranking, top_m)
+
+        return RAG_retrieval_result(
+                self._select_and_hydrate_records(target_collection_name, candidates_heap, top_k, redundancy_tolerance, mmr_lambda), 
+                is_partial=((deadline is not None) and deadline.was_hit))
+
+
+    @override
+    def retrieve_embeddings_from_vectors(self, target_collection_name: str, normalized_query_matrix: list[floatVector], top_k: int, 
+                                         redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                         metadata_filter: dict[str, list[str]] = None) -> list[list[RAG_DTModel]]:
+        """
+        Implementation note:
+            The search is exact: every batch read from the collection (or from the vector cache) is scored against 
+            all the queries with a single matrix-matrix product, while a separate 'top_m' heap is kept for each query.
+            If the operator has search defaults (IVF lists, compressed codes, deadline, server-side scoring or document probe), 
+            each query is served by 'retrieve_embeddings_from_vector' instead, so that the defaults are honoured.
+        """
+        if( (target_collection_name is None) or (normalized_query_matrix is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_vectors' has been called with one or more required parameters as 'None'")
+        if(len(normalized_query_matrix) == 0):
+            return []
+        if(top_k <= 0):
+            return [ [] for _ in range(len(normalized_query_matrix)) ]
+        if(any( default is not None for default in (self.ivf_nprobe, self.vector_compression, self.retrieval_deadline_ms, 
+                                                    self.server_side_scoring or None, self.document_probe) )):
+            return [ self.retrieve_embeddings_from_vector(target_collection_name, normalized_query_vector, top_k, 
+                                                          redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                          metadata_filter=metadata_filter) 
+                        for normalized_query_vector in normalized_query_matrix ]
+
+        top_m = math.ceil(top_k * (1 + math.log(self.batch_size)))
+        query_matrix = numpy.atleast_2d(numpy.asarray(normalized_query_matrix, dtype=numpy.float32))
+
+        metadata_query: json = self._build_metadata_filter(target_collection_name, metadata_filter)
+        if(self.vector_cache_folder_path is None):
+            candidates_heaps = self._find_top_m_candidates_in_collection(
+                    target_collection_name, query_matrix, top_m, 
+                    _combine_filters(metadata_query, self._build_generation_filter(target_collection_name)))
+        else:
+            candidates_heaps = self._find_top_m_candidates_in_cache(target_collection_name, query_matrix, top_m, metadata_query)
+
+        best_record_ids_lists: list[list[ObjectId]] = [ self._select_top_k_record_IDs(target_collection_name, candidates_heap, top_k, 
+                                                                                      redundancy_tolerance, mmr_lambda) 
+                                                            for candidates_heap in candidates_heaps ]
+        # the winners of all the queries are fetched with a single query
+        record_by_id: dict[ObjectId, json] = { record["_id"]: record for record in self._hydrate_records(
+                target_collection_name, list({ record_id for best_record_ids in best_record_ids_lists for record_id in best_record_ids })) }
+
+        # the queries whose winners have been removed meanwhile select again among their remaining candidates
+        return [ [ RAG_DTModel.create_from_JSONData(JSON_data=record_by_id[record_id]) for record_id in best_record_ids ] 
+                    if all( record_id in record_by_id for record_id in best_record_ids ) 
+                    else self._select_and_hydrate_records(target_collection_name, candidates_heap, top_k, redundancy_tolerance, mmr_lambda)
+                        for (candidates_heap, best_record_ids) in zip(candidates_heaps, best_record_ids_lists) ]
+
+
+    def train_IVF_index(self, target_collection_name: str, n_lists: int = None, 
+                        sample_size: int = None, iterations: int = 20) -> bool:
+        """
+        Trains an IVF (inverted-file) index on the given collection: k-means centroids are trained on a sample of the vectors,
+        then every record is labelled with its nearest centroid ('inverted list'), so that a retrieval can scan only the 
+        records belonging to the 'nprobe' lists closest to the query vector.
+        Records inserted afterwards are labelled on insertion, the ones inserted during the training by a final pass. 
+        Training again replaces the previous index.
+        Parameters:
+            target_collection_name (str): The collection to index.
+            n_lists (int, optional): The number of inverted lists (default: square root of the collection size).
+            sample_size (int, optional): The number of vectors used for training (default: 50 per list).
+            iterations (int, default: 20): The number of k-means iterations.
+        Returns:
+            bool: True if the index has been trained. False if the collection is empty.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'train_IVF_index' has been called with 'target_collection_name' as 'None'")
+        collection = self.database[target_collection_name]
+        records_count: int = collection.count_documents({})
+        if(records_count == 0):
+            logging.info(f"[INFO]: IVF index not trained: the collection '{target_collection_name}' is empty.")
+            return False
+        
+        if(n_lists is None):
+            n_lists = max(1, round(math.sqrt(records_count)))
+        if(sample_size is None):
+            sample_size = n_lists * 50
+        centroids: numpy.ndarray = vectorSearch.train_kmeans_centroids(
+                self._sample_training_matrix(target_collection_name, sample_size), n_lists, iterations)
+        
+        # label every record with its inverted list
+        compute_list_function = lambda batch_matrix: [ 
+                {IVF_LIST_FIELD: int(list_index)} for list_index in vectorSearch.assign_to_nearest_centroids(batch_matrix, centroids) ]
+        newest_record: json = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        self._set_fields_computed_from_vectors(target_collection_name, compute_list_function)
+        collection.create_index(IVF_LIST_FIELD)
+        self._store_index_structure(target_collection_name, "ivf", centroids)
+        # the records inserted meanwhile got no list (or the list of the previous centroids): they are labelled again
+        self._set_fields_computed_from_vectors(target_collection_name, compute_list_function, 
+                {"$or": [{IVF_LIST_FIELD: {"$exists": False}}, {"_id": {"$gt": newest_record["_id"]}}]})
+        logging.info(f"[INFO]: IVF index with {centroids.shape[0]} lists trained on '{target_collection_name}'.")
+        return True
+
+
+    def train_PQ_index(self, target_collection_name: str, n_subspaces: int = None, 
+                       sample_size: int = 25600, iterations: int = 20) -> bool:
+        """
+        Trains the product quantization (PQ) codebooks of the given collection on a sample of its vectors, 
+        then stores the compact PQ codes of every record (one byte per subspace) next to its full precision vector.
+        Records inserted afterwards are encoded on insertion. Training again replaces the previous codebooks.
+        Parameters:
+            target_collection_name (str): The collection to encode.
+            n_subspaces (int, optional): The number of subspaces, which must divide the vectors dimension 
+                                            (default: one subspace every 8 dimensions, so a 32x compression of float32 vectors).
+            sample_size (int, default: 25600): The number of vectors used for training.
+            iterations (int, default: 20): The number of k-means iterations per subspace.
+        Returns:
+            bool: True if the codebooks have been trained. False if the collection is empty.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'train_PQ_index' has been called with 'target_collection_name' as 'None'")
+        if(self.database[target_collection_name].count_documents({}) == 0):
+            logging.info(f"[INFO]: PQ codebooks not trained: the collection '{target_collection_name}' is empty.")
+            return False
+        
+        training_matrix: numpy.ndarray = self._sample_training_matrix(target_collection_name, sample_size)
+        if(n_subspaces is None):
+            n_subspaces = max(1, training_matrix.shape[1] // 8)
+        codebooks: numpy.ndarray = vectorSearch.train_product_quantizer(training_matrix, n_subspaces, iterations=iterations)
+        
+        self._set_fields_computed_from_vectors(target_collection_name, lambda batch_matrix: [ 
+                {PQ_CODES_FIELD: Binary(codes.tobytes())} for codes in vectorSearch.encode_product_quantization(batch_matrix, codebooks) ])
+        self._store_index_structure(target_collection_name, "pq", codebooks)
+        logging.info(f"[INFO]: PQ codebooks with {n_subspaces} subspaces trained on '{target_collection_name}'.")
+        return True
+
+
+    def train_SQ_index(self, target_collection_name: str, sample_size: int = 25600) -> bool:
+        """
+        Trains the per-dimension scales of an int8 scalar quantizer on a sample of the vectors of the given collection,
+        then stores the int8 codes of every record (4x smaller than float32) next to its full precision vector.
+        Records inserted afterwards are encoded on insertion. Training again replaces the previous scales.
+        Parameters:
+            target_collection_name (str): The collection to encode.
+            sample_size (int, default: 25600): The number of vectors used for training.
+        Returns:
+            bool: True if the scales have been trained. False if the collection is empty.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'train_SQ_index' has been called with 'target_collection_name' as 'None'")
+        if(self.database[target_collection_name].count_documents({}) == 0):
+            logging.info(f"[INFO]: int8 scales not trained: the collection '{target_collection_name}' is empty.")
+            return False
+        
+        scales: numpy.ndarray = vectorSearch.train_scalar_quantizer(self._sample_training_matrix(target_collection_name, sample_size))
+        
+        self._set_fields_computed_from_vectors(target_collection_name, lambda batch_matrix: [ 
+                {SQ_CODES_FIELD: Binary(codes.tobytes())} for codes in vectorSearch.encode_scalar_quantization(batch_matrix, scales) ])
+        self._store_index_structure(target_collection_name, "sq8", scales)
+        logging.info(f"[INFO]: int8 scalar quantizer trained on '{target_collection_name}'.")
+        return True
+
+
+    def train_binary_index(self, target_collection_name: str, sample_size: int = 25600) -> bool:
+        """
+        Computes the center (mean vector) of a sample of the given collection, then stores the binary sign code of every record
+        (one bit per centered dimension, packed into bytes: 32x smaller than float32) next to its full precision vector.
+        With the 'binary' compression, a vectorized popcount Hamming pass on these codes shortlists the candidates to rescore.
+        Records inserted afterwards are encoded on insertion. Training again replaces the previous codes.
+        Parameters:
+            target_collection_name (str): The collection to encode.
+            sample_size (int, default: 25600): The number of vectors used to compute the center.
+        Returns:
+            bool: True if the codes have been stored. False if the collection is empty.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'train_binary_index' has been called with 'target_collection_name' as 'None'")
+        if(self.database[target_collection_name].count_documents({}) == 0):
+            logging.info(f"[INFO]: Binary codes not computed: the collection '{target_collection_name}' is empty.")
+            return False
         
-        top_m = math.ceil(top_k * (1 + math.log(self.batch_size))) #top_m represents threads' maximum length of the results
-        global_results: list[_VectorModel] = list()
-        async def __find_k_best_matches(normalized_query_vector: floatVector) -> None:
+        sign_center: numpy.ndarray = self._sample_training_matrix(target_collection_name, sample_size).mean(axis=0).astype(numpy.float32)
+        
+        self._set_fields_computed_from_vectors(target_collection_name, lambda batch_matrix: [ 
+                {SIGN_CODES_FIELD: Binary(codes.tobytes())} for codes in vectorSearch.encode_sign_bits(batch_matrix, sign_center) ])
+        self._store_index_structure(target_collection_name, "sign", sign_center)
+        logging.info(f"[INFO]: Binary sign codes stored on '{target_collection_name}'.")
+        return True
+
+
+    def cluster_redundancy_groups(self, target_collection_name: str) -> int:
+        """
+        Assigns the near-duplicate group of every record of the given collection, with a single leader clustering pass 
+        in insertion order at 'TOLERANCE' (see 'Leader_clustering'): each record joins the group of its most similar leader,
+        or becomes the leader of a new group. Needed by collections populated before enabling the redundancy clustering;
+        records inserted afterwards are assigned on insertion. Running it again replaces the previous groups.
+        Insertions into the collection wait for the end of the pass.
+        Parameters:
+            target_collection_name (str): The collection to cluster.
+        Returns:
+            int: The number of groups (leaders).
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'cluster_redundancy_groups' has been called with 'target_collection_name' as 'None'")
+        collection = self.database[target_collection_name]
+        with self._get_writer_lock(target_collection_name): #insertions wait for the new leaders
+            clustering = vectorSearch.Leader_clustering(TOLERANCE)
+            all_records: Cursor = collection.find({}, {"_id": 1, "vector": 1}).sort("_id", 1).batch_size(self.batch_size)
+            batch_matrix: numpy.ndarray = None
             while True:
-                # get embeddings from cursor
-                json_RAGDTModel_list: list[json] = []
-                all_records._next_batch(json_RAGDTModel_list, self.batch_size)
-                if(len(json_RAGDTModel_list) == 0): #no more elements to process
+                json_RAGDTModel_list: list[json] = list(itertools.islice(all_records, self.batch_size))
+                if(len(json_RAGDTModel_list) == 0):
                     break
-                normalized_document_vectors: list[floatVector] = [record["vector"] for record in json_RAGDTModel_list]
-                
-                #array of floats
-                cosine_similarity_array = numpy.dot(
-                    numpy.array(normalized_document_vectors, dtype=float), 
-                    numpy.array(normalized_query_vector, dtype=float))
-
-                # since no order alteration is guaranteed, we can safely pair results with their corresponding records using the same index
-                local_results: list[_VectorModel] = [
-                    _VectorModel(similarity_to_query=cosine_similarity_array[i], 
-                                 json_RAGDTModel=json_RAGDTModel_list[i], 
-                                 vectorList=normalized_document_vectors[i]) 
-                            for i in range(len(cosine_similarity_array))
-                    ]
-                    
-                #we are not returning a number of results equal to 'batch_size', but only the 'top_m' best ones among them
-                local_results.sort(key=lambda t: t.similarity_to_query, reverse=True)
-                local_results = local_results[:top_m]
-                global_results.extend(local_results)
-        
-        # applying 'divide...
-        asyncio.run( __find_k_best_matches(normalized_query_vector) ) # after this execution, 'global_results' will contain 'len(all_records)/batch_size * top_m' best matches
-        if(len(global_results) == 0):
-            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty or not connected.")
-            return []
+                batch_matrix = _decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list], batch_matrix)
+                updates: list[UpdateOne] = []
+                for (record, vector) in zip(json_RAGDTModel_list, batch_matrix):
+                    (group_id, similarity) = clustering.find_nearest_leader(vector)
+                    if(similarity >= TOLERANCE):
+                        updates.append(UpdateOne({"_id": record["_id"]}, {"$set": {REDUNDANCY_GROUP_FIELD: group_id}, 
+                                                                          "$unset": {REDUNDANCY_LEADER_FIELD: ""}}))
+                    else:
+                        clustering.add_leaders(vector, [record["_id"]])
+                        updates.append(UpdateOne({"_id": record["_id"]}, {"$set": {REDUNDANCY_GROUP_FIELD: record["_id"], 
+                                                                                   REDUNDANCY_LEADER_FIELD: True}}))
+                collection.bulk_write(updates, ordered=False)
         
-        # ...et impera'
-        is_fully_ordered: bool = True
-        # only the first and last are guaranteed to be ordered
-        top_k_semi_ordered_list: list[_VectorModel] = [global_results.pop(0)] #initialize with the first result
-        for new_candidate_res in global_results: # insert candidates one by one
-            
-            #early skip (abilitated after 'top_k' results have been collected)
-            if(len(top_k_semi_ordered_list) >= top_k):
-                if(new_candidate_res.similarity_to_query < top_k_semi_ordered_list[0].similarity_to_query):
-                    continue #candidate too far: discard it
-
-            #detect intra-top_k similarity avoidance here (discard the new candidate or another old candidate if needed)
-            discarded_vector: _VectorModel = self._solve_redundance(new_candidate_res, top_k_semi_ordered_list)
-            if(discarded_vector is new_candidate_res): #new candidate discarded
-                continue
-
-            #insert new candidate result (determining if the list remains ordered)
-            if(new_candidate_res.similarity_to_query >= top_k_semi_ordered_list[-1].similarity_to_query):
-                top_k_semi_ordered_list.append(new_candidate_res) #most efficient insertion (no later sorting needed)
-            else:
-                top_k_semi_ordered_list.insert(-1, new_candidate_res) #less efficient insertion (later sorting needed)
-                is_fully_ordered = False
+            self._leader_clusterings[target_collection_name] = clustering
+        logging.info(f"[INFO]: {len(clustering)} redundancy groups assigned on '{target_collection_name}'.")
+        return len(clustering)
+
+
+    def build_document_centroids(self, target_collection_name: str) -> int:
+        """
+        Computes the centroid of the chunk vectors of every document (records grouped by 'metadata.url') of the given collection,
+        replacing the stored ones. The centroids drive the two-stage retrieval (see 'document_probe'): they are kept up to date 
+        on insertion only if the operator has a default 'document_probe', so collections populated otherwise need this build.
+        Parameters:
+            target_collection_name (str): The collection whose documents have to be summarized.
+        Returns:
+            int: The number of documents.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'build_document_centroids' has been called with 'target_collection_name' as 'None'")
+        centroids = vectorSearch.Document_centroids()
+        all_records: Cursor = self.database[target_collection_name].find(
+                {}, {"_id": 1, "vector": 1, "metadata.url": 1}).batch_size(self.batch_size)
+        batch_matrix: numpy.ndarray = None
+        while True:
+            json_RAGDTModel_list: list[json] = list(itertools.islice(all_records, self.batch_size))
+            if(len(json_RAGDTModel_list) == 0):
+                break
+            batch_matrix = _decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list], batch_matrix)
+            rows_by_url: dict[str, list[int]] = dict()
+            for (row, record) in enumerate(json_RAGDTModel_list):
+                rows_by_url.setdefault(record.get("metadata", dict()).get("url"), []).append(row)
+            for (url, rows) in rows_by_url.items():
+                centroids.add_vectors(url, batch_matrix[rows])
+        
+        centroids_collection = self.database[DOCUMENT_CENTROIDS_COLLECTION_NAME]
+        centroids_collection.delete_many({"collection": target_collection_name})
+        documents: list[json] = [ {"collection": target_collection_name, "url": url, "vectors_sum": vectors_sum.tolist(), "count": count} 
+                                    for (url, vectors_sum, count) in centroids.get_documents() ]
+        if(len(documents) > 0):
+            centroids_collection.insert_many(documents)
+            centroids_collection.create_index([("collection", 1), ("url", 1)])
+        self._document_centroids[target_collection_name] = centroids
+        logging.info(f"[INFO]: Centroids of {len(centroids)} documents stored for '{target_collection_name}'.")
+        return len(centroids)
+
+
+    def refresh_vector_cache(self, target_collection_name: str) -> int:
+        """
+        Brings the on-disk vector cache of the given collection up to date with the write version of the collection 
+        (incremented by the insertions and the rewrites of every operator, see '_record_write'), which the cache records 
+        along with its rows: nothing is read while they match.
+        New insertions are appended: first the records after the cache watermark, then (if the collection still holds more 
+        records than the cache) the ones with lower IDs, es. written by other clients. 
+        The cache is rebuilt if records have been rewritten (es. updated), if the collection holds fewer records than the cache 
+        (records removed), or if some cached rows failed their hydration: the new version is filled aside and replaces 
+        the current one once complete, so the retrievals keep using the current one meanwhile.
+        Parameters:
+            target_collection_name (str): The collection whose cache has to be refreshed.
+        Returns:
+            int: The number of newly cached records.
+        """
+        if(self.vector_cache_folder_path is None):
+            raise ValueError("The vector cache is disabled: no 'vector_cache_folder_path' has been configured.")
+        
+        with self._get_writer_lock(target_collection_name):
+            cache: vectorCache.Collection_vector_cache = self._get_vector_cache(target_collection_name)
+            write_version: json = self._get_write_version(target_collection_name) #read first: later writes are caught by the next refresh
+            if((target_collection_name in self._stale_vector_caches) or 
+               (cache.count > self.database[target_collection_name].estimated_document_count()) or 
+               ((cache.source_version is not None) and (cache.source_version["rewrites"] != write_version["rewrites"]))):
+                logging.info(f"[INFO]: Records removed or rewritten in '{target_collection_name}': rebuilding its vector cache.")
+                return self._rebuild_vector_cache(target_collection_name, write_version)
+            if((cache.source_version == write_version) and (cache.watermark is not None)):
+                return 0
+            appended_count: int = self._append_to_vector_cache(target_collection_name, cache)
+            cache.set_source_version(write_version)
+            return appended_count
+
+
+    def migrate_vector_storage(self, target_collection_name: str, storage_format: storage_formats_enum = None) -> int:
+        """
+        Converts in place the stored vectors of the given collection into the given storage format (one bulk write per batch).
+        Records are updated only if their vector did not change meanwhile, so the migration can run alongside insertions
+        and retrievals: both formats are decoded during the rollout.
+        Parameters:
+            target_collection_name (str): The collection to migrate.
+            storage_format (Featured_vector_storage_formats_enum, optional): The target format (default: the operator one).
+        Returns:
+            int: The number of converted records.
+        """
+        storage_format = storage_format or self.vector_storage_format
+        collection = self.database[target_collection_name]
+        all_records: Cursor = collection.find({}, {"_id": 1, "vector": 1}).sort("_id", 1).batch_size(self.batch_size)
+        migrated_count: int = 0
+        while True:
+            json_RAGDTModel_list: list[json] = list(itertools.islice(all_records, self.batch_size))
+            if(len(json_RAGDTModel_list) == 0):
+                break
+            updates: list[UpdateOne] = [
+                    UpdateOne({"_id": record["_id"], "vector": record["vector"]},
+                              {"$set": {"vector": _encode_vector(_decode_vector(record["vector"]), storage_format)}})
+                        for record in json_RAGDTModel_list if not _is_stored_as(record["vector"], storage_format) ]
+            if(len(updates) > 0):
+                migrated_count += collection.bulk_write(updates, ordered=False).modified_count
+
+        if((migrated_count > 0) and (self.vector_cache_folder_path is not None)): #cached vectors may have lost precision
+            with self._get_writer_lock(target_collection_name):
+                self._rebuild_vector_cache(target_collection_name)
+        logging.info(f"[INFO]: {migrated_count} vectors of '{target_collection_name}' migrated to the '{storage_format.value}' format.")
+        return migrated_count
+
+
+    def start_vector_storage_migration(self, target_collection_name: str, storage_format: storage_formats_enum = None) -> Future:
+        """
+        Runs 'migrate_vector_storage' in a background thread (migrations are queued and run one at a time).
+        Returns:
+            Future: The future of the number of converted records.
+        """
+        if(self._maintenance_executor is None):
+            self._maintenance_executor = ThreadPoolExecutor(max_workers=1)
+        return self._maintenance_executor.submit(self.migrate_vector_storage, target_collection_name, storage_format)
 
-            if len(top_k_semi_ordered_list) > top_k: #remove less close one
-                if(not is_fully_ordered): #sort only if needed
-                    top_k_semi_ordered_list.sort(key=lambda t: t.similarity_to_query) #ascending order
-                top_k_semi_ordered_list.pop(0)
 
-        return [ RAG_DTModel.create_from_JSONData(JSON_data=best_res.json_RAGDTModel) for best_res in top_k_semi_ordered_list ]
+    @override
+    def get_collection_statistics(self, target_collection_name: str) -> dict[str, Any]:
+        """
+        The records count is the (metadata-based) estimated one, and the stored vectors are described by the most frequent format 
+        among a random sample of the records (so that collections written with another format, or being migrated, are described 
+        by what they actually store). The collection scan is always available, server-side scoring only if some sampled vectors 
+        are stored as arrays and no default deadline is set, the vector cache, IVF lists and compressed codes only if enabled or trained.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'get_collection_statistics' has been called with 'target_collection_name' as 'None'")
+        sample_records: list[json] = list(self.database[target_collection_name].aggregate([ 
+                {"$sample": {"size": STATISTICS_SAMPLE_SIZE}}, {"$project": {"_id": 0, "vector": 1}} ]))
+        dimension: int = None if (len(sample_records) == 0) else int(_decode_vector(sample_records[0]["vector"]).shape[0])
+        formats_count: dict[storage_formats_enum, int] = dict()
+        for record in sample_records:
+            storage_format: storage_formats_enum = _get_storage_format(record["vector"])
+            formats_count[storage_format] = formats_count.get(storage_format, 0) + 1
+        stored_format: storage_formats_enum = (max(formats_count, key=formats_count.get) if (len(formats_count) > 0) 
+                                               else self.vector_storage_format) #an empty collection will be written with the operator one
+        
+        access_paths: dict[access_paths_enum, dict[str, Any]] = {access_paths_enum.EXACT_SCAN: dict()}
+        # binary vectors cannot be scored by an aggregation, which cannot honour the default deadline either
+        if((formats_count.get(storage_formats_enum.ARRAY, 0) > 0) and (self.retrieval_deadline_ms is None)):
+            access_paths[access_paths_enum.SERVER_SCAN] = dict()
+        if(self.vector_cache_folder_path is not None):
+            access_paths[access_paths_enum.MEMORY_SCAN] = dict()
+        centroids: numpy.ndarray = self._get_index_structure(target_collection_name, "ivf")
+        if(centroids is not None):
+            access_paths[access_paths_enum.IVF] = {"n_lists": int(centroids.shape[0])}
+        codes_parameters: dict[compressions_enum, dict[str, int]] = dict()
+        for (compression, index_type) in INDEX_TYPE_BY_COMPRESSION.items():
+            structure: numpy.ndarray = self._get_index_structure(target_collection_name, index_type)
+            if((structure is not None) and (dimension is not None)):
+                code_bytes: int = {compressions_enum.PRODUCT_QUANTIZATION: structure.shape[0], #one byte per subspace
+                                   compressions_enum.SCALAR_QUANTIZATION_INT8: dimension, 
+                                   compressions_enum.BINARY_SIGN: math.ceil(dimension / 8)}[compression]
+                codes_parameters[compression] = {"code_bytes": int(code_bytes), 
+                                                 "shortlist_factor": SHORTLIST_FACTOR_BY_COMPRESSION[compression]}
+        if(len(codes_parameters) > 0):
+            access_paths[access_paths_enum.COMPRESSED_CODES] = codes_parameters
+        
+        return {"count": self.database[target_collection_name].estimated_document_count(), 
+                "dimension": dimension, 
+                "embedders": [ embedder for embedder in self.database[target_collection_name].distinct("metadata.embedder") 
+                                if embedder is not None ], 
+                "stored_float_bytes": STORED_FLOAT_BYTES_BY_FORMAT[stored_format], 
+                "stored_as_arrays": (stored_format == storage_formats_enum.ARRAY), 
+                "access_paths": access_paths}
 
 
     @override
@@ -364,6 +1103,16 @@ class RAG_MongoDB_operator(RAG_DB_operator_I):
 
     @override
     def close_connection(self):
+        if(self._maintenance_executor is not None): #running migrations are completed before disconnecting
+            self._maintenance_executor.shutdown(wait=True)
+            self._maintenance_executor = None
+        for shared_segment in self._shared_segments.values():
+            with shared_segment.lock: #waits for the running pool scorings
+                shared_segment.release()
+        self._shared_segments.clear()
+        if(self._scoring_pool is not None):
+            self._scoring_pool.close()
+            self._scoring_pool = None
         self.connection.close()
         self.database = None
 
@@ -388,29 +1137,96 @@ class RAG_MongoDB_operator(RAG_DB_operator_I):
         return RAG_engines_enum.MONGODB
 
     
+    def _insert_new_record(self, target_collection_name: str, data_model: RAG_DTModel, generation: int = None, 
+                           lexical_documents: list[tuple[ObjectId, str]] = None) -> bool:
+        """
+        Private method inserting a record whose embedded text is not stored yet (see '_insert_update_record' for the parameters).
+        """
+        if self._check_record_existence_using_embedded_text(target_collection_name, data_model.text):
+            logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text}' into '{target_collection_name}': record already exists.")
+            return False
+        
+        return self._insert_update_record(target_collection_name, data_model, generation=generation, 
+                                          lexical_documents=lexical_documents)
+
+
     #TODO(MINOR REFACTOR): use the data_model's function to generate the json (it will cause a cascade problem because the structure is different now)
-    def _insert_update_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
+    def _insert_update_record(self, target_collection_name: str, data_model: RAG_DTModel, reject_duplicates: bool = True, 
+                              generation: int = None, lexical_documents: list[tuple[ObjectId, str]] = None, 
+                              record_id: ObjectId = None) -> bool:
         """
         Private method actually implementing the insertion/update of records.
+        With the redundancy clustering enabled, the record joins the near-duplicate group of its most similar leader
+        (or leads a new group), and it is not stored if it duplicates that leader.
         Parameters:
             target_collection_name (str): The collection to perform the operation into.
             data_model (RAG_DTModel): The data model to insert/update.
+            reject_duplicates (bool, default: True): Whether duplicates of an already stored record are skipped (clustering only).
+            generation (int, optional): The (unpublished) generation the record belongs to. If None, the record is not stamped.
+            lexical_documents (list[tuple[ObjectId, str]], optional): The list collecting the BM25 entries of the record, 
+                                    added to the loaded index by the caller. If None, they are added right away.
+            record_id (ObjectId, optional): The ID of the stored record to replace (update). If None, a new record is inserted.
         Returns:
             bool: True if the operation is successful. False otherwise.
         """
+        record: json = {
+            "id": data_model.id,
+            "text": data_model.text,
+            "vector": _encode_vector(data_model.vector, self.vector_storage_format),
+            "metadata": {
+                "url": data_model.url,
+                "title": data_model.title,
+                "pages": data_model.pages,
+                "author": data_model.authors,
+                "embedder": data_model.embedder_name
+            }
+        }
+        if(generation is not None):
+            record[GENERATION_FIELD] = generation
         try:
-            return ( self.database[target_collection_name].insert_one({
-                "id": data_model.id,
-                "text": data_model.text,
-                "vector": data_model.vector,
-                "metadata": {
-                    "url": data_model.url,
-                    "title": data_model.title,
-                    "pages": data_model.pages,
-                    "author": data_model.authors,
-                    "embedder": data_model.embedder_name
-                }
-            }) is not None )
+            vector_array = numpy.asarray(data_model.vector, dtype=numpy.float32)
+            centroids: numpy.ndarray = self._get_index_structure(target_collection_name, "ivf")
+            if(centroids is not None): #keep the inverted lists up to date
+                record[IVF_LIST_FIELD] = int(vectorSearch.assign_to_nearest_centroids(vector_array, centroids)[0])
+            codebooks: numpy.ndarray = self._get_index_structure(target_collection_name, "pq")
+            if(codebooks is not None): #keep the PQ codes up to date
+                record[PQ_CODES_FIELD] = Binary(vectorSearch.encode_product_quantization(vector_array, codebooks)[0].tobytes())
+            scales: numpy.ndarray = self._get_index_structure(target_collection_name, "sq8")
+            if(scales is not None): #keep the int8 codes up to date
+                record[SQ_CODES_FIELD] = Binary(vectorSearch.encode_scalar_quantization(vector_array, scales)[0].tobytes())
+            sign_center: numpy.ndarray = self._get_index_structure(target_collection_name, "sign")
+            if(sign_center is not None): #keep the binary codes up to date
+                record[SIGN_CODES_FIELD] = Binary(vectorSearch.encode_sign_bits(vector_array, sign_center)[0].tobytes())
+            # the leader lookup, the insertion and the leader registration are atomic, so that concurrent insertions 
+            # of the same near-duplicate cannot both become leaders (or both be stored)
+            with (self._get_writer_lock(target_collection_name) if self.redundancy_clustering else contextlib.nullcontext()):
+                if(self.redundancy_clustering): #near-duplicate group assignment
+                    (group_id, similarity) = self._get_leader_clustering(target_collection_name).find_nearest_leader(vector_array)
+                    if(reject_duplicates and (similarity >= (self.duplicate_tolerance or EXACT_DUPLICATE_SIMILARITY))):
+                        logging.info(f"[WARNING]: The record with embedded text '{data_model.text[:30]}' has not been stored into '{target_collection_name}': "
+                                     f"duplicate of an already stored record (similarity {similarity:.4f}).")
+                        return False
+                    if(similarity >= TOLERANCE):
+                        record[REDUNDANCY_GROUP_FIELD] = group_id
+                    else: #leader of a new group, identified by its own record ID
+                        record["_id"] = record_id or ObjectId()
+                        record[REDUNDANCY_GROUP_FIELD] = record["_id"]
+                        record[REDUNDANCY_LEADER_FIELD] = True
+                if(record_id is None):
+                    inserted_id: ObjectId = self.database[target_collection_name].insert_one(record).inserted_id
+                else:
+                    record["_id"] = inserted_id = record_id
+                    self.database[target_collection_name].replace_one({"_id": record_id}, record)
+                if(record.get(REDUNDANCY_LEADER_FIELD)):
+                    self._get_leader_clustering(target_collection_name).add_leaders(vector_array, [inserted_id])
+            if((self.document_probe is not None) and (record_id is None)): #keep the document centroid up to date (see 'build_document_centroids' for the updates)
+                self._add_to_document_centroid(target_collection_name, data_model.url, vector_array)
+            lexical_index: lexicalSearch.BM25_index = self._lexical_indexes.get(target_collection_name)
+            if(lexical_documents is not None):
+                lexical_documents.append((inserted_id, data_model.text))
+            elif(lexical_index is not None): #keep the loaded BM25 index up to date
+                lexical_index.add_document(inserted_id, data_model.text)
+            return ( inserted_id is not None )
         except Exception as e:
             logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text[:30]}' into '{target_collection_name}': {e}")
             return False
@@ -440,38 +1256,1990 @@ class RAG_MongoDB_operator(RAG_DB_operator_I):
         return 0.6 * (len(text) / 3.3) + 0.4 * (len(text.split(" ")) * 2.2)
     
 
-    def _solve_redundance(self, new_vector: _VectorModel, vector_list: list[_VectorModel]) -> _VectorModel:
+    def _find_top_m_dense_candidates(self, target_collection_name: str, query_array: numpy.ndarray, top_m: int, 
+                                     metadata_query: json, access_path: access_paths_enum, nprobe: int = None, 
+                                     vector_compression: compressions_enum = None, 
+                                     deadline: vectorSearch.Search_deadline = None) -> vectorSearch.Top_m_candidates_heap:
+        """
+        Private method collecting the 'top_m' candidates of a single query by dense similarity through the given access path
+        (see '_resolve_dense_access_path'): compressed codes scan (with exact rescoring of the shortlist), vector cache, 
+        server-side scoring, IVF lists or collection scan. The codes, server-side and collection scans are restricted 
+        to the probed IVF lists, if any. With a deadline, the collection scan visits the IVF lists closest to the query first 
+        (if trained). With the index generations enabled, the records of the generations published after the search started are ignored.
+        Returns:
+            Top_m_candidates_heap: The collected candidates, paired with their record ID.
+        """
+        if(access_path == access_paths_enum.MEMORY_SCAN): #local matrix product
+            return self._find_top_m_candidates_in_cache(target_collection_name, query_array[numpy.newaxis], top_m, metadata_query)[0]
+        ivf_filter: json = self._build_IVF_filter(target_collection_name, query_array, nprobe)
+        # the collection paths read the published generations only, the vector cache does not hold the others
+        pinned_query: json = _combine_filters(metadata_query, self._build_generation_filter(target_collection_name))
+        query_filter: json = _combine_filters(pinned_query, ivf_filter)
+
+        # every search path pairs the candidates with their record ID only: the winners are hydrated after the selection
+        if(access_path == access_paths_enum.COMPRESSED_CODES): #compressed codes scan and exact rescoring of the shortlist
+            return self._find_top_m_candidates_using_codes(
+                    target_collection_name, query_array, top_m, query_filter, CODES_FIELD_BY_COMPRESSION[vector_compression], 
+                    self._build_codes_scoring_function(target_collection_name, query_array, vector_compression), 
+                    top_m * SHORTLIST_FACTOR_BY_COMPRESSION[vector_compression], deadline)
+        if(access_path == access_paths_enum.SERVER_SCAN): #only the 'top_m' records leave the server
+            return self._find_top_m_candidates_on_server(target_collection_name, query_array, top_m, query_filter)
+        centroids: numpy.ndarray = None if (deadline is None) else self._get_index_structure(target_collection_name, "ivf")
+        if(centroids is not None): #anytime scan, closest clusters first
+            return self._scan_IVF_lists_in_order(target_collection_name, query_array, top_m, pinned_query, centroids, 
+                                                 nprobe if (nprobe is not None) else centroids.shape[0], deadline)
+        return self._find_top_m_candidates_in_collection(target_collection_name, query_array[numpy.newaxis], top_m, 
+                                                         query_filter, deadline)[0]
+
+
+    def _resolve_dense_access_path(self, target_collection_name: str, nprobe: int = None, 
+                                   vector_compression: compressions_enum = None, deadline_ms: int = None, 
+                                   server_side_scoring: bool = None, 
+                                   access_path: access_paths_enum = None) -> tuple[access_paths_enum, int, compressions_enum]:
+        """
+        Private method choosing the access path of a dense search from the options of the call and the operator defaults,
+        raising ValueError instead of silently dropping an option which cannot be honoured.
+        With an 'access_path', only its own options are accepted (its missing ones default to the operator ones, 
+        the defaults of the other paths are not applied). Otherwise the options passed to the call override the operator 
+        defaults they conflict with, and the path is, by precedence: 
+            1. server-side scoring, if requested by the call;
+            2. compressed codes, if requested and trained (a requested compression must be trained if passed to the call);
+            3. vector cache, if enabled and neither IVF lists nor a deadline are requested by the call;
+            4. server-side scoring, if it is the operator default and no deadline is requested by the call;
+            5. IVF lists, if requested and trained (they must be trained if 'nprobe' is passed to the call);
+            6. collection scan.
+        A deadline cannot be honoured by the server-side scoring nor by the vector cache, so requesting either of them 
+        along with a deadline (or with a compression, for the server-side scoring) in the same call is rejected.
+        Parameters:
+            See 'retrieve_embeddings_from_vector' (None options are not requested by the call).
+        Returns:
+            tuple[Featured_access_paths_enum, int, Featured_vector_compressions_enum]: The access path, along with 
+                                    the number of probed IVF lists and the compression it uses (None if not used).
+        """
+        is_IVF_trained: bool = (self._get_index_structure(target_collection_name, "ivf") is not None)
+        if(access_path is not None):
+            foreign_options: list[str] = [ option_name for (option_name, option_value, option_path) in [ 
+                    ("nprobe", nprobe, access_paths_enum.IVF), ("vector_compression", vector_compression, access_paths_enum.COMPRESSED_CODES), 
+                    ("server_side_scoring", server_side_scoring or None, access_paths_enum.SERVER_SCAN) ] 
+                        if (option_value is not None) and (access_path != option_path) ]
+            if(len(foreign_options) > 0):
+                raise ValueError(f"The options {foreign_options} do not apply to the '{access_path.value}' access path.")
+            if((access_path == access_paths_enum.SERVER_SCAN) and 
+               ((server_side_scoring is False) or (deadline_ms is not None) or (self.retrieval_deadline_ms is not None))):
+                raise ValueError("The 'server_scan' access path cannot be combined with a deadline nor with 'server_side_scoring' disabled.")
+            if(access_path == access_paths_enum.MEMORY_SCAN):
+                if(self.vector_cache_folder_path is None):
+                    raise ValueError("The 'memory_scan' access path requires the vector cache ('vector_cache_folder_path') to be enabled.")
+                if(deadline_ms is not None):
+                    raise ValueError("The 'memory_scan' access path cannot be combined with a deadline: the vector cache is scored at once.")
+            if(access_path == access_paths_enum.IVF):
+                nprobe = nprobe if (nprobe is not None) else self.ivf_nprobe
+                if((nprobe is None) or (not is_IVF_trained)):
+                    raise ValueError(f"The 'ivf' access path requires 'nprobe' and an IVF index trained on '{target_collection_name}'.")
+                return (access_path, nprobe, None)
+            if(access_path == access_paths_enum.COMPRESSED_CODES):
+                vector_compression = vector_compression if (vector_compression is not None) else self.vector_compression
+                if((vector_compression is None) or 
+                   (self._get_index_structure(target_collection_name, INDEX_TYPE_BY_COMPRESSION[vector_compression]) is None)):
+                    raise ValueError(f"The 'compressed_codes' access path requires a 'vector_compression' "
+                                     f"whose codes have been trained on '{target_collection_name}'.")
+                return (access_path, None, vector_compression)
+            if(access_path in (access_paths_enum.EXACT_SCAN, access_paths_enum.SERVER_SCAN, access_paths_enum.MEMORY_SCAN)):
+                return (access_path, None, None)
+            raise ValueError(f"The '{access_path.value}' access path is not featured by the MongoDB operator.")
+
+        if(server_side_scoring and ((deadline_ms is not None) or (self.retrieval_deadline_ms is not None))):
+            raise ValueError("The server-side scoring cannot be combined with a deadline: an aggregation cannot return partial results.")
+        if(server_side_scoring and (vector_compression is not None)):
+            raise ValueError("The server-side scoring cannot be combined with a vector compression: the compressed codes are scored on the client side.")
+        if((nprobe is not None) and (not is_IVF_trained)):
+            raise ValueError(f"'nprobe' has been requested, but no IVF index has been trained on '{target_collection_name}' (see 'train_IVF_index').")
+        if((vector_compression is not None) and 
+           (self._get_index_structure(target_collection_name, INDEX_TYPE_BY_COMPRESSION[vector_compression]) is None)):
+            raise ValueError(f"The '{vector_compression.value}' compression has been requested, but its codes have not been trained "
+                             f"on '{target_collection_name}'.")
+        # the defaults are applied only where trained, as the collection may not have been indexed yet
+        nprobe = nprobe if (nprobe is not None) else (self.ivf_nprobe if is_IVF_trained else None)
+        if(vector_compression is None):
+            vector_compression = self.vector_compression
+            if((vector_compression is not None) and 
+               (self._get_index_structure(target_collection_name, INDEX_TYPE_BY_COMPRESSION[vector_compression]) is None)):
+                vector_compression = None
+
+        if(server_side_scoring):
+            return (access_paths_enum.SERVER_SCAN, nprobe, None)
+        if(vector_compression is not None):
+            return (access_paths_enum.COMPRESSED_CODES, nprobe, vector_compression)
+        if((self.vector_cache_folder_path is not None) and (nprobe is None) and (deadline_ms is None)):
+            return (access_paths_enum.MEMORY_SCAN, None, None)
+        if((server_side_scoring is None) and self.server_side_scoring and (deadline_ms is None)):
+            return (access_paths_enum.SERVER_SCAN, nprobe, None)
+        if(nprobe is not None):
+            return (access_paths_enum.IVF, nprobe, None)
+        return (access_paths_enum.EXACT_SCAN, None, None)
+
+
+    def _select_and_hydrate_records(self, target_collection_name: str, candidates_heap: vectorSearch.Top_m_candidates_heap, 
+                                    top_k: int, redundancy_tolerance: float, mmr_lambda: float) -> list[RAG_DTModel]:
+        """
+        Private method applying the redundance filtering on the collected candidates and hydrating the selected records only.
+        The candidates whose records have been removed since their scoring (es. stale vector cache rows) are dropped 
+        and the selection is repeated over the remaining ones, so that 'top_k' records are still returned if available.
+        """
+        if(len(candidates_heap) == 0):
+            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty or not connected.")
+            return []
+        
+        while True:
+            best_record_ids: list[ObjectId] = self._select_top_k_record_IDs(target_collection_name, candidates_heap, top_k, 
+                                                                            redundancy_tolerance, mmr_lambda)
+            best_records: list[json] = self._hydrate_records(target_collection_name, best_record_ids) #text and metadata of the winners only
+            if(len(best_records) == len(best_record_ids)):
+                break
+            missing_ids: set[ObjectId] = set(best_record_ids) - { record["_id"] for record in best_records }
+            self._drop_missing_records(target_collection_name, missing_ids)
+            candidates_heap.remove_payloads(missing_ids)
+
+        return [ RAG_DTModel.create_from_JSONData(JSON_data=json_RAGDTModel) for json_RAGDTModel in best_records ]
+
+
+    def _select_top_k_record_IDs(self, target_collection_name: str, candidates_heap: vectorSearch.Top_m_candidates_heap, 
+                                 top_k: int, redundancy_tolerance: float, mmr_lambda: float) -> list[ObjectId]:
+        """
+        Private method applying the redundance filtering on the collected candidates.
+        With the redundancy clustering enabled and the default filtering (no custom tolerance, no MMR), the candidates are 
+        deduplicated by the near-duplicate group scanned along with their vectors (see '_build_scan_projection'); 
+        otherwise their vectors are compared.
+        Returns:
+            list[ObjectId]: The IDs of the selected records, in selection order.
+        """
+        if((not self.redundancy_clustering) or (redundancy_tolerance is not None) or (mmr_lambda is not None)):
+            return _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda)
+        return _select_top_k_candidates_by_group(candidates_heap, top_k)
+
+
+    def _build_scan_projection(self) -> json:
+        """
+        Private method returning the projection of the scored records: their vector, along with their near-duplicate group 
+        if the redundancy clustering is enabled (so that the redundance filtering needs no further lookup).
+        """
+        projection: json = {"_id": 1, "vector": 1}
+        if(self.redundancy_clustering):
+            projection[REDUNDANCY_GROUP_FIELD] = 1
+        return projection
+
+
+    def _find_top_m_candidates_in_collection(self, target_collection_name: str, query_matrix: numpy.ndarray, top_m: int, 
+                                             query_filter: json = None, 
+                                             deadline: vectorSearch.Search_deadline = None) -> list[vectorSearch.Top_m_candidates_heap]:
         """
-        Private method to resolve redundancy between a given record and a list of already selected records.
-        It removes the less similar record to the query between the given record and the redundant one found in the list.
+        Private method scanning the collection to collect the 'top_m' candidates of each query.
+        If more than one scan thread is configured, the collection is split into '_id' ranges which are scanned 
+        on their own cursors by a thread pool (NumPy and pymongo release the GIL while scoring and reading the sockets), 
+        then the partial candidates lists are merged.
         Parameters:
-            vector (_VectorModel): The record to check.
-            vector_list (list[_VectorModel]): The list of already selected records.
+            target_collection_name (str): The collection to scan.
+            query_matrix (numpy.ndarray): The float32 normalized query vectors (one per row).
+            top_m (int): The number of candidates to collect per query.
+            query_filter (json, optional): The MongoDB filter restricting the scanned records (whole collection if None).
+            deadline (Search_deadline, optional): The time budget of the scan, shared by all the ranges (unbounded if None).
         Returns:
-            _VectorModel: The record that has been discarded due to redundancy (may be the given record or one from the list).
-                            None if no redundancy is found.
+            list[Top_m_candidates_heap]: The collected candidates of each query (same order of the rows), paired with their record ID.
         """
-        redundant_vector: _VectorModel = self._cosine_redundance_check(new_vector, vector_list)
-        if(redundant_vector is not None):
-            if(redundant_vector.similarity_to_query >= new_vector.similarity_to_query):
-                return new_vector #old candidate keeps its place; no discard needed
-            else:
-                vector_list.remove(redundant_vector) #discard old candidate instead
-                return redundant_vector
+        range_filters: list[json] = self._split_into_ID_ranges(target_collection_name, self.scan_threads)
+        if(len(range_filters) <= 1):
+            return self._scan_top_m_candidates(target_collection_name, query_matrix, top_m, query_filter, deadline)
+        
+        if(query_filter is not None):
+            range_filters = [ {"$and": [query_filter, range_filter]} for range_filter in range_filters ]
+        with ThreadPoolExecutor(max_workers=len(range_filters)) as executor:
+            partial_heaps_list: list[list[vectorSearch.Top_m_candidates_heap]] = list(executor.map(
+                    lambda range_filter: self._scan_top_m_candidates(target_collection_name, query_matrix, top_m, range_filter, deadline), 
+                    range_filters))
+        
+        candidates_heaps: list[vectorSearch.Top_m_candidates_heap] = partial_heaps_list[0]
+        for partial_heaps in partial_heaps_list[1:]:
+            for (candidates_heap, partial_heap) in zip(candidates_heaps, partial_heaps):
+                candidates_heap.merge(partial_heap)
+        return candidates_heaps
+
+
+    def _find_top_m_candidates_on_server(self, target_collection_name: str, query_array: numpy.ndarray, top_m: int, 
+                                         query_filter: json = None) -> vectorSearch.Top_m_candidates_heap:
+        """
+        Private method collecting the 'top_m' candidates of a single query through an aggregation pipeline: MongoDB computes 
+        the dot products, sorts them and sends back the 'top_m' best records only (along with their vectors, needed by the 
+        redundance filtering), instead of the whole collection.
+        Aggregation expressions cannot read binary vectors, so the records stored as BSON vectors (see 'vector_storage_format') 
+        are scanned on the client side and merged with the server candidates.
+        Parameters:
+            target_collection_name (str): The collection to score.
+            query_array (numpy.ndarray): The float32 normalized query vector.
+            top_m (int): The number of candidates to collect.
+            query_filter (json, optional): The MongoDB filter restricting the scored records (whole collection if None).
+        Returns:
+            Top_m_candidates_heap: The collected candidates, paired with their record ID.
+        """
+        collection = self.database[target_collection_name]
+        candidates_heap = vectorSearch.Top_m_candidates_heap(top_m)
+        # '$sort' followed by '$limit' is coalesced into a top-k sort, keeping only 'top_m' documents in memory
+        top_records: list[json] = list(collection.aggregate([
+                {"$match": _combine_filters(query_filter, {"vector": {"$type": "array"}})}, 
+                {"$project": { **self._build_scan_projection(), "score": _build_dot_product_expression("$vector", query_array)}}, 
+                {"$sort": {"score": -1}}, 
+                {"$limit": top_m}
+            ], allowDiskUse=True))
+        if(len(top_records) > 0):
+            candidates_heap.push_batch(numpy.asarray([ record["score"] for record in top_records ], dtype=numpy.float32), 
+                                       [ record["_id"] for record in top_records ], 
+                                       _decode_vectors_into_matrix([ record["vector"] for record in top_records ]), 
+                                       [ record.get(REDUNDANCY_GROUP_FIELD) for record in top_records ])
+        
+        binary_vectors_filter: json = _combine_filters(query_filter, {"vector": {"$type": "binData"}})
+        if(collection.find_one(binary_vectors_filter, {"_id": 1}) is not None): #partially migrated collection
+            candidates_heap.merge(self._find_top_m_candidates_in_collection(target_collection_name, query_array[numpy.newaxis], 
+                                                                            top_m, binary_vectors_filter)[0])
+        return candidates_heap
+
+
+    def _scan_top_m_candidates(self, target_collection_name: str, query_matrix: numpy.ndarray, top_m: int, 
+                               query_filter: json, deadline: vectorSearch.Search_deadline = None) -> list[vectorSearch.Top_m_candidates_heap]:
+        """
+        Private method scanning the records matching the filter through a single cursor to collect the 'top_m' candidates of each query.
+        Only the '_id', 'vector' (and group) fields are projected: text and metadata are fetched for the final winners only (see '_hydrate_records').
+        With a deadline, the newest records are scanned first (descending '_id' order) through smaller batches, 
+        and no more batches are fetched once it is over.
+        Parameters and Returns: see '_find_top_m_candidates_in_collection'.
+        """
+        (all_records, batch_size) = self._open_scan_cursor(target_collection_name, query_filter, self._build_scan_projection(), deadline)
+
+        candidates_heaps = [ vectorSearch.Top_m_candidates_heap(top_m) for _ in range(query_matrix.shape[0]) ]
+        batch_matrix: numpy.ndarray = None #preallocated float32 buffer, reused by every batch
+        while ((batch_matrix is None) or (deadline is None) or (not deadline.is_expired())):
+            # get embeddings from cursor
+            json_RAGDTModel_list: list[json] = list(itertools.islice(all_records, batch_size))
+            if(len(json_RAGDTModel_list) == 0): #no more elements to process
+                break
+            batch_matrix = _decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list], batch_matrix)
+            batch_length: int = len(json_RAGDTModel_list)
+            batch_record_ids: list[ObjectId] = [ record["_id"] for record in json_RAGDTModel_list ]
+            batch_groups: list[Any] = [ record.get(REDUNDANCY_GROUP_FIELD) for record in json_RAGDTModel_list ]
+
+            # single float32 matrix product for the whole batch and all the queries
+            cosine_similarity_matrix = batch_matrix[:batch_length] @ query_matrix.T
+
+            # only the batch winners beating the running 'top_m' threshold become Python objects
+            for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                candidates_heap.push_batch(cosine_similarity_matrix[:, query_index], batch_record_ids, batch_matrix[:batch_length], batch_groups)
+        return candidates_heaps
+
+
+    def _scan_IVF_lists_in_order(self, target_collection_name: str, query_array: numpy.ndarray, top_m: int, metadata_query: json, 
+                                 centroids: numpy.ndarray, n_lists: int, 
+                                 deadline: vectorSearch.Search_deadline) -> vectorSearch.Top_m_candidates_heap:
+        """
+        Private method scanning the IVF lists one at a time, from the closest to the query, until 'n_lists' lists have been scanned
+        or the deadline is over: the best candidates are likely met within the first lists, so an interrupted scan still returns them.
+        Returns:
+            Top_m_candidates_heap: The collected candidates, paired with their record ID.
+        """
+        candidates_heap = vectorSearch.Top_m_candidates_heap(top_m)
+        for list_index in numpy.ravel(vectorSearch.assign_to_nearest_centroids(query_array, centroids, n_nearest=max(1, n_lists))):
+            if((len(candidates_heap) > 0) and deadline.is_expired()):
+                break
+            candidates_heap.merge(self._scan_top_m_candidates(target_collection_name, query_array[numpy.newaxis], top_m, 
+                                                              _combine_filters(metadata_query, {IVF_LIST_FIELD: int(list_index)}), 
+                                                              deadline)[0])
+        return candidates_heap
+
+
+    def _open_scan_cursor(self, target_collection_name: str, query_filter: json, projection: json, 
+                          deadline: vectorSearch.Search_deadline) -> tuple[Cursor, int]:
+        """
+        Private method opening the cursor of a scan and returning it along with the size of the batches to fetch.
+        Deadline-bounded scans visit the newest records first (descending '_id' order, served by the '_id' index) 
+        through batches small enough to check the deadline often.
+        """
+        if(deadline is None):
+            return (self.database[target_collection_name].find(query_filter or dict(), projection).batch_size(self.batch_size), 
+                    self.batch_size)
+        batch_size: int = min(self.batch_size, DEADLINE_SCAN_BATCH_SIZE)
+        return (self.database[target_collection_name].find(query_filter or dict(), projection).sort("_id", -1).batch_size(batch_size), 
+                batch_size)
+
+
+    def _build_deadline(self, deadline_ms: int) -> vectorSearch.Search_deadline:
+        """
+        Private method starting the time budget of a retrieval ('deadline_ms' or the operator default). None if unbounded.
+        """
+        deadline_ms = deadline_ms if (deadline_ms is not None) else self.retrieval_deadline_ms
+        return None if (deadline_ms is None) else vectorSearch.Search_deadline(deadline_ms)
+
+
+    def _split_into_ID_ranges(self, target_collection_name: str, n_ranges: int) -> list[json]:
+        """
+        Private method splitting the collection into contiguous '_id' ranges of similar size, 
+        whose boundaries are the quantiles of a random sample of the record IDs.
+        Returns:
+            list[json]: The MongoDB filters of the ranges (together they cover the whole collection). 
+                        A single empty filter if the collection is too small to be split.
+        """
+        if(n_ranges <= 1):
+            return [ dict() ]
+        sample_size: int = n_ranges * SCAN_RANGE_SAMPLES_PER_THREAD
+        if(self.database[target_collection_name].estimated_document_count() < max(sample_size, self.batch_size)):
+            return [ dict() ]
+        
+        sampled_ids: list[ObjectId] = sorted({ record["_id"] for record in self.database[target_collection_name].aggregate([ 
+                {"$sample": {"size": sample_size}}, {"$project": {"_id": 1}} ]) })
+        boundaries: list[ObjectId] = sorted({ sampled_ids[(len(sampled_ids) * i) // n_ranges] for i in range(1, n_ranges) })
+        
+        range_filters: list[json] = [ {"_id": {"$lt": boundaries[0]}} ]
+        for (lower_bound, upper_bound) in zip(boundaries, boundaries[1:]):
+            range_filters.append({"_id": {"$gte": lower_bound, "$lt": upper_bound}})
+        range_filters.append({"_id": {"$gte": boundaries[-1]}})
+        return range_filters
+
+
+    def _find_top_m_candidates_in_cache(self, target_collection_name: str, query_matrix: numpy.ndarray, 
+                                        top_m: int, query_filter: json = None) -> list[vectorSearch.Top_m_candidates_heap]:
+        """
+        Private method refreshing and scanning the memory-mapped vector cache of the collection to collect the 'top_m' candidates of each query.
+        If the process-pool scoring is enabled, the cache is mirrored into shared memory and scored by the worker processes instead.
+        The refresh is skipped while a writer (ingestion, refresh or rebuild) holds the collection, so that the retrieval 
+        does not wait: the last published cache snapshot is scored, pinned for the whole retrieval. 
+        Only the first build of the cache (nothing published yet) is waited for.
+        Parameters:
+            target_collection_name (str): The collection whose cache has to be scanned.
+            query_matrix (numpy.ndarray): The float32 normalized query vectors (one per row).
+            top_m (int): The number of candidates to collect per query.
+            query_filter (json, optional): The MongoDB filter restricting the scored records: only the cache rows of the
+                                            matching IDs (fetched through the supporting indexes) are scored.
+        Returns:
+            list[Top_m_candidates_heap]: The collected candidates of each query (same order of the rows), paired with their record ID.
+        """
+        writer_lock: threading.RLock = self._get_writer_lock(target_collection_name)
+        # a cache never filled has no snapshot to serve yet, so only its first build is waited for
+        if(writer_lock.acquire(blocking=(self._get_vector_cache(target_collection_name).watermark is None))):
+            try:
+                self.refresh_vector_cache(target_collection_name)
+            finally:
+                writer_lock.release()
+        cache: vectorCache.Vector_cache_snapshot = self._get_vector_cache(target_collection_name).get_snapshot()
+        cached_matrix: numpy.ndarray = cache.get_matrix()
+
+        candidates_heaps = [ vectorSearch.Top_m_candidates_heap(top_m) for _ in range(query_matrix.shape[0]) ]
+        if(query_filter is not None): #only the subset rows are gathered and scored
+            subset_offsets: list[int] = sorted( offset for offset in (cache.get_offset(record["_id"].binary) for record in 
+                                                    self.database[target_collection_name].find(query_filter, {"_id": 1})) 
+                                                if offset is not None )
+            for start in range(0, len(subset_offsets), self.batch_size):
+                batch_offsets: list[int] = subset_offsets[start:start + self.batch_size]
+                batch_matrix: numpy.ndarray = cached_matrix[batch_offsets]
+                cosine_similarity_matrix = batch_matrix @ query_matrix.T
+                for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                    candidates_heap.push_batch(cosine_similarity_matrix[:, query_index], batch_offsets, batch_matrix)
+        elif((self._scoring_pool is None) or 
+             (not self._find_top_m_candidates_in_shared_segment(target_collection_name, cache, query_matrix, top_m, candidates_heaps))):
+            for start in range(0, cache.count, self.batch_size):
+                end: int = min(start + self.batch_size, cache.count)
+                cosine_similarity_matrix = cached_matrix[start:end] @ query_matrix.T
+                for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                    candidates_heap.push_batch(cosine_similarity_matrix[:, query_index], range(start, end), cached_matrix[start:end])
+        
+        # offsets are converted into IDs only for the survivors
+        for candidates_heap in candidates_heaps:
+            candidates_heap.map_payloads(lambda offset: ObjectId(cache.get_id(offset)))
+        return candidates_heaps
+
+
+    def _find_top_m_candidates_in_shared_segment(self, target_collection_name: str, cache: vectorCache.Vector_cache_snapshot, 
+                                                 query_matrix: numpy.ndarray, top_m: int, 
+                                                 candidates_heaps: list[vectorSearch.Top_m_candidates_heap]) -> bool:
+        """
+        Private method mirroring the cache snapshot into the shared memory segment of the collection and scoring it 
+        with the worker processes, pushing the candidates (paired with their cache offset) into the given heaps.
+        The segment lock is held from the synchronization to the read back of the candidates' vectors, so that 
+        a concurrent retrieval never grows (re-allocating and unlinking it) or writes the segment while the workers score it.
+        Returns:
+            bool: False if the snapshot is older than the segment content (a rebuilt cache version), so nothing has been scored.
+        """
+        shared_segment: shardedScoring.Shared_vector_segment = self._get_shared_segment(target_collection_name)
+        with shared_segment.lock:
+            if(shared_segment.source_version > cache.version):
+                return False
+            if((shared_segment.count < cache.count) or (shared_segment.source_version < cache.version)):
+                shared_segment.synchronize(cache.get_matrix(), cache.version) #only the rows appended since the last query are copied
+            shared_matrix: numpy.ndarray = shared_segment.get_matrix()
+            # workers only return (score, offset) pairs: the candidates' vectors are read back from the shared segment
+            for ((scores, offsets), candidates_heap) in zip(
+                    self._scoring_pool.find_top_m_candidates(shared_segment, query_matrix, top_m), candidates_heaps):
+                in_snapshot: numpy.ndarray = (offsets < cache.count) #skips the rows synchronized by a newer snapshot
+                candidates_heap.push_batch(scores[in_snapshot], offsets[in_snapshot].tolist(), shared_matrix[offsets[in_snapshot]])
+        return True
+
+
+    def _get_index_structure(self, target_collection_name: str, index_type: str) -> numpy.ndarray:
+        """
+        Private method returning the (lazily loaded) trained structure of the given type for the collection 
+        (es. IVF centroids or PQ codebooks). None if it has not been trained.
+        """
+        if((target_collection_name, index_type) not in self._index_structures):
+            index_metadata: json = self.database[INDEX_METADATA_COLLECTION_NAME].find_one(
+                    {"collection": target_collection_name, "index_type": index_type})
+            self._index_structures[(target_collection_name, index_type)] = (None if (index_metadata is None) else 
+                    numpy.frombuffer(index_metadata["data"], dtype=index_metadata["dtype"]).reshape(index_metadata["shape"]))
+        return self._index_structures[(target_collection_name, index_type)]
+
+
+    def _store_index_structure(self, target_collection_name: str, index_type: str, structure: numpy.ndarray) -> None:
+        """
+        Private method storing (or replacing) the trained structure of the given type for the collection.
+        """
+        self.database[INDEX_METADATA_COLLECTION_NAME].replace_one(
+                {"collection": target_collection_name, "index_type": index_type}, 
+                {"collection": target_collection_name, "index_type": index_type, "dtype": str(structure.dtype), 
+                 "shape": list(structure.shape), "data": Binary(numpy.ascontiguousarray(structure).tobytes())}, 
+                upsert=True)
+        self._index_structures[(target_collection_name, index_type)] = structure
+
+
+    def _sample_training_matrix(self, target_collection_name: str, sample_size: int) -> numpy.ndarray:
+        """
+        Private method returning a float32 matrix of vectors randomly sampled from the collection.
+        """
+        sample: list[json] = list(self.database[target_collection_name].aggregate([ 
+                {"$sample": {"size": sample_size}}, {"$project": {"_id": 0, "vector": 1}} ]))
+        return _decode_vectors_into_matrix([ record["vector"] for record in sample ])
+
+
+    def _set_fields_computed_from_vectors(self, target_collection_name: str, compute_fields_function, query_filter: json = None) -> None:
+        """
+        Private method scanning the collection and setting on every record the fields computed from its vector
+        (one bulk write per batch).
+        Parameters:
+            target_collection_name (str): The collection to update.
+            compute_fields_function: Function taking a float32 batch matrix and returning the fields to set 
+                                        for each of its rows (list[json], same order of the rows).
+            query_filter (json, optional): The MongoDB filter restricting the updated records (whole collection if None).
+        """
+        collection = self.database[target_collection_name]
+        all_records: Cursor = collection.find(query_filter or dict(), {"_id": 1, "vector": 1}).batch_size(self.batch_size)
+        batch_matrix: numpy.ndarray = None
+        while True:
+            json_RAGDTModel_list: list[json] = list(itertools.islice(all_records, self.batch_size))
+            if(len(json_RAGDTModel_list) == 0):
+                break
+            batch_matrix = _decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list], batch_matrix)
+            fields_list: list[json] = compute_fields_function(batch_matrix[:len(json_RAGDTModel_list)])
+            collection.bulk_write([ UpdateOne({"_id": record["_id"]}, {"$set": fields}) 
+                                        for (record, fields) in zip(json_RAGDTModel_list, fields_list) ], ordered=False)
+
+
+    def _build_codes_scoring_function(self, target_collection_name: str, query_array: numpy.ndarray, 
+                                      vector_compression: compressions_enum):
+        """
+        Private method building the function approximating the query similarity of a batch of compressed codes.
+        Returns:
+            The function taking the uint8 codes matrix of a batch and returning its approximated scores.
+            None if no compression is requested or its structures have not been trained for the collection.
+        """
+        if(vector_compression == compressions_enum.PRODUCT_QUANTIZATION):
+            codebooks: numpy.ndarray = self._get_index_structure(target_collection_name, "pq")
+            if(codebooks is not None):
+                lookup_table: numpy.ndarray = vectorSearch.build_ADC_lookup_table(query_array, codebooks)
+                return (lambda codes: vectorSearch.score_with_ADC(codes, lookup_table))
+        elif(vector_compression == compressions_enum.SCALAR_QUANTIZATION_INT8):
+            scales: numpy.ndarray = self._get_index_structure(target_collection_name, "sq8")
+            if(scales is not None):
+                (query_codes, query_factor) = vectorSearch.build_SQ_query(query_array, scales)
+                return (lambda codes: vectorSearch.score_with_SQ(codes.view(numpy.int8), query_codes, query_factor))
+        elif(vector_compression == compressions_enum.BINARY_SIGN):
+            sign_center: numpy.ndarray = self._get_index_structure(target_collection_name, "sign")
+            if(sign_center is not None):
+                query_sign_codes: numpy.ndarray = vectorSearch.encode_sign_bits(query_array, sign_center)[0]
+                return (lambda codes: vectorSearch.score_with_hamming(codes, query_sign_codes))
         return None
-    
 
-    def _cosine_redundance_check(self, vector: _VectorModel, vector_list: list[_VectorModel]) -> _VectorModel:
+
+    def _find_top_m_candidates_using_codes(self, target_collection_name: str, query_array: numpy.ndarray, top_m: int, 
+                                           query_filter: json, codes_field: str, codes_scoring_function, shortlist_size: int, 
+                                           deadline: vectorSearch.Search_deadline = None) -> vectorSearch.Top_m_candidates_heap:
         """
-        Private method to check if a given record is redundant with respect to a list of already selected records.
+        Private method collecting the 'top_m' candidates in two stages: a shortlist is selected by scanning only the
+        compressed codes of the records, then the shortlist is rescored exactly with the full precision vectors.
         Parameters:
-            vector (_VectorModel): The record to check.
-            vector_list (list[_VectorModel]): The list of already selected records.
+            target_collection_name (str): The collection to scan.
+            query_array (numpy.ndarray): The float32 normalized query vector.
+            top_m (int): The number of candidates to collect.
+            query_filter (json): The MongoDB filter restricting the scanned records (whole collection if None).
+            codes_field (str): The record field holding the compressed codes.
+            codes_scoring_function: Function taking the uint8 codes matrix of a batch and returning its approximated scores.
+            shortlist_size (int): The number of candidates selected by the first stage and rescored exactly.
+            deadline (Search_deadline, optional): The time budget of the codes scan (the shortlist is always rescored).
+        Returns:
+            Top_m_candidates_heap: The collected candidates, paired with their record ID.
+        """
+        codes_query: json = dict(query_filter or dict())
+        codes_query[codes_field] = {"$exists": True}
+        (all_codes, batch_size) = self._open_scan_cursor(target_collection_name, codes_query, {"_id": 1, codes_field: 1}, deadline)
+
+        shortlist_heap = vectorSearch.Top_m_candidates_heap(shortlist_size)
+        while ((len(shortlist_heap) == 0) or (deadline is None) or (not deadline.is_expired())):
+            json_RAGDTModel_list: list[json] = list(itertools.islice(all_codes, batch_size))
+            if(len(json_RAGDTModel_list) == 0):
+                break
+            codes_matrix: numpy.ndarray = numpy.frombuffer(b"".join([ record[codes_field] for record in json_RAGDTModel_list ]), 
+                                                           dtype=numpy.uint8).reshape(len(json_RAGDTModel_list), -1)
+            shortlist_heap.push_batch(codes_scoring_function(codes_matrix), 
+                                      [ record["_id"] for record in json_RAGDTModel_list ], codes_matrix)
+
+        return self._rescore_exactly(target_collection_name, [ record_id for (_, record_id, _) in shortlist_heap.get_sorted_candidates() ], 
+                                     query_array, top_m)
+
+
+    def _rescore_exactly(self, target_collection_name: str, record_ids: list[ObjectId], 
+                         query_array: numpy.ndarray, top_m: int, query_filter: json = None) -> vectorSearch.Top_m_candidates_heap:
+        """
+        Private method scoring the given records with their full precision vectors (fetched with a single query).
+        If a filter is given, the records not matching it are skipped.
+        Returns:
+            Top_m_candidates_heap: The 'top_m' best records, paired with their record ID.
+        """
+        candidates_heap = vectorSearch.Top_m_candidates_heap(top_m)
+        shortlist: list[json] = list(self.database[target_collection_name].find(
+                _combine_filters({"_id": {"$in": record_ids}}, query_filter), self._build_scan_projection()))
+        if(len(shortlist) > 0):
+            shortlist_matrix: numpy.ndarray = _decode_vectors_into_matrix([ record["vector"] for record in shortlist ])
+            candidates_heap.push_batch(shortlist_matrix @ query_array, [ record["_id"] for record in shortlist ], shortlist_matrix, 
+                                       [ record.get(REDUNDANCY_GROUP_FIELD) for record in shortlist ])
+        return candidates_heap
+
+
+    def _build_IVF_filter(self, target_collection_name: str, query_array: numpy.ndarray, nprobe: int) -> json:
+        """
+        Private method building the MongoDB filter restricting a scan to the 'nprobe' inverted lists closest to the query.
         Returns:
-            _VectorModel: The record in the vector_list that is redundant with respect to the given record.
-                            None if no redundancy is found.
+            json: The filter on the inverted list labels. None if 'nprobe' is None or no IVF index has been trained.
         """
-        for existing_vector in vector_list:
-            if(numpy.dot(existing_vector.vectorList, vector.vectorList) >= TOLERANCE):
-                return existing_vector
-        return None
\ No newline at end of file
+        if(nprobe is None):
+            return None
+        centroids: numpy.ndarray = self._get_index_structure(target_collection_name, "ivf")
+        if(centroids is None):
+            return None
+        probed_lists: numpy.ndarray = vectorSearch.assign_to_nearest_centroids(query_array, centroids, n_nearest=max(1, nprobe))
+        return {IVF_LIST_FIELD: {"$in": [ int(list_index) for list_index in numpy.ravel(probed_lists) ]}}
+
+
+    def _build_document_filter(self, target_collection_name: str, query_array: numpy.ndarray, document_probe: int, 
+                               metadata_filter: dict[str, list[str]] = None) -> json:
+        """
+        Private method building the MongoDB filter restricting a scan to the chunks of the 'document_probe' documents whose 
+        centroids are the closest to the query ('document_probe' defaults to the operator one). 
+        If the metadata filter accepts some urls, the documents are chosen among them.
+        Returns:
+            json: The filter on the record URLs. None if no document probe is set or no centroids are stored.
+        """
+        document_probe = document_probe if (document_probe is not None) else self.document_probe
+        if(document_probe is None):
+            return None
+        centroids: vectorSearch.Document_centroids = self._get_document_centroids(target_collection_name)
+        if(len(centroids) == 0):
+            return None
+        allowed_urls: set[str] = set(metadata_filter["url"]) if (metadata_filter and ("url" in metadata_filter)) else None
+        return self._build_metadata_filter(target_collection_name, 
+                                           {"url": centroids.find_top_documents(query_array, document_probe, allowed_urls)})
+
+
+    def _build_metadata_filter(self, target_collection_name: str, metadata_filter: dict[str, list[str]]) -> json:
+        """
+        Private method building the MongoDB filter restricting a retrieval to the records matching the given metadata values,
+        creating the supporting indexes of the filtered fields on their first use.
+        Returns:
+            json: The filter on the record metadata. None if no metadata filter is given.
+        """
+        if(not metadata_filter):
+            return None
+        query_filter: json = dict()
+        for (field, values) in metadata_filter.items():
+            if((target_collection_name, field) not in self._metadata_indexes):
+                self.database[target_collection_name].create_index(f"metadata.{field}")
+                self._metadata_indexes.add((target_collection_name, field))
+            query_filter[f"metadata.{field}"] = {"$in": list(values)} #also matches list fields like 'author'
+        return query_filter
+
+
+    def _get_lexical_index(self, target_collection_name: str) -> lexicalSearch.BM25_index:
+        """
+        Private method returning the BM25 index of the collection, built on its first use by reading the stored texts 
+        (only the '{_id, text}' projection) batch by batch.
+        With the index generations enabled, the index is built over the published generations, then it catches up 
+        with the ones published meanwhile (the following ones are added by their publication or by the reload of 
+        the generation view, see '_get_generation_view').
+        """
+        if(target_collection_name not in self._lexical_indexes):
+            lexical_index = lexicalSearch.BM25_index()
+            pinned_view: tuple[int, tuple[int, ...]] = self._get_generation_view(target_collection_name) if self.index_generations else None
+            for record in self.database[target_collection_name].find(
+                    self._build_generation_filter(target_collection_name, pinned_view) or dict(), {"_id": 1, "text": 1}, 
+                    batch_size=self.batch_size):
+                lexical_index.add_document(record["_id"], record.get("text"))
+            self._lexical_indexes[target_collection_name] = lexical_index
+            if(self.index_generations and (self._get_generation_view(target_collection_name) != pinned_view)):
+                self._add_published_generations(target_collection_name, lexical_index, pinned_view, 
+                                                self._get_generation_view(target_collection_name))
+            logging.info(f"[INFO]: BM25 index of '{target_collection_name}' built over {len(lexical_index)} records.")
+        return self._lexical_indexes[target_collection_name]
+
+
+    def _get_leader_clustering(self, target_collection_name: str) -> vectorSearch.Leader_clustering:
+        """
+        Private method returning the near-duplicate leaders of the collection, loaded on their first use from the leader records.
+        """
+        if(target_collection_name not in self._leader_clusterings):
+            clustering = vectorSearch.Leader_clustering(TOLERANCE)
+            leader_records: Cursor = self.database[target_collection_name].find(
+                    {REDUNDANCY_LEADER_FIELD: True}, {"_id": 1, "vector": 1}).batch_size(self.batch_size)
+            while True:
+                json_RAGDTModel_list: list[json] = list(itertools.islice(leader_records, self.batch_size))
+                if(len(json_RAGDTModel_list) == 0):
+                    break
+                clustering.add_leaders(_decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list]), 
+                                       [ record["_id"] for record in json_RAGDTModel_list ])
+            self._leader_clusterings[target_collection_name] = clustering
+        return self._leader_clusterings[target_collection_name]
+
+
+    def _get_document_centroids(self, target_collection_name: str) -> vectorSearch.Document_centroids:
+        """
+        Private method returning the document centroids of the collection, loaded on their first use.
+        """
+        if(target_collection_name not in self._document_centroids):
+            centroids = vectorSearch.Document_centroids()
+            for document in self.database[DOCUMENT_CENTROIDS_COLLECTION_NAME].find({"collection": target_collection_name}):
+                centroids.set_document(document["url"], document["vectors_sum"], document["count"])
+            self._document_centroids[target_collection_name] = centroids
+        return self._document_centroids[target_collection_name]
+
+
+    def _add_to_document_centroid(self, target_collection_name: str, url: str, vector_array: numpy.ndarray) -> None:
+        """
+        Private method adding a new chunk vector to the centroid of its document and persisting the updated centroid.
+        """
+        (vectors_sum, count) = self._get_document_centroids(target_collection_name).add_vectors(url, vector_array)
+        self.database[DOCUMENT_CENTROIDS_COLLECTION_NAME].update_one(
+                {"collection": target_collection_name, "url": url}, 
+                {"$set": {"vectors_sum": vectors_sum.tolist(), "count": count}}, upsert=True)
+
+
+    def _append_to_vector_cache(self, target_collection_name: str, cache: vectorCache.Collection_vector_cache) -> int:
+        """
+        Private method appending to the given cache (version) all the (published) records inserted after its watermark, 
+        publishing a new snapshot per batch. If the collection still holds more records than the cache, the IDs of 
+        the records missing from the cache (inserted with lower IDs) are looked up and their vectors appended as well.
+        The caller must hold the writer lock of the collection.
+        Returns:
+            int: The number of newly cached records.
+        """
+        generation_filter: json = self._build_generation_filter(target_collection_name)
+        query: json = _combine_filters(None if (cache.watermark is None) else {"_id": {"$gt": ObjectId(cache.watermark)}}, 
+                                       generation_filter) or dict()
+        appended_count: int = self._append_records_to_vector_cache(target_collection_name, cache, query, update_watermark=True)
+
+        records_count: int = (self.database[target_collection_name].estimated_document_count() if (generation_filter is None) 
+                              else self.database[target_collection_name].count_documents(generation_filter))
+        if(cache.count < records_count):
+            missing_ids: list[ObjectId] = [ record["_id"] for record in self.database[target_collection_name].find(
+                                                    generation_filter or dict(), {"_id": 1}) 
+                                                if cache.get_offset(record["_id"].binary) is None ]
+            for start in range(0, len(missing_ids), self.batch_size):
+                appended_count += self._append_records_to_vector_cache(
+                        target_collection_name, cache, {"_id": {"$in": missing_ids[start:start + self.batch_size]}}, update_watermark=False)
+        return appended_count
+
+
+    def _append_records_to_vector_cache(self, target_collection_name: str, cache: vectorCache.Collection_vector_cache, 
+                                        query: json, update_watermark: bool) -> int:
+        """
+        Private method appending to the given cache the records matching the query, in ascending '_id' order and batch by batch.
+        Parameters:
+            update_watermark (bool): Whether the last appended record becomes the cache watermark (records after the current one).
+        Returns:
+            int: The number of appended records.
+        """
+        new_records: Cursor = self.database[target_collection_name].find(
+                query, {"_id": 1, "vector": 1}).sort("_id", 1).batch_size(self.batch_size)
+
+        appended_count: int = 0
+        batch_matrix: numpy.ndarray = None
+        while True:
+            json_RAGDTModel_list: list[json] = list(itertools.islice(new_records, self.batch_size))
+            if(len(json_RAGDTModel_list) == 0):
+                break
+            batch_matrix = _decode_vectors_into_matrix([record["vector"] for record in json_RAGDTModel_list], batch_matrix)
+            cache.append(record_ids=[ record["_id"].binary for record in json_RAGDTModel_list ], 
+                         vectors_matrix=batch_matrix[:len(json_RAGDTModel_list)], 
+                         watermark=str(json_RAGDTModel_list[-1]["_id"]) if update_watermark else cache.watermark)
+            appended_count += len(json_RAGDTModel_list)
+        return appended_count
+
+
+    def _rebuild_vector_cache(self, target_collection_name: str, write_version: json) -> int:
+        """
+        Private method filling the next version of the vector cache from scratch, then swapping it in place of the current one
+        (whose files are removed, the snapshots already taken keep reading them). The caller must hold the writer lock.
+        Parameters:
+            write_version (json): The write version of the collection read before the rebuild, recorded by the new version.
+        Returns:
+            int: The number of cached records.
+        """
+        current_cache: vectorCache.Collection_vector_cache = self._get_vector_cache(target_collection_name)
+        next_cache: vectorCache.Collection_vector_cache = current_cache.create_next_version()
+        self._stale_vector_caches.discard(target_collection_name) #rows failing the hydration from now on flag the new version
+        cached_count: int = self._append_to_vector_cache(target_collection_name, next_cache)
+        next_cache.set_source_version(write_version)
+        self._vector_caches[target_collection_name] = next_cache
+        current_cache.reset()
+        return cached_count
+
+
+    def _get_write_version(self, target_collection_name: str) -> json:
+        """
+        Private method returning the write version of the collection: the number of the insertions and of the rewrites 
+        recorded by '_record_write' (by any operator).
+        """
+        write_version: json = self.database[INDEX_METADATA_COLLECTION_NAME].find_one(
+                {"collection": target_collection_name, "index_type": "write_version"}) or dict()
+        return {"inserts": write_version.get("inserts", 0), "rewrites": write_version.get("rewrites", 0)}
+
+
+    def _record_write(self, target_collection_name: str, is_rewrite: bool = False) -> None:
+        """
+        Private method incrementing the write version of the collection once its records have been written: 
+        the vector caches of every operator append the inserted (or published) records, and are rebuilt after a rewrite.
+        """
+        self.database[INDEX_METADATA_COLLECTION_NAME].update_one(
+                {"collection": target_collection_name, "index_type": "write_version"}, 
+                {"$inc": {"rewrites" if is_rewrite else "inserts": 1}}, upsert=True)
+
+
+    def _allocate_generation(self, target_collection_name: str) -> int:
+        """
+        Private method allocating the number of a new generation of the collection, through an atomic increment of the 
+        generation counter (so that no other ingestion, of any operator, gets the same number), and registering it 
+        as pending (excluded from the retrievals until published). 
+        The pending generations whose ingestion did not signal for 'ABANDONED_GENERATION_TIMEOUT_S' are abandoned 
+        before: they stay excluded forever and their records are deleted.
+        Returns:
+            int: The allocated generation.
+        """
+        metadata_collection = self.database[INDEX_METADATA_COLLECTION_NAME]
+        generation_key: json = {"collection": target_collection_name, "index_type": "generation"}
+        generation_metadata: json = metadata_collection.find_one_and_update(
+                generation_key, {"$inc": {"next": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+        generation: int = generation_metadata["next"]
+
+        abandoned_generations: list[int] = [ pending["generation"] for pending in generation_metadata.get("pending", []) 
+                                                if (time.time() - pending["signal_time"]) > ABANDONED_GENERATION_TIMEOUT_S ]
+        if(len(abandoned_generations) > 0): #excluded first, so that their records never become visible
+            metadata_collection.update_one(generation_key, {"$pull": {"pending": {"generation": {"$in": abandoned_generations}}}, 
+                                                            "$addToSet": {"abandoned": {"$each": abandoned_generations}}})
+            deleted_count: int = self.database[target_collection_name].delete_many(
+                    {GENERATION_FIELD: {"$in": abandoned_generations}}).deleted_count
+            logging.info(f"[WARNING]: Generations {abandoned_generations} of '{target_collection_name}' abandoned by their ingestion: "
+                         f"{deleted_count} records deleted.")
+        metadata_collection.update_one(generation_key, {"$push": {"pending": {"generation": generation, "signal_time": time.time()}}})
+        return generation
+
+
+    def _signal_generation(self, target_collection_name: str, generation: int) -> None:
+        """
+        Private method signalling that the ingestion of the given (pending) generation is still running, 
+        so that it is not abandoned by the other ingestions.
+        """
+        self.database[INDEX_METADATA_COLLECTION_NAME].update_one(
+                {"collection": target_collection_name, "index_type": "generation", "pending.generation": generation}, 
+                {"$set": {"pending.$.signal_time": time.time()}})
+
+
+    def _publish_generation(self, target_collection_name: str, generation: int, 
+                            lexical_documents: list[tuple[ObjectId, str]]) -> bool:
+        """
+        Private method making the records of the given generation visible to the retrievals (and to the loaded BM25 index).
+        The caller must hold the writer lock of the collection. 
+        A generation abandoned meanwhile (see '_allocate_generation') is not published: its records are deleted instead.
+        Returns:
+            bool: True if the generation has been published. False if it had been abandoned.
+        """
+        publication = self.database[INDEX_METADATA_COLLECTION_NAME].update_one(
+                {"collection": target_collection_name, "index_type": "generation", "pending.generation": generation}, 
+                {"$pull": {"pending": {"generation": generation}}, "$max": {"published": generation}})
+        if(publication.matched_count == 0):
+            self.database[target_collection_name].delete_many({GENERATION_FIELD: generation})
+            logging.info(f"[ERROR]: Generation {generation} of '{target_collection_name}' abandoned before its publication: records deleted.")
+            return False
+        self._record_write(target_collection_name)
+        if(target_collection_name in self._generation_views): #reloaded by the following retrievals
+            self._generation_views[target_collection_name] = (self._generation_views[target_collection_name][0], -math.inf)
+        lexical_index: lexicalSearch.BM25_index = self._lexical_indexes.get(target_collection_name)
+        if(lexical_index is not None):
+            for (record_id, text) in lexical_documents:
+                lexical_index.add_document(record_id, text)
+        return True
+
+
+    def _get_generation_view(self, target_collection_name: str) -> tuple[int, tuple[int, ...]]:
+        """
+        Private method returning the generations of the collection visible to the retrievals: the last published generation, 
+        along with the generations excluded below it (still pending, or abandoned).
+        The view is reloaded once older than 'GENERATION_VIEW_MAX_AGE_S', so that the generations published by the other 
+        operators become visible too (and are added to the loaded BM25 index).
+        """
+        (view, loading_time) = self._generation_views.get(target_collection_name, (None, None))
+        if((view is None) or (time.monotonic() - loading_time > GENERATION_VIEW_MAX_AGE_S)):
+            generation_metadata: json = self.database[INDEX_METADATA_COLLECTION_NAME].find_one(
+                    {"collection": target_collection_name, "index_type": "generation"}) or dict()
+            new_view: tuple[int, tuple[int, ...]] = (generation_metadata.get("published", 0), tuple(sorted(
+                    [ pending["generation"] for pending in generation_metadata.get("pending", []) ] + generation_metadata.get("abandoned", []))))
+            self._generation_views[target_collection_name] = (new_view, time.monotonic())
+            lexical_index: lexicalSearch.BM25_index = self._lexical_indexes.get(target_collection_name)
+            if((view is not None) and (new_view != view) and (lexical_index is not None)):
+                self._add_published_generations(target_collection_name, lexical_index, view, new_view)
+            view = new_view
+        return view
+
+
+    def _add_published_generations(self, target_collection_name: str, lexical_index: lexicalSearch.BM25_index, 
+                                   old_view: tuple[int, tuple[int, ...]], new_view: tuple[int, tuple[int, ...]]) -> None:
+        """
+        Private method adding to the BM25 index the records visible in the new generation view but not in the old one.
+        """
+        (old_published, old_excluded) = old_view
+        newly_published_filter: json = {"$or": [ {GENERATION_FIELD: {"$gt": old_published}}, {GENERATION_FIELD: {"$in": list(old_excluded)}} ]}
+        for record in self.database[target_collection_name].find(
+                _combine_filters(self._build_generation_filter(target_collection_name, new_view), newly_published_filter), 
+                {"_id": 1, "text": 1}):
+            lexical_index.add_document(record["_id"], record.get("text")) #re-adding a published entry just replaces it
+
+
+    def _build_generation_filter(self, target_collection_name: str, view: tuple[int, tuple[int, ...]] = None) -> json:
+        """
+        Private method building the MongoDB filter pinning a retrieval to the given generation view (default: the current one, 
+        see '_get_generation_view'): the records of the following generations and of the excluded ones are left out, 
+        the ones without generation (written before enabling the generations, or by an update) are included.
+        Returns:
+            json: The filter on the record generations. None if the index generations are disabled.
+        """
+        if(not self.index_generations):
+            return None
+        (published, excluded) = view if (view is not None) else self._get_generation_view(target_collection_name)
+        if(len(excluded) == 0):
+            return {GENERATION_FIELD: {"$not": {"$gt": published}}}
+        return {GENERATION_FIELD: {"$not": {"$gt": published}, "$nin": list(excluded)}}
+
+
+    def _get_writer_lock(self, target_collection_name: str) -> threading.RLock:
+        """
+        Private method returning the lock serializing the writers of the collection (created on its first use).
+        """
+        return self._writer_locks.setdefault(target_collection_name, threading.RLock())
+
+
+    def _get_vector_cache(self, target_collection_name: str) -> vectorCache.Collection_vector_cache:
+        """
+        Private method returning the (lazily opened) on-disk vector cache of the given collection.
+        """
+        if(target_collection_name not in self._vector_caches):
+            self._vector_caches[target_collection_name] = vectorCache.Collection_vector_cache(
+                    cache_folder_path=self.vector_cache_folder_path, DB_name=self.get_DB_name(), collection_name=target_collection_name)
+        return self._vector_caches[target_collection_name]
+
+
+    def _get_shared_segment(self, target_collection_name: str) -> shardedScoring.Shared_vector_segment:
+        """
+        Private method returning the (lazily created) shared memory segment mirroring the vector cache of the collection.
+        """
+        if(target_collection_name not in self._shared_segments): #a single segment per collection, even if created concurrently
+            self._shared_segments.setdefault(target_collection_name, shardedScoring.Shared_vector_segment(
+                    shardedScoring.build_segment_key(self.get_DB_name(), target_collection_name)))
+        return self._shared_segments[target_collection_name]
+
+
+    def _drop_missing_records(self, target_collection_name: str, missing_ids: set[ObjectId]) -> None:
+        """
+        Private method handling the selected records which failed their hydration (removed since their scoring): 
+        if the vector cache holds them, it is flagged so that the next refresh rebuilds it without their rows.
+        """
+        cache: vectorCache.Collection_vector_cache = self._vector_caches.get(target_collection_name)
+        if((cache is not None) and any( cache.get_offset(record_id.binary) is not None for record_id in missing_ids )):
+            logging.info(f"[INFO]: {len(missing_ids)} cached records of '{target_collection_name}' removed: its vector cache will be rebuilt.")
+            self._stale_vector_caches.add(target_collection_name)
+
+
+    def _hydrate_records(self, target_collection_name: str, record_ids: list[ObjectId]) -> list[json]:
+        """
+        Private method fetching with a single query the whole records having the given IDs.
+        Parameters:
+            target_collection_name (str): The collection to fetch the records from.
+            record_ids (list[ObjectId]): The IDs of the records to fetch.
+        Returns:
+            list[json]: The fetched records, in the same order of the given IDs (missing records are skipped).
+        """
+        record_by_id: dict[ObjectId, json] = { 
+                record["_id"]: record for record in self.database[target_collection_name].find({"_id": {"$in": record_ids}}) 
+            }
+        for record in record_by_id.values(): #data models hold plain float lists, whatever the storage format
+            record["vector"] = _decode_vector(record["vector"]).tolist()
+        return [ record_by_id[record_id] for record_id in record_ids if record_id in record_by_id ]
+
+
+
+class RAG_HNSW_operator(RAG_DB_operator_I):
+    """
+    Embedded backend keeping an HNSW (Hierarchical Navigable Small World) graph index per collection, 
+    providing approximate argument retrieval in logarithmic time without running an external vector database.
+    The graph is built with the 'hnswlib' library on inner-product space, so vectors are supposed to be already normalized.
+
+    Every collection is stored in the operator folder as two files:
+        - '<collection>.hnsw': the persisted graph index.
+        - '<collection>.sqlite': the records text and metadata, along with their vectors and the log of their updates 
+                                    (used to repair the graph if the process stopped before the last persistence).
+    The graph is persisted every 'persist_every' insertions and when the connection is closed.
+    """
+    def __init__(self, index_folder_path: str, M: int = 16, ef_construction: int = 200, ef_search: int = 64, 
+                 max_elements: int = 100000, persist_every: int = 1000):
+        if((index_folder_path is None) or (index_folder_path.strip() == "")):
+            raise ValueError("The HNSW RAG DB operator requires an index folder path.")
+        
+        self.index_folder_path: str
+        self.M: int = M #graph out-degree: higher values increase recall and memory
+        self.ef_construction: int = ef_construction
+        self.ef_search: int = ef_search #candidates list length at query time: higher values increase recall and latency
+        self.max_elements: int = max_elements #initial capacity of each graph (doubled when exceeded)
+        self.persist_every: int = persist_every
+        self._indexes: dict[str, hnswlib.Index] = dict()
+        self._record_stores: dict[str, localStore.SQLite_record_store] = dict()
+        self._lexical_indexes: dict[str, lexicalSearch.BM25_index] = dict() #lazily built from the stored texts
+        self._unpersisted_insertions: dict[str, int] = dict()
+        self._search_locks: dict[str, threading.Lock] = dict()
+
+        self.open_connection(index_folder_path)
+
+
+    @override
+    def insert_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
+        if((target_collection_name is None) or (data_model is None)):
+            raise ValueError("One or more required parameters for 'insert_record' method are missing or invalid.")
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        if(record_store.find_label_using_text(data_model.text) is not None):
+            logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text[:30]}' into '{target_collection_name}': record already exists.")
+            return False
+        
+        label: int = record_store.insert_records([data_model])[0]
+        self._add_to_index(target_collection_name, [label], numpy.asarray([data_model.vector], dtype=numpy.float32))
+        self._add_to_lexical_index(target_collection_name, label, data_model.text)
+        return True
+
+
+    @override
+    def update_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
+        if((target_collection_name is None) or (data_model is None)):
+            raise ValueError("One or more required parameters for 'update_record' method are missing or invalid.")
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        label: int = record_store.find_label_using_text(data_model.text)
+        if(label is None):
+            logging.info(f"[ERROR]: Failed to update the record with embedded text '{data_model.text[:30]}' in '{target_collection_name}': record not existing.")
+            return False
+        
+        record_store.update_record(label, data_model, log_update=True) #replayed if the graph is not persisted
+        # hnswlib replaces the vector of an already existing label
+        self._add_to_index(target_collection_name, [label], numpy.asarray([data_model.vector], dtype=numpy.float32))
+        self._add_to_lexical_index(target_collection_name, label, data_model.text)
+        return True
+
+
+    @override
+    def retrieve_embeddings_from_vector(self, target_collection_name: str, normalized_query_vector: list[floatVector], top_k: int, 
+                                        redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                        metadata_filter: dict[str, list[str]] = None, 
+                                        search_options: RAG_search_options = None) -> list[RAG_DTModel]:
+        """
+        Parameters (extension):
+            search_options (RAG_search_options, optional): The graph search options, among:
+                                    - 'ef_search': the candidates list length of the graph search. If not provided, 
+                                        the operator one is used.
+                                    - 'access_path': GRAPH (default) searches the graph, MEMORY_SCAN scores exactly 
+                                        every vector of the graph (cheaper on small collections).
+                                    - 'top_m': the number of candidates collected before the redundance filtering 
+                                        (at least 'top_k'). If not provided, it grows with the logarithm of 'ef_search'.
+        """
+        if( (target_collection_name is None) or (normalized_query_vector is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_vector' has been called with one or more required parameters as 'None'")
+        search_options = search_options or RAG_search_options()
+        search_options.check_supported_options(["access_path", "top_m", "ef_search"], "HNSW")
+        access_path: access_paths_enum = search_options.access_path
+        if((access_path is not None) and (access_path not in (access_paths_enum.GRAPH, access_paths_enum.MEMORY_SCAN))):
+            raise ValueError(f"The HNSW RAG DB operator does not support the '{access_path.value}' access path.")
+        if(len(normalized_query_vector) == 0 or top_k <= 0):
+            return []
+        index: hnswlib.Index = self._get_index(target_collection_name)
+        if((index is None) or (index.get_current_count() == 0)):
+            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty.")
+            return []
+
+        candidates_heap = self._find_top_m_candidates(target_collection_name, index, 
+                                                      numpy.asarray(normalized_query_vector, dtype=numpy.float32)[numpy.newaxis], 
+                                                      top_k, metadata_filter, top_m=search_options.top_m, ef_search=search_options.ef_search, 
+                                                      exact_search=(access_path == access_paths_enum.MEMORY_SCAN))[0]
+        best_labels: list[int] = _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda)
+
+        return [ RAG_DTModel.create_from_JSONData(JSON_data=json_RAGDTModel) 
+                    for json_RAGDTModel in self._get_record_store(target_collection_name).get_records(best_labels) ]
+
+
+    @override
+    def retrieve_embeddings_from_vectors(self, target_collection_name: str, normalized_query_matrix: list[floatVector], top_k: int, 
+                                         redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                         metadata_filter: dict[str, list[str]] = None) -> list[list[RAG_DTModel]]:
+        if( (target_collection_name is None) or (normalized_query_matrix is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_vectors' has been called with one or more required parameters as 'None'")
+        if(len(normalized_query_matrix) == 0):
+            return []
+        index: hnswlib.Index = self._get_index(target_collection_name)
+        if((top_k <= 0) or (index is None) or (index.get_current_count() == 0)):
+            return [ [] for _ in range(len(normalized_query_matrix)) ]
+
+        candidates_heaps = self._find_top_m_candidates(target_collection_name, index, 
+                                                       numpy.atleast_2d(numpy.asarray(normalized_query_matrix, dtype=numpy.float32)), 
+                                                       top_k, metadata_filter)
+        best_labels_lists: list[list[int]] = [ _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda) 
+                                                  for candidates_heap in candidates_heaps ]
+
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        return [ [ RAG_DTModel.create_from_JSONData(JSON_data=json_RAGDTModel) for json_RAGDTModel in record_store.get_records(best_labels) ] 
+                    for best_labels in best_labels_lists ]
+
+
+    @override
+    def retrieve_embeddings_from_text_and_vector(self, target_collection_name: str, query_text: str, 
+                                                 normalized_query_vector: floatVector, top_k: int, 
+                                                 retrieval_mode: retrieval_modes_enum = retrieval_modes_enum.HYBRID, 
+                                                 redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                 metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
+        """
+        Implementation note:
+            The BM25 index of a collection is built in memory from the texts of the record store on its first lexical retrieval, 
+            then it is kept up to date by the insertions and updates. The lexical candidates are restricted to the labels matching
+            the metadata filter, and their dense similarity is scored exactly from the vectors of the graph.
+            The LEXICAL_SHORTLIST mode falls back to the graph search if the query terms match less than 'top_k' records.
+        """
+        if(retrieval_mode == retrieval_modes_enum.VECTOR):
+            return self.retrieve_embeddings_from_vector(target_collection_name, normalized_query_vector, top_k, 
+                                                        redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                        metadata_filter=metadata_filter)
+        if( (target_collection_name is None) or (query_text is None) or (normalized_query_vector is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_text_and_vector' has been called with one or more required parameters as 'None'")
+        if(len(normalized_query_vector) == 0 or top_k <= 0):
+            return []
+        index: hnswlib.Index = self._get_index(target_collection_name)
+        if((index is None) or (index.get_current_count() == 0)):
+            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty.")
+            return []
+
+        query_matrix: numpy.ndarray = numpy.asarray(normalized_query_vector, dtype=numpy.float32)[numpy.newaxis]
+        top_m: int = min(math.ceil(top_k * (1 + math.log(self.ef_search))), index.get_current_count())
+        allowed_labels: set[int] = None
+        if(metadata_filter):
+            allowed_labels = set(self._get_record_store(target_collection_name).find_labels_using_metadata(metadata_filter))
+        lexical_ranking: list[int] = [ label for (_, label) in self._get_lexical_index(target_collection_name).search(
+                query_text, (top_m * LEXICAL_SHORTLIST_FACTOR) if (retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST) else top_m, 
+                allowed_keys=allowed_labels) ]
+        
+        lexical_heap = vectorSearch.Top_m_candidates_heap(top_m)
+        if(len(lexical_ranking) > 0):
+            lexical_matrix: numpy.ndarray = numpy.asarray(index.get_items(lexical_ranking, return_type="numpy"), dtype=numpy.float32)
+            lexical_heap.push_batch(lexical_matrix @ query_matrix[0], lexical_ranking, lexical_matrix)
+        if(retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST):
+            candidates_heap = lexical_heap
+            if(len(candidates_heap) < top_k): #too few records share the query terms
+                candidates_heap = self._find_top_m_candidates(target_collection_name, index, query_matrix, top_k, metadata_filter)[0]
+        else:
+            candidates_heap = _fuse_candidates(self._find_top_m_candidates(target_collection_name, index, query_matrix, 
+                                                                           top_k, metadata_filter)[0], 
+                                               lexical_heap, lexical_ranking, top_m)
+        best_labels: list[int] = _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda)
+
+        return [ RAG_DTModel.create_from_JSONData(JSON_data=json_RAGDTModel) 
+                    for json_RAGDTModel in self._get_record_store(target_collection_name).get_records(best_labels) ]
+
+
+    @override
+    def get_collection_statistics(self, target_collection_name: str) -> dict[str, Any]:
+        """
+        Both the graph search and the exact scoring of the graph vectors are available.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'get_collection_statistics' has been called with 'target_collection_name' as 'None'")
+        index: hnswlib.Index = self._get_index(target_collection_name)
+        return {"count": 0 if (index is None) else index.get_current_count(), 
+                "dimension": None if (index is None) else index.dim, 
+                "embedders": self._get_record_store(target_collection_name).get_embedders(), 
+                "access_paths": {access_paths_enum.GRAPH: {"M": self.M}, access_paths_enum.MEMORY_SCAN: dict()}}
+
+
+    @override
+    def check_collection_existence(self, collection_to_check: str) -> bool:
+        # like MongoDB collections, HNSW collections are created on their first insertion
+        return (collection_to_check is not None) and os.path.isdir(self.index_folder_path)
+
+
+    @override
+    def open_connection(self, index_folder_path: str) -> bool:
+        try:
+            os.makedirs(index_folder_path, exist_ok=True)
+            self.index_folder_path = index_folder_path
+        except Exception as e:
+            logging.info(f"[ERROR]: Failed to open the RAG DB folder '{index_folder_path}': {e}")
+            return False
+        return True
+
+
+    @override
+    def close_connection(self):
+        for collection_name in list(self._indexes.keys()):
+            self.persist_index(collection_name)
+        for record_store in self._record_stores.values():
+            record_store.close()
+        self._indexes.clear()
+        self._record_stores.clear()
+        self._lexical_indexes.clear()
+
+
+    @override
+    def get_configuration_info(self) -> str:
+        return ("RAG_DB: {\n"
+                f"   DB_engine: '{self.get_engine_name()}',\n"
+                f"   index_folder: '{self.index_folder_path}',\n"
+                f"   access_type: 'local files',\n"
+                f"   M: {self.M},\n"
+                f"   ef_construction: {self.ef_construction},\n"
+                f"   ef_search: {self.ef_search}\n"
+                "}")
+
+
+    @override
+    def get_DB_name(self):
+        return os.path.basename(os.path.normpath(self.index_folder_path))
+
+
+    @override
+    def get_engine_name(self) -> str:
+        return RAG_engines_enum.HNSW
+
+
+    def persist_index(self, target_collection_name: str) -> None:
+        """
+        Writes the graph index of the given collection to disk (if it has been loaded).
+        """
+        index: hnswlib.Index = self._indexes.get(target_collection_name)
+        if(index is None):
+            return
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        update_log_position: int = record_store.get_update_log_position()
+        index.save_index(self._get_collection_file_path(target_collection_name, ".hnsw"))
+        record_store.clear_update_log(update_log_position) #the saved graph holds the logged updates
+        self._unpersisted_insertions[target_collection_name] = 0
+
+
+    def _find_top_m_candidates(self, target_collection_name: str, index: hnswlib.Index, query_matrix: numpy.ndarray, 
+                               top_k: int, metadata_filter: dict[str, list[str]], top_m: int = None, ef_search: int = None, 
+                               exact_search: bool = False) -> list[vectorSearch.Top_m_candidates_heap]:
+        """
+        Private method collecting the candidates of each query, over-fetched to leave room to the redundance filtering.
+        hnswlib searches the graph for all the queries in a single call. With a metadata filter, small subsets are scored
+        exactly, while larger ones are searched in the graph skipping the non-matching labels.
+        With 'exact_search', the (filtered) vectors are always scored exactly. 'ef_search' defaults to the operator one.
+        Returns:
+            list[Top_m_candidates_heap]: The collected candidates of each query (same order of the rows), paired with their label.
+        """
+        ef_search = ef_search if (ef_search is not None) else self.ef_search
+        #the same over-fetching of the MongoDB implementation
+        top_m = min(max(top_k, top_m) if (top_m is not None) else math.ceil(top_k * (1 + math.log(ef_search))), 
+                    index.get_current_count())
+        candidates_heaps = [ vectorSearch.Top_m_candidates_heap(top_m) for _ in range(query_matrix.shape[0]) ]
+        
+        allowed_labels: list[int] = None
+        if(metadata_filter):
+            allowed_labels = self._get_record_store(target_collection_name).find_labels_using_metadata(metadata_filter)
+            if(len(allowed_labels) == 0):
+                return candidates_heaps
+            top_m = min(top_m, len(allowed_labels))
+        elif(exact_search):
+            allowed_labels = index.get_ids_list()
+        
+        labels_matrix: numpy.ndarray = None
+        if((allowed_labels is None) or ((not exact_search) and (len(allowed_labels) > HNSW_EXACT_SUBSET_LIMIT))):
+            allowed_labels_set: set[int] = None if (allowed_labels is None) else set(allowed_labels)
+            with self._get_search_lock(target_collection_name): #'ef' is a setting of the whole graph, shared by the concurrent queries
+                index.set_ef(max(ef_search, top_m))
+                try:
+                    labels_matrix, distances_matrix = index.knn_query(
+                            query_matrix, k=top_m, filter=(None if (allowed_labels_set is None) else (lambda label: label in allowed_labels_set)))
+                except RuntimeError: #the filtered graph search could not reach 'top_m' matching labels
+                    if(allowed_labels is None):
+                        raise
+        if(labels_matrix is None): #exact scoring of the (small) subset
+            subset_matrix: numpy.ndarray = numpy.asarray(index.get_items(allowed_labels, return_type="numpy"), dtype=numpy.float32)
+            similarity_matrix: numpy.ndarray = subset_matrix @ query_matrix.T
+            for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                candidates_heap.push_batch(similarity_matrix[:, query_index], allowed_labels, subset_matrix)
+            return candidates_heaps
+        
+        for (labels, distances, candidates_heap) in zip(labels_matrix, distances_matrix, candidates_heaps):
+            candidates_heap.push_batch(1 - distances, labels.tolist(), numpy.asarray(index.get_items(labels), dtype=numpy.float32))
+        return candidates_heaps
+
+
+    def _add_to_index(self, target_collection_name: str, labels: list[int], vectors_matrix: numpy.ndarray) -> None:
+        """
+        Private method adding (or replacing) the given vectors into the graph of the collection, 
+        growing its capacity and persisting it when needed.
+        """
+        index: hnswlib.Index = self._get_index(target_collection_name, dimension=vectors_matrix.shape[1])
+        if(index.get_current_count() + len(labels) > index.get_max_elements()):
+            index.resize_index(max(2 * index.get_max_elements(), index.get_current_count() + len(labels)))
+        index.add_items(vectors_matrix, labels)
+
+        self._unpersisted_insertions[target_collection_name] = self._unpersisted_insertions.get(target_collection_name, 0) + len(labels)
+        if(self._unpersisted_insertions[target_collection_name] >= self.persist_every):
+            self.persist_index(target_collection_name)
+
+
+    def _get_index(self, target_collection_name: str, dimension: int = None) -> hnswlib.Index:
+        """
+        Private method returning the (lazily loaded) graph index of the collection.
+        A new graph is created only if a 'dimension' is given, otherwise None is returned for missing graphs.
+        Records stored or updated after the last persistence of the graph are added back to it on loading.
+        """
+        if(target_collection_name in self._indexes):
+            return self._indexes[target_collection_name]
+        
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        stored_dimension: str = record_store.get_setting("dimension")
+        if(stored_dimension is None):
+            if(dimension is None):
+                return None
+            record_store.set_setting("dimension", str(dimension))
+        else:
+            dimension = int(stored_dimension)
+        
+        index = hnswlib.Index(space="ip", dim=dimension)
+        index_file_path: str = self._get_collection_file_path(target_collection_name, ".hnsw")
+        if(os.path.exists(index_file_path)):
+            index.load_index(index_file_path, max_elements=max(self.max_elements, record_store.count()))
+        else:
+            index.init_index(max_elements=max(self.max_elements, record_store.count()), 
+                             ef_construction=self.ef_construction, M=self.M)
+        index.set_ef(self.ef_search)
+        self._indexes[target_collection_name] = index
+
+        # repair the graph with the records stored after its last persistence, then with the updates logged meanwhile
+        indexed_labels: list[int] = index.get_ids_list()
+        missing_labels, missing_vectors = record_store.get_vectors_after_label(max(indexed_labels, default=0))
+        if(len(missing_labels) > 0):
+            logging.info(f"[INFO]: Adding {len(missing_labels)} unpersisted records back to the HNSW graph of '{target_collection_name}'.")
+            self._add_to_index(target_collection_name, missing_labels, missing_vectors)
+        updated_labels, updated_vectors = record_store.get_logged_vectors()
+        if(len(updated_labels) > 0):
+            logging.info(f"[INFO]: Replaying {len(updated_labels)} unpersisted updates on the HNSW graph of '{target_collection_name}'.")
+            self._add_to_index(target_collection_name, updated_labels, updated_vectors)
+        return index
+
+
+    def _get_search_lock(self, target_collection_name: str) -> threading.Lock:
+        """
+        Private method returning the lock serializing the graph searches of the collection (created on its first use).
+        """
+        return self._search_locks.setdefault(target_collection_name, threading.Lock())
+
+
+    def _get_lexical_index(self, target_collection_name: str) -> lexicalSearch.BM25_index:
+        """
+        Private method returning the BM25 index of the collection, built on its first use from the texts of the record store.
+        """
+        if(target_collection_name not in self._lexical_indexes):
+            lexical_index = lexicalSearch.BM25_index()
+            for (label, text) in self._get_record_store(target_collection_name).get_texts():
+                lexical_index.add_document(label, text)
+            self._lexical_indexes[target_collection_name] = lexical_index
+        return self._lexical_indexes[target_collection_name]
+
+
+    def _add_to_lexical_index(self, target_collection_name: str, label: int, text: str) -> None:
+        """
+        Private method adding (or replacing) a text into the BM25 index of the collection, if it has already been built.
+        """
+        lexical_index: lexicalSearch.BM25_index = self._lexical_indexes.get(target_collection_name)
+        if(lexical_index is not None):
+            lexical_index.add_document(label, text)
+
+
+    def _get_record_store(self, target_collection_name: str) -> localStore.SQLite_record_store:
+        """
+        Private method returning the (lazily opened) record store of the collection.
+        """
+        if(target_collection_name not in self._record_stores):
+            self._record_stores[target_collection_name] = localStore.SQLite_record_store(
+                    self._get_collection_file_path(target_collection_name, ".sqlite"))
+        return self._record_stores[target_collection_name]
+
+
+    def _get_collection_file_path(self, target_collection_name: str, extension: str) -> str:
+        """
+        Private method returning the path of a file belonging to the given collection.
+        """
+        return os.path.join(self.index_folder_path, target_collection_name + extension)
+
+
+
+
+class RAG_LocalFile_operator(RAG_DB_operator_I):
+    """
+    Embedded backend keeping every collection in local files, without external services nor native index libraries:
+        - '<collection>.f32': append-only raw float32 matrix of the vectors (row-major, the record labelled 'n' owns the row 'n - 1').
+        - '<collection>.sqlite': the records text and metadata (see 'SQLite_record_store').
+    Retrievals are exact: the memory-mapped matrix is scored in batches of 'batch_size' rows, so that the vectors are held 
+    by the OS page cache instead of the Python heap. Vectors are supposed to be already normalized.
+    The vectors of a batch are appended before its records are committed, so the rows of an interrupted insertion 
+    are truncated on the next write or loading.
+    With a 'document_probe', retrievals are two-stage: the in-memory centroids of the documents (records grouped by url) 
+    are scored first, then only the chunks of the closest documents are scored.
+    """
+    def __init__(self, index_folder_path: str, batch_size: int = 100000, document_probe: int = None):
+        if((index_folder_path is None) or (index_folder_path.strip() == "")):
+            raise ValueError("The local file RAG DB operator requires an index folder path.")
+        if((batch_size is None) or (batch_size <= 0)):
+            raise ValueError("The scan batch size must be a positive integer.")
+        if((document_probe is not None) and (document_probe <= 0)):
+            raise ValueError("The number of probed documents must be a positive integer.")
+        
+        self.index_folder_path: str
+        self.batch_size: int = batch_size #rows scored per matrix product
+        self.document_probe: int = document_probe #default number of documents whose chunks are scored (single-stage if None)
+        self._matrices: dict[str, numpy.memmap] = dict() #lazily mapped, dropped when the vectors file changes
+        self._record_stores: dict[str, localStore.SQLite_record_store] = dict()
+        self._lexical_indexes: dict[str, lexicalSearch.BM25_index] = dict() #lazily built from the stored texts
+        self._document_centroids: dict[str, vectorSearch.Document_centroids] = dict() #lazily built from the vectors file
+
+        self.open_connection(index_folder_path)
+
+
+    @override
+    def insert_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
+        if((target_collection_name is None) or (data_model is None)):
+            raise ValueError("One or more required parameters for 'insert_record' method are missing or invalid.")
+        return self.insert_records(target_collection_name, [data_model])
+
+
+    @override
+    def insert_records(self, target_collection_name: str, data_models: list[RAG_DTModel]) -> bool:
+        """
+        Implementation note:
+            The whole batch is written with a single append to the vectors file and a single SQLite transaction.
+            Records whose text is already stored (or repeated in the batch) and vectors of a different dimension are skipped.
+        """
+        if((target_collection_name is None) or (data_models is None)):
+            raise ValueError("One or more required parameters for 'insert_records' method are missing or invalid.")
+        if(len(data_models) == 0):
+            return True
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        dimension: int = self._get_dimension(target_collection_name, default_dimension=len(data_models[0].vector))
+
+        new_data_models: list[RAG_DTModel] = []
+        new_texts: set[str] = set()
+        for data_model in data_models:
+            if((data_model.text in new_texts) or (record_store.find_label_using_text(data_model.text) is not None)):
+                logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text[:30]}' into '{target_collection_name}': record already exists.")
+            elif(len(data_model.vector) != dimension):
+                logging.info(f"[ERROR]: Failed to insert the record with embedded text '{data_model.text[:30]}' into '{target_collection_name}': "
+                             f"{len(data_model.vector)}-dimensional vector, while the collection stores {dimension}-dimensional ones.")
+            else:
+                new_texts.add(data_model.text)
+                new_data_models.append(data_model)
+        if(len(new_data_models) == 0):
+            return False
+
+        stored_count: int = self._check_vectors_file(target_collection_name, dimension)
+        labels: list[int] = list(range(stored_count + 1, stored_count + len(new_data_models) + 1))
+        with open(self._get_collection_file_path(target_collection_name, ".f32"), "ab") as vectors_file:
+            vectors_file.write(numpy.asarray([ data_model.vector for data_model in new_data_models ], dtype=numpy.float32).tobytes())
+        record_store.insert_records(new_data_models, store_vectors=False, labels=labels)
+        self._matrices.pop(target_collection_name, None)
+
+        document_centroids: vectorSearch.Document_centroids = self._document_centroids.get(target_collection_name)
+        for (label, data_model) in zip(labels, new_data_models):
+            self._add_to_lexical_index(target_collection_name, label, data_model.text)
+            if(document_centroids is not None): #keep the loaded centroids up to date
+                document_centroids.add_vectors(data_model.url, numpy.asarray(data_model.vector, dtype=numpy.float32))
+        return (len(new_data_models) == len(data_models))
+
+
+    @override
+    def update_record(self, target_collection_name: str, data_model: RAG_DTModel) -> bool:
+        if((target_collection_name is None) or (data_model is None)):
+            raise ValueError("One or more required parameters for 'update_record' method are missing or invalid.")
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        label: int = record_store.find_label_using_text(data_model.text)
+        if(label is None):
+            logging.info(f"[ERROR]: Failed to update the record with embedded text '{data_model.text[:30]}' in '{target_collection_name}': record not existing.")
+            return False
+        dimension: int = self._get_dimension(target_collection_name)
+        if(len(data_model.vector) != dimension):
+            logging.info(f"[ERROR]: Failed to update the record with embedded text '{data_model.text[:30]}' in '{target_collection_name}': "
+                         f"{len(data_model.vector)}-dimensional vector, while the collection stores {dimension}-dimensional ones.")
+            return False
+        
+        # the vector keeps its row, which is overwritten in place
+        with open(self._get_collection_file_path(target_collection_name, ".f32"), "r+b") as vectors_file:
+            vectors_file.seek((label - 1) * dimension * numpy.dtype(numpy.float32).itemsize)
+            vectors_file.write(numpy.asarray(data_model.vector, dtype=numpy.float32).tobytes())
+        record_store.update_record(label, data_model, store_vectors=False)
+        self._matrices.pop(target_collection_name, None)
+        self._document_centroids.pop(target_collection_name, None) #rebuilt on the next two-stage retrieval
+        self._add_to_lexical_index(target_collection_name, label, data_model.text)
+        return True
+
+
+    @override
+    def retrieve_embeddings_from_vector(self, target_collection_name: str, normalized_query_vector: list[floatVector], top_k: int, 
+                                        redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                        metadata_filter: dict[str, list[str]] = None, document_probe: int = None, 
+                                        search_options: RAG_search_options = None) -> list[RAG_DTModel]:
+        """
+        Parameters (extension):
+            document_probe (int, optional): The number of documents (by url) whose chunks are scored, selected by the similarity 
+                                    of their centroid to the query. If not provided, the operator default is used 
+                                    (the whole collection is scored if None).
+            search_options (RAG_search_options, optional): The search options, among:
+                                    - 'top_m': the number of candidates collected before the redundance filtering 
+                                        (at least 'top_k'). If not provided, it grows with the logarithm of the batch size.
+        """
+        if( (target_collection_name is None) or (normalized_query_vector is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_vector' has been called with one or more required parameters as 'None'")
+        search_options = search_options or RAG_search_options()
+        search_options.check_supported_options(["top_m"], "local file")
+        if(len(normalized_query_vector) == 0 or top_k <= 0):
+            return []
+        matrix: numpy.ndarray = self._get_matrix(target_collection_name)
+        if((matrix is None) or (matrix.shape[0] == 0)):
+            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty.")
+            return []
+
+        query_matrix: numpy.ndarray = numpy.asarray(normalized_query_vector, dtype=numpy.float32)[numpy.newaxis]
+        metadata_filter = self._add_document_filter(target_collection_name, matrix, query_matrix[0], metadata_filter, document_probe)
+        candidates_heap = self._find_top_m_candidates(target_collection_name, matrix, query_matrix, top_k, metadata_filter, 
+                                                      top_m=search_options.top_m)[0]
+        return self._get_data_models(target_collection_name, matrix, 
+                                     _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda))
+
+
+    @override
+    def retrieve_embeddings_from_vectors(self, target_collection_name: str, normalized_query_matrix: list[floatVector], top_k: int, 
+                                         redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                         metadata_filter: dict[str, list[str]] = None) -> list[list[RAG_DTModel]]:
+        if( (target_collection_name is None) or (normalized_query_matrix is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_vectors' has been called with one or more required parameters as 'None'")
+        if(len(normalized_query_matrix) == 0):
+            return []
+        matrix: numpy.ndarray = self._get_matrix(target_collection_name)
+        if((top_k <= 0) or (matrix is None) or (matrix.shape[0] == 0)):
+            return [ [] for _ in range(len(normalized_query_matrix)) ]
+
+        # a single pass over the vectors file serves all the queries
+        candidates_heaps = self._find_top_m_candidates(target_collection_name, matrix, 
+                                                       numpy.atleast_2d(numpy.asarray(normalized_query_matrix, dtype=numpy.float32)), 
+                                                       top_k, metadata_filter)
+        return [ self._get_data_models(target_collection_name, matrix, 
+                                       _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda)) 
+                    for candidates_heap in candidates_heaps ]
+
+
+    @override
+    def retrieve_embeddings_from_text_and_vector(self, target_collection_name: str, query_text: str, 
+                                                 normalized_query_vector: floatVector, top_k: int, 
+                                                 retrieval_mode: retrieval_modes_enum = retrieval_modes_enum.HYBRID, 
+                                                 redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                 metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
+        """
+        Implementation note:
+            Same as 'RAG_HNSW_operator': the BM25 index is built in memory from the stored texts on the first lexical retrieval,
+            and the lexical candidates are scored exactly from their rows of the vectors file.
+            With a default 'document_probe', only the dense candidates are restricted to the closest documents.
+        """
+        if(retrieval_mode == retrieval_modes_enum.VECTOR):
+            return self.retrieve_embeddings_from_vector(target_collection_name, normalized_query_vector, top_k, 
+                                                        redundancy_tolerance=redundancy_tolerance, mmr_lambda=mmr_lambda, 
+                                                        metadata_filter=metadata_filter)
+        if( (target_collection_name is None) or (query_text is None) or (normalized_query_vector is None) or (top_k is None) ):
+            raise ValueError("The method 'retrieve_embeddings_from_text_and_vector' has been called with one or more required parameters as 'None'")
+        if(len(normalized_query_vector) == 0 or top_k <= 0):
+            return []
+        matrix: numpy.ndarray = self._get_matrix(target_collection_name)
+        if((matrix is None) or (matrix.shape[0] == 0)):
+            logging.info(f"[INFO]: The collection '{target_collection_name}' is empty.")
+            return []
+
+        query_matrix: numpy.ndarray = numpy.asarray(normalized_query_vector, dtype=numpy.float32)[numpy.newaxis]
+        top_m: int = min(math.ceil(top_k * (1 + math.log(self.batch_size))), matrix.shape[0])
+        allowed_labels: set[int] = None
+        if(metadata_filter):
+            allowed_labels = set(self._get_record_store(target_collection_name).find_labels_using_metadata(metadata_filter))
+        lexical_ranking: list[int] = [ label for (_, label) in self._get_lexical_index(target_collection_name).search(
+                query_text, (top_m * LEXICAL_SHORTLIST_FACTOR) if (retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST) else top_m, 
+                allowed_keys=allowed_labels) if label <= matrix.shape[0] ]
+        
+        lexical_heap = vectorSearch.Top_m_candidates_heap(top_m)
+        if(len(lexical_ranking) > 0):
+            lexical_matrix: numpy.ndarray = matrix[[ label - 1 for label in lexical_ranking ]]
+            lexical_heap.push_batch(lexical_matrix @ query_matrix[0], lexical_ranking, lexical_matrix)
+        dense_metadata_filter: dict[str, list[str]] = self._add_document_filter(target_collection_name, matrix, query_matrix[0], 
+                                                                                metadata_filter, None)
+        if(retrieval_mode == retrieval_modes_enum.LEXICAL_SHORTLIST):
+            candidates_heap = lexical_heap
+            if(len(candidates_heap) < top_k): #too few records share the query terms
+                candidates_heap = self._find_top_m_candidates(target_collection_name, matrix, query_matrix, top_k, dense_metadata_filter)[0]
+        else:
+            candidates_heap = _fuse_candidates(self._find_top_m_candidates(target_collection_name, matrix, query_matrix, 
+                                                                           top_k, dense_metadata_filter)[0], 
+                                               lexical_heap, lexical_ranking, top_m)
+        return self._get_data_models(target_collection_name, matrix, 
+                                     _select_top_k_candidates(candidates_heap, top_k, redundancy_tolerance, mmr_lambda))
+
+
+    @override
+    def get_collection_statistics(self, target_collection_name: str) -> dict[str, Any]:
+        """
+        Only the exact scan of the memory-mapped vectors is available.
+        """
+        if(target_collection_name is None):
+            raise ValueError("The method 'get_collection_statistics' has been called with 'target_collection_name' as 'None'")
+        matrix: numpy.ndarray = self._get_matrix(target_collection_name)
+        return {"count": 0 if (matrix is None) else matrix.shape[0], 
+                "dimension": self._get_dimension(target_collection_name), 
+                "embedders": self._get_record_store(target_collection_name).get_embedders(), 
+                "access_paths": {access_paths_enum.MEMORY_SCAN: dict()}}
+
+
+    @override
+    def check_collection_existence(self, collection_to_check: str) -> bool:
+        # like MongoDB collections, local collections are created on their first insertion
+        return (collection_to_check is not None) and os.path.isdir(self.index_folder_path)
+
+
+    @override
+    def open_connection(self, index_folder_path: str) -> bool:
+        try:
+            os.makedirs(index_folder_path, exist_ok=True)
+            self.index_folder_path = index_folder_path
+        except Exception as e:
+            logging.info(f"[ERROR]: Failed to open the RAG DB folder '{index_folder_path}': {e}")
+            return False
+        return True
+
+
+    @override
+    def close_connection(self):
+        for record_store in self._record_stores.values():
+            record_store.close()
+        self._matrices.clear()
+        self._record_stores.clear()
+        self._lexical_indexes.clear()
+        self._document_centroids.clear()
+
+
+    @override
+    def get_configuration_info(self) -> str:
+        return ("RAG_DB: {\n"
+                f"   DB_engine: '{self.get_engine_name()}',\n"
+                f"   index_folder: '{self.index_folder_path}',\n"
+                f"   access_type: 'local files',\n"
+                f"   batch_size: {self.batch_size},\n"
+                f"   document_probe: {self.document_probe}\n"
+                "}")
+
+
+    @override
+    def get_DB_name(self):
+        return os.path.basename(os.path.normpath(self.index_folder_path))
+
+
+    @override
+    def get_engine_name(self) -> str:
+        return RAG_engines_enum.LOCAL_FILE
+
+
+    def _find_top_m_candidates(self, target_collection_name: str, matrix: numpy.ndarray, query_matrix: numpy.ndarray, 
+                               top_k: int, metadata_filter: dict[str, list[str]], 
+                               top_m: int = None) -> list[vectorSearch.Top_m_candidates_heap]:
+        """
+        Private method scanning the vectors matrix in batches to collect the candidates of each query, over-fetched to leave 
+        room to the redundance filtering. With a metadata filter, only the rows of the matching labels are gathered and scored.
+        Returns:
+            list[Top_m_candidates_heap]: The collected candidates of each query (same order of the rows), paired with their label.
+        """
+        #the same over-fetching of the MongoDB implementation
+        top_m = min(max(top_k, top_m) if (top_m is not None) else math.ceil(top_k * (1 + math.log(self.batch_size))), 
+                    matrix.shape[0])
+        candidates_heaps = [ vectorSearch.Top_m_candidates_heap(top_m) for _ in range(query_matrix.shape[0]) ]
+
+        if(metadata_filter):
+            subset_rows: list[int] = sorted( label - 1 for label in 
+                                             self._get_record_store(target_collection_name).find_labels_using_metadata(metadata_filter) 
+                                             if label <= matrix.shape[0] )
+            for start in range(0, len(subset_rows), self.batch_size):
+                batch_rows: list[int] = subset_rows[start:start + self.batch_size]
+                batch_matrix: numpy.ndarray = matrix[batch_rows]
+                cosine_similarity_matrix = batch_matrix @ query_matrix.T
+                for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                    candidates_heap.push_batch(cosine_similarity_matrix[:, query_index], [ row + 1 for row in batch_rows ], batch_matrix)
+            return candidates_heaps
+
+        for start in range(0, matrix.shape[0], self.batch_size):
+            end: int = min(start + self.batch_size, matrix.shape[0])
+            cosine_similarity_matrix = matrix[start:end] @ query_matrix.T
+            for (query_index, candidates_heap) in enumerate(candidates_heaps):
+                candidates_heap.push_batch(cosine_similarity_matrix[:, query_index], range(start + 1, end + 1), matrix[start:end])
+        return candidates_heaps
+
+
+    def _add_document_filter(self, target_collection_name: str, matrix: numpy.ndarray, query_array: numpy.ndarray, 
+                             metadata_filter: dict[str, list[str]], document_probe: int) -> dict[str, list[str]]:
+        """
+        Private method restricting the metadata filter to the urls of the 'document_probe' documents whose centroids are 
+        the closest to the query ('document_probe' defaults to the operator one). 
+        If the metadata filter already accepts some urls, the documents are chosen among them.
+        Returns:
+            dict[str, list[str]]: The restricted metadata filter (the given one if no document probe is set).
+        """
+        document_probe = document_probe if (document_probe is not None) else self.document_probe
+        if(document_probe is None):
+            return metadata_filter
+        restricted_filter: dict[str, list[str]] = dict(metadata_filter or dict())
+        restricted_filter["url"] = self._get_document_centroids(target_collection_name, matrix).find_top_documents(
+                query_array, document_probe, set(restricted_filter["url"]) if ("url" in restricted_filter) else None)
+        return restricted_filter
+
+
+    def _get_document_centroids(self, target_collection_name: str, matrix: numpy.ndarray) -> vectorSearch.Document_centroids:
+        """
+        Private method returning the document centroids of the collection, built on their first use with a pass over the matrix.
+        """
+        if(target_collection_name not in self._document_centroids):
+            centroids = vectorSearch.Document_centroids()
+            rows_by_url: dict[str, list[int]] = dict()
+            for (label, url) in self._get_record_store(target_collection_name).get_urls():
+                if(label <= matrix.shape[0]):
+                    rows_by_url.setdefault(url, []).append(label - 1)
+            for (url, rows) in rows_by_url.items():
+                centroids.add_vectors(url, matrix[sorted(rows)])
+            self._document_centroids[target_collection_name] = centroids
+        return self._document_centroids[target_collection_name]
+
+
+    def _get_data_models(self, target_collection_name: str, matrix: numpy.ndarray, labels: list[int]) -> list[RAG_DTModel]:
+        """
+        Private method building the data models of the given labels (same order), reading their vectors from the matrix.
+        """
+        json_RAGDTModels: list[json] = self._get_record_store(target_collection_name).get_records(labels)
+        for (label, json_RAGDTModel) in zip(labels, json_RAGDTModels):
+            json_RAGDTModel["vector"] = matrix[label - 1].tolist()
+        return [ RAG_DTModel.create_from_JSONData(JSON_data=json_RAGDTModel) for json_RAGDTModel in json_RAGDTModels ]
+
+
+    def _get_matrix(self, target_collection_name: str) -> numpy.ndarray:
+        """
+        Private method returning the (lazily mapped) read-only float32 matrix of the collection vectors (shape: records x dimension).
+        None if nothing has been stored yet.
+        """
+        if(target_collection_name in self._matrices):
+            return self._matrices[target_collection_name]
+        dimension: int = self._get_dimension(target_collection_name)
+        if(dimension is None):
+            return None
+        
+        stored_count: int = self._check_vectors_file(target_collection_name, dimension)
+        if(stored_count == 0):
+            return numpy.empty((0, dimension), dtype=numpy.float32)
+        self._matrices[target_collection_name] = numpy.memmap(self._get_collection_file_path(target_collection_name, ".f32"), 
+                                                              dtype=numpy.float32, mode="r", shape=(stored_count, dimension))
+        return self._matrices[target_collection_name]
+
+
+    def _check_vectors_file(self, target_collection_name: str, dimension: int) -> int:
+        """
+        Private method aligning the vectors file with the record store, truncating the rows of an interrupted insertion.
+        In case of records without vectors (es. a vectors file removed by hand), raises ValueError.
+        Returns:
+            int: The number of stored records (and vectors).
+        """
+        stored_count: int = self._get_record_store(target_collection_name).get_max_label()
+        vectors_file_path: str = self._get_collection_file_path(target_collection_name, ".f32")
+        expected_size: int = stored_count * dimension * numpy.dtype(numpy.float32).itemsize
+        file_size: int = os.path.getsize(vectors_file_path) if os.path.exists(vectors_file_path) else 0
+        if(file_size > expected_size):
+            logging.info(f"[WARNING]: Truncating the vectors of an interrupted insertion from '{target_collection_name}'.")
+            self._matrices.pop(target_collection_name, None)
+            os.truncate(vectors_file_path, expected_size)
+        elif(file_size < expected_size):
+            raise ValueError(f"The vectors file of '{target_collection_name}' is shorter than its {stored_count} stored records.")
+        return stored_count
+
+
+    def _get_dimension(self, target_collection_name: str, default_dimension: int = None) -> int:
+        """
+        Private method returning the vector dimension of the collection. 
+        If it is not set yet, 'default_dimension' is stored (None is returned if it is not given either).
+        """
+        record_store: localStore.SQLite_record_store = self._get_record_store(target_collection_name)
+        stored_dimension: str = record_store.get_setting("dimension")
+        if(stored_dimension is not None):
+            return int(stored_dimension)
+        if(default_dimension is not None):
+            record_store.set_setting("dimension", str(default_dimension))
+        return default_dimension
+
+
+    def _get_lexical_index(self, target_collection_name: str) -> lexicalSearch.BM25_index:
+        """
+        Private method returning the BM25 index of the collection, built on its first use from the texts of the record store.
+        """
+        if(target_collection_name not in self._lexical_indexes):
+            lexical_index = lexicalSearch.BM25_index()
+            for (label, text) in self._get_record_store(target_collection_name).get_texts():
+                lexical_index.add_document(label, text)
+            self._lexical_indexes[target_collection_name] = lexical_index
+        return self._lexical_indexes[target_collection_name]
+
+
+    def _add_to_lexical_index(self, target_collection_name: str, label: int, text: str) -> None:
+        """
+        Private method adding (or replacing) a text into the BM25 index of the collection, if it has already been built.
+        """
+        lexical_index: lexicalSearch.BM25_index = self._lexical_indexes.get(target_collection_name)
+        if(lexical_index is not None):
+            lexical_index.add_document(label, text)
+
+
+    def _get_record_store(self, target_collection_name: str) -> localStore.SQLite_record_store:
+        """
+        Private method returning the (lazily opened) record store of the collection.
+        """
+        if(target_collection_name not in self._record_stores):
+            self._record_stores[target_collection_name] = localStore.SQLite_record_store(
+                    self._get_collection_file_path(target_collection_name, ".sqlite"))
+        return self._record_stores[target_collection_name]
+
+
+    def _get_collection_file_path(self, target_collection_name: str, extension: str) -> str:
+        """
+        Private method returning the path of a file belonging to the given collection.
+        """
+        return os.path.join(self.index_folder_path, target_collection_name + extension)
+
+
+
+
+#region intra-top_k redundance filtering
+
+def _select_top_k_candidates(candidates_heap: vectorSearch.Top_m_candidates_heap, top_k: int, 
+                             redundancy_tolerance: float = None, mmr_lambda: float = None) -> list[Any]:
+    """
+    Module private function applying the intra-top_k redundance filtering on the collected candidates
+    (vectorized Maximal Marginal Relevance selection).
+    Parameters:
+        candidates_heap (Top_m_candidates_heap): The collected candidates.
+        top_k (int): The maximum number of candidates to select.
+        redundancy_tolerance (float, optional): The similarity between two candidates above which the less relevant one is discarded.
+                                                    Default: 'TOLERANCE'.
+        mmr_lambda (float, optional): The relevance/diversity trade-off of the MMR selection (pure relevance if None).
+    Returns:
+        list[Any]: The records paired with the selected candidates, in selection order.
+    """
+    sorted_candidates: list[tuple[float, Any, numpy.ndarray]] = candidates_heap.get_sorted_candidates()
+    if(len(sorted_candidates) == 0):
+        return []
+    selected_indexes: list[int] = vectorSearch.select_non_redundant_candidates(
+            similarities=numpy.array([ similarity for (similarity, _, _) in sorted_candidates ], dtype=numpy.float32), 
+            vectors=numpy.vstack([ vector for (_, _, vector) in sorted_candidates ]).astype(numpy.float32, copy=False), 
+            top_k=top_k, 
+            redundancy_tolerance=(redundancy_tolerance if (redundancy_tolerance is not None) else TOLERANCE), 
+            mmr_lambda=mmr_lambda)
+    return [ sorted_candidates[index][1] for index in selected_indexes ]
+
+
+def _select_top_k_candidates_by_group(candidates_heap: vectorSearch.Top_m_candidates_heap, top_k: int) -> list[Any]:
+    """
+    Module private function applying the intra-top_k redundance filtering through the near-duplicate groups assigned 
+    at ingest time: only the best candidate of each group is selected, through a set lookup instead of vector comparisons.
+    The candidates with no group (not clustered yet, see 'cluster_redundancy_groups', or scored from the vector cache) 
+    are compared by vector with the selected candidates, and the grouped ones with the selected candidates with no group.
+    Parameters:
+        candidates_heap (Top_m_candidates_heap): The collected candidates, paired with their group.
+        top_k (int): The maximum number of candidates to select.
+    Returns:
+        list[Any]: The records paired with the selected candidates, in selection order.
+    """
+    selected_payloads: list[Any] = []
+    selected_groups: set[Any] = set()
+    (selected_vectors, ungrouped_vectors) = ([], [])
+    for ((_, payload, vector), group) in zip(candidates_heap.get_sorted_candidates(), candidates_heap.get_sorted_groups()):
+        if(group in selected_groups):
+            continue
+        compared_vectors: list[numpy.ndarray] = selected_vectors if (group is None) else ungrouped_vectors
+        if((len(compared_vectors) > 0) and (float(numpy.max(numpy.vstack(compared_vectors) @ vector)) >= TOLERANCE)):
+            continue
+        if(group is None):
+            ungrouped_vectors.append(vector)
+        else:
+            selected_groups.add(group)
+        selected_vectors.append(vector)
+        selected_payloads.append(payload)
+        if(len(selected_payloads) == top_k):
+            break
+    return selected_payloads
+#endregion intra-top_k redundance filtering
+
+
+
+#region hybrid retrieval
+
+def _fuse_candidates(dense_heap: vectorSearch.Top_m_candidates_heap, lexical_heap: vectorSearch.Top_m_candidates_heap, 
+                     lexical_ranking: list[Any], top_m: int) -> vectorSearch.Top_m_candidates_heap:
+    """
+    Module private function fusing the dense and lexical rankings of the candidates with Reciprocal Rank Fusion.
+    Parameters:
+        dense_heap (Top_m_candidates_heap): The candidates collected by dense similarity.
+        lexical_heap (Top_m_candidates_heap): The lexical candidates, scored with their vectors (skipped ones are dropped).
+        lexical_ranking (list[Any]): The payloads of the lexical candidates, in BM25 order.
+        top_m (int): The maximum number of fused candidates.
+    Returns:
+        Top_m_candidates_heap: The fused candidates, scored by their fused score normalized to (0, 1] 
+                                    (so that 'mmr_lambda' keeps its meaning), paired with the same payloads and groups.
+    """
+    dense_candidates: list[tuple[float, Any, numpy.ndarray]] = dense_heap.get_sorted_candidates()
+    vector_by_payload: dict[Any, numpy.ndarray] = { payload: vector for (_, payload, vector) in lexical_heap.get_sorted_candidates() }
+    lexical_ranking = [ payload for payload in lexical_ranking if payload in vector_by_payload ]
+    vector_by_payload.update({ payload: vector for (_, payload, vector) in dense_candidates })
+    group_by_payload: dict[Any, Any] = dict(zip([ payload for (_, payload, _) in lexical_heap.get_sorted_candidates() ], 
+                                                lexical_heap.get_sorted_groups()))
+    group_by_payload.update(zip([ payload for (_, payload, _) in dense_candidates ], dense_heap.get_sorted_groups()))
+
+    fused_candidates: list[tuple[float, Any]] = lexicalSearch.reciprocal_rank_fusion(
+            [ [ payload for (_, payload, _) in dense_candidates ], lexical_ranking ])[:top_m]
+    candidates_heap = vectorSearch.Top_m_candidates_heap(top_m)
+    if(len(fused_candidates) > 0):
+        candidates_heap.push_batch(numpy.array([ score for (score, _) in fused_candidates ], dtype=numpy.float32) / fused_candidates[0][0], 
+                                   [ payload for (_, payload) in fused_candidates ], 
+                                   numpy.vstack([ vector_by_payload[payload] for (_, payload) in fused_candidates ]), 
+                                   [ group_by_payload[payload] for (_, payload) in fused_candidates ])
+    return candidates_heap
+
+#endregion hybrid retrieval
+
+
+
+#region MongoDB filters
+
+def _combine_filters(*query_filters: json) -> json:
+    """
+    Module private function combining the given MongoDB filters (None ones are ignored) into their conjunction.
+    Returns:
+        json: The combined filter. None if no filter is given.
+    """
+    query_filters = [ query_filter for query_filter in query_filters if query_filter is not None ]
+    if(len(query_filters) == 0):
+        return None
+    if(len(query_filters) == 1):
+        return query_filters[0]
+    return {"$and": query_filters}
+
+#endregion MongoDB filters
+
+
+
+#region MongoDB aggregation scoring
+
+def _build_dot_product_expression(vector_field_path: str, query_array: numpy.ndarray) -> json:
+    """
+    Module private function building the aggregation expression of the dot product between a stored vector (array of doubles) 
+    and the query: the two arrays are paired by '$zip' and the products of the pairs are accumulated by '$reduce'.
+    Parameters:
+        vector_field_path (str): The path of the vector field (es. '$vector').
+        query_array (numpy.ndarray): The query vector, embedded into the expression as a constant.
+    Returns:
+        json: The expression evaluating to the dot product (0 for empty vectors).
+    """
+    return {"$reduce": {
+                "input": {"$zip": {"inputs": [vector_field_path, query_array.astype(float).tolist()]}}, 
+                "initialValue": 0.0, 
+                "in": {"$add": ["$$value", {"$multiply": [{"$arrayElemAt": ["$$this", 0]}, {"$arrayElemAt": ["$$this", 1]}]}]}
+            }}
+
+#endregion MongoDB aggregation scoring
+
+
+
+#region vector storage encoding
+
+def _encode_vector(vector: floatVector, storage_format: storage_formats_enum) -> Any:
+    """
+    Module private function converting a vector into its MongoDB representation for the given storage format.
+    """
+    if(storage_format == storage_formats_enum.FLOAT32):
+        return Binary(BinaryVectorDtype.FLOAT32.value + b"\x00" + numpy.asarray(vector, dtype="<f4").tobytes(), VECTOR_SUBTYPE)
+    if(storage_format == storage_formats_enum.FLOAT16):
+        return Binary(numpy.asarray(vector, dtype="<f2").tobytes(), FLOAT16_VECTOR_SUBTYPE)
+    return [ float(value) for value in vector ]
+
+
+def _decode_vector(stored_vector: Any) -> numpy.ndarray:
+    """
+    Module private function decoding a vector stored in any of the featured storage formats.
+    Binary vectors are decoded zero-copy (the returned array is a read-only view of the BSON payload).
+    """
+    if(isinstance(stored_vector, Binary)):
+        if(stored_vector.subtype == VECTOR_SUBTYPE):
+            return numpy.frombuffer(stored_vector, dtype="<f4", offset=BSON_VECTOR_HEADER_SIZE)
+        if(stored_vector.subtype == FLOAT16_VECTOR_SUBTYPE):
+            return numpy.frombuffer(stored_vector, dtype="<f2")
+        raise ValueError(f"Unknown binary vector subtype '{stored_vector.subtype}'.")
+    return numpy.asarray(stored_vector, dtype=numpy.float32)
+
+
+def _decode_vectors_into_matrix(stored_vectors: list[Any], matrix: numpy.ndarray = None) -> numpy.ndarray:
+    """
+    Module private function decoding a batch of stored vectors (formats may be mixed) into a float32 matrix.
+    See 'vector_search_services.decode_vectors_into_matrix'.
+    """
+    return vectorSearch.decode_vectors_into_matrix([ _decode_vector(stored_vector) for stored_vector in stored_vectors ], matrix)
+
+
+def _get_storage_format(stored_vector: Any) -> storage_formats_enum:
+    """
+    Module private function returning the storage format of a stored vector.
+    """
+    if(isinstance(stored_vector, Binary)):
+        return storage_formats_enum.FLOAT32 if (stored_vector.subtype == VECTOR_SUBTYPE) else storage_formats_enum.FLOAT16
+    return storage_formats_enum.ARRAY
+
+
+def _is_stored_as(stored_vector: Any, storage_format: storage_formats_enum) -> bool:
+    """
+    Module private function checking whether a stored vector already matches the given storage format.
+    """
+    if(isinstance(stored_vector, Binary)):
+        return ((storage_format == storage_formats_enum.FLOAT32 and stored_vector.subtype == VECTOR_SUBTYPE) or 
+                (storage_format == storage_formats_enum.FLOAT16 and stored_vector.subtype == FLOAT16_VECTOR_SUBTYPE))
+    return (storage_format == storage_formats_enum.ARRAY)
+
+#endregion vector storage encoding
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import Any
 
 from src.models.interfaces.config_interfaces import DB_config_I
 from src.models.interfaces.data_model_interface import DTModel_I
 from src.models.data_models import Storage_DTModel, RAG_DTModel
+from src.common.constants import Featured_retrieval_modes_enum as retrieval_modes_enum
 
 floatVector = list[float]
 
@@ -146,17 +148,107 @@ class RAG_DB_operator_I(DB_operator_I):
     It extends the DB_operator interface.
     """
 
+    def insert_records(self, target_index_name: str, data_models: list[RAG_DTModel]) -> bool:
+        """
+        Bulk variation of 'insert_record'. By default the records are inserted one by one, 
+        implementations with a cheaper bulk write are meant to override it.
+
+        Parameters:
+            target_index_name (str): The name of the index where to insert the records into.
+            data_models (list[RAG_DTModel]): The data models describing the records to insert.
+        Returns:
+            bool: True if all the records have been inserted. False otherwise.
+        """
+        flag = True
+        for data_model in data_models:
+            if(not self.insert_record(target_index_name, data_model)):
+                flag = False
+        return flag
+
+    def get_collection_statistics(self, target_index_name: str) -> dict[str, Any]:
+        """
+        Returns the statistics used to plan the retrievals of the given index (see 'query_planner_services').
+        By default None is returned, meaning that the implementation cannot be steered and its retrievals are not planned.
+
+        Parameters:
+            target_index_name (str): The name of the index to describe.
+        Returns:
+            dict[str, Any]: The 'count' of records, their vector 'dimension' (None if empty), the 'embedders' names, 
+                            how the vectors fetched from the DB are stored ('stored_float_bytes' per element, 
+                            'stored_as_arrays' if decoded element by element; optional for local backends) and 
+                            the 'access_paths' (dict of 'Featured_access_paths_enum' to the parameters of the path)
+                            which can be requested through the 'access_path' option of 'retrieve_embeddings_from_vector'.
+                            Implementations returning statistics also accept its 'top_m' option (candidates over-fetching).
+        """
+        return None
+
     @abstractmethod
-    def retrieve_embeddings_from_vector(self, target_index_name: str, query_vector: floatVector, top_k: int) -> list[RAG_DTModel]:
+    def retrieve_embeddings_from_vector(self, target_index_name: str, query_vector: floatVector, top_k: int, 
+                                        redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                        metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
         """
         Retrieves the top_k most similar vectors to the input query from the given index.
+        An intra-top_k redundance filtering (Maximal Marginal Relevance selection) is applied on the retrieved vectors.
 
         Parameters:
             target_index_name (str): The name of the index to retrieve the vectors from.
             query_vector (floatVector): The vector representing the query for argument retrieval.
                                     This value is supposed to be obtained by embedding a natural language question or text to retrieve.
             top_k (int): The number of top similar vectors to retrieve.
+            redundancy_tolerance (float, optional): The similarity between two retrieved vectors above which 
+                                    the less relevant one is discarded. If None, the implementation default is used.
+            mmr_lambda (float, optional): The relevance/diversity trade-off in [0, 1] of the selection. 
+                                    If None, vectors are selected by pure relevance.
+            metadata_filter (dict[str, list[str]], optional): The accepted values of some metadata fields 
+                                    (see 'Filterable_RAG_metadata_fields_enum'). Only the records matching at least one 
+                                    value of every given field are searched. If None, the whole index is searched.
         Returns:
             list[RAG_DTModel]: A list of the top_k most similar vectors as data models.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def retrieve_embeddings_from_vectors(self, target_index_name: str, query_matrix: list[floatVector], top_k: int, 
+                                         redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                         metadata_filter: dict[str, list[str]] = None) -> list[list[RAG_DTModel]]:
+        """
+        Batched variation of 'retrieve_embeddings_from_vector', retrieving the top_k most similar vectors for each of the given queries.
+        Implementations are meant to serve all the queries with a single pass over the index.
+
+        Parameters:
+            target_index_name (str): The name of the index to retrieve the vectors from.
+            query_matrix (list[floatVector]): The vectors representing the queries (one per row).
+            top_k (int): The number of top similar vectors to retrieve for each query.
+            redundancy_tolerance (float, optional): See 'retrieve_embeddings_from_vector'.
+            mmr_lambda (float, optional): See 'retrieve_embeddings_from_vector'.
+            metadata_filter (dict[str, list[str]], optional): See 'retrieve_embeddings_from_vector'.
+        Returns:
+            list[list[RAG_DTModel]]: The top_k most similar vectors of each query, in the same order of the queries.
+        """
+        pass
+
+    @abstractmethod
+    def retrieve_embeddings_from_text_and_vector(self, target_index_name: str, query_text: str, query_vector: floatVector, 
+                                                 top_k: int, retrieval_mode: retrieval_modes_enum = retrieval_modes_enum.HYBRID, 
+                                                 redundancy_tolerance: float = None, mmr_lambda: float = None, 
+                                                 metadata_filter: dict[str, list[str]] = None) -> list[RAG_DTModel]:
+        """
+        Variation of 'retrieve_embeddings_from_vector' also ranking the records by the BM25 relevance of their text to the query,
+        so that exact terms (titles, acronyms, author names...) are not missed by the dense similarity.
+
+        Parameters:
+            target_index_name (str): The name of the index to retrieve the vectors from.
+            query_text (str): The natural language query (the one embedded into 'query_vector').
+            query_vector (floatVector): The vector representing the query.
+            top_k (int): The number of top records to retrieve.
+            retrieval_mode (Featured_retrieval_modes_enum, default: HYBRID): 
+                                    HYBRID fuses the lexical and dense rankings with Reciprocal Rank Fusion.
+                                    LEXICAL_SHORTLIST scores the dense similarity only on the best lexical candidates.
+                                    VECTOR ignores the query text.
+            redundancy_tolerance (float, optional): See 'retrieve_embeddings_from_vector'.
+            mmr_lambda (float, optional): See 'retrieve_embeddings_from_vector'.
+            metadata_filter (dict[str, list[str]], optional): See 'retrieve_embeddings_from_vector'.
+        Returns:
+            list[RAG_DTModel]: A list of the top_k best records as data models.
+        """
+        pass
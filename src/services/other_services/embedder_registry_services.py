@@ -0,0 +1,93 @@
+import re
+import sqlite3
+import threading
+
+"""
+Static service module implementing the registry of the embedder partitions of the RAG collections.
+A logical collection is physically split into one partition (collection/index) per embedder, so that vectors of different
+models (and dimensions) never share a scan; the registry records the partition name and the vector dimension of each
+(collection, embedder) pair in a SQLite file.
+"""
+
+
+
+class Embedder_partition_registry:
+    """
+    Thread-safe SQLite registry of the embedder partitions, cached in memory.
+    """
+    def __init__(self, registry_file_path: str):
+        if((registry_file_path is None) or (registry_file_path.strip() == "")):
+            raise ValueError("The embedder partition registry requires a file path.")
+
+        self.registry_file_path: str = registry_file_path
+        self.connection: sqlite3.Connection = sqlite3.connect(registry_file_path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS partitions ("
+                                "collection TEXT NOT NULL, embedder TEXT NOT NULL, partition_name TEXT NOT NULL, "
+                                "dimension INTEGER NOT NULL, PRIMARY KEY (collection, embedder))")
+        self.connection.commit()
+        self._lock: threading.Lock = threading.Lock()
+        self._partitions_by_collection: dict[str, dict[str, tuple[str, int]]] = dict() #lazily loaded
+
+
+    def get_partitions(self, collection_name: str) -> dict[str, tuple[str, int]]:
+        """
+        Returns the partitions of the given logical collection.
+        Returns:
+            dict[str, tuple[str, int]]: The '(partition name, dimension)' pair of each registered embedder (empty if none).
+        """
+        with self._lock:
+            return dict(self._load_partitions(collection_name))
+
+
+    def register_partition(self, collection_name: str, embedder_name: str, dimension: int,
+                           partition_name: str = None) -> tuple[str, int]:
+        """
+        Registers the partition of an embedder within a logical collection (nothing changes if it is already registered).
+        In case of a dimension different from the registered one, raises ValueError.
+        Parameters:
+            collection_name (str): The logical collection.
+            embedder_name (str): The embedder of the partition vectors.
+            dimension (int): The dimension of the partition vectors.
+            partition_name (str, optional): The physical collection/index of the partition (es. an already populated one).
+                                                If None, it is derived from the collection and embedder names.
+        Returns:
+            tuple[str, int]: The registered '(partition name, dimension)' pair.
+        """
+        with self._lock:
+            partitions: dict[str, tuple[str, int]] = self._load_partitions(collection_name)
+            if(embedder_name in partitions):
+                if(partitions[embedder_name][1] != dimension):
+                    raise ValueError(f"The partition of '{embedder_name}' in '{collection_name}' stores {partitions[embedder_name][1]}-dimensional "
+                                     f"vectors, not {dimension}-dimensional ones.")
+                return partitions[embedder_name]
+
+            partition = (partition_name or build_partition_name(collection_name, embedder_name), int(dimension))
+            with self.connection:
+                self.connection.execute("INSERT INTO partitions (collection, embedder, partition_name, dimension) VALUES (?, ?, ?, ?)",
+                                        (collection_name, embedder_name, *partition))
+            partitions[embedder_name] = partition
+            return partition
+
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+    def _load_partitions(self, collection_name: str) -> dict[str, tuple[str, int]]:
+        """
+        Private method returning the cached partitions of a collection, reading them on the first request.
+        The caller must hold the lock.
+        """
+        if(collection_name not in self._partitions_by_collection):
+            self._partitions_by_collection[collection_name] = {
+                    embedder: (partition_name, dimension) for (embedder, partition_name, dimension) in self.connection.execute(
+                        "SELECT embedder, partition_name, dimension FROM partitions WHERE collection = ?", (collection_name,)) }
+        return self._partitions_by_collection[collection_name]
+
+
+def build_partition_name(collection_name: str, embedder_name: str) -> str:
+    """
+    Returns the default physical name of the partition of an embedder (es. 'papers-text-embedding-3-small').
+    Only lowercase letters, digits and hyphens are used for the embedder part, so that the name suits every backend.
+    """
+    return f"{collection_name}-{re.sub(r'[^a-z0-9]+', '-', embedder_name.lower()).strip('-')}"
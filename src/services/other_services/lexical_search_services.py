@@ -0,0 +1,134 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Hashable
+
+from src.services.other_services.raw_data_services import STOPWORDS
+
+"""
+Static service module implementing the lexical side of the retrieval: an in-memory inverted index scoring the embedded
+texts with Okapi BM25, and the Reciprocal Rank Fusion (RRF) of several rankings.
+Exact terms (paper titles, acronyms, author names...) are matched literally, complementing the vectorial similarity.
+"""
+
+RRF_K = 60 #rank smoothing constant of the Reciprocal Rank Fusion
+TOKEN_PATTERN = re.compile(r"\w+(?:['\-]\w+)*")
+
+
+
+class BM25_index:
+    """
+    Thread-safe inverted index of the texts of a single collection, scored with Okapi BM25.
+    Documents are identified by a hashable key chosen by the backend (record ID, label...) and can be added
+    (or replaced) incrementally.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        if((k1 is None) or (k1 < 0) or (b is None) or not (0 <= b <= 1)):
+            raise ValueError("The BM25 parameters must satisfy 'k1 >= 0' and '0 <= b <= 1'.")
+
+        self.k1: float = k1 #term frequency saturation
+        self.b: float = b #document length normalization
+        self._postings: dict[str, dict[Hashable, int]] = dict() #term -> {document key: term frequency}
+        self._document_terms: dict[Hashable, tuple[str, ...]] = dict() #document key -> distinct terms (for replacements)
+        self._document_lengths: dict[Hashable, int] = dict()
+        self._total_length: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._document_lengths)
+
+
+    def add_document(self, document_key: Hashable, text: str) -> None:
+        """
+        Indexes the given text, replacing the previous one of the same document (if any).
+        """
+        term_frequencies: Counter = Counter(tokenize(text))
+        with self._lock:
+            self._remove_document(document_key)
+            for (term, frequency) in term_frequencies.items():
+                self._postings.setdefault(term, dict())[document_key] = frequency
+            self._document_terms[document_key] = tuple(term_frequencies.keys())
+            self._document_lengths[document_key] = sum(term_frequencies.values())
+            self._total_length += self._document_lengths[document_key]
+
+
+    def remove_document(self, document_key: Hashable) -> None:
+        """
+        Removes the given document from the index (nothing happens if it is not indexed).
+        """
+        with self._lock:
+            self._remove_document(document_key)
+
+
+    def search(self, query_text: str, top_n: int, allowed_keys: set[Hashable] = None) -> list[tuple[float, Hashable]]:
+        """
+        Scores the documents containing at least one of the query terms.
+        Parameters:
+            query_text (str): The natural language query.
+            top_n (int): The maximum number of documents to return.
+            allowed_keys (set[Hashable], optional): The only documents which can be returned (es. a metadata-filtered subset).
+        Returns:
+            list[tuple[float, Hashable]]: The '(BM25 score, document key)' pairs of the best documents, in descending score order.
+        """
+        query_terms: list[str] = list(dict.fromkeys(tokenize(query_text)))
+        scores: dict[Hashable, float] = dict()
+        with self._lock:
+            n_documents: int = len(self._document_lengths)
+            if((n_documents == 0) or (top_n <= 0)):
+                return []
+            average_length: float = self._total_length / n_documents
+            for term in query_terms:
+                postings: dict[Hashable, int] = self._postings.get(term)
+                if(postings is None):
+                    continue
+                inverse_frequency: float = math.log(1 + (n_documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for (document_key, frequency) in postings.items():
+                    if((allowed_keys is not None) and (document_key not in allowed_keys)):
+                        continue
+                    length_norm: float = self.k1 * (1 - self.b + self.b * self._document_lengths[document_key] / average_length)
+                    scores[document_key] = (scores.get(document_key, 0.0)
+                                            + inverse_frequency * frequency * (self.k1 + 1) / (frequency + length_norm))
+        best_keys: list[Hashable] = sorted(scores, key=scores.__getitem__, reverse=True)[:top_n]
+        return [ (scores[document_key], document_key) for document_key in best_keys ]
+
+
+    def _remove_document(self, document_key: Hashable) -> None:
+        """
+        Private method removing a document from the index. The caller must hold the lock.
+        """
+        for term in self._document_terms.pop(document_key, ()):
+            postings: dict[Hashable, int] = self._postings[term]
+            postings.pop(document_key, None)
+            if(len(postings) == 0):
+                del self._postings[term]
+        self._total_length -= self._document_lengths.pop(document_key, 0)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits the given text into lowercase word terms, discarding the stop words.
+    Hyphenated words and acronyms are kept whole (es. 'BM25', 'state-of-the-art').
+    """
+    if(text is None):
+        return []
+    return [ term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS ]
+
+
+def reciprocal_rank_fusion(rankings: list[list[Hashable]], k: int = RRF_K) -> list[tuple[float, Hashable]]:
+    """
+    Fuses several rankings of the same documents: every document scores the sum of '1 / (k + rank)' over the rankings
+    containing it (ranks start from 1), so only the positions matter and the incomparable scores of the rankers are ignored.
+    Parameters:
+        rankings (list[list[Hashable]]): The document keys of each ranking, best first.
+        k (int, default: RRF_K): The smoothing constant limiting the weight of the first positions.
+    Returns:
+        list[tuple[float, Hashable]]: The '(fused score, document key)' pairs, in descending score order.
+    """
+    fused_scores: dict[Hashable, float] = dict()
+    for ranking in rankings:
+        for (rank, document_key) in enumerate(ranking, start=1):
+            fused_scores[document_key] = fused_scores.get(document_key, 0.0) + 1.0 / (k + rank)
+    return [ (fused_scores[document_key], document_key)
+                for document_key in sorted(fused_scores, key=fused_scores.__getitem__, reverse=True) ]
@@ -0,0 +1,245 @@
+import json
+import sqlite3
+import numpy
+
+from src.models.data_models import RAG_DTModel
+
+"""
+Static service module implementing a SQLite-based store for the records (text and metadata) of the local RAG backends.
+Each record is identified by an integer 'label', which is the key shared with the vectorial structures of the backend
+(graph node, row of a vectors file...).
+"""
+
+METADATA_COLUMNS = {"url": "url", "title": "title", "embedder": "embedder"} #filterable metadata stored as plain columns
+
+
+
+class SQLite_record_store:
+    """
+    SQLite store of the RAG records belonging to a single collection.
+    Vectors may be stored along with the records, so that the vectorial structures of the backend can be rebuilt.
+    Updates may be logged as well, so that the ones not persisted yet by the backend structures can be replayed.
+    """
+    def __init__(self, database_file_path: str):
+        if((database_file_path is None) or (database_file_path.strip() == "")):
+            raise ValueError("The SQLite record store requires a database file path.")
+
+        self.connection: sqlite3.Connection = sqlite3.connect(database_file_path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS records ("
+                                "label INTEGER PRIMARY KEY, record_id TEXT, text TEXT NOT NULL, url TEXT, title TEXT, "
+                                "pages TEXT, authors TEXT, embedder TEXT, vector BLOB)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_text ON records (text)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_embedder ON records (embedder)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS update_log (position INTEGER PRIMARY KEY AUTOINCREMENT, label INTEGER NOT NULL)")
+        self.connection.commit()
+
+
+    def insert_records(self, data_models: list[RAG_DTModel], store_vectors: bool = True, labels: list[int] = None) -> list[int]:
+        """
+        Inserts the given records within a single transaction.
+        Parameters:
+            data_models (list[RAG_DTModel]): The records to insert.
+            store_vectors (bool): Whether to store the float32 vectors along with the records.
+            labels (list[int], optional): The labels to assign (es. the rows of a vectors file). If None, SQLite assigns them.
+        Returns:
+            list[int]: The labels assigned to the inserted records (same order of 'data_models').
+        """
+        if((labels is not None) and (len(labels) != len(data_models))):
+            raise ValueError("The number of labels must match the number of records to insert.")
+        assigned_labels: list[int] = []
+        with self.connection:
+            for (position, data_model) in enumerate(data_models):
+                cursor = self.connection.execute(
+                        "INSERT INTO records (label, record_id, text, url, title, pages, authors, embedder, vector) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (None if (labels is None) else int(labels[position]), *self._to_row(data_model, store_vectors)))
+                assigned_labels.append(cursor.lastrowid)
+        return assigned_labels
+
+
+    def update_record(self, label: int, data_model: RAG_DTModel, store_vectors: bool = True, log_update: bool = False) -> bool:
+        """
+        Replaces the record having the given label.
+        Parameters:
+            label (int): The label of the record to replace.
+            data_model (RAG_DTModel): The new record.
+            store_vectors (bool): Whether to store the float32 vector along with the record.
+            log_update (bool): Whether to append the label to the update log (within the same transaction), see 'get_logged_vectors'.
+        Returns:
+            bool: True if a record has been updated. False otherwise.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                    "UPDATE records SET record_id = ?, text = ?, url = ?, title = ?, pages = ?, authors = ?, "
+                    "embedder = ?, vector = ? WHERE label = ?",
+                    (*self._to_row(data_model, store_vectors), label))
+            if(log_update and (cursor.rowcount > 0)):
+                self.connection.execute("INSERT INTO update_log (label) VALUES (?)", (label,))
+        return (cursor.rowcount > 0)
+
+
+    def find_label_using_text(self, text: str) -> int:
+        """
+        Returns the label of the record having the given embedded text. None if not found.
+        """
+        row = self.connection.execute("SELECT label FROM records WHERE text = ? LIMIT 1", (text,)).fetchone()
+        return None if (row is None) else row[0]
+
+
+    def find_labels_using_metadata(self, metadata_filter: dict[str, list[str]]) -> list[int]:
+        """
+        Returns the labels of the records matching at least one of the accepted values of every given metadata field
+        ('url', 'title', 'author' or 'embedder'). A record matches an 'author' value if it is one of its authors.
+        """
+        conditions: list[str] = []
+        parameters: list[str] = []
+        for (field, values) in metadata_filter.items():
+            if(len(values) == 0):
+                return []
+            placeholders: str = ",".join("?" * len(values))
+            if(field == "author"): #authors are stored as a JSON list
+                conditions.append(f"EXISTS (SELECT 1 FROM json_each(records.authors) WHERE json_each.value IN ({placeholders}))")
+            elif(field in METADATA_COLUMNS):
+                conditions.append(f"{METADATA_COLUMNS[field]} IN ({placeholders})")
+            else:
+                raise ValueError(f"The metadata field '{field}' cannot be used to filter the records.")
+            parameters.extend(values)
+        where_clause: str = " AND ".join(conditions) if (len(conditions) > 0) else "1"
+        return [ row[0] for row in self.connection.execute(f"SELECT label FROM records WHERE {where_clause}", parameters) ]
+
+
+    def get_records(self, labels: list[int]) -> list[dict[str, any]]:
+        """
+        Returns the records having the given labels as JSON data (the same format stored by 'RAG_MongoDB_operator').
+        Records are returned in the same order of the given labels (missing labels are skipped).
+        """
+        if(len(labels) == 0):
+            return []
+        placeholders: str = ",".join("?" * len(labels))
+        rows = self.connection.execute(
+                f"SELECT label, record_id, text, url, title, pages, authors, embedder, vector FROM records WHERE label IN ({placeholders})",
+                [ int(label) for label in labels ]).fetchall()
+        record_by_label: dict[int, dict[str, any]] = dict()
+        for (label, record_id, text, url, title, pages, authors, embedder, vector) in rows:
+            record_by_label[label] = {
+                "id": record_id,
+                "text": text,
+                "vector": (None if (vector is None) else numpy.frombuffer(vector, dtype=numpy.float32).tolist()),
+                "metadata": {
+                    "url": url,
+                    "title": title,
+                    "pages": pages,
+                    "author": json.loads(authors),
+                    "embedder": embedder
+                }
+            }
+        return [ record_by_label[int(label)] for label in labels if int(label) in record_by_label ]
+
+
+    def get_texts(self) -> list[tuple[int, str]]:
+        """
+        Returns the '(label, text)' pairs of all the stored records (es. to build a lexical index).
+        """
+        return self.connection.execute("SELECT label, text FROM records").fetchall()
+
+
+    def get_urls(self) -> list[tuple[int, str]]:
+        """
+        Returns the '(label, url)' pairs of all the stored records (es. to group the records by document).
+        """
+        return self.connection.execute("SELECT label, url FROM records").fetchall()
+
+
+    def get_embedders(self) -> list[str]:
+        """
+        Returns the distinct embedder names of the stored records.
+        """
+        return [ embedder for (embedder,) in self.connection.execute("SELECT DISTINCT embedder FROM records WHERE embedder IS NOT NULL") ]
+
+
+    def get_vectors_after_label(self, label: int) -> tuple[list[int], numpy.ndarray]:
+        """
+        Returns the stored vectors of the records having a label greater than the given one (ascending label order).
+        Returns:
+            tuple[list[int], numpy.ndarray]: The labels and the float32 matrix of the matching vectors.
+        """
+        rows = self.connection.execute("SELECT label, vector FROM records WHERE label > ? AND vector IS NOT NULL "
+                                       "ORDER BY label", (label,)).fetchall()
+        if(len(rows) == 0):
+            return [], numpy.empty((0, 0), dtype=numpy.float32)
+        return ([ row[0] for row in rows ],
+                numpy.vstack([ numpy.frombuffer(row[1], dtype=numpy.float32) for row in rows ]))
+
+
+    def get_logged_vectors(self) -> tuple[list[int], numpy.ndarray]:
+        """
+        Returns the stored vectors of the records updated since the update log was last cleared (ascending label order).
+        Returns:
+            tuple[list[int], numpy.ndarray]: The labels and the float32 matrix of the updated vectors.
+        """
+        rows = self.connection.execute("SELECT label, vector FROM records WHERE label IN (SELECT label FROM update_log) "
+                                       "AND vector IS NOT NULL ORDER BY label").fetchall()
+        if(len(rows) == 0):
+            return [], numpy.empty((0, 0), dtype=numpy.float32)
+        return ([ row[0] for row in rows ],
+                numpy.vstack([ numpy.frombuffer(row[1], dtype=numpy.float32) for row in rows ]))
+
+
+    def get_update_log_position(self) -> int:
+        """
+        Returns the position of the last logged update (0 if the log is empty).
+        """
+        return self.connection.execute("SELECT COALESCE(MAX(position), 0) FROM update_log").fetchone()[0]
+
+
+    def clear_update_log(self, position: int) -> None:
+        """
+        Removes the logged updates up to the given position (es. once the backend structures holding them have been persisted).
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM update_log WHERE position <= ?", (position,))
+
+
+    def get_max_label(self) -> int:
+        """
+        Returns the greatest label of the stored records (0 if the store is empty).
+        """
+        return self.connection.execute("SELECT COALESCE(MAX(label), 0) FROM records").fetchone()[0]
+
+
+    def count(self) -> int:
+        """
+        Returns the number of stored records.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+
+    def get_setting(self, key: str) -> str:
+        """
+        Returns the value of the given store setting. None if not set.
+        """
+        row = self.connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return None if (row is None) else row[0]
+
+
+    def set_setting(self, key: str, value: str) -> None:
+        """
+        Sets the value of the given store setting.
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+    def _to_row(self, data_model: RAG_DTModel, store_vectors: bool) -> tuple:
+        """
+        Private method converting a data model into the values of a 'records' row (label excluded).
+        """
+        vector_blob: bytes = numpy.asarray(data_model.vector, dtype=numpy.float32).tobytes() if store_vectors else None
+        return (data_model.id, data_model.text, data_model.url, data_model.title, data_model.pages,
+                json.dumps(data_model.authors), data_model.embedder_name, vector_blob)
@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+from typing import Any, Callable
+
+from src.common.constants import Featured_access_paths_enum as access_paths_enum
+from src.common.constants import Featured_vector_compressions_enum as compressions_enum
+from src.models.data_models import RAG_search_options
+
+"""
+Static service module implementing the cost-based planning of the dense retrievals.
+Every collection keeps incrementally updated statistics (records count, vector dimension, embedders, available access paths),
+and each query is served by the cheapest exact access path meeting a latency target or, if none does, by the most accurate
+approximate one, whose parameters (es. the 'nprobe' of an IVF index) are sized on the target.
+Costs are rough per-float estimates, meant to rank the access paths rather than to predict the actual latency.
+"""
+
+LOCAL_FLOAT_COST_NS = 0.5 #scoring one float of a local vector
+FETCHED_BYTE_COST_NS = 2.0 #transferring and parsing one byte of a record fetched from the DB
+DECODED_FLOAT_COST_NS = 30.0 #converting one element of a stored array into a Python float
+SERVER_FLOAT_COST_NS = 30.0 #scoring one float inside a DB aggregation pipeline
+GRAPH_ACCESS_PENALTY = 4.0 #cache misses of the random accesses of a graph search, per scored float
+OVERFETCH_POPULATION_LIMIT = 100000 #collection size beyond which the candidates over-fetching stops growing
+STATISTICS_MAX_AGE_S = 300 #statistics reloaded from the backend after this time (es. to see newly trained indexes)
+APPROXIMATE_PATHS_BY_ACCURACY = [access_paths_enum.GRAPH, access_paths_enum.IVF, access_paths_enum.COMPRESSED_CODES]
+COMPRESSIONS_BY_ACCURACY = [compressions_enum.SCALAR_QUANTIZATION_INT8, compressions_enum.PRODUCT_QUANTIZATION,
+                            compressions_enum.BINARY_SIGN]
+
+
+
+class Collection_statistics:
+    """
+    Statistics of a single collection, loaded from its backend (see 'RAG_DB_operator_I.get_collection_statistics')
+    and kept up to date by the insertions going through the planner owner.
+    """
+    def __init__(self, backend_statistics: dict[str, Any] = None):
+        backend_statistics = backend_statistics or dict()
+        self.count: int = backend_statistics.get("count", 0)
+        self.dimension: int = backend_statistics.get("dimension") #None if the collection is empty
+        self.embedders: set[str] = set(backend_statistics.get("embedders", []))
+        self.stored_float_bytes: int = backend_statistics.get("stored_float_bytes", 4) #size of a float fetched from the DB
+        self.stored_as_arrays: bool = backend_statistics.get("stored_as_arrays", False) #whether fetched floats are decoded one by one
+        # parameters of every access path the backend can be steered to (none if the backend does not support planning)
+        self.access_paths: dict[access_paths_enum, dict[str, Any]] = dict(backend_statistics.get("access_paths", dict()))
+        self.loaded_at: float = time.monotonic()
+
+
+    def __str__(self) -> str:
+        return (f"{self.count} records, dimension {self.dimension}, embedders {sorted(self.embedders)}, "
+                f"access paths {[ access_path.value for access_path in self.access_paths ]}")
+
+
+class Retrieval_plan:
+    """
+    Access path and retrieval options chosen for a query, along with its estimated cost.
+    """
+    def __init__(self, access_path: access_paths_enum, options: RAG_search_options, estimated_cost_ms: float,
+                 is_exact: bool, meets_target: bool = True):
+        self.access_path: access_paths_enum = access_path
+        self.options: RAG_search_options = options #the search options of the operator retrieval enforcing the plan
+        self.estimated_cost_ms: float = estimated_cost_ms
+        self.is_exact: bool = is_exact
+        self.meets_target: bool = meets_target
+
+
+    def __str__(self) -> str:
+        return (f"{self.access_path.value} {self.options}, {'exact' if self.is_exact else 'approximate'}, "
+                f"estimated {self.estimated_cost_ms:.2f} ms" + ("" if self.meets_target else " (over the latency target)"))
+
+
+class Query_planner:
+    """
+    Thread-safe planner of the retrievals, caching the statistics of every collection.
+    """
+    def __init__(self, latency_target_ms: float, statistics_max_age_s: float = STATISTICS_MAX_AGE_S):
+        if((latency_target_ms is None) or (latency_target_ms <= 0)):
+            raise ValueError("The latency target of the query planner must be a positive number of milliseconds.")
+
+        self.latency_target_ms: float = latency_target_ms
+        self.statistics_max_age_s: float = statistics_max_age_s
+        self._statistics: dict[str, Collection_statistics] = dict()
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def plan(self, collection_name: str, statistics_loader: Callable[[str], dict[str, Any]], top_k: int) -> Retrieval_plan:
+        """
+        Chooses the access path and options of a retrieval: the cheapest exact path meeting the latency target,
+        otherwise the most accurate approximate path meeting it, otherwise the cheapest path.
+        Parameters:
+            collection_name (str): The searched collection.
+            statistics_loader (Callable[[str], dict[str, Any]]): The function reading the statistics of a collection
+                                                                  from the backend (called on the first plan and when stale).
+            top_k (int): The number of requested records.
+        Returns:
+            Retrieval_plan: The chosen plan. None if the backend does not support planning or the collection is empty.
+        """
+        statistics: Collection_statistics = self.get_statistics(collection_name, statistics_loader)
+        if((len(statistics.access_paths) == 0) or (statistics.count == 0) or (statistics.dimension is None)):
+            return None
+
+        # the same over-fetching of the operators, with the collection size in place of their fixed batch size
+        top_m: int = max(top_k, min(statistics.count,
+                                    math.ceil(top_k * (1 + math.log(max(2, min(statistics.count, OVERFETCH_POPULATION_LIMIT)))))))
+        plans: dict[access_paths_enum, Retrieval_plan] = self._estimate_plans(statistics, top_m)
+        for plan in plans.values():
+            plan.meets_target = (plan.estimated_cost_ms <= self.latency_target_ms)
+            plan.options.top_m = top_m
+            if(len(plans) > 1): #the operator must be steered to the chosen path
+                plan.options.access_path = plan.access_path
+
+        exact_plans: list[Retrieval_plan] = [ plan for plan in plans.values() if plan.is_exact and plan.meets_target ]
+        if(len(exact_plans) > 0):
+            return min(exact_plans, key=lambda plan: plan.estimated_cost_ms)
+        for access_path in APPROXIMATE_PATHS_BY_ACCURACY:
+            if((access_path in plans) and plans[access_path].meets_target):
+                return plans[access_path]
+        return min(plans.values(), key=lambda plan: plan.estimated_cost_ms)
+
+
+    def get_statistics(self, collection_name: str, statistics_loader: Callable[[str], dict[str, Any]]) -> Collection_statistics:
+        """
+        Returns the cached statistics of a collection, (re)loading them from the backend if missing or stale.
+        """
+        with self._lock:
+            statistics: Collection_statistics = self._statistics.get(collection_name)
+        if((statistics is None) or (time.monotonic() - statistics.loaded_at > self.statistics_max_age_s)):
+            statistics = Collection_statistics(statistics_loader(collection_name))
+            with self._lock:
+                self._statistics[collection_name] = statistics
+        return statistics
+
+
+    def record_insertions(self, collection_name: str, embedder_names: list[str], all_inserted: bool) -> None:
+        """
+        Updates the statistics of a collection after an insertion through the planner owner.
+        If some records have been rejected (or the dimension is still unknown), the statistics are reloaded on the next plan.
+        Parameters:
+            collection_name (str): The written collection.
+            embedder_names (list[str]): The embedder of each inserted record.
+            all_inserted (bool): Whether all the records have been inserted.
+        """
+        with self._lock:
+            statistics: Collection_statistics = self._statistics.get(collection_name)
+            if(statistics is None):
+                return
+            if((not all_inserted) or (statistics.dimension is None)):
+                del self._statistics[collection_name]
+                return
+            statistics.count += len(embedder_names)
+            statistics.embedders.update(embedder_names)
+
+
+    def invalidate(self, collection_name: str) -> None:
+        """
+        Drops the statistics of a collection, so that they are reloaded on the next plan.
+        """
+        with self._lock:
+            self._statistics.pop(collection_name, None)
+
+
+    def _estimate_plans(self, statistics: Collection_statistics, top_m: int) -> dict[access_paths_enum, Retrieval_plan]:
+        """
+        Private method estimating the cost of every access path of the collection, sizing the parameters of the approximate
+        ones on the latency target (the most accurate setting within the target, or the cheapest one if none fits).
+        Returns:
+            dict[access_paths_enum, Retrieval_plan]: The plan of each access path.
+        """
+        (n, d) = (statistics.count, statistics.dimension)
+        budget_ns: float = self.latency_target_ms * 1e6
+        fetched_float_cost_ns: float = (statistics.stored_float_bytes * FETCHED_BYTE_COST_NS + LOCAL_FLOAT_COST_NS 
+                                        + (DECODED_FLOAT_COST_NS if statistics.stored_as_arrays else 0.0))
+        plans: dict[access_paths_enum, Retrieval_plan] = dict()
+        for (access_path, parameters) in statistics.access_paths.items():
+            if(access_path == access_paths_enum.MEMORY_SCAN):
+                plans[access_path] = Retrieval_plan(access_path, RAG_search_options(), n * d * LOCAL_FLOAT_COST_NS / 1e6, is_exact=True)
+            elif(access_path == access_paths_enum.EXACT_SCAN):
+                plans[access_path] = Retrieval_plan(access_path, RAG_search_options(), n * d * fetched_float_cost_ns / 1e6, is_exact=True)
+            elif(access_path == access_paths_enum.SERVER_SCAN):
+                plans[access_path] = Retrieval_plan(access_path, RAG_search_options(),
+                                                    (n * d * SERVER_FLOAT_COST_NS + top_m * d * fetched_float_cost_ns) / 1e6,
+                                                    is_exact=True)
+            elif(access_path == access_paths_enum.IVF):
+                n_lists: int = parameters["n_lists"]
+                centroids_cost_ns: float = n_lists * d * LOCAL_FLOAT_COST_NS
+                list_cost_ns: float = n / n_lists * d * fetched_float_cost_ns
+                nprobe: int = int(min(n_lists, max(1, (budget_ns - centroids_cost_ns) // list_cost_ns)))
+                plans[access_path] = Retrieval_plan(access_path, RAG_search_options(nprobe=nprobe),
+                                                    (centroids_cost_ns + nprobe * list_cost_ns) / 1e6, is_exact=(nprobe == n_lists))
+            elif(access_path == access_paths_enum.COMPRESSED_CODES):
+                codes_plans: list[Retrieval_plan] = [
+                        Retrieval_plan(access_path, RAG_search_options(vector_compression=compression),
+                                       (n * parameters[compression]["code_bytes"] * (FETCHED_BYTE_COST_NS + LOCAL_FLOAT_COST_NS)
+                                        + min(n, top_m * parameters[compression]["shortlist_factor"]) * d * fetched_float_cost_ns) / 1e6,
+                                       is_exact=False)
+                            for compression in COMPRESSIONS_BY_ACCURACY if compression in parameters ]
+                plans[access_path] = next(( plan for plan in codes_plans if plan.estimated_cost_ms * 1e6 <= budget_ns ),
+                                          min(codes_plans, key=lambda plan: plan.estimated_cost_ms))
+            elif(access_path == access_paths_enum.GRAPH):
+                ef_cost_ns: float = max(1.0, math.log2(n)) * d * LOCAL_FLOAT_COST_NS * GRAPH_ACCESS_PENALTY
+                ef_search: int = int(max(top_m, min(n, budget_ns // ef_cost_ns)))
+                plans[access_path] = Retrieval_plan(access_path, RAG_search_options(ef_search=ef_search), ef_search * ef_cost_ns / 1e6, is_exact=False)
+        return plans
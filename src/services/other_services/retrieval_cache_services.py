@@ -0,0 +1,142 @@
+import copy
+import hashlib
+import threading
+import numpy
+from collections import OrderedDict
+from typing import Any
+
+from src.models.data_models import RAG_DTModel, RAG_retrieval_result
+
+"""
+Static service module implementing an in-memory LRU cache of retrieval results.
+Entries are keyed by collection, query vector hash and retrieval options, and they are invalidated per collection
+whenever the collection is written (or maintained).
+"""
+
+
+
+class Retrieval_result_cache:
+    """
+    Thread-safe LRU cache of retrieval results, exposing its usage statistics (hits, misses, evictions, invalidations)
+    so that it can be sized.
+    Every invalidation advances the epoch of its collection: a result computed while the collection was being written 
+    is put along with the epoch read before the retrieval, and it is dropped if the epoch has changed meanwhile.
+    """
+    def __init__(self, max_entries: int):
+        if((max_entries is None) or (max_entries <= 0)):
+            raise ValueError("The retrieval result cache size must be a positive integer.")
+
+        self.max_entries: int = max_entries
+        self._entries: OrderedDict[tuple, RAG_retrieval_result] = OrderedDict() #least recently used first
+        self._keys_by_collection: dict[str, set[tuple]] = dict()
+        self._epochs: dict[str, int] = dict() #number of invalidations of each collection
+        self._lock: threading.Lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+        self._invalidations: int = 0
+
+
+    def build_key(self, collection_name: str, query_vector: list[float], top_k: int, **options: Any) -> tuple:
+        """
+        Returns the cache key of a retrieval.
+        Parameters:
+            collection_name (str): The searched collection.
+            query_vector (list[float]): The query vector (hashed as float32 bytes).
+            top_k (int): The number of requested records.
+            **options: The other retrieval options affecting the result (es. filters), which must be JSON-like values.
+        """
+        query_hash: str = hashlib.blake2b(numpy.ascontiguousarray(query_vector, dtype=numpy.float32).tobytes(), digest_size=16).hexdigest()
+        return (collection_name, query_hash, top_k, _freeze(options))
+
+
+    def get_epoch(self, collection_name: str) -> int:
+        """
+        Returns the current epoch of the given collection, to be read before a retrieval whose result is going to be put.
+        """
+        with self._lock:
+            return self._epochs.get(collection_name, 0)
+
+
+    def get(self, key: tuple) -> RAG_retrieval_result:
+        """
+        Returns a copy of the cached result of the given key (so that the caller can modify its records). None if not cached.
+        """
+        with self._lock:
+            result: RAG_retrieval_result = self._entries.get(key)
+            if(result is None):
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return _copy_result(result)
+
+
+    def put(self, key: tuple, result: list[RAG_DTModel], epoch: int) -> bool:
+        """
+        Caches a copy of the result of the given key, evicting the least recently used entries beyond the cache size.
+        Parameters:
+            key (tuple): The key of the retrieval (see 'build_key').
+            result (list[RAG_DTModel]): The retrieved records.
+            epoch (int): The epoch of the collection read before the retrieval (see 'get_epoch').
+        Returns:
+            bool: False if the result has been dropped because the collection has been invalidated meanwhile. True otherwise.
+        """
+        cached_result: RAG_retrieval_result = _copy_result(result) #copied out of the lock, the records are not shared yet
+        with self._lock:
+            if(self._epochs.get(key[0], 0) != epoch):
+                return False
+            self._entries[key] = cached_result
+            self._entries.move_to_end(key)
+            self._keys_by_collection.setdefault(key[0], set()).add(key)
+            while(len(self._entries) > self.max_entries):
+                (evicted_key, _) = self._entries.popitem(last=False)
+                self._keys_by_collection[evicted_key[0]].discard(evicted_key)
+                self._evictions += 1
+            return True
+
+
+    def invalidate_collection(self, collection_name: str) -> None:
+        """
+        Drops all the cached results of the given collection, advancing its epoch.
+        """
+        with self._lock:
+            self._epochs[collection_name] = self._epochs.get(collection_name, 0) + 1
+            for key in self._keys_by_collection.pop(collection_name, set()):
+                if(self._entries.pop(key, None) is not None):
+                    self._invalidations += 1
+
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Returns the cache usage statistics.
+        """
+        with self._lock:
+            lookups: int = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if (lookups > 0) else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
+
+
+def _copy_result(result: list[RAG_DTModel]) -> RAG_retrieval_result:
+    """
+    Module private function copying a retrieval result along with its records (vectors and metadata lists included).
+    """
+    return RAG_retrieval_result(copy.deepcopy(list(result)), getattr(result, "is_partial", False))
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Module private function converting a JSON-like value into a hashable one (dict keys order and list/tuple types are ignored).
+    """
+    if(isinstance(value, dict)):
+        return tuple(sorted( (key, _freeze(item)) for (key, item) in value.items() ))
+    if(isinstance(value, (list, tuple, set))):
+        return tuple( _freeze(item) for item in value )
+    return value
@@ -0,0 +1,196 @@
+import math
+import os
+import threading
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+"""
+Static service module implementing a CPU-parallel scoring engine over vector matrices kept in shared memory.
+Every scored matrix is copied once into a 'multiprocessing.shared_memory' segment, so that a persistent pool of worker
+processes can attach it and score its own shard (contiguous rows range) without any vector being pickled per query.
+Workers only return the (score, row index) pairs of their shard winners to the parent, which merges them.
+This module must stay free of heavy imports, since it is re-imported by every spawned worker.
+"""
+
+SEGMENT_GROWTH_FACTOR = 1.5 #spare rows allocated on (re)allocation, so that appended rows are copied in place
+
+
+
+class Shared_vector_segment:
+    """
+    Float32 matrix stored in a shared memory segment, readable by the scoring workers.
+    The segment is append-friendly: new rows are copied after the last stored one while they fit in its capacity,
+    otherwise a new (larger) segment generation replaces the previous one.
+    Owners shared by several threads must hold 'lock' from 'synchronize' to the end of the scoring (and while releasing),
+    since a new generation unlinks the one the workers may be attaching.
+    """
+    def __init__(self, segment_key: str):
+        if((segment_key is None) or (segment_key.strip() == "")):
+            raise ValueError("The shared vector segment requires a key.")
+
+        self.segment_key: str = segment_key
+        self.count: int = 0
+        self.dimension: int = 0
+        self.capacity: int = 0
+        self.source_version: int = 0 #version of the mirrored matrix (es. the vector cache version)
+        self._generation: int = 0
+        self.lock: threading.Lock = threading.Lock() #see the class note, never taken by the methods themselves
+        self._segment: shared_memory.SharedMemory = None
+        self._matrix: numpy.ndarray = None
+
+
+    def get_name(self) -> str:
+        """
+        Returns the name of the current shared memory segment (None if nothing has been stored yet).
+        """
+        return None if (self._segment is None) else self._segment.name
+
+
+    def get_matrix(self) -> numpy.ndarray:
+        """
+        Returns the float32 view of the stored rows (shape: count x dimension).
+        """
+        if(self._matrix is None):
+            return numpy.empty((0, self.dimension), dtype=numpy.float32)
+        return self._matrix[:self.count]
+
+
+    def synchronize(self, source_matrix: numpy.ndarray, source_version: int = 0) -> None:
+        """
+        Makes the segment content equal to the given append-only matrix, copying only the rows added since the last call
+        (the whole matrix is copied if it shrank, if its dimension or version changed or if it no longer fits in the segment).
+        Parameters:
+            source_matrix (numpy.ndarray): The float32 matrix to share (es. the memory-mapped vector cache).
+            source_version (int, default: 0): The version of the matrix, changed whenever its rows are rebuilt.
+        """
+        (rows, dimension) = source_matrix.shape
+        if((rows < self.count) or ((self.count > 0) and (dimension != self.dimension)) or (rows > self.capacity) or 
+           (source_version != self.source_version)):
+            self._allocate(max(rows, 1), dimension)
+            self.source_version = source_version
+        if(rows > self.count):
+            self._matrix[self.count:rows] = source_matrix[self.count:rows]
+        self.count = rows
+
+
+    def release(self) -> None:
+        """
+        Closes and removes the shared memory segment.
+        """
+        self._matrix = None
+        if(self._segment is not None):
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+        self.count = 0
+        self.capacity = 0
+
+
+    def _allocate(self, rows: int, dimension: int) -> None:
+        """
+        Private method replacing the segment with an empty new generation able to store at least 'rows' rows.
+        """
+        self.release()
+        self._generation += 1
+        self.dimension = dimension
+        self.capacity = math.ceil(rows * SEGMENT_GROWTH_FACTOR)
+        self._segment = shared_memory.SharedMemory(
+                name=f"{self.segment_key}_{self._generation}", create=True,
+                size=max(self.capacity * dimension * numpy.dtype(numpy.float32).itemsize, 1))
+        self._matrix = numpy.ndarray((self.capacity, dimension), dtype=numpy.float32, buffer=self._segment.buf)
+
+
+
+
+class Sharded_scoring_pool:
+    """
+    Persistent pool of worker processes scoring the shards of shared vector segments.
+    Workers are spawned (not forked), so that the threads of the parent process (es. database drivers) are never duplicated.
+    """
+    def __init__(self, n_processes: int):
+        if((n_processes is None) or (n_processes < 1)):
+            raise ValueError("The number of scoring processes must be a positive integer.")
+
+        self.n_processes: int = n_processes
+        self._executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=n_processes, mp_context=get_context("spawn"))
+
+
+    def find_top_m_candidates(self, segment: Shared_vector_segment,
+                              query_matrix: numpy.ndarray, top_m: int) -> list[tuple[numpy.ndarray, numpy.ndarray]]:
+        """
+        Scores all the rows of the segment against every query, one shard per worker.
+        Parameters:
+            segment (Shared_vector_segment): The segment storing the normalized float32 vectors.
+            query_matrix (numpy.ndarray): The float32 normalized query vectors (one per row).
+            top_m (int): The number of candidates to collect per query.
+        Returns:
+            list[tuple[numpy.ndarray, numpy.ndarray]]: For each query, the scores and the segment row indexes of its
+                                                        (at most) 'top_m' best candidates, in descending score order.
+        """
+        if(segment.count == 0):
+            return [ (numpy.empty(0, dtype=numpy.float32), numpy.empty(0, dtype=numpy.int64)) for _ in range(query_matrix.shape[0]) ]
+
+        n_shards: int = min(self.n_processes, segment.count)
+        boundaries: list[int] = [ (segment.count * shard) // n_shards for shard in range(n_shards + 1) ]
+        shard_results: list[tuple[numpy.ndarray, numpy.ndarray]] = list(self._executor.map(
+                _score_shard,
+                [ segment.segment_key ] * n_shards, [ segment.get_name() ] * n_shards,
+                [ segment.capacity ] * n_shards, [ segment.dimension ] * n_shards,
+                boundaries[:-1], boundaries[1:], [ query_matrix ] * n_shards, [ top_m ] * n_shards))
+
+        all_scores: numpy.ndarray = numpy.concatenate([ scores for (scores, _) in shard_results ], axis=1)
+        all_indexes: numpy.ndarray = numpy.concatenate([ indexes for (_, indexes) in shard_results ], axis=1)
+        candidates: list[tuple[numpy.ndarray, numpy.ndarray]] = []
+        for (query_scores, query_indexes) in zip(all_scores, all_indexes):
+            order: numpy.ndarray = numpy.argsort(-query_scores, kind="stable")[:top_m]
+            candidates.append((query_scores[order], query_indexes[order]))
+        return candidates
+
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def build_segment_key(*names: str) -> str:
+    """
+    Returns a shared memory segment key unique to the current process and to the given names.
+    """
+    readable_name: str = "_".join(names)
+    return f"rag_{os.getpid()}_{abs(hash(readable_name)) % (10 ** 10)}"
+
+
+
+#region worker side
+
+_attached_segments: dict[str, shared_memory.SharedMemory] = dict() #segment key -> current generation attached by this worker
+
+
+def _score_shard(segment_key: str, segment_name: str, capacity: int, dimension: int,
+                 start: int, end: int, query_matrix: numpy.ndarray, top_m: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Module private function run by the workers: scores the rows [start, end) of the segment against every query.
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: The scores and the absolute row indexes of the shard winners
+                                                (shape: queries x min(top_m, shard rows)).
+    """
+    segment: shared_memory.SharedMemory = _attached_segments.get(segment_key)
+    if((segment is None) or (segment.name.lstrip("/") != segment_name.lstrip("/"))):
+        if(segment is not None): #a newer generation replaced the attached one
+            segment.close()
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _attached_segments[segment_key] = segment
+    shard_matrix = numpy.ndarray((capacity, dimension), dtype=numpy.float32, buffer=segment.buf)[start:end]
+
+    similarity_matrix: numpy.ndarray = query_matrix @ shard_matrix.T #queries x shard rows
+    m: int = min(top_m, end - start)
+    if(m < similarity_matrix.shape[1]):
+        indexes: numpy.ndarray = numpy.argpartition(-similarity_matrix, m - 1, axis=1)[:, :m]
+    else:
+        indexes = numpy.broadcast_to(numpy.arange(similarity_matrix.shape[1]), similarity_matrix.shape)
+    return (numpy.take_along_axis(similarity_matrix, indexes, axis=1), indexes + start)
+
+#endregion worker side
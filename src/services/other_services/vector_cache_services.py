@@ -0,0 +1,248 @@
+import json
+import os
+import re
+import numpy
+from typing import Any
+
+"""
+Static service module implementing a persistent on-disk cache of the vectors stored in a RAG collection.
+Each cached collection is represented by three files inside '<cache_folder>/<DB_name>/':
+    - '<collection>.f32': append-only raw float32 matrix (row-major, one row per record).
+    - '<collection>.ids': append-only raw matrix of 12-bytes record IDs (same row order of the vectors).
+    - '<collection>.json': the cache header (dimension, rows count, refresh watermark and source version).
+The matrix is memory-mapped at query time, so that a retrieval becomes a local matrix product.
+Readers score immutable snapshots (fixed rows count) of the cache, so appends never disturb a running retrieval,
+and rebuilds fill a new version of the files ('<collection>.v<N>.*') aside, which replaces the previous one once complete.
+"""
+
+OBJECT_ID_SIZE = 12
+
+
+
+class Vector_cache_snapshot:
+    """
+    Immutable view of the first 'count' rows of a vector cache version. 
+    Its memory mappings are opened once, so that the rows it covers stay readable while the cache grows or is replaced.
+    """
+    def __init__(self, vectors_file_path: str, ids_file_path: str, version: int, count: int, dimension: int):
+        self.version: int = version
+        self.count: int = count
+        self.dimension: int = dimension
+        if(count == 0):
+            self._matrix: numpy.ndarray = numpy.empty((0, dimension), dtype=numpy.float32)
+            self._ids: numpy.ndarray = numpy.empty((0, OBJECT_ID_SIZE), dtype=numpy.uint8)
+        else:
+            self._matrix = numpy.memmap(vectors_file_path, dtype=numpy.float32, mode="r", shape=(count, dimension))
+            self._ids = numpy.memmap(ids_file_path, dtype=numpy.uint8, mode="r", shape=(count, OBJECT_ID_SIZE))
+        self._offset_by_id: dict[bytes, int] = None #lazily built
+
+
+    def get_matrix(self) -> numpy.ndarray:
+        """
+        Returns the read-only memory-mapped float32 matrix of the cached vectors (shape: count x dimension).
+        """
+        return self._matrix
+
+
+    def get_id(self, offset: int) -> bytes:
+        """
+        Returns the 12-bytes ID of the record cached at the given row offset.
+        """
+        return bytes(self._ids[offset])
+
+
+    def get_offset(self, record_id: bytes) -> int:
+        """
+        Returns the row offset of the given record ID. None if the record is not cached.
+        """
+        if(self._offset_by_id is None):
+            self._offset_by_id = { self.get_id(offset): offset for offset in range(self.count) }
+        return self._offset_by_id.get(record_id)
+
+
+class Collection_vector_cache:
+    """
+    Persistent and incrementally refreshable cache of the vectors of a single collection.
+    The cache is append-only: new rows are added after the last cached record (the 'watermark'),
+    while a full rebuild is required whenever records are removed from the source collection.
+    Every append publishes a new snapshot (see 'get_snapshot'), and a rebuild is filled into the next version 
+    of the cache (see 'create_next_version') while the current one keeps serving the retrievals.
+    Writers (appends, resets) are meant to be serialized by the owner, readers need no locking.
+    """
+    def __init__(self, cache_folder_path: str, DB_name: str, collection_name: str, version: int = None):
+        if((cache_folder_path is None) or (cache_folder_path.strip() == "") or
+           (DB_name is None) or (collection_name is None)):
+            raise ValueError("One or more required parameters for the vector cache initialization are missing or invalid.")
+
+        self.cache_folder_path: str = cache_folder_path
+        self.DB_name: str = DB_name
+        self.collection_name: str = collection_name
+        folder_path: str = os.path.join(cache_folder_path, DB_name)
+        os.makedirs(folder_path, exist_ok=True)
+        if(version is None): #latest version on disk, the leftovers of the previous ones are removed
+            versions: list[int] = _find_versions(folder_path, collection_name)
+            version = versions[-1] if (len(versions) > 0) else 0
+            for old_version in versions[:-1]:
+                _remove_files(_build_file_paths(folder_path, collection_name, old_version))
+        self.version: int = version
+        (self.vectors_file_path, self.ids_file_path, self.header_file_path) = _build_file_paths(folder_path, collection_name, version)
+
+        self.dimension: int = 0
+        self.count: int = 0
+        self.watermark: str = None #hex representation of the last cached record ID
+        self.source_version: Any = None #JSON-serializable version of the source collection the cache reflects (set by the owner)
+
+        self._snapshot: Vector_cache_snapshot = None #lazily opened, replaced by every append
+
+        self._load_header()
+
+
+    def get_snapshot(self) -> Vector_cache_snapshot:
+        """
+        Returns the snapshot of the rows cached so far, unaffected by the following appends.
+        """
+        snapshot: Vector_cache_snapshot = self._snapshot
+        if(snapshot is None):
+            snapshot = Vector_cache_snapshot(self.vectors_file_path, self.ids_file_path, self.version, self.count, self.dimension)
+            self._snapshot = snapshot
+        return snapshot
+
+
+    def get_matrix(self) -> numpy.ndarray:
+        """
+        Returns the read-only memory-mapped float32 matrix of the cached vectors (shape: count x dimension).
+        """
+        return self.get_snapshot().get_matrix()
+
+
+    def get_id(self, offset: int) -> bytes:
+        """
+        Returns the 12-bytes ID of the record cached at the given row offset.
+        """
+        return self.get_snapshot().get_id(offset)
+
+
+    def get_offset(self, record_id: bytes) -> int:
+        """
+        Returns the row offset of the given record ID. None if the record is not cached.
+        """
+        return self.get_snapshot().get_offset(record_id)
+
+
+    def create_next_version(self) -> "Collection_vector_cache":
+        """
+        Returns the empty next version of the cache, to be filled aside while this one is still read.
+        """
+        next_cache = Collection_vector_cache(self.cache_folder_path, self.DB_name, self.collection_name, self.version + 1)
+        next_cache.reset() #leftovers of an interrupted rebuild
+        return next_cache
+
+
+    def append(self, record_ids: list[bytes], vectors_matrix: numpy.ndarray, watermark: str) -> None:
+        """
+        Appends new rows at the end of the cache and persists the new header.
+        Parameters:
+            record_ids (list[bytes]): The 12-bytes IDs of the new records.
+            vectors_matrix (numpy.ndarray): The vectors of the new records (same order of 'record_ids').
+            watermark (str): The hex ID of the last appended record.
+        """
+        if(len(record_ids) == 0):
+            return
+        if(self.dimension == 0):
+            self.dimension = vectors_matrix.shape[1]
+        elif(self.dimension != vectors_matrix.shape[1]):
+            raise ValueError(f"Vector dimension mismatch: the cache stores {self.dimension}-dims vectors, "
+                             f"while {vectors_matrix.shape[1]}-dims vectors have been provided.")
+
+        with open(self.vectors_file_path, "ab") as vectors_file:
+            vectors_file.write(numpy.ascontiguousarray(vectors_matrix, dtype=numpy.float32).tobytes())
+        with open(self.ids_file_path, "ab") as ids_file:
+            ids_file.write(b"".join(record_ids))
+
+        self.count += len(record_ids)
+        self.watermark = watermark
+        self._store_header()
+        self._snapshot = None #the following readers map the new rows too
+
+
+    def set_source_version(self, source_version: Any) -> None:
+        """
+        Records (and persists) the version of the source collection the cached rows reflect, 
+        so that the owner can tell whether the cache has to be refreshed.
+        """
+        self.source_version = source_version
+        self._store_header()
+
+
+    def reset(self) -> None:
+        """
+        Empties the cache (removing its files), so that the next refresh rebuilds it from scratch.
+        Snapshots taken before keep reading their rows, where the platform allows removing mapped files.
+        """
+        self._snapshot = None
+        _remove_files((self.vectors_file_path, self.ids_file_path, self.header_file_path))
+        self.dimension = 0
+        self.count = 0
+        self.watermark = None
+        self.source_version = None
+
+
+    def _load_header(self) -> None:
+        """
+        Private method loading the cache header, discarding the cache if the header does not match the data files.
+        """
+        if(not os.path.exists(self.header_file_path)):
+            self.reset()
+            return
+        with open(self.header_file_path, "r", encoding="utf-8") as header_file:
+            header: dict[str, any] = json.load(header_file)
+        self.dimension = header["dimension"]
+        self.count = header["count"]
+        self.watermark = header["watermark"]
+        self.source_version = header.get("source_version")
+
+        expected_size: int = self.count * self.dimension * numpy.dtype(numpy.float32).itemsize
+        if((not os.path.exists(self.vectors_file_path)) or (os.path.getsize(self.vectors_file_path) != expected_size) or
+           (not os.path.exists(self.ids_file_path)) or (os.path.getsize(self.ids_file_path) != self.count * OBJECT_ID_SIZE)):
+            self.reset() #interrupted append: rebuild
+
+
+    def _store_header(self) -> None:
+        """
+        Private method atomically replacing the cache header.
+        """
+        temporary_path: str = self.header_file_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as header_file:
+            json.dump({"dimension": self.dimension, "count": self.count, "watermark": self.watermark, 
+                       "source_version": self.source_version}, header_file)
+        os.replace(temporary_path, self.header_file_path)
+
+
+
+def _build_file_paths(folder_path: str, collection_name: str, version: int) -> tuple[str, str, str]:
+    """
+    Module private function returning the vectors, IDs and header file paths of a cache version
+    (the first version keeps the unversioned names).
+    """
+    base_name: str = collection_name if (version == 0) else f"{collection_name}.v{version}"
+    return tuple( os.path.join(folder_path, f"{base_name}{extension}") for extension in (".f32", ".ids", ".json") )
+
+
+def _find_versions(folder_path: str, collection_name: str) -> list[int]:
+    """
+    Module private function returning the (sorted) versions of the cache of a collection having a header on disk.
+    """
+    header_pattern: re.Pattern = re.compile(rf"{re.escape(collection_name)}(?:\.v(\d+))?\.json")
+    return sorted( int(match.group(1) or 0) for match in map(header_pattern.fullmatch, os.listdir(folder_path)) if match is not None )
+
+
+def _remove_files(file_paths: tuple[str, ...]) -> None:
+    """
+    Module private function removing the given files, ignoring the missing ones and the ones still in use 
+    (es. mapped by a reader on Windows).
+    """
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
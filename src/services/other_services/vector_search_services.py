@@ -0,0 +1,609 @@
+import heapq
+import numpy
+import threading
+import time
+from typing import Any, Hashable
+
+"""
+Static service module gathering the numerical kernels shared by the vectorial retrieval implementations.
+Vectors are handled as contiguous float32 'numpy' matrices, so that scoring happens in a single BLAS call per batch.
+"""
+
+
+
+class Top_m_candidates_heap:
+    """
+    Bounded min-heap collecting the 'top_m' best scored candidates met across several scoring batches.
+    Only the candidates beating the current heap threshold are turned into Python objects,
+    so that most of the records of a batch never leave the scoring matrix.
+    Every candidate can carry a group along with its payload (es. its near-duplicate group), None if not given.
+    """
+    def __init__(self, top_m: int):
+        if(top_m is None or top_m <= 0):
+            raise ValueError("The heap size 'top_m' must be a positive integer.")
+
+        self.top_m: int = top_m
+        self._heap: list[tuple[float, int, Any, numpy.ndarray, Any]] = []
+        self._insertion_counter: int = 0 #tie-breaker, so that payloads are never compared
+
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+    def get_threshold(self) -> float:
+        """
+        Returns the minimum score a candidate must exceed to enter the heap.
+        """
+        if(len(self._heap) < self.top_m):
+            return -numpy.inf
+        return self._heap[0][0]
+
+
+    def push_batch(self, scores: numpy.ndarray, payloads: list[Any], vectors: numpy.ndarray, groups: list[Any] = None) -> None:
+        """
+        Inserts the best candidates of a scored batch into the heap.
+        Parameters:
+            scores (numpy.ndarray): The 1-D similarity scores of the batch.
+            payloads (list[Any]): The objects paired with each score (same order of 'scores').
+            vectors (numpy.ndarray): The matrix of vectors paired with each score (same order of 'scores').
+                                        Surviving rows are copied, so the matrix can be safely reused afterwards.
+            groups (list[Any], optional): The groups paired with each score (same order of 'scores'). None if not known.
+        """
+        threshold: float = self.get_threshold()
+        for index in select_top_m_indexes(scores, self.top_m):
+            score = float(scores[index])
+            if(score <= threshold):
+                continue
+            entry = (score, self._insertion_counter, payloads[index], numpy.array(vectors[index], copy=True), 
+                     None if (groups is None) else groups[index])
+            self._insertion_counter += 1
+            if(len(self._heap) < self.top_m):
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heapreplace(self._heap, entry)
+            threshold = self.get_threshold()
+
+
+    def merge(self, other_heap: "Top_m_candidates_heap") -> None:
+        """
+        Inserts all the candidates of another heap into this one.
+        """
+        for (score, _, payload, vector, group) in other_heap._heap:
+            if(score <= self.get_threshold()):
+                continue
+            entry = (score, self._insertion_counter, payload, vector, group)
+            self._insertion_counter += 1
+            if(len(self._heap) < self.top_m):
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heapreplace(self._heap, entry)
+
+
+    def map_payloads(self, mapping_function) -> None:
+        """
+        Replaces in place every payload with the result of the given function applied on it
+        (es. converting storage offsets into record IDs only for the survivors).
+        """
+        self._heap = [ (score, counter, mapping_function(payload), vector, group) for (score, counter, payload, vector, group) in self._heap ]
+
+
+    def remove_payloads(self, payloads: set[Any]) -> None:
+        """
+        Removes the candidates paired with the given payloads (es. records removed after being scored).
+        The heap keeps its size: the following batches can fill it again.
+        """
+        self._heap = [ entry for entry in self._heap if entry[2] not in payloads ]
+        heapq.heapify(self._heap)
+
+
+    def get_sorted_candidates(self) -> list[tuple[float, Any, numpy.ndarray]]:
+        """
+        Returns the collected candidates as '(score, payload, vector)' tuples, in descending score order.
+        The heap content is left untouched.
+        """
+        return [ (score, payload, vector) for (score, _, payload, vector, _) in sorted(self._heap, reverse=True) ]
+
+
+    def get_sorted_groups(self) -> list[Any]:
+        """
+        Returns the groups of the collected candidates (None where not known), in the order of 'get_sorted_candidates'.
+        """
+        return [ group for (_, _, _, _, group) in sorted(self._heap, reverse=True) ]
+
+
+
+class Search_deadline:
+    """
+    Time budget of an 'anytime' search: the scans check it before fetching every new batch and stop once it is over,
+    keeping the best candidates found so far. It can be shared by the threads of a parallel scan.
+    """
+    def __init__(self, budget_ms: float):
+        if((budget_ms is None) or (budget_ms <= 0)):
+            raise ValueError("The search time budget must be a positive number of milliseconds.")
+
+        self.expiration_time: float = time.monotonic() + budget_ms / 1000
+        self.was_hit: bool = False #True if at least one scan stopped before its end
+
+
+    def is_expired(self) -> bool:
+        """
+        Returns True if the time budget is over (the deadline is then recorded as hit).
+        """
+        if(time.monotonic() >= self.expiration_time):
+            self.was_hit = True
+        return self.was_hit
+
+
+
+class Leader_clustering:
+    """
+    Incremental leader clustering of the vectors of a collection: a new vector joins the group of its most similar leader
+    if their similarity reaches 'tolerance', otherwise it becomes the leader of a new group.
+    A single pass in insertion order is enough, so groups can be assigned at ingest time; every assignment costs one
+    matrix-vector product against the leaders only.
+    """
+    def __init__(self, tolerance: float):
+        if((tolerance is None) or not (0 < tolerance <= 1)):
+            raise ValueError("The clustering tolerance must be in (0, 1].")
+
+        self.tolerance: float = tolerance
+        self._leaders_matrix: numpy.ndarray = None #preallocated float32 rows, the first 'len(self)' ones are used
+        self._group_ids: list[Any] = []
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._group_ids)
+
+
+    def find_nearest_leader(self, vector: numpy.ndarray) -> tuple[Any, float]:
+        """
+        Returns the group of the leader most similar to the given (normalized) vector, along with their similarity.
+        Returns:
+            tuple[Any, float]: The '(group ID, similarity)' pair. '(None, -inf)' if there are no leaders yet.
+        """
+        with self._lock:
+            if(len(self._group_ids) == 0):
+                return (None, -numpy.inf)
+            similarities: numpy.ndarray = self._leaders_matrix[:len(self._group_ids)] @ numpy.asarray(vector, dtype=numpy.float32)
+            best_index: int = int(numpy.argmax(similarities))
+            return (self._group_ids[best_index], float(similarities[best_index]))
+
+
+    def add_leaders(self, vectors_matrix: numpy.ndarray, group_ids: list[Any]) -> None:
+        """
+        Adds the given vectors as the leaders of the given groups (same order), growing the leaders matrix when needed.
+        """
+        vectors_matrix = numpy.atleast_2d(numpy.asarray(vectors_matrix, dtype=numpy.float32))
+        if(vectors_matrix.shape[0] != len(group_ids)):
+            raise ValueError("Each leader vector must be paired with its group ID.")
+        with self._lock:
+            count: int = len(self._group_ids)
+            if(self._leaders_matrix is None):
+                self._leaders_matrix = numpy.empty((max(16, vectors_matrix.shape[0]), vectors_matrix.shape[1]), dtype=numpy.float32)
+            elif(count + vectors_matrix.shape[0] > self._leaders_matrix.shape[0]): #amortized doubling
+                grown_matrix = numpy.empty((max(2 * self._leaders_matrix.shape[0], count + vectors_matrix.shape[0]), 
+                                            self._leaders_matrix.shape[1]), dtype=numpy.float32)
+                grown_matrix[:count] = self._leaders_matrix[:count]
+                self._leaders_matrix = grown_matrix
+            self._leaders_matrix[count:count + vectors_matrix.shape[0]] = vectors_matrix
+            self._group_ids.extend(group_ids)
+
+
+
+class Document_centroids:
+    """
+    Running centroids of the chunk vectors of each document: the sum and count of the vectors are kept per document, 
+    so that a new chunk updates its document in constant time. The centroids are normalized only when they are scored.
+    """
+    def __init__(self):
+        self._row_by_document: dict[Hashable, int] = dict()
+        self._documents: list[Hashable] = []
+        self._sums_matrix: numpy.ndarray = None #preallocated float64 rows, the first 'len(self)' ones are used
+        self._counts: list[int] = []
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+    def add_vectors(self, document_key: Hashable, vectors_matrix: numpy.ndarray) -> tuple[numpy.ndarray, int]:
+        """
+        Adds the given chunk vectors to the centroid of their document (created if missing).
+        Returns:
+            tuple[numpy.ndarray, int]: The updated vectors sum and chunks count of the document (es. to persist them).
+        """
+        vectors_matrix = numpy.atleast_2d(numpy.asarray(vectors_matrix, dtype=numpy.float64))
+        with self._lock:
+            row: int = self._get_row(document_key, vectors_matrix.shape[1])
+            self._sums_matrix[row] += vectors_matrix.sum(axis=0)
+            self._counts[row] += vectors_matrix.shape[0]
+            return (self._sums_matrix[row].copy(), self._counts[row])
+
+
+    def set_document(self, document_key: Hashable, vectors_sum: numpy.ndarray, count: int) -> None:
+        """
+        Sets the vectors sum and chunks count of a document (es. loading the persisted centroids).
+        """
+        vectors_sum = numpy.asarray(vectors_sum, dtype=numpy.float64)
+        with self._lock:
+            row: int = self._get_row(document_key, vectors_sum.shape[0])
+            self._sums_matrix[row] = vectors_sum
+            self._counts[row] = count
+
+
+    def get_documents(self) -> list[tuple[Hashable, numpy.ndarray, int]]:
+        """
+        Returns the '(document key, vectors sum, chunks count)' triple of every document.
+        """
+        with self._lock:
+            return [ (document_key, self._sums_matrix[row].copy(), self._counts[row]) for (row, document_key) in enumerate(self._documents) ]
+
+
+    def find_top_documents(self, query_array: numpy.ndarray, top_n: int, allowed_documents: set[Hashable] = None) -> list[Hashable]:
+        """
+        Scores the normalized centroids against the (normalized) query vector.
+        Parameters:
+            query_array (numpy.ndarray): The query vector.
+            top_n (int): The number of documents to return.
+            allowed_documents (set[Hashable], optional): The only documents which can be returned (es. a metadata-filtered subset).
+        Returns:
+            list[Hashable]: The keys of the 'top_n' documents closest to the query, best first.
+        """
+        with self._lock:
+            if((len(self._documents) == 0) or (top_n <= 0)):
+                return []
+            centroids_matrix: numpy.ndarray = normalize_rows(self._sums_matrix[:len(self._documents)].astype(numpy.float32))
+            scores: numpy.ndarray = centroids_matrix @ numpy.asarray(query_array, dtype=numpy.float32)
+            if(allowed_documents is not None):
+                scores[[ document_key not in allowed_documents for document_key in self._documents ]] = -numpy.inf
+                top_n = min(top_n, len(allowed_documents))
+            best_rows: numpy.ndarray = select_top_m_indexes(scores, top_n)
+            return [ self._documents[row] for row in best_rows[numpy.argsort(-scores[best_rows])] if scores[row] > -numpy.inf ]
+
+
+    def _get_row(self, document_key: Hashable, dimension: int) -> int:
+        """
+        Private method returning the row of the given document, appending a zero row for new documents 
+        (the sums matrix grows by amortized doubling). The caller must hold the lock.
+        """
+        if((self._sums_matrix is not None) and (self._sums_matrix.shape[1] != dimension)):
+            raise ValueError(f"Vector dimension mismatch: the centroids are {self._sums_matrix.shape[1]}-dimensional, not {dimension}-dimensional.")
+        if(document_key in self._row_by_document):
+            return self._row_by_document[document_key]
+        count: int = len(self._documents)
+        if(self._sums_matrix is None):
+            self._sums_matrix = numpy.zeros((16, dimension), dtype=numpy.float64)
+        elif(count == self._sums_matrix.shape[0]):
+            self._sums_matrix = numpy.vstack([ self._sums_matrix, numpy.zeros_like(self._sums_matrix) ])
+        self._row_by_document[document_key] = count
+        self._documents.append(document_key)
+        self._counts.append(0)
+        return count
+
+
+
+def select_top_m_indexes(scores: numpy.ndarray, top_m: int) -> numpy.ndarray:
+    """
+    Selects the indexes of the 'top_m' highest scores through a linear-time partial selection.
+    The returned indexes are NOT ordered.
+    Parameters:
+        scores (numpy.ndarray): The 1-D array of scores.
+        top_m (int): The number of indexes to select.
+    Returns:
+        numpy.ndarray: The indexes of the 'top_m' highest scores (all the indexes if 'top_m' exceeds the scores count).
+    """
+    if(top_m >= scores.shape[0]):
+        return numpy.arange(scores.shape[0])
+    return numpy.argpartition(scores, -top_m)[-top_m:]
+
+
+def decode_vectors_into_matrix(vectors: list[list[float]], matrix: numpy.ndarray = None) -> numpy.ndarray:
+    """
+    Copies a list of vectors into a float32 matrix, reusing the given buffer whenever it is large enough.
+    Parameters:
+        vectors (list[list[float]]): The vectors to decode (all of the same length).
+        matrix (numpy.ndarray, optional): The preallocated buffer to fill. A new one is allocated if missing or too small.
+    Returns:
+        numpy.ndarray: The (possibly newly allocated) buffer. Only its first 'len(vectors)' rows are meaningful.
+    """
+    dimension: int = len(vectors[0])
+    if((matrix is None) or (matrix.shape[0] < len(vectors)) or (matrix.shape[1] != dimension)):
+        matrix = numpy.empty((len(vectors), dimension), dtype=numpy.float32)
+    for (row_index, vector) in enumerate(vectors):
+        matrix[row_index] = vector
+    return matrix
+
+
+def train_kmeans_centroids(matrix: numpy.ndarray, n_clusters: int, iterations: int = 20, seed: int = 0, 
+                           spherical: bool = True) -> numpy.ndarray:
+    """
+    Trains k-means centroids on the given vectors.
+    Parameters:
+        matrix (numpy.ndarray): The float32 training vectors (one per row).
+        n_clusters (int): The number of centroids to train (capped to the number of training vectors).
+        iterations (int): The number of Lloyd iterations to perform.
+        seed (int): The seed of the random centroids initialization.
+        spherical (bool): If True, vectors are assigned by cosine similarity and centroids are normalized 
+                            (meant for normalized vectors). Otherwise the euclidean distance is used.
+    Returns:
+        numpy.ndarray: The float32 centroids matrix (shape: n_clusters x dimension).
+    """
+    if(matrix is None or matrix.shape[0] == 0):
+        raise ValueError("Cannot train k-means centroids on an empty matrix.")
+    n_clusters = min(n_clusters, matrix.shape[0])
+
+    random_generator = numpy.random.default_rng(seed)
+    centroids: numpy.ndarray = matrix[random_generator.choice(matrix.shape[0], size=n_clusters, replace=False)].astype(numpy.float32)
+    for _ in range(iterations):
+        assignments: numpy.ndarray = (assign_to_nearest_centroids(matrix, centroids) if spherical 
+                                        else _assign_to_nearest_euclidean_centroids(matrix, centroids))
+        new_centroids = numpy.zeros_like(centroids)
+        numpy.add.at(new_centroids, assignments, matrix)
+        cluster_sizes: numpy.ndarray = numpy.bincount(assignments, minlength=n_clusters)
+        empty_clusters: numpy.ndarray = (cluster_sizes == 0)
+        if(not spherical):
+            new_centroids[~empty_clusters] /= cluster_sizes[~empty_clusters, numpy.newaxis]
+        #re-seed empty clusters with random training vectors
+        new_centroids[empty_clusters] = matrix[random_generator.choice(matrix.shape[0], size=int(empty_clusters.sum()))]
+        centroids = normalize_rows(new_centroids) if spherical else new_centroids
+    return centroids
+
+
+def assign_to_nearest_centroids(matrix: numpy.ndarray, centroids: numpy.ndarray, n_nearest: int = 1) -> numpy.ndarray:
+    """
+    Assigns each vector to its nearest centroids (highest dot product).
+    Parameters:
+        matrix (numpy.ndarray): The vectors to assign (one per row). A 1-D vector is treated as a single row.
+        centroids (numpy.ndarray): The centroids matrix.
+        n_nearest (int): The number of nearest centroids to return per vector.
+    Returns:
+        numpy.ndarray: The nearest centroid index of each vector if 'n_nearest' is 1 (1-D array), 
+                        otherwise the 'n_nearest' centroid indexes of each vector in descending similarity order.
+    """
+    similarities: numpy.ndarray = numpy.atleast_2d(matrix) @ centroids.T
+    if(n_nearest == 1):
+        return numpy.argmax(similarities, axis=1)
+    n_nearest = min(n_nearest, centroids.shape[0])
+    nearest: numpy.ndarray = numpy.argpartition(-similarities, n_nearest - 1, axis=1)[:, :n_nearest]
+    order: numpy.ndarray = numpy.argsort(-numpy.take_along_axis(similarities, nearest, axis=1), axis=1)
+    return numpy.take_along_axis(nearest, order, axis=1)
+
+
+def normalize_rows(matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Scales every row of the given matrix to unit length (zero rows are left untouched).
+    """
+    norms: numpy.ndarray = numpy.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(numpy.float32)
+
+
+def validate_vectors_batch(vectors: list[list[float]], dimension: int, 
+                           norm_tolerance: float = 1e-3) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Checks a whole batch of vectors at once against the expected dimension and the unit length assumed by the retrieval.
+    Parameters:
+        vectors (list[list[float]]): The vectors to check.
+        dimension (int): The expected dimension.
+        norm_tolerance (float, default: 1e-3): The maximum deviation of a norm from 1 accepted as normalized.
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: 
+            - The boolean mask of the valid vectors (expected dimension and non-null norm).
+            - The boolean mask of the valid vectors which were not normalized.
+            - The float32 matrix of the normalized vectors (the rows of the invalid ones are zeros).
+    """
+    valid_mask: numpy.ndarray = numpy.array([ len(vector) == dimension for vector in vectors ], dtype=bool)
+    matrix: numpy.ndarray = numpy.zeros((len(vectors), dimension), dtype=numpy.float32)
+    if(valid_mask.any()):
+        matrix[valid_mask] = numpy.asarray([ vector for (vector, is_valid) in zip(vectors, valid_mask) if is_valid ], dtype=numpy.float32)
+    norms: numpy.ndarray = numpy.linalg.norm(matrix, axis=1)
+    valid_mask &= (norms > 0)
+    unnormalized_mask: numpy.ndarray = valid_mask & (numpy.abs(norms - 1) > norm_tolerance)
+    matrix[unnormalized_mask] /= norms[unnormalized_mask, numpy.newaxis]
+    return (valid_mask, unnormalized_mask, matrix)
+
+
+def train_product_quantizer(matrix: numpy.ndarray, n_subspaces: int, n_centroids: int = 256, 
+                            iterations: int = 20, seed: int = 0) -> numpy.ndarray:
+    """
+    Trains the codebooks of a product quantizer: vectors are split into 'n_subspaces' contiguous sub-vectors
+    and an euclidean k-means codebook is trained for each subspace.
+    Parameters:
+        matrix (numpy.ndarray): The float32 training vectors (one per row).
+        n_subspaces (int): The number of subspaces (it must divide the vectors dimension).
+        n_centroids (int): The number of centroids per subspace (at most 256, so that codes fit in one byte).
+        iterations (int): The number of k-means iterations per subspace.
+        seed (int): The seed of the random centroids initialization.
+    Returns:
+        numpy.ndarray: The float32 codebooks (shape: n_subspaces x n_centroids x subspace_dimension).
+    """
+    if(matrix.shape[1] % n_subspaces != 0):
+        raise ValueError(f"The vectors dimension ({matrix.shape[1]}) is not divisible by the number of subspaces ({n_subspaces}).")
+    if(n_centroids > 256):
+        raise ValueError("Product quantization codes are stored in one byte: at most 256 centroids per subspace are allowed.")
+    
+    n_centroids = min(n_centroids, matrix.shape[0])
+    subspace_dimension: int = matrix.shape[1] // n_subspaces
+    codebooks = numpy.zeros((n_subspaces, n_centroids, subspace_dimension), dtype=numpy.float32)
+    for subspace in range(n_subspaces):
+        sub_matrix: numpy.ndarray = matrix[:, subspace*subspace_dimension : (subspace+1)*subspace_dimension]
+        codebooks[subspace] = train_kmeans_centroids(sub_matrix, n_centroids, iterations, seed + subspace, spherical=False)
+    return codebooks
+
+
+def encode_product_quantization(matrix: numpy.ndarray, codebooks: numpy.ndarray) -> numpy.ndarray:
+    """
+    Encodes the given vectors into product quantization codes (one byte per subspace).
+    Returns:
+        numpy.ndarray: The uint8 codes matrix (shape: vectors_count x n_subspaces).
+    """
+    matrix = numpy.atleast_2d(matrix)
+    (n_subspaces, _, subspace_dimension) = codebooks.shape
+    codes = numpy.empty((matrix.shape[0], n_subspaces), dtype=numpy.uint8)
+    for subspace in range(n_subspaces):
+        sub_matrix: numpy.ndarray = matrix[:, subspace*subspace_dimension : (subspace+1)*subspace_dimension]
+        codes[:, subspace] = _assign_to_nearest_euclidean_centroids(sub_matrix, codebooks[subspace])
+    return codes
+
+
+def build_ADC_lookup_table(query_array: numpy.ndarray, codebooks: numpy.ndarray) -> numpy.ndarray:
+    """
+    Builds the asymmetric distance computation (ADC) lookup table of a query: 
+    the dot product between each query sub-vector and every centroid of the matching subspace.
+    Returns:
+        numpy.ndarray: The float32 lookup table (shape: n_subspaces x n_centroids).
+    """
+    (n_subspaces, _, subspace_dimension) = codebooks.shape
+    query_sub_vectors: numpy.ndarray = numpy.asarray(query_array, dtype=numpy.float32).reshape(n_subspaces, subspace_dimension)
+    return numpy.einsum("scd,sd->sc", codebooks, query_sub_vectors)
+
+
+def score_with_ADC(codes: numpy.ndarray, lookup_table: numpy.ndarray) -> numpy.ndarray:
+    """
+    Approximates the dot products between a query and the encoded vectors by summing the lookup table entries of their codes.
+    Parameters:
+        codes (numpy.ndarray): The uint8 codes matrix (shape: vectors_count x n_subspaces).
+        lookup_table (numpy.ndarray): The query lookup table built by 'build_ADC_lookup_table'.
+    Returns:
+        numpy.ndarray: The approximated scores (one per encoded vector).
+    """
+    return lookup_table[numpy.arange(lookup_table.shape[0]), codes].sum(axis=1, dtype=numpy.float32)
+
+
+def train_scalar_quantizer(matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Trains a symmetric int8 scalar quantizer: each dimension gets its own scale, mapping its maximum absolute value to 127.
+    Parameters:
+        matrix (numpy.ndarray): The float32 training vectors (one per row).
+    Returns:
+        numpy.ndarray: The float32 per-dimension scales.
+    """
+    scales: numpy.ndarray = numpy.abs(matrix).max(axis=0).astype(numpy.float32) / 127
+    scales[scales == 0] = 1 #constant dimensions
+    return scales
+
+
+def encode_scalar_quantization(matrix: numpy.ndarray, scales: numpy.ndarray) -> numpy.ndarray:
+    """
+    Encodes the given vectors into int8 codes (values beyond the trained range are clipped).
+    Returns:
+        numpy.ndarray: The int8 codes matrix (shape: vectors_count x dimension).
+    """
+    return numpy.clip(numpy.rint(numpy.atleast_2d(matrix) / scales), -127, 127).astype(numpy.int8)
+
+
+def build_SQ_query(query_array: numpy.ndarray, scales: numpy.ndarray) -> tuple[numpy.ndarray, float]:
+    """
+    Quantizes a query for the integer scoring of int8 codes: since q·x ≈ (q*scales)·codes, the scaled query is itself 
+    quantized to int8 values, so that the dot products can be accumulated on integers.
+    Returns:
+        tuple[numpy.ndarray, float]: The int32 query codes and the factor converting the integer dot products into scores.
+    """
+    scaled_query: numpy.ndarray = numpy.asarray(query_array, dtype=numpy.float32) * scales
+    query_factor: float = float(numpy.abs(scaled_query).max()) / 127
+    if(query_factor == 0):
+        return numpy.zeros(scaled_query.shape[0], dtype=numpy.int32), 0.0
+    return numpy.rint(scaled_query / query_factor).astype(numpy.int32), query_factor
+
+
+def score_with_SQ(codes: numpy.ndarray, query_codes: numpy.ndarray, query_factor: float) -> numpy.ndarray:
+    """
+    Approximates the dot products between a query and the int8 encoded vectors with an integer matrix-vector product.
+    Parameters:
+        codes (numpy.ndarray): The int8 codes matrix (shape: vectors_count x dimension).
+        query_codes, query_factor: The quantized query built by 'build_SQ_query'.
+    Returns:
+        numpy.ndarray: The approximated scores (one per encoded vector).
+    """
+    return (codes.astype(numpy.int32) @ query_codes).astype(numpy.float32) * numpy.float32(query_factor)
+
+
+def encode_sign_bits(matrix: numpy.ndarray, center: numpy.ndarray) -> numpy.ndarray:
+    """
+    Encodes the given vectors into binary codes: one bit per dimension, set if the centered value is positive,
+    packed into bytes (es. a 1024-dims vector becomes 128 bytes).
+    Parameters:
+        matrix (numpy.ndarray): The float32 vectors (one per row).
+        center (numpy.ndarray): The vector subtracted before taking the signs (es. the collection mean), 
+                                    so that every bit splits the vectors in a balanced way.
+    Returns:
+        numpy.ndarray: The uint8 codes matrix (shape: vectors_count x ceil(dimension / 8)).
+    """
+    return numpy.packbits(numpy.atleast_2d(matrix) > center, axis=1)
+
+
+def score_with_hamming(codes: numpy.ndarray, query_codes: numpy.ndarray) -> numpy.ndarray:
+    """
+    Scores the binary encoded vectors by their (negated) Hamming distance from the query codes, 
+    computed as a vectorized popcount of the XOR-ed bytes.
+    Returns:
+        numpy.ndarray: The float32 scores (higher is closer).
+    """
+    return -_popcount(numpy.bitwise_xor(codes, query_codes)).sum(axis=1, dtype=numpy.int32).astype(numpy.float32)
+
+
+def _assign_to_nearest_euclidean_centroids(matrix: numpy.ndarray, centroids: numpy.ndarray) -> numpy.ndarray:
+    """
+    Module private function assigning each vector to its nearest centroid by euclidean distance.
+    argmin(|x - c|^2) is computed as argmax(x·c - |c|^2 / 2), so that a single matrix product is needed.
+    """
+    return numpy.argmax(matrix @ centroids.T - 0.5 * numpy.einsum("cd,cd->c", centroids, centroids), axis=1)
+
+
+def select_non_redundant_candidates(similarities: numpy.ndarray, vectors: numpy.ndarray, top_k: int, 
+                                    redundancy_tolerance: float = None, mmr_lambda: float = None) -> list[int]:
+    """
+    Greedy Maximal Marginal Relevance (MMR) selection of 'top_k' non-redundant candidates.
+    The candidates Gram matrix is computed once, then each step picks the candidate with the best marginal relevance,
+    updating the redundancy of the remaining candidates with a single vectorized row operation.
+    Parameters:
+        similarities (numpy.ndarray): The similarity of each candidate to the query.
+        vectors (numpy.ndarray): The normalized candidate vectors (one per row, same order of 'similarities').
+        top_k (int): The maximum number of candidates to select.
+        redundancy_tolerance (float, optional): Candidates whose similarity to an already selected one reaches this value
+                                                    are discarded (no hard cut if None).
+        mmr_lambda (float, optional): The relevance/diversity trade-off in [0, 1] of the marginal relevance
+                                        'lambda * similarity - (1 - lambda) * max_similarity_to_selected'.
+                                        If None, candidates are picked by pure relevance (same as 'mmr_lambda' = 1).
+    Returns:
+        list[int]: The indexes of the selected candidates, in selection order.
+    """
+    candidates_count: int = similarities.shape[0]
+    if(candidates_count == 0 or top_k <= 0):
+        return []
+    gram_matrix: numpy.ndarray = vectors @ vectors.T
+    relevance: numpy.ndarray = numpy.asarray(similarities, dtype=numpy.float32)
+    max_redundancy: numpy.ndarray = numpy.full(candidates_count, -numpy.inf, dtype=numpy.float32)
+    is_available: numpy.ndarray = numpy.ones(candidates_count, dtype=bool)
+
+    selected_indexes: list[int] = []
+    while(len(selected_indexes) < top_k):
+        if(redundancy_tolerance is not None):
+            is_available &= (max_redundancy < redundancy_tolerance)
+        if(not is_available.any()):
+            break
+        if((mmr_lambda is None) or (len(selected_indexes) == 0)):
+            marginal_relevance: numpy.ndarray = relevance
+        else:
+            marginal_relevance = mmr_lambda * relevance - (1 - mmr_lambda) * max_redundancy
+        best_index: int = int(numpy.argmax(numpy.where(is_available, marginal_relevance, -numpy.inf)))
+
+        selected_indexes.append(best_index)
+        is_available[best_index] = False
+        numpy.maximum(max_redundancy, gram_matrix[best_index], out=max_redundancy)
+    return selected_indexes
+
+
+_POPCOUNT_TABLE: numpy.ndarray = numpy.array([ bin(byte).count("1") for byte in range(256) ], dtype=numpy.uint8)
+
+
+def _popcount(byte_matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Module private function counting the set bits of every byte (native instruction with NumPy 2, lookup table otherwise).
+    """
+    if(hasattr(numpy, "bitwise_count")):
+        return numpy.bitwise_count(byte_matrix)
+    return _POPCOUNT_TABLE[byte_matrix]
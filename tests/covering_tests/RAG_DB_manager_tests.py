@@ -0,0 +1,162 @@
+import os
+import sys
+import unittest
+import numpy
+from unittest import mock
+
+import src.services.db_services.RAG_DB_operators as RAG_operators
+# the manager imports the RAG operators module by its lowercase name (resolved by case-insensitive file systems only)
+sys.modules.setdefault("src.services.db_services.rag_DB_operators", RAG_operators)
+import src.managers.DB_managers as DB_managers
+from src.models.config_models import RAG_DB_config
+from src.models.data_models import RAG_DTModel, RAG_search_options
+from src.common.constants import (Featured_RAG_DB_engines_enum as RAG_DB_engines, 
+                                  Featured_vector_storage_formats_enum as vector_storage_formats, 
+                                  Featured_access_paths_enum as access_paths)
+from RAG_test_helpers import RAG_MongoDB_tester, expire_deadline
+
+
+class RAG_DB_manager_tester(RAG_MongoDB_tester):
+
+    def test_batched_retrieval(self):
+        DB_manager = self._build_populated_manager(batch_size=64)
+        vector_queries = self.vectors[[3, 50, 222]].tolist()
+        batched_results = DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, vector_queries, 5, 
+                                                                          metadata_filter={"url": "https://doc3.com"})
+        single_results = [ DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, vector_query, 5, 
+                                                                         metadata_filter={"url": "https://doc3.com"}) 
+                                for vector_query in vector_queries ]
+        self.assertEqual([ [ data_model.text for data_model in result ] for result in batched_results ], 
+                         [ [ data_model.text for data_model in result ] for result in single_results ])
+        for result in batched_results:
+            self.assertEqual(len(result), 5)
+            self.assertTrue(all( data_model.url == "https://doc3.com" for data_model in result ))
+        with self.assertRaises(ValueError):
+            DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, vector_queries, 5, metadata_filter={"text": "chunk 3"})
+
+
+    def test_result_cache(self):
+        DB_manager = self._build_populated_manager(count=300, result_cache_size=8)
+        query = self.vectors[5].tolist()
+        first_result = DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)
+        cached_result = DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)
+        self.assertEqual([ data_model.text for data_model in cached_result ], [ data_model.text for data_model in first_result ])
+        self.assertEqual((DB_manager.get_result_cache_stats()["hits"], DB_manager.get_result_cache_stats()["misses"]), (1, 1))
+        cached_result[0].text = "modified by the caller"
+        self.assertEqual(DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)[0].text, first_result[0].text)
+        # the batched retrieval only sends the queries missing from the cache
+        batched_results = DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, [query, self.vectors[6].tolist()], 5)
+        self.assertEqual(batched_results[0][0].text, first_result[0].text)
+        self.assertEqual(DB_manager.get_result_cache_stats()["entries"], 2)
+
+        # writes drop the cached results of their collection
+        duplicate_model = self._build_data_models(1, first_row=5)[0]
+        (duplicate_model.text, duplicate_model.id) = ("chunk 5 duplicate", "5 duplicate")
+        self.assertTrue(DB_manager.insert_record(self.collection_name, duplicate_model))
+        self.assertEqual(DB_manager.get_result_cache_stats()["entries"], 0)
+        retrieved_texts = [ data_model.text for data_model in 
+                                DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5, redundancy_tolerance=1.01) ]
+        self.assertEqual(sorted(retrieved_texts[:2]), ["chunk 5", "chunk 5 duplicate"])
+
+        # and so do the maintenance operations
+        for maintenance in [ lambda: DB_manager.train_IVF_index(self.collection_name, n_lists=4), 
+                             lambda: DB_manager.migrate_vector_storage(self.collection_name, vector_storage_formats.FLOAT32), 
+                             lambda: DB_manager.start_vector_storage_migration(self.collection_name, vector_storage_formats.ARRAY).result() ]:
+            DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)
+            self.assertGreater(DB_manager.get_result_cache_stats()["entries"], 0)
+            maintenance()
+            self.assertEqual(DB_manager.get_result_cache_stats()["entries"], 0)
+
+
+    def test_partial_results_not_cached(self):
+        DB_manager = self._build_populated_manager(batch_size=64, result_cache_size=8, retrieval_deadline_ms=60000)
+        query = self.vectors[17].tolist()
+        with mock.patch.object(RAG_operators.vectorSearch.Search_deadline, "is_expired", expire_deadline):
+            self.assertTrue(DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5).is_partial)
+            self.assertTrue(all( result.is_partial for result in 
+                                    DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, [query, query], 5) ))
+        self.assertEqual(DB_manager.get_result_cache_stats()["entries"], 0)
+        # complete results are cached
+        self.assertFalse(DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5).is_partial)
+        self.assertEqual(DB_manager.get_result_cache_stats()["entries"], 1)
+
+
+    def test_embedder_partitions(self):
+        registry_folder_path = self._create_temporary_folder()
+        DB_manager = self._build_populated_manager(count=100, embedder_registry_path=os.path.join(registry_folder_path, "registry.sqlite"))
+        other_embedder = "text-embedding-3-small"
+        other_vectors = self.vectors[100:150, :8] / numpy.linalg.norm(self.vectors[100:150, :8], axis=1, keepdims=True)
+        other_data_models = [ RAG_DTModel(vector=vector.tolist(), text=f"small chunk {row}", embedder_name=other_embedder, 
+                                          url="https://small.com", id=str(row)) for (row, vector) in enumerate(other_vectors) ]
+        other_data_models[0].vector = (2 * other_vectors[0]).tolist() #normalized before the insertion
+        other_data_models[1].vector = self.vectors[0].tolist() #wrong dimension: rejected
+        self.assertFalse(DB_manager.insert_records(self.collection_name, other_data_models))
+        
+        partitions = DB_manager.partition_registry.get_partitions(self.collection_name)
+        self.assertEqual(partitions, {self.samples["RAG_test_embedder"]: (f"{self.collection_name}-llama-text-embed-v2", 16), 
+                                      other_embedder: (f"{self.collection_name}-text-embedding-3-small", 8)})
+        other_collection = DB_manager.DB_operator.database[partitions[other_embedder][0]]
+        self.assertEqual(other_collection.count_documents({}), 49)
+        self.assertAlmostEqual(float(numpy.linalg.norm(other_collection.find_one({"text": "small chunk 0"})["vector"])), 1.0, places=5)
+        
+        # every query is routed to the partition of its embedder
+        with self.assertRaises(ValueError): #ambiguous
+            DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, self.vectors[3].tolist(), 5)
+        with self.assertRaises(ValueError): #dimension of the other embedder
+            DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, self.vectors[3].tolist(), 5, embedder_name=other_embedder)
+        with self.assertRaises(ValueError): #unknown embedder
+            DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, self.vectors[3].tolist(), 5, embedder_name="unknown")
+        retrieved = DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, self.vectors[3].tolist(), 5, 
+                                                                  embedder_name=self.samples["RAG_test_embedder"])
+        self.assertEqual(retrieved[0].text, "chunk 3")
+        retrieved = DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, [other_vectors[5].tolist()], 5, 
+                                                                    embedder_name=other_embedder)
+        self.assertEqual(retrieved[0][0].text, "small chunk 5")
+        self.assertTrue(all( data_model.embedder_name == other_embedder for data_model in retrieved[0] ))
+        with self.assertRaises(ValueError):
+            DB_manager.register_embedder_partition(self.collection_name, other_embedder, 16)
+
+
+    def test_query_planner(self):
+        DB_manager = self._build_populated_manager(count=300, planner_latency_target_ms=1e-6, 
+                                                   vector_storage_format=vector_storage_formats.FLOAT32)
+        query = self.vectors[17].tolist()
+        exact_texts = [ data_model.text for data_model in DB_manager.DB_operator.retrieve_embeddings_from_vector(self.collection_name, query, 5) ]
+        with (mock.patch.object(DB_manager.DB_operator, "get_collection_statistics", 
+                                wraps=DB_manager.DB_operator.get_collection_statistics) as statistics_loader, 
+              mock.patch.object(DB_manager.DB_operator, "retrieve_embeddings_from_vector", 
+                                wraps=DB_manager.DB_operator.retrieve_embeddings_from_vector) as retrieval):
+            # binary vectors cannot be scored server-side: before any index is trained only the exact scan is available
+            with self.assertLogs(level="INFO") as logs:
+                retrieved = DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)
+            self.assertTrue(any( "Retrieval plan for" in line for line in logs.output ))
+            self.assertEqual([ data_model.text for data_model in retrieved ], exact_texts)
+            self.assertIsNone(retrieval.call_args.kwargs["search_options"].access_path)
+            
+            # insertions update the cached statistics, which are reloaded after a maintenance operation
+            self.assertTrue(DB_manager.insert_records(self.collection_name, self._build_data_models(10, first_row=300)))
+            self.assertEqual(DB_manager.query_planner.get_statistics(self.collection_name, statistics_loader).count, 310)
+            self.assertEqual(statistics_loader.call_count, 1)
+            self.assertTrue(DB_manager.train_IVF_index(self.collection_name, n_lists=4))
+            # no path meets the target: the cheapest one probes a single IVF list
+            DB_manager.retrieve_vectors_using_vectorQuery(self.collection_name, query, 5)
+            self.assertEqual(statistics_loader.call_count, 2)
+            self.assertEqual(retrieval.call_args.kwargs["search_options"], RAG_search_options(access_paths.IVF, top_m=34, nprobe=1))
+            # and the batched retrieval serves the approximate plan one query at a time
+            retrieval.reset_mock()
+            DB_manager.retrieve_vectors_using_vectorQueries(self.collection_name, [query, self.vectors[18].tolist()], 5)
+            self.assertEqual(retrieval.call_count, 2)
+
+
+    def _build_populated_manager(self, count: int = None, **config_options) -> DB_managers.RAG_DB_manager:
+        """
+        Builds a manager of a new in-memory MongoDB and inserts the sample records (the first 'count' ones if given).
+        """
+        DB_manager = DB_managers.RAG_DB_manager(RAG_DB_config(RAG_DB_engines.MONGODB, connection_url="mongodb://localhost:27017/", 
+                                                              database_name=self.samples["RAG_test_db_name"], **config_options))
+        self.addCleanup(DB_manager.disconnect)
+        return self._populate(DB_manager, count)
+
+
+if __name__ == "__main__":
+    unittest.main()
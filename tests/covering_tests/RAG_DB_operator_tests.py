@@ -0,0 +1,795 @@
+import datetime
+import functools
+import unittest
+import numpy
+import mongomock
+from unittest import mock
+from bson import ObjectId
+
+import src.services.db_services.RAG_DB_operators as RAG_operators
+from src.models.data_models import RAG_DTModel, RAG_search_options
+from src.common.constants import (REDUNDANCY_TOLERANCE, Featured_vector_compressions_enum as compressions, 
+                                  Featured_vector_storage_formats_enum as storage_formats, 
+                                  Featured_retrieval_modes_enum as retrieval_modes, 
+                                  Featured_access_paths_enum as access_paths)
+from RAG_test_helpers import RAG_MongoDB_tester, mean_recall, expire_deadline, document_probe_rows
+
+
+class RAG_MongoDB_operator_tester(RAG_MongoDB_tester):
+
+    def test_exact_retrieval(self):
+        DB_operator = self._build_populated_operator(batch_size=64)
+        for query_index in [0, 17, 123]:
+            query = self.vectors[query_index]
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(query, 5))
+            self.assertFalse(retrieved.is_partial)
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 0), [])
+
+
+    def test_vector_cache_retrieval(self):
+        vector_cache_folder_path = self._create_temporary_folder()
+        DB_operator = self._build_populated_operator(count=300, batch_size=64, vector_cache_folder_path=vector_cache_folder_path)
+        rows = list(range(300))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[5], 5, rows))
+        cache = DB_operator._get_vector_cache(self.collection_name)
+        self.assertEqual(cache.count, 300)
+
+        # the records inserted afterwards are appended to the cache by the next retrieval
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(50, first_row=300)))
+        rows = list(range(350))
+        for query_index in [5, 320]:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[query_index], 5, rows))
+        self.assertEqual((cache.count, cache.version), (350, 0))
+        
+        # removed records trigger a rebuild into the next version
+        DB_operator.database[self.collection_name].delete_one({"text": "chunk 320"})
+        rows.remove(320)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[320].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[320], 5, rows))
+        self.assertEqual((DB_operator._get_vector_cache(self.collection_name).count, 
+                          DB_operator._get_vector_cache(self.collection_name).version), (349, 1))
+
+
+    def test_vector_cache_write_versions(self):
+        vector_cache_folder_path = self._create_temporary_folder()
+        DB_operator = self._build_populated_operator(count=300, batch_size=64, vector_cache_folder_path=vector_cache_folder_path)
+        collection = DB_operator.database[self.collection_name]
+        rows = list(range(300))
+        DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 5)
+        cache = DB_operator._get_vector_cache(self.collection_name)
+        self.assertEqual((cache.count, cache.source_version), (300, {"inserts": 1, "rewrites": 0}))
+        self.assertEqual(DB_operator.refresh_vector_cache(self.collection_name), 0) #up to date: nothing read
+        
+        # a record written by another client with a lower ID than the cache watermark
+        old_record_id = ObjectId.from_datetime(datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        collection.insert_one({"_id": old_record_id, "id": "300", "text": "chunk 300", "vector": self.vectors[300].tolist(), 
+                               "metadata": {"url": "https://doc6.com", "title": None, "pages": None, "author": None, 
+                                            "embedder": self.samples["RAG_test_embedder"]}})
+        DB_operator._record_write(self.collection_name)
+        rows.append(300)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[300].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[300], 5, rows))
+        self.assertEqual((cache.count, cache.version), (301, 0))
+        
+        # a removed record replaced by a new one: its stale row fails the hydration and the cache is rebuilt
+        collection.delete_one({"text": "chunk 17"})
+        rows.remove(17)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(1, first_row=301)))
+        rows.append(301)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5, rows))
+        retrieved = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, [self.vectors[17].tolist()], 5)
+        self.assertEqual([ data_model.text for data_model in retrieved[0] ], self._exact_top_k(self.vectors[17], 5, rows))
+        DB_operator.refresh_vector_cache(self.collection_name)
+        cache = DB_operator._get_vector_cache(self.collection_name)
+        self.assertEqual((cache.count, cache.version), (301, 1))
+        
+        # an updated vector is reflected by the cache rebuilt after the rewrite
+        updated_model = self._build_data_models(1, first_row=7)[0]
+        updated_model.vector = self.vectors[8].tolist()
+        self.assertTrue(DB_operator.update_record(self.collection_name, updated_model))
+        self.assertEqual(collection.count_documents({"text": "chunk 7"}), 1)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[8].tolist(), 2, redundancy_tolerance=1.01)
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 7", "chunk 8"])
+        cache = DB_operator._get_vector_cache(self.collection_name)
+        self.assertEqual((cache.version, cache.source_version["rewrites"]), (2, 1))
+
+
+    def test_IVF_retrieval(self):
+        DB_operator = self._build_populated_operator()
+        self.assertTrue(DB_operator.train_IVF_index(self.collection_name, n_lists=16))
+        query_indexes = range(0, self.vectors.shape[0], 20)
+        recalls: dict[int, float] = dict()
+        for nprobe in [4, 16]:
+            retrieved_lists = [ [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                                        self.collection_name, self.vectors[query_index].tolist(), 10, 
+                                        search_options=RAG_search_options(nprobe=nprobe)) ] 
+                                    for query_index in query_indexes ]
+            recalls[nprobe] = mean_recall(retrieved_lists, [ self._exact_top_k(self.vectors[query_index], 10) 
+                                                             for query_index in query_indexes ])
+        self.assertEqual(recalls[16], 1.0) #all the lists probed: exact search
+        self.assertGreaterEqual(recalls[4], 0.6)
+        
+        # records inserted afterwards are labelled with their inverted list
+        DB_operator.database[self.collection_name].delete_one({"text": "chunk 0"})
+        self.assertTrue(DB_operator.insert_record(self.collection_name, self._build_data_models(1)[0]))
+        self.assertIn(RAG_operators.IVF_LIST_FIELD, DB_operator.database[self.collection_name].find_one({"text": "chunk 0"}))
+        self.assertFalse(DB_operator.train_IVF_index("empty_collection"))
+
+        # the records inserted during a training (labelled with the previous centroids, or with none) are labelled again
+        collection = DB_operator.database[self.collection_name]
+        collection.delete_many({"text": {"$in": ["chunk 1", "chunk 2"]}})
+        labelling_function = DB_operator._set_fields_computed_from_vectors
+        def insert_during_labelling(target_collection_name, *args):
+            labelling_function(target_collection_name, *args)
+            if(len(args) == 1): #first pass
+                self.assertTrue(DB_operator.insert_record(self.collection_name, self._build_data_models(1, first_row=1)[0]))
+                collection.insert_one({**collection.find_one({"text": "chunk 0"}, {"_id": 0, RAG_operators.IVF_LIST_FIELD: 0}), 
+                                       "text": "chunk 2", "vector": self.vectors[2].tolist()})
+        with mock.patch.object(DB_operator, "_set_fields_computed_from_vectors", side_effect=insert_during_labelling):
+            self.assertTrue(DB_operator.train_IVF_index(self.collection_name, n_lists=8))
+        centroids = DB_operator._get_index_structure(self.collection_name, "ivf")
+        self.assertEqual(centroids.shape[0], 8)
+        for row in [1, 2]:
+            self.assertEqual(collection.find_one({"text": f"chunk {row}"})[RAG_operators.IVF_LIST_FIELD], 
+                             int(numpy.ravel(RAG_operators.vectorSearch.assign_to_nearest_centroids(self.vectors[row][numpy.newaxis], centroids))[0]))
+
+
+    def test_PQ_retrieval(self):
+        DB_operator = self._build_populated_operator()
+        with self.assertRaises(ValueError): #codes not trained yet
+            DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 10, 
+                                                        search_options=RAG_search_options(vector_compression=compressions.PRODUCT_QUANTIZATION))
+        self.assertTrue(DB_operator.train_PQ_index(self.collection_name, n_subspaces=4))
+        self.assertEqual(len(DB_operator.database[self.collection_name].find_one()[RAG_operators.PQ_CODES_FIELD]), 4)
+        # the PQ shortlist (a few times 'top_m') is rescored with the full precision vectors
+        self.assertGreaterEqual(self._mean_recall_of(DB_operator, search_options=RAG_search_options(vector_compression=compressions.PRODUCT_QUANTIZATION, top_m=10)), 0.9)
+        self.assertFalse(DB_operator.train_PQ_index("empty_collection"))
+
+
+    def _build_populated_operator(self, count: int = None, **operator_options) -> RAG_operators.RAG_MongoDB_operator:
+        """
+        Builds a MongoDB operator on a new in-memory DB and inserts the sample records (the first 'count' ones if given).
+        """
+        DB_operator = RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], 
+                                                         **operator_options)
+        self.addCleanup(DB_operator.close_connection)
+        return self._populate(DB_operator, count)
+
+
+    def test_SQ_retrieval(self):
+        DB_operator = self._build_populated_operator()
+        with self.assertRaises(ValueError): #codes not trained yet
+            DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 10, 
+                                                        search_options=RAG_search_options(vector_compression=compressions.SCALAR_QUANTIZATION_INT8))
+        self.assertTrue(DB_operator.train_SQ_index(self.collection_name))
+        self.assertEqual(len(DB_operator.database[self.collection_name].find_one()[RAG_operators.SQ_CODES_FIELD]), 16)
+        # the int8 shortlist (a few times 'top_m') is rescored with the full precision vectors
+        self.assertGreaterEqual(self._mean_recall_of(DB_operator, search_options=RAG_search_options(vector_compression=compressions.SCALAR_QUANTIZATION_INT8, top_m=10)), 0.95)
+        
+        # records inserted afterwards are encoded on insertion
+        DB_operator.database[self.collection_name].delete_one({"text": "chunk 0"})
+        self.assertTrue(DB_operator.insert_record(self.collection_name, self._build_data_models(1)[0]))
+        self.assertIn(RAG_operators.SQ_CODES_FIELD, DB_operator.database[self.collection_name].find_one({"text": "chunk 0"}))
+        self.assertFalse(DB_operator.train_SQ_index("empty_collection"))
+
+
+    def test_binary_retrieval(self):
+        DB_operator = self._build_populated_operator()
+        with self.assertRaises(ValueError): #codes not computed yet
+            DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 10, 
+                                                        search_options=RAG_search_options(vector_compression=compressions.BINARY_SIGN))
+        self.assertTrue(DB_operator.train_binary_index(self.collection_name))
+        self.assertEqual(len(DB_operator.database[self.collection_name].find_one()[RAG_operators.SIGN_CODES_FIELD]), 2)
+        # the Hamming shortlist (a few times 'top_m') is rescored with the full precision vectors
+        self.assertGreaterEqual(self._mean_recall_of(DB_operator, search_options=RAG_search_options(vector_compression=compressions.BINARY_SIGN, top_m=10)), 0.85)
+        self.assertFalse(DB_operator.train_binary_index("empty_collection"))
+
+
+    def test_hybrid_retrieval(self):
+        DB_operator = RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], batch_size=64)
+        self.addCleanup(DB_operator.close_connection)
+        data_models = self._build_data_models()
+        lexical_rows = [250, 260, 270]
+        for row in lexical_rows:
+            data_models[row].text += " transformer attention"
+        self.assertTrue(DB_operator.insert_records(self.collection_name, data_models))
+        query = self.vectors[0].tolist()
+        dense_texts = self._exact_top_k(self.vectors[0], 3, redundancy_tolerance=1.01)
+        lexical_texts = [ data_models[row].text for row in lexical_rows ]
+        
+        # the fused ranking interleaves the best records of the dense and BM25 rankings
+        retrieved = DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "Transformer", query, 6, 
+                                                                         redundancy_tolerance=1.01)
+        self.assertEqual({ data_model.text for data_model in retrieved }, set(dense_texts + lexical_texts))
+        retrieved = DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "Transformer", query, 6, 
+                                                                         retrieval_mode=retrieval_modes.VECTOR, redundancy_tolerance=1.01)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[0], 6, redundancy_tolerance=1.01))
+        
+        # the lexical shortlist is ranked by the dense similarity
+        retrieved = DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "attention", query, 3, 
+                                                                         retrieval_mode=retrieval_modes.LEXICAL_SHORTLIST)
+        self.assertEqual([ data_model.text for data_model in retrieved ], 
+                         [ data_models[row].text for row in sorted(lexical_rows, key=lambda row: -float(self.vectors[row] @ self.vectors[0])) ])
+        # too few records share the query terms: dense retrieval
+        retrieved = DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "attention", query, 5, 
+                                                                         retrieval_mode=retrieval_modes.LEXICAL_SHORTLIST)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[0], 5))
+        
+        # the BM25 index is kept up to date by the insertions
+        new_model = self._build_data_models(1, first_row=399)[0]
+        DB_operator.database[self.collection_name].delete_one({"text": new_model.text})
+        new_model.text += " attention"
+        self.assertTrue(DB_operator.insert_record(self.collection_name, new_model))
+        retrieved = DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "attention", query, 4, 
+                                                                         retrieval_mode=retrieval_modes.LEXICAL_SHORTLIST)
+        self.assertIn(new_model.text, [ data_model.text for data_model in retrieved ])
+
+
+    def test_deadline_retrieval(self):
+        DB_operator = self._build_populated_operator(batch_size=64)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, deadline_ms=60000)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5))
+        self.assertFalse(retrieved.is_partial)
+        
+        # the deadline is over after the first batch: only the newest records have been scored
+        with mock.patch.object(RAG_operators.vectorSearch.Search_deadline, "is_expired", expire_deadline):
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, deadline_ms=60000)
+        self.assertTrue(retrieved.is_partial)
+        newest_rows = range(self.vectors.shape[0] - min(64, RAG_operators.DEADLINE_SCAN_BATCH_SIZE), self.vectors.shape[0])
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5, newest_rows))
+        
+        # the IVF lists are visited from the closest one
+        self.assertTrue(DB_operator.train_IVF_index(self.collection_name, n_lists=16))
+        with mock.patch.object(RAG_operators.vectorSearch.Search_deadline, "is_expired", expire_deadline):
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, deadline_ms=60000)
+        self.assertTrue(retrieved.is_partial)
+        self.assertEqual(retrieved[0].text, "chunk 17")
+
+
+    def test_server_side_scoring(self):
+        for conflicting_option in [{"retrieval_deadline_ms": 100}, {"vector_compression": compressions.BINARY_SIGN}]:
+            with self.assertRaises(ValueError):
+                RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], 
+                                                   server_side_scoring=True, **conflicting_option)
+        # the dot product expression evaluates to the similarity of the stored vector
+        expression = RAG_operators._build_dot_product_expression("$vector", self.vectors[0])
+        self.assertAlmostEqual(_evaluate_expression(expression, {"vector": self.vectors[1].tolist()}), 
+                               float(self.vectors[0] @ self.vectors[1]), places=6)
+        self.assertEqual(_evaluate_expression(expression, {"vector": []}), 0.0)
+        
+        DB_operator = self._build_populated_operator(batch_size=64, server_side_scoring=True)
+        self.assertIn(access_paths.SERVER_SCAN, DB_operator.get_collection_statistics(self.collection_name)["access_paths"])
+        with self.assertRaises(ValueError): #an aggregation cannot return partial results
+            DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 5, deadline_ms=100, 
+                                                        server_side_scoring=True)
+        # a deadline passed to the call overrides the server-side scoring default
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 5, deadline_ms=60000)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[0], 5))
+        # the installed mongomock does not evaluate '$reduce': the scoring pipeline is run by '_aggregate_scoring_pipeline'
+        with mock.patch.object(mongomock.collection.Collection, "aggregate", autospec=True, 
+                               side_effect=_aggregate_scoring_pipeline) as aggregate_spy:
+            for query_index in [0, 17, 123]:
+                retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5)
+                self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[query_index], 5))
+            self.assertEqual(aggregate_spy.call_count, 3)
+            
+            # the binary vectors of a partially migrated collection are scanned on the client side
+            for row in range(0, self.vectors.shape[0], 2):
+                DB_operator.database[self.collection_name].update_one({"text": f"chunk {row}"}, {"$set": {
+                        "vector": RAG_operators._encode_vector(self.vectors[row], storage_formats.FLOAT32)}})
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, 
+                                                                    metadata_filter={"url": ["https://doc3.com", "https://doc4.com"]})
+            self.assertEqual([ data_model.text for data_model in retrieved ], 
+                             self._exact_top_k(self.vectors[17], 5, [ row for row in range(self.vectors.shape[0]) if row % 7 in (3, 4) ]))
+            # per call, the client-side scan can still be chosen
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, 
+                                                                    server_side_scoring=False)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5))
+
+
+    def test_redundancy_clustering(self):
+        for invalid_options in [{"duplicate_tolerance": 0.95}, {"redundancy_clustering": True, "duplicate_tolerance": 0.5}]:
+            with self.assertRaises(ValueError):
+                RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], **invalid_options)
+        DB_operator = self._build_populated_operator(count=300, batch_size=64, redundancy_clustering=True, duplicate_tolerance=0.99)
+        collection = DB_operator.database[self.collection_name]
+        self.assertEqual(collection.count_documents({RAG_operators.REDUNDANCY_GROUP_FIELD: {"$exists": False}}), 0)
+        
+        # a near-duplicate joins the group of its leader, while a duplicate is not stored
+        near_duplicate_model = self._build_data_models(1, first_row=5)[0]
+        near_duplicate_vector = self.vectors[5] + 0.2 * self.vectors[6]
+        (near_duplicate_model.text, near_duplicate_model.vector) = ("near duplicate", (near_duplicate_vector / numpy.linalg.norm(near_duplicate_vector)).tolist())
+        self.assertTrue(DB_operator.insert_record(self.collection_name, near_duplicate_model))
+        duplicate_model = self._build_data_models(1, first_row=5)[0]
+        duplicate_model.text = "duplicate"
+        self.assertFalse(DB_operator.insert_record(self.collection_name, duplicate_model))
+        self.assertIsNone(collection.find_one({"text": "duplicate"}))
+        group_of_5 = collection.find_one({"text": "chunk 5"})[RAG_operators.REDUNDANCY_GROUP_FIELD]
+        self.assertEqual(collection.find_one({"text": "near duplicate"})[RAG_operators.REDUNDANCY_GROUP_FIELD], group_of_5)
+        self.assertTrue(collection.find_one({"_id": group_of_5})[RAG_operators.REDUNDANCY_LEADER_FIELD])
+        
+        # the retrieval keeps the best record of each group
+        for query_index in [5, 17, 123]:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], _group_top_k(collection, self.vectors[query_index], 5))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 5, redundancy_tolerance=1.01)
+        self.assertEqual([ data_model.text for data_model in retrieved[:2] ], ["chunk 5", "near duplicate"]) #custom tolerance: no groups
+
+        # the groups are scanned along with the vectors (only the winners are looked up), the records not clustered yet are compared by vector
+        collection.update_one({"text": "near duplicate"}, {"$unset": {RAG_operators.REDUNDANCY_GROUP_FIELD: ""}})
+        with mock.patch.object(mongomock.collection.Collection, "find", autospec=True, 
+                               side_effect=mongomock.collection.Collection.find) as find_mock:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], _group_top_k(collection, self.vectors[5], 5))
+        self.assertEqual(sum( "$in" in str(call.args[1:2]) for call in find_mock.call_args_list ), 1)
+
+
+    def test_redundancy_groups_clustering(self):
+        DB_operator = self._build_populated_operator(count=300, batch_size=64)
+        collection = DB_operator.database[self.collection_name]
+        leaders_count = DB_operator.cluster_redundancy_groups(self.collection_name)
+        self.assertEqual(collection.count_documents({RAG_operators.REDUNDANCY_LEADER_FIELD: True}), leaders_count)
+        self.assertEqual(collection.count_documents({RAG_operators.REDUNDANCY_GROUP_FIELD: {"$exists": False}}), 0)
+        # every member reaches the tolerance with its leader, while the leaders are not near-duplicates of the previous ones
+        leaders = { record["_id"]: numpy.asarray(record["vector"]) for record in collection.find({RAG_operators.REDUNDANCY_LEADER_FIELD: True}) }
+        for record in collection.find({RAG_operators.REDUNDANCY_LEADER_FIELD: {"$exists": False}}):
+            self.assertGreaterEqual(float(numpy.asarray(record["vector"]) @ leaders[record[RAG_operators.REDUNDANCY_GROUP_FIELD]]), 
+                                    REDUNDANCY_TOLERANCE - 1e-6)
+        self.assertEqual(DB_operator.cluster_redundancy_groups(self.collection_name), leaders_count) #deterministic pass
+
+
+    def test_document_probe(self):
+        with self.assertRaises(ValueError):
+            RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], document_probe=0)
+        DB_operator = self._build_populated_operator(batch_size=64)
+        query = self.vectors[17]
+        # without stored centroids the whole collection is scanned
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5, document_probe=2)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(query, 5))
+        
+        self.assertEqual(DB_operator.build_document_centroids(self.collection_name), 7)
+        self.assertEqual(DB_operator.database[RAG_operators.DOCUMENT_CENTROIDS_COLLECTION_NAME].count_documents(
+                {"collection": self.collection_name}), 7)
+        for query_index in [17, 123]:
+            query = self.vectors[query_index]
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5, document_probe=2)
+            self.assertEqual([ data_model.text for data_model in retrieved ], 
+                             self._exact_top_k(query, 5, document_probe_rows(self.vectors, query, 2)))
+        # the documents are chosen among the ones accepted by the metadata filter
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5, document_probe=1,
+                                                                metadata_filter={"url": ["https://doc3.com", "https://doc5.com"]})
+        self.assertEqual([ data_model.text for data_model in retrieved ], 
+                         self._exact_top_k(query, 5, document_probe_rows(self.vectors, query, 1, [3, 5])))
+
+
+    def test_document_centroids_on_insertion(self):
+        DB_operator = self._build_populated_operator(batch_size=64, document_probe=2)
+        centroids_collection = DB_operator.database[RAG_operators.DOCUMENT_CENTROIDS_COLLECTION_NAME]
+        # the centroids kept up to date on insertion match the ones of a full build
+        stored_centroids = { document["url"]: (numpy.asarray(document["vectors_sum"]), document["count"]) 
+                                for document in centroids_collection.find({"collection": self.collection_name}) }
+        self.assertEqual(DB_operator.build_document_centroids(self.collection_name), 7)
+        for document in centroids_collection.find({"collection": self.collection_name}):
+            self.assertEqual(stored_centroids[document["url"]][1], document["count"])
+            numpy.testing.assert_allclose(stored_centroids[document["url"]][0], document["vectors_sum"], rtol=1e-5, atol=1e-6)
+        for query_index in [17, 123]:
+            query = self.vectors[query_index]
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], 
+                             self._exact_top_k(query, 5, document_probe_rows(self.vectors, query, 2)))
+
+
+    def test_index_generations(self):
+        DB_operator = self._build_populated_operator(count=300, batch_size=64, index_generations=True)
+        collection = DB_operator.database[self.collection_name]
+        self.assertEqual(collection.count_documents({RAG_operators.GENERATION_FIELD: 1}), 300)
+        new_data_models = self._build_data_models(3, first_row=5)
+        for data_model in new_data_models:
+            (data_model.text, data_model.id) = (f"new {data_model.text}", f"new {data_model.id}")
+        
+        # the retrievals running during an ingestion do not see its records until all of them have been written
+        insert_new_record = DB_operator._insert_new_record
+        retrieved_during_ingestion: list[str] = []
+        def insert_and_retrieve(*args, **kwargs):
+            inserted = insert_new_record(*args, **kwargs)
+            retrieved_during_ingestion.extend( data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                    self.collection_name, self.vectors[5].tolist(), 5, redundancy_tolerance=1.01) )
+            return inserted
+        with mock.patch.object(DB_operator, "_insert_new_record", side_effect=insert_and_retrieve):
+            self.assertTrue(DB_operator.insert_records(self.collection_name, new_data_models))
+        self.assertEqual(len(retrieved_during_ingestion), 15)
+        self.assertFalse(any( text.startswith("new") for text in retrieved_during_ingestion ))
+        self.assertEqual(collection.count_documents({RAG_operators.GENERATION_FIELD: 2}), 3)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 2, redundancy_tolerance=1.01)
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 5", "new chunk 5"])
+        
+        # the records of an unpublished generation (es. an interrupted ingestion) stay invisible
+        collection.insert_one({"text": "unpublished", "vector": self.vectors[9].tolist(), RAG_operators.GENERATION_FIELD: 3, 
+                               "metadata": {"url": "https://doc2.com", "embedder": self.samples["RAG_test_embedder"]}})
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[9].tolist(), 2, redundancy_tolerance=1.01)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[9], 2, range(300)))
+        retrieved = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, [self.vectors[9].tolist()], 2, redundancy_tolerance=1.01)
+        self.assertEqual([ data_model.text for data_model in retrieved[0] ], self._exact_top_k(self.vectors[9], 2, range(300)))
+
+
+    def test_generations_of_other_operators(self):
+        # two operators (es. two processes) ingesting into the same MongoDB
+        server_store = mongomock.store.ServerStore()
+        with mock.patch.object(RAG_operators, "MongoClient", functools.partial(mongomock.MongoClient, _store=server_store)):
+            DB_operator = self._build_populated_operator(count=300, index_generations=True)
+            other_operator = RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], 
+                                                                index_generations=True)
+        self.addCleanup(other_operator.close_connection)
+        new_model = self._build_data_models(1, first_row=5)[0]
+        (new_model.text, new_model.id) = ("new chunk 5", "new 5")
+        DB_operator.retrieve_embeddings_from_text_and_vector(self.collection_name, "chunk", self.vectors[5].tolist(), 2) #BM25 index loaded
+        
+        # the generation numbers are allocated atomically: the other operator gets its own one
+        with mock.patch.object(RAG_operators, "GENERATION_VIEW_MAX_AGE_S", 3600):
+            self.assertTrue(other_operator.insert_records(self.collection_name, [new_model]))
+            self.assertEqual(sorted(DB_operator.database[self.collection_name].distinct(RAG_operators.GENERATION_FIELD)), [1, 2])
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 2, redundancy_tolerance=1.01)
+            self.assertNotIn("new chunk 5", [ data_model.text for data_model in retrieved ])
+        # the published generation is reloaded once expired
+        with mock.patch.object(RAG_operators, "GENERATION_VIEW_MAX_AGE_S", -1):
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[5].tolist(), 2, redundancy_tolerance=1.01)
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 5", "new chunk 5"])
+        self.assertEqual(len(DB_operator._get_lexical_index(self.collection_name)), 301)
+
+
+    def test_abandoned_generations(self):
+        DB_operator = self._build_populated_operator(count=300, index_generations=True)
+        collection = DB_operator.database[self.collection_name]
+        (crashed_model, new_model) = self._build_data_models(2, first_row=300)
+        # the ingestion of generation 2 stops after its first record
+        crashed_generation: int = DB_operator._allocate_generation(self.collection_name)
+        self.assertTrue(DB_operator._insert_new_record(self.collection_name, crashed_model, crashed_generation, []))
+        
+        # a following generation is published, while the pending one stays invisible
+        self.assertTrue(DB_operator.insert_records(self.collection_name, [new_model]))
+        self.assertEqual(collection.count_documents({RAG_operators.GENERATION_FIELD: 3}), 1)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[300].tolist(), 5)
+        self.assertNotIn("chunk 300", [ data_model.text for data_model in retrieved ])
+        self.assertIn("chunk 301", [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                self.collection_name, self.vectors[301].tolist(), 5) ])
+        
+        # once timed out, the pending generation is abandoned by the next ingestion: its records are deleted
+        with mock.patch.object(RAG_operators, "ABANDONED_GENERATION_TIMEOUT_S", -1):
+            self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(1, first_row=302)))
+        self.assertEqual(collection.count_documents({RAG_operators.GENERATION_FIELD: crashed_generation}), 0)
+        # the abandoned ingestion cannot publish it anymore
+        self.assertTrue(DB_operator._insert_new_record(self.collection_name, crashed_model, crashed_generation, []))
+        self.assertFalse(DB_operator._publish_generation(self.collection_name, crashed_generation, []))
+        self.assertEqual(collection.count_documents({RAG_operators.GENERATION_FIELD: crashed_generation}), 0)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[300].tolist(), 5)
+        self.assertNotIn("chunk 300", [ data_model.text for data_model in retrieved ])
+
+
+    def test_conflicting_options(self):
+        cache_folder_path = self._create_temporary_folder()
+        for conflicting_options in [ {"vector_cache_folder_path": cache_folder_path, "ivf_nprobe": 2}, 
+                                     {"vector_cache_folder_path": cache_folder_path, "retrieval_deadline_ms": 100}, 
+                                     {"server_side_scoring": True, "retrieval_deadline_ms": 100}, 
+                                     {"server_side_scoring": True, "vector_compression": compressions.BINARY_SIGN} ]:
+            with self.assertRaises(ValueError):
+                RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], **conflicting_options)
+        
+        DB_operator = self._build_populated_operator(count=300, batch_size=64)
+        query = self.vectors[17].tolist()
+        for (conflicting_search_options, conflicting_options) in [ 
+                (RAG_search_options(access_paths.EXACT_SCAN, nprobe=2), dict()), 
+                (RAG_search_options(access_paths.IVF, vector_compression=compressions.BINARY_SIGN), dict()), 
+                (RAG_search_options(access_paths.IVF), dict()), #no IVF index trained
+                (RAG_search_options(access_paths.MEMORY_SCAN), dict()), #no vector cache
+                (RAG_search_options(access_paths.SERVER_SCAN), {"deadline_ms": 100}), 
+                (RAG_search_options(access_paths.GRAPH), dict()), 
+                (RAG_search_options(ef_search=64), dict()), #graph option
+                (None, {"server_side_scoring": True, "deadline_ms": 100}), 
+                (RAG_search_options(nprobe=2), dict()) ]: #no IVF index trained
+            with self.assertRaises(ValueError):
+                DB_operator.retrieve_embeddings_from_vector(self.collection_name, query, 5, search_options=conflicting_search_options, 
+                                                            **conflicting_options)
+        # probing every IVF list is exact
+        self.assertTrue(DB_operator.train_IVF_index(self.collection_name, n_lists=4))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query, 5, 
+                                                                search_options=RAG_search_options(access_paths.IVF, nprobe=4))
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5, range(300)))
+
+
+    def test_batched_retrieval(self):
+        DB_operator = self._build_populated_operator(batch_size=64)
+        query_indexes = [0, 17, 123, 399]
+        query_matrix = self.vectors[query_indexes].tolist()
+        for metadata_filter in [None, {"url": ["https://doc1.com", "https://doc2.com"]}]:
+            batched_results = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, query_matrix, 5, 
+                                                                           metadata_filter=metadata_filter)
+            single_results = [ DB_operator.retrieve_embeddings_from_vector(self.collection_name, query_vector, 5, 
+                                                                           metadata_filter=metadata_filter) 
+                                    for query_vector in query_matrix ]
+            self.assertEqual([ [ data_model.text for data_model in result ] for result in batched_results ], 
+                             [ [ data_model.text for data_model in result ] for result in single_results ])
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vectors(self.collection_name, [], 5), [])
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vectors(self.collection_name, query_matrix, 0), [[], [], [], []])
+
+
+    def test_records_hydration(self):
+        DB_operator = self._build_populated_operator(batch_size=64)
+        with mock.patch.object(DB_operator, "_hydrate_records", wraps=DB_operator._hydrate_records) as hydration_spy, \
+             mock.patch.object(DB_operator, "_open_scan_cursor", wraps=DB_operator._open_scan_cursor) as scan_spy:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[42].tolist(), 5)
+        # the scan reads the vectors only, then the winners are fetched whole with a single query
+        self.assertTrue(scan_spy.called)
+        for scan_call in scan_spy.call_args_list:
+            self.assertNotIn("text", scan_call.args[2])
+        hydration_spy.assert_called_once()
+        self.assertEqual(len(hydration_spy.call_args.args[1]), 5)
+        
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[42], 5))
+        for data_model in retrieved:
+            row = int(data_model.text.split(" ")[1])
+            self.assertEqual((data_model.url, data_model.id, data_model.embedder_name), 
+                             (f"https://doc{row % 7}.com", str(row), self.samples["RAG_test_embedder"]))
+            numpy.testing.assert_allclose(data_model.vector, self.vectors[row], rtol=1e-6)
+
+
+    def test_partitioned_scan(self):
+        with self.assertRaises(ValueError):
+            RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], scan_threads=0)
+        DB_operator = self._build_populated_operator(batch_size=32, scan_threads=4)
+        # the '_id' ranges split the collection without overlaps
+        range_filters = DB_operator._split_into_ID_ranges(self.collection_name, 4)
+        self.assertEqual(len(range_filters), 4)
+        self.assertEqual(sum( DB_operator.database[self.collection_name].count_documents(range_filter) for range_filter in range_filters ), 
+                         self.vectors.shape[0])
+        
+        for query_index in [0, 17, 123]:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[query_index], 5))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, 
+                                                                metadata_filter={"url": ["https://doc3.com"]})
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5, range(3, self.vectors.shape[0], 7)))
+        batched_results = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, self.vectors[[0, 17]].tolist(), 5)
+        self.assertEqual([ [ data_model.text for data_model in result ] for result in batched_results ], 
+                         [ self._exact_top_k(self.vectors[0], 5), self._exact_top_k(self.vectors[17], 5) ])
+
+
+    def test_process_pool_scoring(self):
+        with self.assertRaises(ValueError): #the shared segments mirror the vector cache
+            RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], scoring_processes=2)
+        vector_cache_folder_path = self._create_temporary_folder()
+        DB_operator = self._build_populated_operator(count=300, vector_cache_folder_path=vector_cache_folder_path, scoring_processes=2)
+        for query_index in [0, 17, 123]:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[query_index], 5, range(300)))
+        
+        # the records inserted afterwards are appended to the shared segment
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(first_row=300)))
+        batched_results = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, self.vectors[[17, 350]].tolist(), 5)
+        self.assertEqual([ [ data_model.text for data_model in result ] for result in batched_results ], 
+                         [ self._exact_top_k(self.vectors[17], 5), self._exact_top_k(self.vectors[350], 5) ])
+        self.assertEqual(DB_operator._shared_segments[self.collection_name].count, self.vectors.shape[0])
+
+
+    def test_vector_storage_formats(self):
+        vector = self.vectors[0]
+        for (storage_format, tolerance) in [(storage_formats.ARRAY, 1e-7), (storage_formats.FLOAT32, 0), (storage_formats.FLOAT16, 1e-3)]:
+            stored_vector = RAG_operators._encode_vector(vector, storage_format)
+            self.assertTrue(RAG_operators._is_stored_as(stored_vector, storage_format))
+            self.assertEqual(RAG_operators._get_storage_format(stored_vector), storage_format)
+            numpy.testing.assert_allclose(RAG_operators._decode_vector(stored_vector), vector, atol=tolerance)
+        self.assertEqual(len(RAG_operators._encode_vector(vector, storage_formats.FLOAT16)), 2 * vector.shape[0])
+
+        DB_operator = self._build_populated_operator(batch_size=64, vector_storage_format=storage_formats.FLOAT32)
+        collection = DB_operator.database[self.collection_name]
+        self.assertTrue(RAG_operators._is_stored_as(collection.find_one()["vector"], storage_formats.FLOAT32))
+        self.assertEqual(DB_operator.get_collection_statistics(self.collection_name)["stored_float_bytes"], 4)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[17], 5))
+        numpy.testing.assert_array_equal(retrieved[0].vector, self.vectors[17]) #data models hold plain float lists
+
+        # float32 -> float16 migration, while both formats are decoded
+        collection.update_one({"text": "chunk 0"}, {"$set": {"vector": RAG_operators._encode_vector(self.vectors[0], storage_formats.FLOAT16)}})
+        self.assertEqual(DB_operator.migrate_vector_storage(self.collection_name, storage_formats.FLOAT16), self.vectors.shape[0] - 1)
+        self.assertEqual(DB_operator.migrate_vector_storage(self.collection_name, storage_formats.FLOAT16), 0)
+        self.assertTrue(all( RAG_operators._is_stored_as(record["vector"], storage_formats.FLOAT16) for record in collection.find() ))
+        self.assertEqual(DB_operator.get_collection_statistics(self.collection_name)["stored_float_bytes"], 2)
+        self.assertGreaterEqual(self._mean_recall_of(DB_operator), 0.95)
+        
+        # background migration back to the BSON arrays
+        self.assertEqual(DB_operator.start_vector_storage_migration(self.collection_name, storage_formats.ARRAY).result(), 
+                         self.vectors.shape[0])
+        self.assertTrue(all( isinstance(record["vector"], list) for record in collection.find() ))
+
+
+    def test_metadata_filter(self):
+        DB_operator = RAG_operators.RAG_MongoDB_operator("mongodb://localhost:27017/", self.samples["RAG_test_db_name"], batch_size=64)
+        self.addCleanup(DB_operator.close_connection)
+        data_models = self._build_data_models()
+        for (row, data_model) in enumerate(data_models):
+            data_model.authors = ["alice"] if (row % 2 == 0) else ["bob", "carol"]
+        self.assertTrue(DB_operator.insert_records(self.collection_name, data_models))
+
+        with mock.patch.object(DB_operator, "_open_scan_cursor", wraps=DB_operator._open_scan_cursor) as scan_spy:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[10].tolist(), 5, 
+                                                                    metadata_filter={"author": ["carol"]})
+        # the filter is pushed down to the scan query, served by an index on the filtered field
+        self.assertEqual(scan_spy.call_args.args[1], {"metadata.author": {"$in": ["carol"]}})
+        self.assertIn("metadata.author_1", DB_operator.database[self.collection_name].index_information())
+        self.assertEqual([ data_model.text for data_model in retrieved ], 
+                         self._exact_top_k(self.vectors[10], 5, range(1, self.vectors.shape[0], 2)))
+        
+        metadata_filter = {"author": ["alice"], "url": ["https://doc2.com", "https://doc4.com"]}
+        rows = [ row for row in range(0, self.vectors.shape[0], 2) if row % 7 in (2, 4) ]
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[10].tolist(), 5, 
+                                                                metadata_filter=metadata_filter)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[10], 5, rows))
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[10].tolist(), 5, 
+                                                                     metadata_filter={"url": ["https://nowhere.com"]}), [])
+
+
+    def _mean_recall_of(self, DB_operator: RAG_operators.RAG_MongoDB_operator, **retrieval_options) -> float:
+        """
+        Returns the mean recall@10 of the given retrieval options against the brute force reference, on one query every 20 samples.
+        """
+        query_indexes = range(0, self.vectors.shape[0], 20)
+        retrieved_lists = [ [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                                    self.collection_name, self.vectors[query_index].tolist(), 10, **retrieval_options) ] 
+                                for query_index in query_indexes ]
+        return mean_recall(retrieved_lists, [ self._exact_top_k(self.vectors[query_index], 10) for query_index in query_indexes ])
+
+
+class RAG_PineconeDB_operator_tester(unittest.TestCase):
+
+    def setUp(self):
+        # operator on a mocked index acknowledging every upserted record
+        self.DB_operator = object.__new__(RAG_operators.RAG_PineconeDB_operator)
+        self.DB_operator.database = mock.Mock()
+        self.DB_operator.database.upsert.side_effect = lambda namespace, vectors: mock.Mock(upserted_count=len(vectors))
+        patcher = mock.patch.object(self.DB_operator, "check_collection_existence", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def test_upsert_batches_split(self):
+        # small records are split by the records count limit
+        records = [ data_model.generate_JSON_data() for data_model in _build_pinecone_data_models(2500, 8) ]
+        batches = self.DB_operator._split_into_upsert_batches(records)
+        self.assertEqual([ len(batch) for batch in batches ], [1000, 1000, 500])
+        self.assertEqual([ record for batch in batches for record in batch ], records)
+        
+        # large records by the request size limit, each batch being as full as possible
+        records = [ data_model.generate_JSON_data() for data_model in _build_pinecone_data_models(300, 1024) ]
+        batches = self.DB_operator._split_into_upsert_batches(records)
+        self.assertGreater(len(batches), 3)
+        self.assertEqual([ record for batch in batches for record in batch ], records)
+        for (batch, next_batch) in zip(batches, batches[1:] + [None]):
+            self.assertLessEqual(_estimate_request_bytes(batch), RAG_operators.PINECONE_MAX_UPSERT_REQUEST_BYTES)
+            if(next_batch is not None):
+                self.assertGreater(_estimate_request_bytes(batch + next_batch[:1]), RAG_operators.PINECONE_MAX_UPSERT_REQUEST_BYTES)
+        # a record exceeding the size limit by itself makes up its own batch
+        oversized_records = records[:2] + [ _build_pinecone_data_models(1, 100000)[0].generate_JSON_data() ] + records[2:4]
+        self.assertEqual([ len(batch) for batch in self.DB_operator._split_into_upsert_batches(oversized_records) ], [2, 1, 2])
+
+
+    def test_bulk_insertion(self):
+        data_models = _build_pinecone_data_models(2500, 8)
+        self.assertTrue(self.DB_operator.insert_records("namespace", data_models))
+        upserted_batches = [ call.kwargs["vectors"] for call in self.DB_operator.database.upsert.call_args_list ]
+        self.assertEqual(sorted( len(batch) for batch in upserted_batches ), [500, 1000, 1000])
+        self.assertEqual(sorted( record["id"] for batch in upserted_batches for record in batch ), sorted( data_model.id for data_model in data_models ))
+        self.assertTrue(all( call.kwargs["namespace"] == "namespace" for call in self.DB_operator.database.upsert.call_args_list ))
+        self.assertEqual(self.DB_operator.check_collection_existence.call_count, 1)
+        
+        # a failed batch does not stop the other ones, but the insertion is reported as incomplete
+        self.DB_operator.database.upsert.reset_mock()
+        def upsert_failing_on_first_record(namespace, vectors):
+            if(vectors[0]["id"] == "0"):
+                raise RuntimeError("request rejected")
+            return mock.Mock(upserted_count=len(vectors))
+        self.DB_operator.database.upsert.side_effect = upsert_failing_on_first_record
+        with self.assertLogs(level="INFO") as logs:
+            self.assertFalse(self.DB_operator.insert_records("namespace", data_models))
+        self.assertEqual(self.DB_operator.database.upsert.call_count, 3)
+        self.assertTrue(any( "1500/2500 records upserted" in line for line in logs.output ))
+        
+        self.DB_operator.database.upsert.reset_mock()
+        self.assertTrue(self.DB_operator.insert_records("namespace", []))
+        self.DB_operator.database.upsert.assert_not_called()
+        self.DB_operator.check_collection_existence.return_value = False
+        with self.assertRaises(ValueError):
+            self.DB_operator.insert_records("namespace", data_models)
+
+
+
+
+def _build_pinecone_data_models(count: int, dimension: int) -> list[RAG_DTModel]:
+    """
+    Returns 'count' records holding constant 'dimension'-dimensional vectors.
+    """
+    return [ RAG_DTModel(vector=[0.125] * dimension, text=f"chunk {row}", embedder_name="llama-text-embed-v2", 
+                         url=f"https://doc{row % 7}.com", id=str(row)) for row in range(count) ]
+
+
+def _estimate_request_bytes(records: list[dict]) -> int:
+    """
+    The request size estimate of the Pinecone operator: value bytes, stringified metadata and IDs.
+    """
+    return sum( len(record["values"]) * RAG_operators.PINECONE_UPSERT_VALUE_BYTES + len(str(record["metadata"]).encode("utf-8")) 
+                + len(str(record["id"])) for record in records )
+
+
+def _group_top_k(collection, query: numpy.ndarray, top_k: int) -> list[str]:
+    """
+    Reference of the group-based redundance filtering: the texts of the 'top_k' most similar records, one per near-duplicate group
+    (the records with no group yet are compared by vector).
+    """
+    records = sorted(collection.find(), key=lambda record: -float(numpy.asarray(record["vector"], dtype=numpy.float32) @ query))
+    (selected_texts, selected_records, selected_groups) = ([], [], set())
+    for record in records:
+        # the records with no group are skipped if they reach the tolerance with a selected record
+        group = record.get(RAG_operators.REDUNDANCY_GROUP_FIELD, record["_id"])
+        if((group not in selected_groups) and all( float(numpy.asarray(record["vector"]) @ numpy.asarray(selected_record["vector"])) 
+                                                   < REDUNDANCY_TOLERANCE for selected_record in selected_records 
+                                                   if (RAG_operators.REDUNDANCY_GROUP_FIELD not in record) 
+                                                   or (RAG_operators.REDUNDANCY_GROUP_FIELD not in selected_record) )):
+            selected_groups.add(group)
+            selected_records.append(record)
+            selected_texts.append(record["text"])
+        if(len(selected_texts) == top_k):
+            break
+    return selected_texts
+
+
+_mongomock_aggregate = mongomock.collection.Collection.aggregate
+
+
+def _aggregate_scoring_pipeline(collection, pipeline: list[dict], *args, **kwargs):
+    """
+    Replacement of the mongomock 'aggregate' running the server-side scoring pipelines ('$match', '$project' of the score, 
+    '$sort', '$limit') with '_evaluate_expression'. Other pipelines are run by mongomock.
+    """
+    if((len(pipeline) != 4) or ("score" not in pipeline[1].get("$project", dict()))):
+        return _mongomock_aggregate(collection, pipeline, *args, **kwargs)
+    projection = { field: 1 for field in pipeline[1]["$project"] if (field != "score") }
+    records = [ {**record, "score": _evaluate_expression(pipeline[1]["$project"]["score"], record)} 
+                    for record in collection.find(pipeline[0]["$match"], projection) ]
+    return iter(sorted(records, key=lambda record: -record["score"])[:pipeline[3]["$limit"]])
+
+
+def _evaluate_expression(expression, document: dict, variables: dict = None):
+    """
+    Evaluates the subset of the aggregation expressions used by the dot product expression on the given document.
+    """
+    variables = variables or dict()
+    if(isinstance(expression, str) and expression.startswith("$$")):
+        return variables[expression[2:]]
+    if(isinstance(expression, str) and expression.startswith("$")):
+        return document[expression[1:]]
+    if(isinstance(expression, list)):
+        return [ _evaluate_expression(item, document, variables) for item in expression ]
+    if(not isinstance(expression, dict)):
+        return expression
+    ((operator, arguments),) = expression.items()
+    if(operator == "$reduce"):
+        value = _evaluate_expression(arguments["initialValue"], document, variables)
+        for item in _evaluate_expression(arguments["input"], document, variables):
+            value = _evaluate_expression(arguments["in"], document, {**variables, "value": value, "this": item})
+        return value
+    if(operator == "$zip"):
+        return [ list(items) for items in zip(*_evaluate_expression(arguments["inputs"], document, variables)) ]
+    arguments = _evaluate_expression(arguments, document, variables)
+    if(operator == "$add"):
+        return sum(arguments)
+    if(operator == "$multiply"):
+        return arguments[0] * arguments[1]
+    if(operator == "$arrayElemAt"):
+        return arguments[0][arguments[1]]
+    raise NotImplementedError(operator)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import yaml
+import unittest
+import numpy
+import mongomock
+from unittest import mock
+
+import src.services.db_services.RAG_DB_operators as RAG_operators
+from src.models.data_models import RAG_DTModel
+from src.common.constants import REDUNDANCY_TOLERANCE
+
+"""
+Shared fixtures of the RAG DB tests: the seeded sample vectors of 'test_samples.yaml', the records holding them
+and the brute force references the retrievals are compared with.
+"""
+
+
+
+class RAG_samples_tester(unittest.TestCase):
+    """
+    Base test case of the RAG DB tests, working on the records 'chunk <row>' of the documents 'https://doc<row % 7>.com'
+    which hold the seeded normalized sample vectors.
+    """
+    @classmethod
+    def setUpClass(cls):
+        stream = open(os.path.join("tests", "covering_tests", "test_samples.yaml"), 'r', encoding="utf-8")
+        cls.samples = yaml.safe_load(stream)
+        stream.close()
+        cls.collection_name = cls.samples["RAG_test_collection_name"]
+        vectors_sample = cls.samples["RAG_test_vectors"]
+        random_generator = numpy.random.default_rng(vectors_sample["seed"])
+        cls.vectors = random_generator.normal(size=(vectors_sample["count"], vectors_sample["dimension"])).astype(numpy.float32)
+        cls.vectors /= numpy.linalg.norm(cls.vectors, axis=1, keepdims=True)
+
+
+    def _build_data_models(self, count: int = None, first_row: int = 0) -> list[RAG_DTModel]:
+        """
+        Returns the sample records from 'first_row' on (the next 'count' ones if given).
+        """
+        rows = range(first_row, self.vectors.shape[0] if (count is None) else first_row + count)
+        return [ RAG_DTModel(vector=self.vectors[row].tolist(), text=f"chunk {row}", embedder_name=self.samples["RAG_test_embedder"],
+                             url=f"https://doc{row % 7}.com", id=str(row))
+                    for row in rows ]
+
+
+    def _populate(self, DB_handler, count: int = None):
+        """
+        Inserts the sample records (the first 'count' ones if given) through the given operator or manager, then returns it.
+        """
+        self.assertTrue(DB_handler.insert_records(self.collection_name, self._build_data_models(count)))
+        return DB_handler
+
+
+    def _create_temporary_folder(self) -> str:
+        """
+        Returns a new folder removed at the end of the test.
+        """
+        folder_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder_path, True)
+        return folder_path
+
+
+    def _exact_top_k(self, query: numpy.ndarray, top_k: int, rows: list[int] = None,
+                     redundancy_tolerance: float = REDUNDANCY_TOLERANCE) -> list[str]:
+        """
+        Brute force reference: the texts of the 'top_k' most similar sample vectors (among the given rows),
+        skipping the ones too similar to an already selected one.
+        """
+        rows = numpy.arange(self.vectors.shape[0]) if (rows is None) else numpy.asarray(rows)
+        selected_rows: list[int] = []
+        for row in rows[numpy.argsort(-(self.vectors[rows] @ query), kind="stable")]:
+            if(all( float(self.vectors[row] @ self.vectors[selected_row]) < redundancy_tolerance for selected_row in selected_rows )):
+                selected_rows.append(int(row))
+            if(len(selected_rows) == top_k):
+                break
+        return [ f"chunk {row}" for row in selected_rows ]
+
+
+
+class RAG_MongoDB_tester(RAG_samples_tester):
+    """
+    Base test case of the MongoDB backed tests: every test works on a new in-memory MongoDB (mongomock).
+    """
+    def setUp(self):
+        for patcher in [ mock.patch.object(RAG_operators, "MongoClient", mongomock.MongoClient),
+                         mock.patch.object(mongomock.collection.BulkOperationBuilder, "add_update", _add_unsorted_update) ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+
+
+def mean_recall(retrieved_lists: list[list[str]], exact_lists: list[list[str]]) -> float:
+    """
+    Returns the mean share of the exact results found by each retrieval.
+    """
+    return float(numpy.mean([ len(set(retrieved) & set(exact)) / len(exact) for (retrieved, exact) in zip(retrieved_lists, exact_lists) ]))
+
+
+def expire_deadline(deadline) -> bool:
+    """
+    Replacement of 'Search_deadline.is_expired' simulating a time budget which is over at its first check.
+    """
+    deadline.was_hit = True
+    return True
+
+
+def document_probe_rows(vectors: numpy.ndarray, query: numpy.ndarray, document_probe: int, documents: list[int] = None) -> list[int]:
+    """
+    Reference of the two-stage retrieval: the rows of the 'document_probe' documents (row % 7) whose normalized centroids
+    are the closest to the query, among the given documents.
+    """
+    documents = list(range(7)) if (documents is None) else documents
+    centroids_matrix = numpy.stack([ vectors[document::7].astype(numpy.float64).sum(axis=0) for document in documents ])
+    scores = (centroids_matrix / numpy.linalg.norm(centroids_matrix, axis=1, keepdims=True)) @ query
+    best_documents = { documents[index] for index in numpy.argsort(-scores)[:document_probe] }
+    return [ row for row in range(vectors.shape[0]) if (row % 7) in best_documents ]
+
+
+_mongomock_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+
+def _add_unsorted_update(bulk_builder, *args, sort=None, **kwargs):
+    """
+    Module private function replacing the mongomock bulk 'add_update', which does not accept the 'sort' argument
+    passed by the 'UpdateOne' of recent pymongo versions (the operators only issue unsorted updates).
+    """
+    if(sort is not None):
+        raise NotImplementedError("mongomock does not feature sorted bulk updates.")
+    return _mongomock_add_update(bulk_builder, *args, **kwargs)
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+import src.services.other_services.embedder_registry_services as embedderRegistry
+
+
+class Embedder_registry_service_tester(unittest.TestCase):
+
+    def setUp(self):
+        registry_folder_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, registry_folder_path, True)
+        self.registry_file_path = os.path.join(registry_folder_path, "registry.sqlite")
+
+
+    def test_partition_names(self):
+        self.assertEqual(embedderRegistry.build_partition_name("papers", "text-embedding-3-small"), "papers-text-embedding-3-small")
+        self.assertEqual(embedderRegistry.build_partition_name("papers", "Org/Model_V2 "), "papers-org-model-v2")
+
+
+    def test_registration(self):
+        with self.assertRaises(ValueError):
+            embedderRegistry.Embedder_partition_registry(" ")
+        registry = embedderRegistry.Embedder_partition_registry(self.registry_file_path)
+        self.assertEqual(registry.get_partitions("papers"), dict())
+        self.assertEqual(registry.register_partition("papers", "llama-text-embed-v2", 1024), ("papers-llama-text-embed-v2", 1024))
+        self.assertEqual(registry.register_partition("papers", "text-embedding-3-small", 1536, partition_name="legacy_papers"), 
+                         ("legacy_papers", 1536))
+        # registering again changes nothing, unless the dimension differs
+        self.assertEqual(registry.register_partition("papers", "llama-text-embed-v2", 1024, partition_name="other"), 
+                         ("papers-llama-text-embed-v2", 1024))
+        with self.assertRaises(ValueError):
+            registry.register_partition("papers", "llama-text-embed-v2", 768)
+        returned_partitions = registry.get_partitions("papers")
+        returned_partitions.clear() #copies are returned
+        self.assertEqual(len(registry.get_partitions("papers")), 2)
+        self.assertEqual(registry.get_partitions("other_collection"), dict())
+        registry.close()
+        
+        # the partitions are read back from the registry file
+        reopened_registry = embedderRegistry.Embedder_partition_registry(self.registry_file_path)
+        self.addCleanup(reopened_registry.close)
+        self.assertEqual(reopened_registry.get_partitions("papers"), {"llama-text-embed-v2": ("papers-llama-text-embed-v2", 1024), 
+                                                                      "text-embedding-3-small": ("legacy_papers", 1536)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import math
+import unittest
+import src.services.other_services.lexical_search_services as lexicalSearch
+
+
+class Lexical_search_service_tester(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.texts = {"a": "Attention is all you need: the Transformer architecture", 
+                     "b": "BM25 ranking of documents, a state-of-the-art baseline", 
+                     "c": "Transformer models and BM25 hybrid retrieval with transformer rescoring", 
+                     "d": "Convolutional networks for image classification"}
+
+
+    def test_tokenize(self):
+        self.assertEqual(lexicalSearch.tokenize("The state-of-the-art BM25 model's scores, aren't they?"), 
+                         ["state-of-the-art", "bm25", "model's", "scores"])
+        self.assertEqual(lexicalSearch.tokenize(None), [])
+
+
+    def test_BM25_scores(self):
+        with self.assertRaises(ValueError):
+            lexicalSearch.BM25_index(b=2)
+        index = lexicalSearch.BM25_index()
+        self.assertEqual(index.search("transformer", 3), [])
+        for (document_key, text) in self.texts.items():
+            index.add_document(document_key, text)
+        self.assertEqual(len(index), 4)
+        
+        # Okapi BM25 reference of a single term query
+        lengths = { document_key: len(lexicalSearch.tokenize(text)) for (document_key, text) in self.texts.items() }
+        average_length = sum(lengths.values()) / 4
+        inverse_frequency = math.log(1 + (4 - 2 + 0.5) / (2 + 0.5))
+        expected_scores = { document_key: inverse_frequency * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * lengths[document_key] / average_length))
+                                for (document_key, frequency) in [("a", 1), ("c", 2)] }
+        results = index.search("Transformer", 3)
+        self.assertEqual([ document_key for (_, document_key) in results ], sorted(expected_scores, key=expected_scores.get, reverse=True))
+        for (score, document_key) in results:
+            self.assertAlmostEqual(score, expected_scores[document_key], places=9)
+        
+        self.assertEqual([ document_key for (_, document_key) in index.search("transformer BM25", 1) ], ["c"]) #matches both terms
+        self.assertEqual([ document_key for (_, document_key) in index.search("transformer", 3, allowed_keys={"a", "b"}) ], ["a"])
+        self.assertEqual(index.search("the of and", 3), []) #stop words only
+
+
+    def test_BM25_updates(self):
+        index = lexicalSearch.BM25_index()
+        for (document_key, text) in self.texts.items():
+            index.add_document(document_key, text)
+        index.add_document("d", "Vision transformer for image classification")
+        self.assertEqual(len(index), 4)
+        self.assertEqual({ document_key for (_, document_key) in index.search("transformer", 4) }, {"a", "c", "d"})
+        self.assertEqual(index.search("convolutional", 4), [])
+        
+        index.remove_document("c")
+        index.remove_document("unknown")
+        self.assertEqual({ document_key for (_, document_key) in index.search("transformer bm25", 4) }, {"a", "b", "d"})
+        # the statistics are those of an index built from scratch
+        rebuilt_index = lexicalSearch.BM25_index()
+        for (document_key, text) in [("a", self.texts["a"]), ("b", self.texts["b"]), ("d", "Vision transformer for image classification")]:
+            rebuilt_index.add_document(document_key, text)
+        self.assertEqual(index.search("transformer image", 4), rebuilt_index.search("transformer image", 4))
+
+
+    def test_reciprocal_rank_fusion(self):
+        fused = lexicalSearch.reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+        expected_scores = {"a": 1/61, "b": 1/62, "c": 1/63 + 1/61, "d": 1/62}
+        self.assertEqual(fused[0][1], "c")
+        self.assertEqual({ document_key: score for (score, document_key) in fused }, expected_scores)
+        self.assertEqual([ score for (score, _) in fused ], sorted(expected_scores.values(), reverse=True))
+        self.assertEqual(lexicalSearch.reciprocal_rank_fusion([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import os
+import time
+import unittest
+import numpy
+from concurrent.futures import ThreadPoolExecutor
+
+import src.services.db_services.RAG_DB_operators as RAG_operators
+from src.models.data_models import RAG_search_options
+from src.common.constants import Featured_access_paths_enum as access_paths
+from RAG_test_helpers import RAG_samples_tester, mean_recall, document_probe_rows
+
+
+class RAG_HNSW_operator_tester(RAG_samples_tester):
+
+    def setUp(self):
+        self.index_folder_path = self._create_temporary_folder()
+
+
+    def test_graph_retrieval(self):
+        DB_operator = RAG_operators.RAG_HNSW_operator(self.index_folder_path)
+        self.addCleanup(DB_operator.close_connection)
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 5), [])
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models()))
+        self.assertFalse(DB_operator.insert_record(self.collection_name, self._build_data_models(1)[0]))
+
+        query_indexes = range(0, self.vectors.shape[0], 20)
+        exact_lists = [ self._exact_top_k(self.vectors[query_index], 10) for query_index in query_indexes ]
+        graph_lists = [ [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                                self.collection_name, self.vectors[query_index].tolist(), 10) ] 
+                            for query_index in query_indexes ]
+        self.assertGreaterEqual(mean_recall(graph_lists, exact_lists), 0.9)
+        scan_lists = [ [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                                self.collection_name, self.vectors[query_index].tolist(), 10, 
+                                search_options=RAG_search_options(access_paths.MEMORY_SCAN)) ] 
+                            for query_index in query_indexes ]
+        self.assertEqual(scan_lists, exact_lists)
+        for unsupported_options in [RAG_search_options(access_paths.IVF), RAG_search_options(nprobe=4)]:
+            with self.assertRaises(ValueError):
+                DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 10, 
+                                                            search_options=unsupported_options)
+
+        # the batched retrieval searches the graph for all the queries at once
+        batched_lists = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, self.vectors[[0, 20]].tolist(), 10)
+        self.assertEqual([ [ data_model.text for data_model in batched ] for batched in batched_lists ], graph_lists[:2])
+        
+        # an update replaces the vector of the record
+        updated_model = self._build_data_models(1)[0]
+        updated_model.vector = self.vectors[1].tolist()
+        self.assertTrue(DB_operator.update_record(self.collection_name, updated_model))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[1].tolist(), 2, 
+                                                                redundancy_tolerance=1.01, search_options=RAG_search_options(access_paths.MEMORY_SCAN))
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 0", "chunk 1"])
+
+
+    def test_metadata_filter(self):
+        DB_operator = RAG_operators.RAG_HNSW_operator(self.index_folder_path)
+        self.addCleanup(DB_operator.close_connection)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models()))
+        rows = range(1, self.vectors.shape[0], 7)
+        for query_index in [0, 50, 99]:
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[query_index].tolist(), 5, 
+                                                                    metadata_filter={"url": ["https://doc1.com"]})
+            self.assertTrue(all( data_model.url == "https://doc1.com" for data_model in retrieved ))
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[query_index], 5, rows))
+
+
+    def test_graph_repair_after_crash(self):
+        DB_operator = RAG_operators.RAG_HNSW_operator(self.index_folder_path, persist_every=10000)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(300)))
+        DB_operator.persist_index(self.collection_name)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(50, 300)))
+        updated_model = self._build_data_models(1, first_row=10)[0]
+        updated_model.vector = self.vectors[11].tolist()
+        self.assertTrue(DB_operator.update_record(self.collection_name, updated_model))
+        # the process stops before persisting the last records and updates: only the record store holds them
+        for record_store in DB_operator._record_stores.values():
+            record_store.close()
+
+        reopened_operator = RAG_operators.RAG_HNSW_operator(self.index_folder_path)
+        self.addCleanup(reopened_operator.close_connection)
+        self.assertEqual(reopened_operator.get_collection_statistics(self.collection_name)["count"], 350)
+        retrieved = reopened_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[320].tolist(), 5, 
+                                                                      search_options=RAG_search_options(access_paths.MEMORY_SCAN))
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[320], 5, range(350)))
+        retrieved = reopened_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[11].tolist(), 2, 
+                                                                      redundancy_tolerance=1.01, search_options=RAG_search_options(access_paths.MEMORY_SCAN))
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 10", "chunk 11"])
+        # once persisted, the graph holds the updates: the log is cleared
+        reopened_operator.persist_index(self.collection_name)
+        self.assertEqual(reopened_operator._get_record_store(self.collection_name).get_logged_vectors()[0], [])
+
+
+    def test_concurrent_ef_search(self):
+        DB_operator = RAG_operators.RAG_HNSW_operator(self.index_folder_path)
+        self.addCleanup(DB_operator.close_connection)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(300)))
+        checking_index = _Ef_checking_index(DB_operator._get_index(self.collection_name))
+        DB_operator._indexes[self.collection_name] = checking_index
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda ef_search: DB_operator.retrieve_embeddings_from_vector(
+                    self.collection_name, self.vectors[0].tolist(), 5, search_options=RAG_search_options(ef_search=ef_search)), [16, 256] * 8))
+        # every graph search runs with the ef it has set, even if other queries set their own one meanwhile
+        self.assertEqual(len(checking_index.searched_efs), 16)
+        self.assertTrue(all( set_ef == searched_ef for (set_ef, searched_ef) in checking_index.searched_efs ))
+
+
+
+class RAG_LocalFile_operator_tester(RAG_samples_tester):
+
+    def setUp(self):
+        self.index_folder_path = self._create_temporary_folder()
+
+
+    def test_exact_retrieval(self):
+        with self.assertRaises(ValueError):
+            RAG_operators.RAG_LocalFile_operator(self.index_folder_path, batch_size=0)
+        DB_operator = RAG_operators.RAG_LocalFile_operator(self.index_folder_path, batch_size=64)
+        self.addCleanup(DB_operator.close_connection)
+        self.assertEqual(DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 5), [])
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models()))
+        # duplicated texts and vectors of another dimension are skipped
+        wrong_dimension_model = self._build_data_models(1)[0]
+        (wrong_dimension_model.text, wrong_dimension_model.vector) = ("short vector", self.vectors[0, :8].tolist())
+        self.assertFalse(DB_operator.insert_records(self.collection_name, 
+                                                    self._build_data_models(1) + [wrong_dimension_model]))
+        self.assertEqual(DB_operator.get_collection_statistics(self.collection_name)["count"], self.vectors.shape[0])
+
+        query_indexes = [0, 17, 123, 399]
+        exact_lists = [ self._exact_top_k(self.vectors[query_index], 5) for query_index in query_indexes ]
+        self.assertEqual([ [ data_model.text for data_model in DB_operator.retrieve_embeddings_from_vector(
+                                    self.collection_name, self.vectors[query_index].tolist(), 5) ] for query_index in query_indexes ], 
+                         exact_lists)
+        batched_results = DB_operator.retrieve_embeddings_from_vectors(self.collection_name, self.vectors[query_indexes].tolist(), 5)
+        self.assertEqual([ [ data_model.text for data_model in result ] for result in batched_results ], exact_lists)
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[17].tolist(), 5, 
+                                                                metadata_filter={"url": ["https://doc3.com"]})
+        self.assertEqual([ data_model.text for data_model in retrieved ], 
+                         self._exact_top_k(self.vectors[17], 5, range(3, self.vectors.shape[0], 7)))
+        
+        # an update overwrites the vector row of its record
+        updated_model = self._build_data_models(1, 1)[0]
+        updated_model.vector = self.vectors[0].tolist()
+        self.assertTrue(DB_operator.update_record(self.collection_name, updated_model))
+        retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 2, redundancy_tolerance=1.01)
+        self.assertEqual(sorted( data_model.text for data_model in retrieved ), ["chunk 0", "chunk 1"])
+        numpy.testing.assert_array_equal(retrieved[1].vector, self.vectors[0])
+
+
+    def test_document_probe(self):
+        with self.assertRaises(ValueError):
+            RAG_operators.RAG_LocalFile_operator(self.index_folder_path, document_probe=0)
+        DB_operator = RAG_operators.RAG_LocalFile_operator(self.index_folder_path, document_probe=2)
+        self.addCleanup(DB_operator.close_connection)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models()))
+        for query_index in [17, 123]:
+            query = self.vectors[query_index]
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5)
+            self.assertEqual([ data_model.text for data_model in retrieved ], 
+                             self._exact_top_k(query, 5, document_probe_rows(self.vectors, query, 2)))
+            # the per-call probe overrides the default one
+            retrieved = DB_operator.retrieve_embeddings_from_vector(self.collection_name, query.tolist(), 5, document_probe=7)
+            self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(query, 5))
+        with self.assertRaises(ValueError): #no graph to search
+            DB_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[0].tolist(), 5, 
+                                                        search_options=RAG_search_options(ef_search=64))
+
+
+    def test_repair_after_crash(self):
+        DB_operator = RAG_operators.RAG_LocalFile_operator(self.index_folder_path, batch_size=64)
+        self.assertTrue(DB_operator.insert_records(self.collection_name, self._build_data_models(300)))
+        DB_operator.close_connection()
+        # the process stops after appending the vectors of a batch, before committing its records
+        with open(os.path.join(self.index_folder_path, self.collection_name + ".f32"), "ab") as vectors_file:
+            vectors_file.write(self.vectors[300:350].tobytes())
+
+        reopened_operator = RAG_operators.RAG_LocalFile_operator(self.index_folder_path, batch_size=64)
+        self.addCleanup(reopened_operator.close_connection)
+        retrieved = reopened_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[320].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[320], 5, range(300)))
+        self.assertEqual(os.path.getsize(os.path.join(self.index_folder_path, self.collection_name + ".f32")), self.vectors[:300].nbytes)
+        
+        # the batch can be inserted again
+        self.assertTrue(reopened_operator.insert_records(self.collection_name, self._build_data_models(100, 300)))
+        retrieved = reopened_operator.retrieve_embeddings_from_vector(self.collection_name, self.vectors[320].tolist(), 5)
+        self.assertEqual([ data_model.text for data_model in retrieved ], self._exact_top_k(self.vectors[320], 5))
+
+
+class _Ef_checking_index:
+    """
+    Wrapper of an HNSW graph recording, for every search, the ef set before it and the ef of the graph at the end of the search.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.ef: int = None
+        self.searched_efs: list[tuple[int, int]] = []
+
+
+    def set_ef(self, ef: int) -> None:
+        self.ef = ef
+        self.index.set_ef(ef)
+
+
+    def knn_query(self, *args, **kwargs):
+        set_ef: int = self.ef
+        time.sleep(0.01) #leaves room to the concurrent searches
+        result = self.index.knn_query(*args, **kwargs)
+        self.searched_efs.append((set_ef, self.ef))
+        return result
+
+
+    def __getattr__(self, name: str):
+        return getattr(self.index, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import src.services.other_services.query_planner_services as queryPlanner
+from src.common.constants import (Featured_access_paths_enum as access_paths,
+                                  Featured_vector_compressions_enum as compressions)
+
+
+class Query_planner_service_tester(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded_collections: list[str] = []
+        self.backend_statistics: dict = {"count": 1000, "dimension": 16, "embedders": ["llama-text-embed-v2"],
+                                         "access_paths": {access_paths.EXACT_SCAN: dict()}}
+
+
+    def test_small_collection(self):
+        with self.assertRaises(ValueError):
+            queryPlanner.Query_planner(0)
+        planner = queryPlanner.Query_planner(1.0)
+        plan = planner.plan("collection", self._load_statistics, 10)
+        # 1000 * 16 floats of 4 bytes: 0.136 ms, a single path needs no steering
+        self.assertEqual((plan.access_path, plan.is_exact, plan.meets_target), (access_paths.EXACT_SCAN, True, True))
+        self.assertAlmostEqual(plan.estimated_cost_ms, 0.136)
+        self.assertEqual(plan.options.get_set_options(), {"top_m": 80}) #ceil(10 * (1 + ln(1000)))
+
+        # no plan for empty collections or backends without access paths
+        self.backend_statistics = {"count": 0, "access_paths": {access_paths.EXACT_SCAN: dict()}}
+        self.assertIsNone(planner.plan("empty collection", self._load_statistics, 10))
+        self.backend_statistics = dict()
+        self.assertIsNone(planner.plan("unplanned collection", self._load_statistics, 10))
+
+
+    def test_IVF_sizing(self):
+        self.backend_statistics = {"count": 1000000, "dimension": 768,
+                                   "access_paths": {access_paths.EXACT_SCAN: dict(), access_paths.IVF: {"n_lists": 1000}}}
+        # the exact scan (6528 ms) misses the target: the IVF probes the lists fitting it, (50 ms - 0.384 ms) // 6.528 ms
+        plan = queryPlanner.Query_planner(50.0).plan("collection", self._load_statistics, 10)
+        self.assertEqual((plan.access_path, plan.is_exact, plan.meets_target), (access_paths.IVF, False, True))
+        self.assertEqual((plan.options.nprobe, plan.options.access_path), (7, access_paths.IVF))
+        self.assertAlmostEqual(plan.estimated_cost_ms, 0.384 + 7 * 6.528)
+        # within a loose target both paths are exact (all the lists probed), and the scan skips the centroids
+        plan = queryPlanner.Query_planner(10000.0).plan("collection", self._load_statistics, 10)
+        self.assertEqual((plan.access_path, plan.is_exact, plan.options.access_path), (access_paths.EXACT_SCAN, True, access_paths.EXACT_SCAN))
+        # with no path within the target, the cheapest one is chosen
+        plan = queryPlanner.Query_planner(1.0).plan("collection", self._load_statistics, 10)
+        self.assertEqual((plan.access_path, plan.options.nprobe, plan.meets_target), (access_paths.IVF, 1, False))
+
+        # the exact scan of a small collection meets the target
+        self.backend_statistics["count"] = 1000
+        plan = queryPlanner.Query_planner(50.0).plan("collection", self._load_statistics, 10)
+        self.assertEqual((plan.access_path, plan.is_exact), (access_paths.EXACT_SCAN, True))
+
+
+    def test_compressed_codes_choice(self):
+        self.backend_statistics = {"count": 1000000, "dimension": 768, "access_paths": {access_paths.EXACT_SCAN: dict(),
+                                   access_paths.COMPRESSED_CODES: {
+                                        compressions.SCALAR_QUANTIZATION_INT8: {"code_bytes": 768, "shortlist_factor": 4},
+                                        compressions.PRODUCT_QUANTIZATION: {"code_bytes": 96, "shortlist_factor": 4},
+                                        compressions.BINARY_SIGN: {"code_bytes": 96, "shortlist_factor": 16}}}}
+        # int8 codes cost 1920 ms, PQ codes 243 ms and sign codes 253 ms (the shortlists of 'top_m' 126 are rescored)
+        plans = { target: queryPlanner.Query_planner(target).plan("collection", self._load_statistics, 10) for target in [3000.0, 500.0, 100.0] }
+        self.assertEqual(plans[3000.0].options.vector_compression, compressions.SCALAR_QUANTIZATION_INT8)
+        self.assertEqual(plans[500.0].options.vector_compression, compressions.PRODUCT_QUANTIZATION)
+        self.assertEqual((plans[100.0].options.vector_compression, plans[100.0].meets_target), (compressions.PRODUCT_QUANTIZATION, False))
+        for plan in plans.values():
+            self.assertEqual((plan.access_path, plan.is_exact, plan.options.top_m), (access_paths.COMPRESSED_CODES, False, 126))
+
+
+    def test_statistics_upkeep(self):
+        planner = queryPlanner.Query_planner(1.0)
+        planner.plan("collection", self._load_statistics, 10)
+        planner.plan("collection", self._load_statistics, 5)
+        self.assertEqual(self.loaded_collections, ["collection"])
+
+        # complete insertions update the statistics in place
+        planner.record_insertions("collection", ["llama-text-embed-v2", "text-embedding-3-small"], all_inserted=True)
+        statistics = planner.get_statistics("collection", self._load_statistics)
+        self.assertEqual((statistics.count, statistics.embedders), (1002, {"llama-text-embed-v2", "text-embedding-3-small"}))
+        planner.record_insertions("other collection", ["llama-text-embed-v2"], all_inserted=True) #not planned yet: ignored
+        self.assertEqual(self.loaded_collections, ["collection"])
+
+        # rejected insertions, invalidations and stale statistics are reloaded from the backend
+        planner.record_insertions("collection", ["llama-text-embed-v2"], all_inserted=False)
+        self.assertEqual(planner.get_statistics("collection", self._load_statistics).count, 1000)
+        planner.invalidate("collection")
+        planner.plan("collection", self._load_statistics, 10)
+        self.assertEqual(self.loaded_collections, ["collection"] * 3)
+        stale_planner = queryPlanner.Query_planner(1.0, statistics_max_age_s=-1)
+        stale_planner.plan("collection", self._load_statistics, 10)
+        stale_planner.plan("collection", self._load_statistics, 10)
+        self.assertEqual(len(self.loaded_collections), 5)
+
+
+    def _load_statistics(self, collection_name: str) -> dict:
+        """
+        Backend statistics loader recording its calls.
+        """
+        self.loaded_collections.append(collection_name)
+        return self.backend_statistics
+
+
+if __name__ == "__main__":
+    unittest.main()
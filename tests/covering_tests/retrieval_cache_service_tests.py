@@ -0,0 +1,84 @@
+import unittest
+import numpy
+import src.services.other_services.retrieval_cache_services as retrievalCache
+from src.models.data_models import RAG_DTModel, RAG_retrieval_result
+
+
+class Retrieval_cache_service_tester(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random_generator = numpy.random.default_rng(0)
+        cls.queries = random_generator.normal(size=(4, 8)).astype(numpy.float32).tolist()
+
+
+    def setUp(self):
+        self.result = RAG_retrieval_result([ RAG_DTModel(vector=[0.5, 0.5], text=f"chunk {row}", embedder_name="llama-text-embed-v2", 
+                                                         url="https://doc.com", id=str(row)) for row in range(3) ])
+
+
+    def test_keys(self):
+        cache = retrievalCache.Retrieval_result_cache(4)
+        key = cache.build_key("collection", self.queries[0], 5, metadata_filter={"url": ["a", "b"], "title": ["t"]})
+        # dict keys order and list types do not matter, any other option does
+        self.assertEqual(key, cache.build_key("collection", numpy.asarray(self.queries[0]), 5, 
+                                              metadata_filter={"title": ("t",), "url": ["a", "b"]}))
+        self.assertNotEqual(key, cache.build_key("collection", self.queries[0], 6, metadata_filter={"url": ["a", "b"], "title": ["t"]}))
+        self.assertNotEqual(key, cache.build_key("collection", self.queries[1], 5, metadata_filter={"url": ["a", "b"], "title": ["t"]}))
+        self.assertNotEqual(key, cache.build_key("other_collection", self.queries[0], 5, metadata_filter={"url": ["a", "b"], "title": ["t"]}))
+        hash(key)
+
+
+    def test_LRU_eviction(self):
+        with self.assertRaises(ValueError):
+            retrievalCache.Retrieval_result_cache(0)
+        cache = retrievalCache.Retrieval_result_cache(2)
+        keys = [ cache.build_key("collection", query, 5) for query in self.queries[:3] ]
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertTrue(cache.put(keys[0], self.result, cache.get_epoch("collection")))
+        self.assertTrue(cache.put(keys[1], self.result, cache.get_epoch("collection")))
+        self.assertIsNotNone(cache.get(keys[0])) #the first key becomes the most recently used one
+        self.assertTrue(cache.put(keys[2], self.result, cache.get_epoch("collection")))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertEqual(cache.get_stats(), {"entries": 2, "max_entries": 2, "hits": 2, "misses": 2, "hit_rate": 0.5, 
+                                             "evictions": 1, "invalidations": 0})
+
+
+    def test_copies(self):
+        cache = retrievalCache.Retrieval_result_cache(2)
+        key = cache.build_key("collection", self.queries[0], 3)
+        partial_result = RAG_retrieval_result(list(self.result), is_partial=True)
+        cache.put(key, partial_result, 0)
+        partial_result[0].text = "modified after the put"
+        
+        cached_result = cache.get(key)
+        self.assertIsInstance(cached_result, RAG_retrieval_result)
+        self.assertTrue(cached_result.is_partial)
+        self.assertEqual([ data_model.text for data_model in cached_result ], ["chunk 0", "chunk 1", "chunk 2"])
+        cached_result[0].vector.append(1.0)
+        cached_result.pop()
+        self.assertEqual(len(cache.get(key)), 3)
+        self.assertEqual(cache.get(key)[0].vector, [0.5, 0.5])
+
+
+    def test_invalidation(self):
+        cache = retrievalCache.Retrieval_result_cache(4)
+        (key, other_key) = (cache.build_key("collection", self.queries[0], 3), cache.build_key("other_collection", self.queries[0], 3))
+        cache.put(key, self.result, cache.get_epoch("collection"))
+        cache.put(other_key, self.result, cache.get_epoch("other_collection"))
+        
+        # a result retrieved before a write of its collection is not cached
+        stale_epoch = cache.get_epoch("collection")
+        cache.invalidate_collection("collection")
+        self.assertEqual(cache.get_epoch("collection"), stale_epoch + 1)
+        self.assertIsNone(cache.get(key))
+        self.assertIsNotNone(cache.get(other_key))
+        self.assertFalse(cache.put(key, self.result, stale_epoch))
+        self.assertIsNone(cache.get(key))
+        self.assertTrue(cache.put(key, self.result, cache.get_epoch("collection")))
+        self.assertEqual(cache.get_stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy
+import src.services.other_services.sharded_scoring_services as shardedScoring
+
+
+class Sharded_scoring_service_tester(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random_generator = numpy.random.default_rng(0)
+        cls.matrix = random_generator.normal(size=(300, 16)).astype(numpy.float32)
+        cls.matrix /= numpy.linalg.norm(cls.matrix, axis=1, keepdims=True)
+
+
+    def test_segment_synchronization(self):
+        with self.assertRaises(ValueError):
+            shardedScoring.Shared_vector_segment(" ")
+        segment = shardedScoring.Shared_vector_segment(shardedScoring.build_segment_key("testDB", "segment_test"))
+        self.addCleanup(segment.release)
+        self.assertIsNone(segment.get_name())
+        self.assertEqual(segment.get_matrix().shape, (0, 0))
+
+        segment.synchronize(self.matrix[:100])
+        first_name = segment.get_name()
+        numpy.testing.assert_array_equal(segment.get_matrix(), self.matrix[:100])
+        # appended rows are copied in place while they fit in the spare capacity
+        segment.synchronize(self.matrix[:140])
+        self.assertEqual(segment.get_name(), first_name)
+        numpy.testing.assert_array_equal(segment.get_matrix(), self.matrix[:140])
+        # a larger, rebuilt or shrunk matrix replaces the segment with a new generation
+        segment.synchronize(self.matrix)
+        self.assertNotEqual(segment.get_name(), first_name)
+        numpy.testing.assert_array_equal(segment.get_matrix(), self.matrix)
+        rebuilt_matrix = self.matrix[::-1].copy()
+        segment.synchronize(rebuilt_matrix, source_version=1)
+        numpy.testing.assert_array_equal(segment.get_matrix(), rebuilt_matrix)
+        segment.synchronize(self.matrix[:10], source_version=1)
+        numpy.testing.assert_array_equal(segment.get_matrix(), self.matrix[:10])
+
+
+    def test_sharded_top_m_candidates(self):
+        with self.assertRaises(ValueError):
+            shardedScoring.Sharded_scoring_pool(0)
+        scoring_pool = shardedScoring.Sharded_scoring_pool(2)
+        self.addCleanup(scoring_pool.close)
+        segment = shardedScoring.Shared_vector_segment(shardedScoring.build_segment_key("testDB", "pool_test"))
+        self.addCleanup(segment.release)
+        query_matrix = self.matrix[[3, 150, 299]]
+        
+        (scores, indexes) = scoring_pool.find_top_m_candidates(segment, query_matrix, 10)[0]
+        self.assertEqual((scores.shape[0], indexes.shape[0]), (0, 0)) #empty segment
+        
+        segment.synchronize(self.matrix)
+        candidates = scoring_pool.find_top_m_candidates(segment, query_matrix, 10)
+        for ((scores, indexes), query) in zip(candidates, query_matrix):
+            exact_scores = self.matrix @ query
+            self.assertEqual(indexes.tolist(), numpy.argsort(-exact_scores, kind="stable")[:10].tolist())
+            numpy.testing.assert_allclose(scores, exact_scores[indexes], rtol=1e-5)
+        
+        # the workers attach the new generation after a reallocation
+        segment.synchronize(self.matrix[::-1].copy(), source_version=1)
+        (_, indexes) = scoring_pool.find_top_m_candidates(segment, query_matrix[:1], 1)[0]
+        self.assertEqual(indexes.tolist(), [ 299 - 3 ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy
+import src.services.other_services.vector_cache_services as vectorCache
+
+
+class Vector_cache_service_tester(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_folder_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_folder_path, True)
+        random_generator = numpy.random.default_rng(0)
+        self.matrix = random_generator.normal(size=(30, 8)).astype(numpy.float32)
+        self.record_ids = [ row.to_bytes(vectorCache.OBJECT_ID_SIZE, "big") for row in range(30) ]
+
+
+    def test_append_and_reopen(self):
+        cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        self.assertEqual((cache.count, cache.watermark), (0, None))
+        cache.append(self.record_ids[:20], self.matrix[:20], "watermark 20")
+        cache.append(self.record_ids[20:], self.matrix[20:], "watermark 30")
+        with self.assertRaises(ValueError):
+            cache.append(self.record_ids[:1], numpy.zeros((1, 4), dtype=numpy.float32), "wrong dimension")
+
+        # the header and the data files persist the appended rows
+        reopened_cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        self.assertEqual((reopened_cache.count, reopened_cache.dimension, reopened_cache.watermark), (30, 8, "watermark 30"))
+        numpy.testing.assert_array_equal(reopened_cache.get_matrix(), self.matrix)
+        self.assertEqual(reopened_cache.get_id(25), self.record_ids[25])
+        self.assertEqual(reopened_cache.get_offset(self.record_ids[12]), 12)
+        self.assertIsNone(reopened_cache.get_offset(b"\xff" * vectorCache.OBJECT_ID_SIZE))
+        
+        # the source version is persisted along with the rows, and dropped by a reset
+        reopened_cache.set_source_version({"inserts": 2, "rewrites": 0})
+        self.assertEqual(vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers").source_version, 
+                         {"inserts": 2, "rewrites": 0})
+        reopened_cache.reset()
+        self.assertIsNone(vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers").source_version)
+
+
+    def test_interrupted_append_is_discarded(self):
+        cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        cache.append(self.record_ids, self.matrix, "watermark 30")
+        with open(cache.vectors_file_path, "ab") as vectors_file: #rows written without their header update
+            vectors_file.write(self.matrix[:2].tobytes())
+        
+        reopened_cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        self.assertEqual((reopened_cache.count, reopened_cache.watermark), (0, None))
+        self.assertFalse(os.path.exists(reopened_cache.vectors_file_path))
+
+
+    def test_snapshots_and_versions(self):
+        cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        cache.append(self.record_ids[:10], self.matrix[:10], "watermark 10")
+        snapshot = cache.get_snapshot()
+        cache.append(self.record_ids[10:], self.matrix[10:], "watermark 30")
+        # the snapshot keeps its rows count, the next readers see the appended rows
+        self.assertEqual((snapshot.count, cache.get_snapshot().count), (10, 30))
+        numpy.testing.assert_array_equal(snapshot.get_matrix(), self.matrix[:10])
+
+        # a rebuild fills the next version aside, then the reopened cache uses it and removes the old one
+        next_cache = cache.create_next_version()
+        self.assertEqual((next_cache.version, next_cache.count), (1, 0))
+        next_cache.append(self.record_ids[:5], self.matrix[:5], "watermark 5")
+        self.assertTrue(next_cache.vectors_file_path.endswith("papers.v1.f32"))
+        numpy.testing.assert_array_equal(snapshot.get_matrix(), self.matrix[:10])
+        reopened_cache = vectorCache.Collection_vector_cache(self.cache_folder_path, "testDB", "papers")
+        self.assertEqual((reopened_cache.version, reopened_cache.count), (1, 5))
+        self.assertFalse(os.path.exists(cache.header_file_path))
+        with open(reopened_cache.header_file_path, "r", encoding="utf-8") as header_file:
+            self.assertEqual(json.load(header_file)["watermark"], "watermark 5")
+
+
+if __name__ == "__main__":
+    unittest.main()
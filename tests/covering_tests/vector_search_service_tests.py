@@ -0,0 +1,259 @@
+import time
+import unittest
+import numpy
+import src.services.other_services.vector_search_services as vectorSearch
+
+
+class Vector_search_service_tester(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        random_generator = numpy.random.default_rng(0)
+        cls.matrix = vectorSearch.normalize_rows(random_generator.normal(size=(500, 16)).astype(numpy.float32))
+        cls.query = cls.matrix[7]
+
+
+    def test_select_top_m_indexes(self):
+        scores = self.matrix @ self.query
+        self.assertEqual(set(vectorSearch.select_top_m_indexes(scores, 10).tolist()), 
+                         set(numpy.argsort(-scores)[:10].tolist()))
+        # all the indexes are returned if 'top_m' exceeds the scores count
+        self.assertEqual(sorted(vectorSearch.select_top_m_indexes(scores[:5], 10).tolist()), [0, 1, 2, 3, 4])
+
+
+    def test_top_m_candidates_heap(self):
+        with self.assertRaises(ValueError):
+            vectorSearch.Top_m_candidates_heap(0)
+        scores = self.matrix @ self.query
+        expected_indexes = numpy.argsort(-scores)[:20].tolist()
+
+        # batches scored one at a time through a reused buffer
+        candidates_heap = vectorSearch.Top_m_candidates_heap(20)
+        buffer = numpy.empty((64, 16), dtype=numpy.float32)
+        for start in range(0, self.matrix.shape[0], 64):
+            batch_size = min(64, self.matrix.shape[0] - start)
+            buffer[:batch_size] = self.matrix[start:start + batch_size]
+            candidates_heap.push_batch(buffer[:batch_size] @ self.query, list(range(start, start + batch_size)), buffer[:batch_size])
+        buffer[:] = 0
+        sorted_candidates = candidates_heap.get_sorted_candidates()
+        self.assertEqual([ payload for (_, payload, _) in sorted_candidates ], expected_indexes)
+        for (score, payload, vector) in sorted_candidates: #surviving rows are copies of the buffer
+            numpy.testing.assert_array_equal(vector, self.matrix[payload])
+            self.assertAlmostEqual(score, float(scores[payload]), places=5)
+        self.assertEqual(candidates_heap.get_threshold(), sorted_candidates[-1][0])
+
+        self.assertEqual(candidates_heap.get_sorted_groups(), [None] * 20)
+
+        # the heaps of two halves merge into the heap of the whole, along with their groups
+        (first_heap, second_heap) = (vectorSearch.Top_m_candidates_heap(20), vectorSearch.Top_m_candidates_heap(20))
+        first_heap.push_batch(scores[:250], list(range(250)), self.matrix[:250])
+        second_heap.push_batch(scores[250:], list(range(250, 500)), self.matrix[250:], [ index % 3 for index in range(250, 500) ])
+        first_heap.merge(second_heap)
+        self.assertEqual([ payload for (_, payload, _) in first_heap.get_sorted_candidates() ], expected_indexes)
+        self.assertEqual(first_heap.get_sorted_groups(), [ (index % 3) if (index >= 250) else None for index in expected_indexes ])
+
+        first_heap.map_payloads(lambda payload: f"record {payload}")
+        self.assertEqual(first_heap.get_sorted_candidates()[0][1], f"record {expected_indexes[0]}")
+        first_heap.remove_payloads({ f"record {index}" for index in expected_indexes[:2] })
+        self.assertEqual([ payload for (_, payload, _) in first_heap.get_sorted_candidates() ], 
+                         [ f"record {index}" for index in expected_indexes[2:] ])
+        self.assertEqual(first_heap.get_sorted_groups(), [ (index % 3) if (index >= 250) else None for index in expected_indexes[2:] ])
+
+
+    def test_decode_vectors_into_matrix(self):
+        vectors = self.matrix[:10].tolist()
+        buffer = numpy.zeros((32, 16), dtype=numpy.float32)
+        matrix = vectorSearch.decode_vectors_into_matrix(vectors, buffer)
+        self.assertIs(matrix, buffer) #large enough buffers are reused
+        numpy.testing.assert_allclose(matrix[:10], self.matrix[:10])
+        self.assertEqual(vectorSearch.decode_vectors_into_matrix(vectors, numpy.zeros((4, 16), dtype=numpy.float32)).shape, (10, 16))
+
+
+    def test_kmeans_centroids(self):
+        with self.assertRaises(ValueError):
+            vectorSearch.train_kmeans_centroids(numpy.empty((0, 16), dtype=numpy.float32), 4)
+        random_generator = numpy.random.default_rng(1)
+        centers = vectorSearch.normalize_rows(random_generator.normal(size=(4, 16)).astype(numpy.float32))
+        matrix = vectorSearch.normalize_rows(centers[numpy.repeat(numpy.arange(4), 50)] 
+                                             + 0.05 * random_generator.normal(size=(200, 16)).astype(numpy.float32))
+        centroids = vectorSearch.train_kmeans_centroids(matrix, 4, iterations=50)
+        self.assertEqual(centroids.shape, (4, 16))
+        numpy.testing.assert_allclose(numpy.linalg.norm(centroids, axis=1), 1, rtol=1e-5)
+        # converged spherical k-means: every centroid is the normalized mean of the vectors assigned to it
+        assignments = vectorSearch.assign_to_nearest_centroids(matrix, centroids)
+        for cluster in set(assignments.tolist()):
+            numpy.testing.assert_allclose(centroids[cluster], vectorSearch.normalize_rows(
+                    matrix[assignments == cluster].sum(axis=0, keepdims=True))[0], atol=1e-5)
+        self.assertGreater(float(numpy.mean(numpy.max(matrix @ centroids.T, axis=1))), 0.8)
+
+        self.assertEqual(vectorSearch.train_kmeans_centroids(matrix[:3], 10).shape, (3, 16)) #capped to the training vectors
+
+
+    def test_assign_to_nearest_centroids(self):
+        centroids = self.matrix[:10]
+        nearest = vectorSearch.assign_to_nearest_centroids(self.matrix[100:110], centroids, n_nearest=3)
+        expected = numpy.argsort(-(self.matrix[100:110] @ centroids.T), axis=1)[:, :3]
+        numpy.testing.assert_array_equal(nearest, expected)
+        numpy.testing.assert_array_equal(vectorSearch.assign_to_nearest_centroids(self.matrix[100:110], centroids), expected[:, 0])
+        self.assertEqual(vectorSearch.assign_to_nearest_centroids(self.query, centroids).shape, (1,))
+
+    def test_product_quantization(self):
+        with self.assertRaises(ValueError):
+            vectorSearch.train_product_quantizer(self.matrix, 5) #16 dimensions are not divisible into 5 subspaces
+        codebooks = vectorSearch.train_product_quantizer(self.matrix, 4, n_centroids=32)
+        self.assertEqual(codebooks.shape, (4, 32, 4))
+        codes = vectorSearch.encode_product_quantization(self.matrix, codebooks)
+        self.assertEqual((codes.shape, codes.dtype), ((500, 4), numpy.uint8))
+        
+        # the codes decode into the concatenation of their centroids, close to the encoded vectors
+        decoded = numpy.concatenate([ codebooks[subspace][codes[:, subspace]] for subspace in range(4) ], axis=1)
+        self.assertLess(float(numpy.mean(numpy.linalg.norm(decoded - self.matrix, axis=1))), 0.5)
+        numpy.testing.assert_array_equal(vectorSearch.encode_product_quantization(decoded, codebooks), codes)
+        
+        # ADC scores are the exact dot products between the query and the decoded vectors
+        lookup_table = vectorSearch.build_ADC_lookup_table(self.query, codebooks)
+        numpy.testing.assert_allclose(vectorSearch.score_with_ADC(codes, lookup_table), decoded @ self.query, atol=1e-5)
+        top_indexes = set(vectorSearch.select_top_m_indexes(vectorSearch.score_with_ADC(codes, lookup_table), 50).tolist())
+        self.assertGreaterEqual(len(set(numpy.argsort(-(self.matrix @ self.query))[:10].tolist()) & top_indexes), 9)
+
+    def test_select_non_redundant_candidates(self):
+        # the 5 candidates closest to the query, each one followed by a near-duplicate
+        random_generator = numpy.random.default_rng(2)
+        query = vectorSearch.normalize_rows(self.matrix[7:9].sum(axis=0, keepdims=True))[0]
+        candidates = numpy.argsort(-(self.matrix @ query))[:5]
+        duplicates = vectorSearch.normalize_rows(self.matrix[candidates] + 0.01 * random_generator.normal(size=(5, 16)).astype(numpy.float32))
+        vectors = numpy.empty((10, 16), dtype=numpy.float32)
+        (vectors[0::2], vectors[1::2]) = (self.matrix[candidates], duplicates)
+        similarities = vectors @ query
+
+        self.assertEqual(vectorSearch.select_non_redundant_candidates(similarities, vectors, 0), [])
+        self.assertEqual(vectorSearch.select_non_redundant_candidates(similarities, vectors, 10), 
+                         numpy.argsort(-similarities, kind="stable").tolist()) #no hard cut: pure relevance order
+        
+        # greedy reference: a candidate is kept if it is not too similar to any kept one
+        expected_indexes: list[int] = []
+        for index in numpy.argsort(-similarities, kind="stable").tolist():
+            if(all( float(vectors[index] @ vectors[kept_index]) < 0.9 for kept_index in expected_indexes )):
+                expected_indexes.append(index)
+        selected_indexes = vectorSearch.select_non_redundant_candidates(similarities, vectors, 10, redundancy_tolerance=0.9)
+        self.assertEqual(selected_indexes, expected_indexes)
+        self.assertEqual(len(selected_indexes), 5) #one per near-duplicate pair
+        self.assertEqual(vectorSearch.select_non_redundant_candidates(similarities, vectors, 3, redundancy_tolerance=0.9), 
+                         expected_indexes[:3])
+        
+        # the marginal relevance trades the relevance for the distance to the already selected candidates
+        mmr_indexes = vectorSearch.select_non_redundant_candidates(similarities, vectors, 5, mmr_lambda=0.5)
+        self.assertEqual(mmr_indexes[0], int(numpy.argmax(similarities)))
+        for step in range(1, 5):
+            max_redundancy = (vectors @ vectors[mmr_indexes[:step]].T).max(axis=1)
+            marginal_relevance = 0.5 * similarities - 0.5 * max_redundancy
+            marginal_relevance[mmr_indexes[:step]] = -numpy.inf
+            self.assertEqual(mmr_indexes[step], int(numpy.argmax(marginal_relevance)))
+
+    def test_scalar_quantization(self):
+        scales = vectorSearch.train_scalar_quantizer(self.matrix)
+        numpy.testing.assert_allclose(scales * 127, numpy.abs(self.matrix).max(axis=0), rtol=1e-6)
+        codes = vectorSearch.encode_scalar_quantization(self.matrix, scales)
+        self.assertEqual((codes.shape, codes.dtype), ((500, 16), numpy.int8))
+        # decoding is exact up to half a quantization step, values beyond the trained range are clipped
+        self.assertTrue(numpy.all(numpy.abs(codes * scales - self.matrix) <= scales / 2 + 1e-6))
+        numpy.testing.assert_array_equal(vectorSearch.encode_scalar_quantization(3 * self.matrix[:1], scales)[0], 
+                                         numpy.clip(numpy.rint(3 * self.matrix[0] / scales), -127, 127))
+        
+        (query_codes, query_factor) = vectorSearch.build_SQ_query(self.query, scales)
+        approximated_scores = vectorSearch.score_with_SQ(codes, query_codes, query_factor)
+        numpy.testing.assert_allclose(approximated_scores, self.matrix @ self.query, atol=0.05)
+        top_indexes = set(vectorSearch.select_top_m_indexes(approximated_scores, 20).tolist())
+        self.assertTrue(set(numpy.argsort(-(self.matrix @ self.query))[:10].tolist()) <= top_indexes)
+        (zero_codes, zero_factor) = vectorSearch.build_SQ_query(numpy.zeros(16, dtype=numpy.float32), scales)
+        self.assertEqual((int(numpy.abs(zero_codes).sum()), zero_factor), (0, 0.0))
+
+    def test_sign_bits(self):
+        center = self.matrix.mean(axis=0)
+        codes = vectorSearch.encode_sign_bits(self.matrix, center)
+        self.assertEqual((codes.shape, codes.dtype), ((500, 2), numpy.uint8))
+        bits = numpy.unpackbits(codes, axis=1)
+        numpy.testing.assert_array_equal(bits, (self.matrix > center).astype(numpy.uint8))
+        
+        # the scores are the negated numbers of differing bits
+        query_codes = vectorSearch.encode_sign_bits(self.query, center)
+        expected_scores = -(bits != numpy.unpackbits(query_codes, axis=1)).sum(axis=1)
+        numpy.testing.assert_array_equal(vectorSearch.score_with_hamming(codes, query_codes), expected_scores)
+        self.assertEqual(vectorSearch.score_with_hamming(codes, query_codes)[7], 0)
+        
+        # the lookup table fallback counts the same bits as the native popcount
+        all_bytes = numpy.arange(256, dtype=numpy.uint8).reshape(16, 16)
+        numpy.testing.assert_array_equal(vectorSearch._POPCOUNT_TABLE[all_bytes], 
+                                         numpy.unpackbits(all_bytes[..., numpy.newaxis], axis=-1).sum(axis=-1))
+        numpy.testing.assert_array_equal(vectorSearch._popcount(all_bytes), vectorSearch._POPCOUNT_TABLE[all_bytes])
+
+    def test_search_deadline(self):
+        with self.assertRaises(ValueError):
+            vectorSearch.Search_deadline(0)
+        deadline = vectorSearch.Search_deadline(60000)
+        self.assertFalse(deadline.is_expired())
+        self.assertFalse(deadline.was_hit)
+        deadline = vectorSearch.Search_deadline(1)
+        time.sleep(0.01)
+        self.assertTrue(deadline.is_expired())
+        self.assertTrue(deadline.was_hit)
+
+    def test_validate_vectors_batch(self):
+        vectors = [ self.matrix[0].tolist(), (3 * self.matrix[1]).tolist(), [0.0] * 16, self.matrix[2, :8].tolist() ]
+        (valid_mask, unnormalized_mask, matrix) = vectorSearch.validate_vectors_batch(vectors, 16)
+        self.assertEqual(valid_mask.tolist(), [True, True, False, False]) #null vector and wrong dimension
+        self.assertEqual(unnormalized_mask.tolist(), [False, True, False, False])
+        numpy.testing.assert_allclose(matrix[:2], self.matrix[:2], rtol=1e-5)
+        numpy.testing.assert_array_equal(matrix[2:], 0)
+
+    def test_leader_clustering(self):
+        with self.assertRaises(ValueError):
+            vectorSearch.Leader_clustering(0)
+        clustering = vectorSearch.Leader_clustering(0.85)
+        self.assertEqual(clustering.find_nearest_leader(self.query), (None, -numpy.inf))
+        with self.assertRaises(ValueError):
+            clustering.add_leaders(self.matrix[:2], ["group 0"])
+        
+        # the leaders matrix grows beyond its initial rows
+        clustering.add_leaders(self.matrix[:10], [ f"group {row}" for row in range(10) ])
+        clustering.add_leaders(self.matrix[10:40], [ f"group {row}" for row in range(10, 40) ])
+        self.assertEqual(len(clustering), 40)
+        for row in [0, 15, 39]:
+            (group_id, similarity) = clustering.find_nearest_leader(self.matrix[row])
+            self.assertEqual(group_id, f"group {row}")
+            self.assertAlmostEqual(similarity, 1.0, places=5)
+        (group_id, similarity) = clustering.find_nearest_leader(self.query)
+        best_row = int(numpy.argmax(self.matrix[:40] @ self.query))
+        self.assertEqual((group_id, round(similarity, 5)), (f"group {best_row}", round(float(self.matrix[best_row] @ self.query), 5)))
+
+    def test_document_centroids(self):
+        centroids = vectorSearch.Document_centroids()
+        self.assertEqual(centroids.find_top_documents(self.query, 3), [])
+        # 20 documents grow the sums matrix beyond its initial rows
+        for row in range(0, 100, 5):
+            (vectors_sum, count) = centroids.add_vectors(f"doc {row // 5}", self.matrix[row:row + 4])
+            self.assertEqual(count, 4)
+        (vectors_sum, count) = centroids.add_vectors("doc 0", self.matrix[4])
+        self.assertEqual(count, 5)
+        numpy.testing.assert_allclose(vectors_sum, self.matrix[:5].astype(numpy.float64).sum(axis=0), rtol=1e-6)
+        self.assertEqual(len(centroids), 20)
+        with self.assertRaises(ValueError):
+            centroids.add_vectors("doc 0", numpy.ones(self.matrix.shape[1] + 1))
+        
+        reference_matrix = numpy.stack([ self.matrix[row:row + (5 if (row == 0) else 4)].sum(axis=0) for row in range(0, 100, 5) ])
+        reference_scores = (reference_matrix / numpy.linalg.norm(reference_matrix, axis=1, keepdims=True)) @ self.query
+        self.assertEqual(centroids.find_top_documents(self.query, 3), [ f"doc {row}" for row in numpy.argsort(-reference_scores)[:3] ])
+        allowed_documents = {"doc 2", "doc 7", "doc 11"}
+        allowed_rows = sorted(int(document.split()[1]) for document in allowed_documents)
+        self.assertEqual(centroids.find_top_documents(self.query, 5, allowed_documents), 
+                         [ f"doc {allowed_rows[index]}" for index in numpy.argsort(-reference_scores[allowed_rows]) ])
+        
+        # the persisted sums and counts restore the same ranking
+        restored_centroids = vectorSearch.Document_centroids()
+        for (document_key, vectors_sum, count) in centroids.get_documents():
+            restored_centroids.set_document(document_key, vectors_sum, count)
+        self.assertEqual(restored_centroids.find_top_documents(self.query, 20), centroids.find_top_documents(self.query, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()